@@ -0,0 +1,51 @@
+"""
+Moves analytics events past ANALYTICS_EVENT_RETENTION_DAYS into
+ArchivedAnalyticsEvent (monthly partitions on PostgreSQL), one short
+transaction per chunk, so dashboards only scan recent events. Interrupted runs
+resume on the next call: moved events no longer match.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from config.partitioning import ensure_month_partitions
+from .models import AnalyticsEvent, ArchivedAnalyticsEvent
+
+logger = logging.getLogger(__name__)
+
+ARCHIVED_FIELDS = ('id', 'user_id', 'session_id', 'event_type', 'data', 'url', 'timestamp')
+
+
+def archive_events(older_than_days=None, chunk_size=5000, max_chunks=None):
+    """Returns the number of events archived"""
+    if older_than_days is None:
+        older_than_days = getattr(settings, 'ANALYTICS_EVENT_RETENTION_DAYS', 90)
+    before = timezone.now() - timedelta(days=older_than_days)
+
+    archived = chunks = 0
+    while max_chunks is None or chunks < max_chunks:
+        ids = list(
+            AnalyticsEvent.objects.filter(timestamp__lt=before).order_by('id').values_list('id', flat=True)[:chunk_size]
+        )
+        if not ids:
+            break
+        archived += _archive_chunk(ids)
+        chunks += 1
+
+    logger.info(f"Archived {archived} analytics events older than {before:%Y-%m-%d}")
+    return archived
+
+
+@transaction.atomic
+def _archive_chunk(ids):
+    rows = list(AnalyticsEvent.objects.filter(id__in=ids).values(*ARCHIVED_FIELDS))
+    ensure_month_partitions(ArchivedAnalyticsEvent, [row['timestamp'] for row in rows])
+    ArchivedAnalyticsEvent.objects.bulk_create(
+        [ArchivedAnalyticsEvent(event_id=row.pop('id'), **row) for row in rows],
+        ignore_conflicts=True
+    )
+    AnalyticsEvent.objects.filter(id__in=ids).delete()
+    return len(rows)
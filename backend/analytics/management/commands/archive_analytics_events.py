@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from analytics.archive import archive_events
+
+
+class Command(BaseCommand):
+    help = 'Move analytics events past the retention window into the archive table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Archive events older than this many days (default ANALYTICS_EVENT_RETENTION_DAYS)')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--max-chunks', type=int, default=None)
+
+    def handle(self, *args, **options):
+        count = archive_events(
+            older_than_days=options['days'], chunk_size=options['chunk_size'], max_chunks=options['max_chunks']
+        )
+        self.stdout.write(self.style.SUCCESS(f"Archived {count} analytics events"))
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:55
+
+from django.db import migrations, models
+
+from config.partitioning import convert_to_monthly_partitions
+
+
+def partition_archive(apps, schema_editor):
+    convert_to_monthly_partitions(schema_editor, apps.get_model('analytics', 'ArchivedAnalyticsEvent'), 'timestamp')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAnalyticsEvent',
+            fields=[
+                ('pk', models.CompositePrimaryKey('event_id', 'timestamp', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('event_id', models.BigIntegerField()),
+                ('user_id', models.BigIntegerField(blank=True, null=True)),
+                ('session_id', models.CharField(max_length=100)),
+                ('event_type', models.CharField(max_length=50)),
+                ('data', models.JSONField(default=dict)),
+                ('url', models.URLField(blank=True, max_length=500)),
+                ('timestamp', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['event_type', 'timestamp'], name='analytics_a_event_t_5629be_idx')],
+            },
+        ),
+        migrations.RunPython(partition_archive, migrations.RunPython.noop),
+    ]
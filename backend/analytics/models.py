@@ -39,3 +39,27 @@ class AnalyticsEvent(models.Model):
     def __str__(self):
         user_str = self.user.username if self.user else 'Anon'
         return f"{self.event_type} - {user_str} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
+
+
+class ArchivedAnalyticsEvent(models.Model):
+    """
+    Analytics event past the retention window (see analytics.archive).
+    Range-partitioned by month of timestamp on PostgreSQL.
+    """
+    pk = models.CompositePrimaryKey('event_id', 'timestamp')
+    event_id = models.BigIntegerField()
+    user_id = models.BigIntegerField(null=True, blank=True)
+    session_id = models.CharField(max_length=100)
+    event_type = models.CharField(max_length=50)
+    data = models.JSONField(default=dict)
+    url = models.URLField(max_length=500, blank=True)
+    timestamp = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['event_type', 'timestamp']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
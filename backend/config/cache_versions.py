@@ -0,0 +1,74 @@
+"""
+Shared cache version counters.
+
+A version is a monotonically increasing integer stored in the shared cache.
+Cached data embeds the version it was computed against in its key, so bumping
+the version invalidates every entry at once without having to find and delete
+them. Counters are seeded from the current time in milliseconds so that an
+evicted counter never restarts below a value that was already handed out.
+
+Compiled data (rule sets, zone tables, rate cards, ...) is read through a
+LocalCopy: the entry for the current versioned key is kept per process, so a
+reader only pays for the version check until the version moves on.
+"""
+import time
+from django.core.cache import cache
+
+VERSION_KEY_PREFIX = 'version:'
+
+
+def _seed():
+    return int(time.time() * 1000)
+
+
+def get_version(name):
+    """Return the current version for `name`, creating it if missing."""
+    key = f"{VERSION_KEY_PREFIX}{name}"
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _seed(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(name):
+    """Increment the version for `name` and return the new value."""
+    key = f"{VERSION_KEY_PREFIX}{name}"
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Counter missing (first use or evicted) - reseed above any previous value
+        version = _seed()
+        cache.set(key, version, timeout=None)
+        return version
+
+
+def get_versions(names):
+    """{name: current version} for many names in one cache round trip, creating missing ones"""
+    keys = {f"{VERSION_KEY_PREFIX}{name}": name for name in names}
+    found = cache.get_many(list(keys))
+    return {name: found[key] if key in found else get_version(name) for key, name in keys.items()}
+
+
+class LocalCopy:
+    """Per-process copy of one versioned shared cache entry, backed by the shared cache"""
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self._entry = (None, None)
+
+    def get(self, key, build):
+        """The value cached under `key`; on a miss in both tiers it is built by build() and stored"""
+        local_key, value = self._entry
+        if local_key == key:
+            return value
+
+        value = cache.get(key)
+        if value is None:
+            value = build()
+            cache.set(key, value, timeout=self.timeout)
+        self._entry = (key, value)
+        return value
+
+    def clear(self):
+        self._entry = (None, None)
@@ -21,6 +21,22 @@ app.conf.beat_schedule = {
         'task': 'orders.tasks.send_abandoned_cart_task',
         'schedule': crontab(hour=10, minute=0), # Run at 10 AM every day
     },
+    'compact-inventory-ledger': {
+        'task': 'products.tasks.compact_inventory_task',
+        'schedule': crontab(minute='*/5'),
+    },
+    'archive-closed-orders-nightly': {
+        'task': 'orders.tasks.archive_orders_task',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'purge-expired-exports': {
+        'task': 'exports.tasks.purge_exports_task',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    'warm-popular-postcodes': {
+        'task': 'orders.tasks.warm_postcodes_task',
+        'schedule': crontab(minute='*/30'),
+    },
 }
 
 @app.task(bind=True)
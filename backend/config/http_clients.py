@@ -0,0 +1,217 @@
+"""
+Shared HTTP clients for third-party integrations.
+
+Carrier, pincode directory and messaging calls used module-level requests.get /
+requests.post, so every call paid DNS, TCP and TLS setup again, and Shiprocket
+calls had no timeout at all. get_client(provider) instead returns one
+IntegrationClient per provider and process:
+
+- a requests.Session with a keep-alive connection pool (POOL_SIZE per host,
+  enough for the rate quote thread pool), recreated after a fork
+- (connect, read) timeouts per provider, narrowed per endpoint by URL path;
+  a timeout passed by the caller still wins
+- retries with exponential backoff and jitter on connection errors, and for
+  idempotent methods (GET, HEAD, OPTIONS, PUT, DELETE) also on read errors
+  and 429/502/503/504. A POST is only retried when it never reached the server.
+  These calls run inside gunicorn request workers, so no wait between
+  attempts - backoff or a server's Retry-After - exceeds max_retry_wait:
+  a call takes at most (retries + 1) * (connect + read) timeout plus
+  retries * max_retry_wait seconds
+- per-endpoint response time metrics (count, errors, mean / max) and the
+  number of connections opened, via metrics(); slow calls are logged
+
+PROVIDERS holds each provider's settings.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = 20
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+RETRY_STATUSES = (429, 502, 503, 504)
+SLOW_REQUEST_SECONDS = 5
+MAX_RETRY_WAIT = 2
+
+# timeout: default (connect, read) seconds; endpoint_timeouts: (path fragment, timeout), first match wins;
+# retries: retry budget (0 when the caller retries itself); max_retry_wait: longest sleep between attempts
+PROVIDERS = {
+    'delhivery': {
+        'timeout': (3.05, 30),
+        'endpoint_timeouts': (
+            ('/api/kinko/v1/invoice/charges', (3.05, 15)),
+            ('/c/api/pin-codes/', (3.05, 15)),
+        ),
+    },
+    'shiprocket': {
+        'timeout': (3.05, 30),
+        'endpoint_timeouts': (
+            ('/open/postcode/details', (3.05, 5)),
+            ('/courier/serviceability', (3.05, 15)),
+            ('/courier/track/', (3.05, 15)),
+            ('/auth/login', (3.05, 15)),
+        ),
+    },
+    # orders.pincode_sync retries with its own backoff and checkpointing
+    'datagovin': {'timeout': (5, 30), 'retries': 0},
+    'twilio': {'timeout': (3.05, 15)},
+    'resend': {'timeout': (3.05, 30)},
+}
+DEFAULT_PROVIDER = {
+    'timeout': (3.05, 30), 'endpoint_timeouts': (), 'retries': 2, 'backoff': 0.5, 'max_retry_wait': MAX_RETRY_WAIT,
+}
+
+
+def endpoint_name(url):
+    """URL path with ids collapsed, so metrics group per endpoint"""
+    return re.sub(r'\d+', ':id', urlparse(url).path) or '/'
+
+
+class BoundedRetry(Retry):
+    """Retry that honours Retry-After only up to max_wait seconds"""
+
+    def __init__(self, *args, max_wait=MAX_RETRY_WAIT, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_wait = max_wait
+
+    def new(self, **kw):
+        retry = super().new(**kw)
+        retry.max_wait = self.max_wait
+        return retry
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, self.max_wait)
+
+
+class IntegrationClient:
+    def __init__(self, provider, timeout=(3.05, 30), endpoint_timeouts=(), retries=2, backoff=0.5,
+                 max_retry_wait=MAX_RETRY_WAIT):
+        self.provider = provider
+        self.timeout = timeout
+        self.endpoint_timeouts = endpoint_timeouts
+        self.retries = retries
+        self.backoff = backoff
+        self.max_retry_wait = max_retry_wait
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _build_session(self):
+        retry = BoundedRetry(
+            total=self.retries,
+            connect=self.retries,
+            read=self.retries,
+            status=self.retries,
+            backoff_factor=self.backoff,
+            backoff_jitter=self.backoff,
+            backoff_max=self.max_retry_wait,
+            max_wait=self.max_retry_wait,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=IDEMPOTENT_METHODS,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    @property
+    def session(self):
+        # A session inherited through fork shares sockets with the parent - start a new one
+        if self._session is None or self._pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._pid != os.getpid():
+                    self._session = self._build_session()
+                    self._pid = os.getpid()
+        return self._session
+
+    def timeout_for(self, url):
+        path = urlparse(url).path
+        for fragment, timeout in self.endpoint_timeouts:
+            if fragment in path:
+                return timeout
+        return self.timeout
+
+    def _record(self, endpoint, elapsed, failed):
+        with self._lock:
+            stats = self._metrics.setdefault(endpoint, {'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            stats['count'] += 1
+            stats['errors'] += failed
+            stats['total_ms'] += elapsed * 1000
+            stats['max_ms'] = max(stats['max_ms'], elapsed * 1000)
+        if elapsed > SLOW_REQUEST_SECONDS:
+            logger.warning(f"Slow {self.provider} call to {endpoint}: {elapsed:.1f}s")
+
+    def request(self, method, url, timeout=None, **kwargs):
+        endpoint = endpoint_name(url)
+        started = time.perf_counter()
+        failed = True
+        try:
+            response = self.session.request(method, url, timeout=timeout or self.timeout_for(url), **kwargs)
+            failed = response.status_code >= 500
+            return response
+        finally:
+            self._record(endpoint, time.perf_counter() - started, failed)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def connections_opened(self):
+        if self._session is None:
+            return 0
+        pools = self._session.get_adapter('https://').poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    def metrics(self):
+        """{endpoint: {count, errors, mean_ms, max_ms}} plus connections opened, for this process"""
+        with self._lock:
+            endpoints = {
+                endpoint: {
+                    'count': stats['count'],
+                    'errors': stats['errors'],
+                    'mean_ms': round(stats['total_ms'] / stats['count'], 2),
+                    'max_ms': round(stats['max_ms'], 2),
+                }
+                for endpoint, stats in self._metrics.items()
+            }
+        return {'provider': self.provider, 'connections_opened': self.connections_opened(), 'endpoints': endpoints}
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(provider):
+    """The shared IntegrationClient of `provider` (see PROVIDERS)"""
+    client = _clients.get(provider)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(provider)
+            if client is None:
+                client = _clients[provider] = IntegrationClient(provider, **{**DEFAULT_PROVIDER, **PROVIDERS.get(provider, {})})
+    return client
+
+
+def all_metrics():
+    return [client.metrics() for client in list(_clients.values())]
@@ -0,0 +1,69 @@
+"""
+Monthly range partitioning for append-only archive tables (PostgreSQL only).
+
+Archive models declare a composite primary key that includes their partition
+column, are created by a normal CreateModel, and are then converted with
+convert_to_monthly_partitions() in a RunPython step. On other databases
+(SQLite in development and tests) they stay plain tables and every helper
+here is a no-op.
+
+Partitions are created on demand by ensure_month_partitions() before rows are
+written, so the DEFAULT partition only catches rows nobody prepared for.
+"""
+from datetime import date
+
+from django.db import connection
+
+_known_partitions = set()
+
+
+def _is_postgres(conn):
+    return conn.vendor == 'postgresql'
+
+
+def convert_to_monthly_partitions(schema_editor, model, column):
+    """Recreate the (empty) table of `model` as PARTITION BY RANGE (`column`)"""
+    if not _is_postgres(schema_editor.connection):
+        return
+    qn = schema_editor.quote_name
+    table = model._meta.db_table
+    tmp = f"{table}_unpartitioned"
+    pk_columns = ', '.join(qn(field.column) for field in model._meta.pk_fields)
+
+    schema_editor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(tmp)}")
+    schema_editor.execute(
+        f"CREATE TABLE {qn(table)} (LIKE {qn(tmp)} INCLUDING DEFAULTS) PARTITION BY RANGE ({qn(column)})"
+    )
+    # Dropping the old table frees its constraint and index names for the new one
+    schema_editor.execute(f"DROP TABLE {qn(tmp)}")
+    schema_editor.execute(f"ALTER TABLE {qn(table)} ADD PRIMARY KEY ({pk_columns})")
+    schema_editor.execute(f"CREATE TABLE {qn(table + '_default')} PARTITION OF {qn(table)} DEFAULT")
+    for index in model._meta.indexes:
+        schema_editor.add_index(model, index)
+
+
+def _month_bounds(year, month):
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def ensure_month_partitions(model, datetimes):
+    """Create the monthly partitions of `model` covering `datetimes` if missing"""
+    if not _is_postgres(connection):
+        return
+    table = model._meta.db_table
+    qn = connection.ops.quote_name
+    months = {(value.year, value.month) for value in datetimes}
+
+    with connection.cursor() as cursor:
+        for year, month in sorted(months):
+            name = f"{table}_p{year}{month:02d}"
+            if name in _known_partitions:
+                continue
+            start, end = _month_bounds(year, month)
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {qn(name)} PARTITION OF {qn(table)} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+            _known_partitions.add(name)
@@ -103,6 +103,7 @@ INSTALLED_APPS = [
     'notifications',
     'homepage',
     'promotions',  # New app for coupons and promotions
+    'exports',  # Streaming CSV/XLSX report exports
     'services',   # Pandit Booking & Tracking module
     
     # Channels for WebSocket support
@@ -210,6 +211,11 @@ STORAGES = {
     "default": {
         "BACKEND": "django.core.files.storage.FileSystemStorage",
     },
+    # Report exports hold customer PII, so they never go under MEDIA_ROOT (served publicly)
+    "exports": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {"location": BASE_DIR / 'private_media'},
+    },
 }
 
 # Media files configuration
@@ -255,6 +261,18 @@ if USE_R2_STORAGE:
     }
     
     print(f"DEBUG SETTINGS: STORAGES['default'] = {STORAGES['default']}")
+
+    # Exports go to a separate bucket with no public domain; URLs are signed and expire
+    STORAGES["exports"] = {
+        "BACKEND": "config.storage_backends.CloudflareR2Storage",
+        "OPTIONS": {
+            "bucket_name": os.getenv('R2_EXPORTS_BUCKET_NAME', f"{AWS_STORAGE_BUCKET_NAME}-private"),
+            "custom_domain": None,
+            "querystring_auth": True,
+            "querystring_expire": 300,
+            "object_parameters": {'CacheControl': 'private, no-store'},
+        },
+    }
     
     # Public URL for media files
     MEDIA_URL = os.getenv('R2_PUBLIC_URL', 'https://pub-d1ba09fdc860448fad2976607846ddb1.r2.dev/')
@@ -454,6 +472,48 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# Cache Configuration
+# Shared Redis cache in production (Railway REDIS_URL); per-process memory cache for local dev/tests
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+            'KEY_PREFIX': 'uparwala',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'uparwala-local',
+        }
+    }
+
+# Guest carts (orders.guest_cart) - Redis hashes with a sliding TTL, in-process memory without Redis
+GUEST_CART_BACKEND = os.getenv(
+    'GUEST_CART_BACKEND',
+    'orders.guest_cart.RedisGuestCartStore' if os.getenv('REDIS_URL') else 'orders.guest_cart.LocalGuestCartStore'
+)
+GUEST_CART_REDIS_URL = os.getenv('REDIS_URL')
+GUEST_CART_TTL = int(os.getenv('GUEST_CART_TTL', 60 * 60 * 24 * 30))
+
+# Checkout quote cache (CalculateTotalsView) - seconds a computed quote stays valid
+QUOTE_CACHE_TIMEOUT = int(os.getenv('QUOTE_CACHE_TIMEOUT', 900))
+
+# Inventory ledger (products.inventory) - movements younger than this many seconds are left for the next compaction
+INVENTORY_COMPACTION_LAG = int(os.getenv('INVENTORY_COMPACTION_LAG', 300))
+
+# History archival (orders.archive, analytics.archive)
+ORDER_ARCHIVE_AFTER_DAYS = int(os.getenv('ORDER_ARCHIVE_AFTER_DAYS', 365))
+ORDER_ARCHIVE_CHUNK_SIZE = int(os.getenv('ORDER_ARCHIVE_CHUNK_SIZE', 200))
+ANALYTICS_EVENT_RETENTION_DAYS = int(os.getenv('ANALYTICS_EVENT_RETENTION_DAYS', 90))
+
+# Report exports (exports app) - larger exports run as background jobs instead of streaming
+EXPORT_STREAM_MAX_ROWS = int(os.getenv('EXPORT_STREAM_MAX_ROWS', 100000))
+# Days a finished export file is kept before the nightly purge deletes it
+EXPORT_RETENTION_DAYS = int(os.getenv('EXPORT_RETENTION_DAYS', 7))
+
 # Shiprocket Settings
 SHIPROCKET_WEBHOOK_SECRET = os.getenv('SHIPROCKET_WEBHOOK_SECRET', '')
 SHIPROCKET_AUTO_CREATE = os.getenv('SHIPROCKET_AUTO_CREATE', 'True') == 'True'
@@ -464,6 +524,24 @@ SHIPROCKET_PASSWORD = os.getenv('SHIPROCKET_PASSWORD')
 # Delhivery Settings
 DELHIVERY_TOKEN = os.getenv('DELHIVERY_TOKEN', '')
 
+# Live shipping rates (payments.rate_quotes) - seconds to wait for all vendor quotes together,
+# and seconds a quote stays cached
+RATE_QUOTE_DEADLINE = float(os.getenv('RATE_QUOTE_DEADLINE', 4))
+RATE_QUOTE_CACHE_TIMEOUT = int(os.getenv('RATE_QUOTE_CACHE_TIMEOUT', 1800))
+# Fraction of rate card quotes re-quoted live in the background to track drift
+RATE_CARD_SAMPLE_RATE = float(os.getenv('RATE_CARD_SAMPLE_RATE', 0.02))
+# Live quotes that must agree (mean drift within the limit) before a learned rate card cell is used
+RATE_CARD_LEARN_MIN_SAMPLES = int(os.getenv('RATE_CARD_LEARN_MIN_SAMPLES', 3))
+RATE_CARD_LEARN_MAX_DRIFT = float(os.getenv('RATE_CARD_LEARN_MAX_DRIFT', 0.05))
+
+# data.gov.in All India Pincode Directory (orders.pincode_sync); the default key is the public sample key
+DATA_GOV_IN_API_KEY = os.getenv('DATA_GOV_IN_API_KEY', '579b464db66ec23bdd000001f17ca38f88df4c4a6449db80d254a78f')
+DATA_GOV_IN_PINCODE_URL = os.getenv(
+    'DATA_GOV_IN_PINCODE_URL', 'https://api.data.gov.in/resource/6176ee09-3d56-4a3b-8115-21841576b2f6'
+)
+# Requests per second across all concurrent page fetches
+DATA_GOV_IN_RATE_LIMIT = float(os.getenv('DATA_GOV_IN_RATE_LIMIT', 4))
+
 # GST/Tax Settings
 # State code where the business is registered (affects CGST/SGST vs IGST)
 # MH = Maharashtra, DL = Delhi, GJ = Gujarat, etc.
@@ -31,6 +31,7 @@ urlpatterns = [
     path('api/homepage/', include('homepage.urls')),
     path('api/promotions/', include('promotions.urls')),
     path('api/analytics/', include('analytics.urls')),  # Phase 7
+    path('api/exports/', include('exports.urls')),
     path('api/marketing/', include('marketing.urls')),  # Phase 8
     path('api/services/', include('services.urls')),   # Pandit Booking & Tracking
     
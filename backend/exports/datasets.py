@@ -0,0 +1,184 @@
+"""
+Exportable datasets.
+
+A dataset is a column list of (header, lookup) over one model. Rows are read
+with .values_list() on the lookups and .iterator(), which uses a server-side
+cursor on PostgreSQL, so an export never materializes model instances or the
+full result set.
+
+Vendors can only export datasets with a `vendor_field`, restricted to their own
+rows; admin-only datasets are for staff.
+"""
+from datetime import datetime, time
+
+from django.db.models import DecimalField, ExpressionWrapper, F
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+ITERATOR_CHUNK_SIZE = 2000
+
+
+class Dataset:
+    def __init__(self, name, title, columns, queryset, date_field, vendor_field=None,
+                 status_field=None, admin_only=False):
+        self.name = name
+        self.title = title
+        self.columns = columns
+        self.queryset = queryset
+        self.date_field = date_field
+        self.vendor_field = vendor_field
+        self.status_field = status_field
+        self.admin_only = admin_only
+
+    @property
+    def header(self):
+        return [header for header, lookup in self.columns]
+
+    def can_export(self, user):
+        if user.is_staff or user.is_superuser:
+            return True
+        return not self.admin_only and self.vendor_field is not None and hasattr(user, 'vendor_profile')
+
+    def filtered(self, user, params):
+        """Queryset for `user` with the date_from / date_to / status params applied"""
+        queryset = self.queryset()
+        if not (user.is_staff or user.is_superuser):
+            queryset = queryset.filter(**{self.vendor_field: user.vendor_profile})
+
+        # Whole days in the site timezone
+        date_from = parse_date(params.get('date_from') or '')
+        if date_from:
+            queryset = queryset.filter(**{
+                f'{self.date_field}__gte': timezone.make_aware(datetime.combine(date_from, time.min))
+            })
+        date_to = parse_date(params.get('date_to') or '')
+        if date_to:
+            queryset = queryset.filter(**{
+                f'{self.date_field}__lte': timezone.make_aware(datetime.combine(date_to, time.max))
+            })
+        if self.status_field and params.get('status'):
+            queryset = queryset.filter(**{self.status_field: params['status']})
+        return queryset
+
+    def rows(self, user, params):
+        lookups = [lookup for header, lookup in self.columns]
+        return self.filtered(user, params).order_by('pk').values_list(*lookups).iterator(
+            chunk_size=ITERATOR_CHUNK_SIZE
+        )
+
+
+def _orders():
+    from orders.models import Order
+    return Order.objects.all()
+
+
+def _vendor_orders():
+    from orders.models import VendorOrder
+    return VendorOrder.objects.all()
+
+
+def _order_items():
+    from orders.models import OrderItem
+    return OrderItem.objects.all()
+
+
+def _tax_lines():
+    from orders.models import OrderItem
+    return OrderItem.objects.filter(order__payment_status__in=['paid', 'cod']).exclude(
+        order__status__in=['CANCELLED', 'FAILED']
+    ).annotate(
+        taxable_value=ExpressionWrapper(
+            F('price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2)
+        )
+    )
+
+
+def _gst_rollup():
+    from payments.models import TaxRollup
+    return TaxRollup.objects.all()
+
+
+def _payouts():
+    from vendors.models import PayoutRequest
+    return PayoutRequest.objects.all()
+
+
+def _analytics_events():
+    from analytics.models import AnalyticsEvent
+    return AnalyticsEvent.objects.all()
+
+
+DATASETS = {dataset.name: dataset for dataset in (
+    Dataset(
+        'orders', 'Orders',
+        columns=[
+            ('Order ID', 'id'), ('Created', 'created_at'), ('Status', 'status'),
+            ('Payment Status', 'payment_status'), ('Payment Method', 'payment_method'),
+            ('Customer Email', 'user__email'), ('Guest Email', 'guest_email'),
+            ('Subtotal', 'subtotal'), ('Tax', 'tax_amount'), ('Shipping', 'shipping_amount'),
+            ('Discount', 'discount_amount'), ('Total', 'total_amount'),
+        ],
+        queryset=_orders, date_field='created_at', status_field='status', admin_only=True,
+    ),
+    Dataset(
+        'vendor_orders', 'Vendor Orders',
+        columns=[
+            ('Vendor Order ID', 'id'), ('Order ID', 'order_id'), ('Created', 'created_at'),
+            ('Vendor', 'vendor__store_name'), ('Status', 'status'), ('Items', 'item_count'),
+            ('Subtotal', 'subtotal'), ('Tax', 'tax_amount'), ('Shipping', 'shipping_amount'),
+            ('Discount', 'discount_amount'), ('Total', 'total_amount'), ('AWB', 'awb_code'),
+            ('Courier', 'courier_name'), ('Paid To Vendor', 'paid_to_vendor'), ('Payout Date', 'payout_date'),
+        ],
+        queryset=_vendor_orders, date_field='created_at', vendor_field='vendor', status_field='status',
+    ),
+    Dataset(
+        'order_items', 'Order Items',
+        columns=[
+            ('Item ID', 'id'), ('Order ID', 'order_id'), ('Order Date', 'order__created_at'),
+            ('Order Status', 'order__status'), ('Vendor', 'vendor__store_name'), ('Product ID', 'product_id'),
+            ('Product', 'product_name'), ('SKU', 'product_sku'), ('HSN', 'hsn_code'),
+            ('Quantity', 'quantity'), ('Cancelled Quantity', 'cancelled_quantity'), ('Price', 'price'),
+            ('Tax Rate', 'tax_rate'), ('Tax', 'tax_amount'), ('Commission', 'commission_amount'),
+            ('Payout', 'payout_amount'), ('Paid To Vendor', 'paid_to_vendor'),
+        ],
+        queryset=_order_items, date_field='order__created_at', vendor_field='vendor', status_field='order__status',
+    ),
+    Dataset(
+        'tax', 'Tax Report',
+        columns=[
+            ('Order ID', 'order_id'), ('Order Date', 'order__created_at'), ('Vendor', 'vendor__store_name'),
+            ('State', 'order__shipping_address_data__state_code'), ('HSN', 'hsn_code'), ('Product', 'product_name'),
+            ('Quantity', 'quantity'), ('Taxable Value', 'taxable_value'), ('Tax Rate', 'tax_rate'),
+            ('CGST', 'cgst_amount'), ('SGST', 'sgst_amount'), ('IGST', 'igst_amount'), ('Total Tax', 'tax_amount'),
+        ],
+        queryset=_tax_lines, date_field='order__created_at', vendor_field='vendor',
+    ),
+    Dataset(
+        'gst_rollup', 'GST Rollup',
+        columns=[
+            ('Date', 'date'), ('Vendor', 'vendor__store_name'), ('Place Of Supply', 'state_code'),
+            ('HSN', 'hsn_code'), ('Tax Rate', 'tax_rate'), ('Quantity', 'quantity'),
+            ('Taxable Value', 'taxable_value'), ('IGST', 'igst_amount'), ('CGST', 'cgst_amount'),
+            ('SGST', 'sgst_amount'),
+        ],
+        queryset=_gst_rollup, date_field='date', vendor_field='vendor',
+    ),
+    Dataset(
+        'payouts', 'Payouts',
+        columns=[
+            ('Payout ID', 'id'), ('Vendor', 'vendor__store_name'), ('Requested', 'requested_amount'),
+            ('Approved', 'approved_amount'), ('Status', 'status'), ('Payment Method', 'payment_method'),
+            ('Transaction ID', 'transaction_id'), ('Requested At', 'requested_at'),
+            ('Approved At', 'approved_at'), ('Completed At', 'completed_at'),
+        ],
+        queryset=_payouts, date_field='requested_at', vendor_field='vendor', status_field='status',
+    ),
+    Dataset(
+        'analytics_events', 'Analytics Events',
+        columns=[
+            ('Event ID', 'id'), ('Timestamp', 'timestamp'), ('Event', 'event_type'), ('Session', 'session_id'),
+            ('User ID', 'user_id'), ('URL', 'url'), ('Data', 'data'),
+        ],
+        queryset=_analytics_events, date_field='timestamp', status_field='event_type', admin_only=True,
+    ),
+)}
@@ -0,0 +1,19 @@
+from rest_framework import serializers
+
+from .models import ExportJob
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = ('id', 'dataset', 'file_format', 'params', 'status', 'row_count', 'error',
+                  'created_at', 'completed_at', 'download_url')
+
+    def get_download_url(self, obj):
+        if obj.status != 'completed':
+            return None
+        request = self.context.get('request')
+        url = f'/api/exports/jobs/{obj.id}/download/'
+        return request.build_absolute_uri(url) if request else url
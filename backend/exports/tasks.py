@@ -0,0 +1,14 @@
+from celery import shared_task
+
+from .jobs import purge_expired_exports, run_export_job
+
+
+@shared_task
+def run_export_job_task(job_id):
+    run_export_job(job_id)
+
+
+@shared_task
+def purge_exports_task():
+    """Nightly removal of export files past their retention period"""
+    return f"Purged {purge_expired_exports()} export jobs"
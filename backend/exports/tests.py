@@ -0,0 +1,79 @@
+import io
+import tempfile
+import zipfile
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.files.storage import FileSystemStorage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from orders.models import Order, OrderItem
+from products.models import Product
+from users.models import User
+from vendors.models import VendorProfile
+
+from .jobs import purge_expired_exports, run_export_job
+from .models import ExportJob
+
+
+class ExportTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', email='admin@example.com', password='password',
+                                              is_staff=True)
+        self.vendor_user = User.objects.create_user(username='vendor', email='vendor@example.com', password='password')
+        vendor = VendorProfile.objects.create(user=self.vendor_user, store_name='Vendor Store')
+        other = VendorProfile.objects.create(
+            user=User.objects.create_user(username='other', email='other@example.com', password='password'),
+            store_name='Other Store'
+        )
+        for index, owner in enumerate([vendor, other, vendor]):
+            product = Product.objects.create(
+                name=f'Item {index}', vendor=owner, regular_price=100, description='Desc', slug=f'item-{index}'
+            )
+            order = Order.objects.create(user=self.admin, total_amount=100, shipping_address='Addr')
+            OrderItem.objects.create(order=order, product=product, vendor=owner, quantity=1, price=100)
+        self.client = APIClient()
+
+    def test_streams_csv_scoped_to_vendor(self):
+        self.client.force_authenticate(self.vendor_user)
+        response = self.client.get('/api/exports/order_items/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith('Item ID,Order ID'))
+        self.assertNotIn('Other Store', ''.join(lines))
+
+        self.assertEqual(self.client.get('/api/exports/orders/').status_code, 403)
+
+    def test_streams_xlsx(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/exports/orders/', {'file_format': 'xlsx'})
+        self.assertEqual(response.status_code, 200)
+        workbook = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        sheet = workbook.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(sheet.count('<row>'), 4)
+
+    @override_settings(EXPORT_STREAM_MAX_ROWS=2)
+    def test_large_export_becomes_a_job(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/exports/order_items/', {'status': 'PENDING'})
+        self.assertEqual(response.status_code, 202)
+        job = ExportJob.objects.get(id=response.data['id'])
+        self.assertEqual(job.params, {'status': 'PENDING'})
+
+        with tempfile.TemporaryDirectory() as root, \
+                patch.object(ExportJob._meta.get_field('file'), 'storage', FileSystemStorage(location=root)) as storage:
+            job = run_export_job(job.id)
+            self.assertEqual((job.status, job.row_count), ('completed', 3))
+            download = self.client.get(f'/api/exports/jobs/{job.id}/download/')
+            self.assertEqual(download.status_code, 200)
+            self.assertEqual(len(b''.join(download.streaming_content).decode('utf-8-sig').splitlines()), 4)
+            download.close()
+
+            ExportJob.objects.filter(id=job.id).update(created_at=timezone.now() - timedelta(days=30))
+            self.assertEqual(purge_expired_exports(), 1)
+            self.assertFalse(storage.exists(job.file.name))
+            self.assertFalse(ExportJob.objects.filter(id=job.id).exists())
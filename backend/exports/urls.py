@@ -0,0 +1,9 @@
+from django.urls import path
+from .views import ExportView, ExportJobListView, ExportJobDetailView, ExportJobDownloadView
+
+urlpatterns = [
+    path('jobs/', ExportJobListView.as_view(), name='export-job-list'),
+    path('jobs/<int:job_id>/', ExportJobDetailView.as_view(), name='export-job-detail'),
+    path('jobs/<int:job_id>/download/', ExportJobDownloadView.as_view(), name='export-job-download'),
+    path('<str:dataset>/', ExportView.as_view(), name='export'),
+]
@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.db import transaction
+from django.http import FileResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .datasets import DATASETS
+from .models import ExportJob
+from .serializers import ExportJobSerializer
+from .writers import CONTENT_TYPES, export_chunks
+
+FILTER_PARAMS = ('date_from', 'date_to', 'status')
+
+
+class ExportView(APIView):
+    """
+    Stream a dataset as CSV or XLSX: GET /api/exports/<dataset>/?file_format=csv|xlsx&date_from=&date_to=&status=
+    Exports above EXPORT_STREAM_MAX_ROWS rows (or with background=1) become an ExportJob instead.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, dataset):
+        export = DATASETS.get(dataset)
+        if export is None:
+            return Response({'error': f'Unknown export: {dataset}'}, status=status.HTTP_404_NOT_FOUND)
+        if not export.can_export(request.user):
+            return Response({'error': 'You do not have permission to export this data'},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        # `format` is taken by DRF's content negotiation, so the file type is `file_format`
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in CONTENT_TYPES:
+            return Response({'error': 'file_format must be csv or xlsx'}, status=status.HTTP_400_BAD_REQUEST)
+        params = {key: request.query_params[key] for key in FILTER_PARAMS if request.query_params.get(key)}
+
+        background = request.query_params.get('background') in ('1', 'true')
+        if not background:
+            limit = getattr(settings, 'EXPORT_STREAM_MAX_ROWS', 100000)
+            background = export.filtered(request.user, params)[limit:limit + 1].exists()
+
+        if background:
+            from .tasks import run_export_job_task
+            job = ExportJob.objects.create(user=request.user, dataset=dataset, file_format=file_format, params=params)
+            transaction.on_commit(lambda: run_export_job_task.delay(job.id))
+            return Response(ExportJobSerializer(job, context={'request': request}).data,
+                            status=status.HTTP_202_ACCEPTED)
+
+        response = StreamingHttpResponse(
+            export_chunks(file_format, export.header, export.rows(request.user, params), sheet_name=export.title),
+            content_type=CONTENT_TYPES[file_format],
+        )
+        filename = f"{dataset}-{timezone.localdate().isoformat()}.{file_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class ExportJobListView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        jobs = ExportJob.objects.filter(user=request.user)[:50]
+        return Response(ExportJobSerializer(jobs, many=True, context={'request': request}).data)
+
+
+class ExportJobDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = get_object_or_404(ExportJob, id=job_id, user=request.user)
+        return Response(ExportJobSerializer(job, context={'request': request}).data)
+
+
+class ExportJobDownloadView(APIView):
+    """Serve a finished export from storage to the user who requested it"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = get_object_or_404(ExportJob, id=job_id, user=request.user, status='completed')
+        return FileResponse(
+            job.file.open('rb'),
+            as_attachment=True,
+            filename=job.file.name.rsplit('/', 1)[-1],
+            content_type=CONTENT_TYPES[job.file_format],
+        )
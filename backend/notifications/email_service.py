@@ -69,7 +69,7 @@ class EmailService:
                 'billing_address': order.billing_address_data,
                 
                 # Items
-                'items': order.items.all()
+                'items': order.items.select_related('vendor')
             }
             
             # Get template content
@@ -63,8 +63,8 @@ def get_email_template(template_name, context):
                             {''.join([f'''
                             <tr>
                                 <td style="border-bottom: 1px solid #eee;">
-                                    <strong>{item.product.name}</strong>
-                                    <div style="font-size: 12px; color: #666;">Sold by: {item.product.vendor.business_name}</div>
+                                    <strong>{item.product_name}</strong>
+                                    <div style="font-size: 12px; color: #666;">Sold by: {item.vendor.store_name}</div>
                                 </td>
                                 <td style="border-bottom: 1px solid #eee; text-align: center;">{item.quantity}</td>
                                 <td style="border-bottom: 1px solid #eee; text-align: right;">₹{item.price:.2f}</td>
@@ -3,12 +3,29 @@ Resend Email Service for transactional emails.
 Uses Resend's HTTP API to bypass SMTP blocks on Railway/PaaS.
 """
 import resend
+import requests
 from django.conf import settings
 import logging
 
+from config.http_clients import get_client
+
 logger = logging.getLogger(__name__)
 
 
+class PooledResendHttpClient(resend.HTTPClient):
+    """Sends Resend API calls through the shared pooled 'resend' client"""
+
+    def request(self, method, url, headers, json=None):
+        try:
+            response = get_client('resend').request(method.upper(), url, headers=headers, json=json)
+        except requests.RequestException as e:
+            raise RuntimeError(f"Request failed: {e}") from e
+        return response.content, response.status_code, response.headers
+
+
+resend.default_http_client = PooledResendHttpClient()
+
+
 def send_email_via_resend(to_email: str, subject: str, html_content: str, from_email: str = None):
     """
     Send an email using Resend's API.
@@ -1,9 +1,28 @@
 from django.conf import settings
+from twilio.http.http_client import TwilioHttpClient
+from twilio.http.response import Response
 from twilio.rest import Client
 import logging
 
+from config.http_clients import get_client
+
 logger = logging.getLogger(__name__)
 
+
+class PooledTwilioHttpClient(TwilioHttpClient):
+    """Sends Twilio API calls through the shared pooled 'twilio' client"""
+
+    def request(self, method, url, params=None, data=None, headers=None, auth=None, timeout=None,
+                allow_redirects=False):
+        body = {'json': data} if headers and 'json' in headers.get('Content-Type', '') else {'data': data}
+        response = get_client('twilio').request(
+            method.upper(), url, params=params, headers=headers, auth=auth, timeout=timeout,
+            allow_redirects=allow_redirects, **body
+        )
+        self.log_response(response.status_code, response)
+        return Response(int(response.status_code), response.text, response.headers)
+
+
 class TwilioService:
     def __init__(self):
         self.client = None
@@ -12,7 +31,9 @@ class TwilioService:
         
         if settings.TWILIO_ACCOUNT_SID and settings.TWILIO_AUTH_TOKEN:
             try:
-                self.client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+                self.client = Client(
+                    settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, http_client=PooledTwilioHttpClient()
+                )
             except Exception as e:
                 logger.error(f"Failed to initialize Twilio client: {e}")
         else:
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     Cart, CartItem, Order, OrderItem, OrderReturn,
-    AddressVerification, CODPincode, GiftOption, OrderGift
+    AddressVerification, CODPincode, GiftOption, OrderGift, VendorOrder
 )
 
 # Import admin modules
@@ -17,8 +17,13 @@ class OrderNoteInline(admin.TabularInline):
     extra = 0
     readonly_fields = ['created_at', 'author']
 
+class VendorOrderInline(admin.TabularInline):
+    model = VendorOrder
+    extra = 0
+    readonly_fields = ['item_count', 'subtotal', 'tax_amount', 'shipping_amount', 'discount_amount', 'total_amount']
+
 class OrderAdmin(admin.ModelAdmin):
-    inlines = [OrderItemInline, OrderNoteInline]
+    inlines = [VendorOrderInline, OrderItemInline, OrderNoteInline]
     readonly_fields = ['created_at', 'updated_at', 'shipped_at', 'delivered_at']
     list_display = ('id', 'user', 'total_amount', 'status', 'awb_code', 'courier_name', 'created_at')
 
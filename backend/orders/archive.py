@@ -0,0 +1,171 @@
+"""
+Order archival.
+
+Closed orders older than ORDER_ARCHIVE_AFTER_DAYS are moved, with their lines
+and tracking events, into the ArchivedOrder* tables (monthly partitions on
+PostgreSQL, see config.partitioning), keeping the live order tables and their
+indexes small for checkout and the admin/vendor queries.
+
+archive_orders() works in chunks of ORDER_ARCHIVE_CHUNK_SIZE orders. Each chunk
+is one short transaction that copies the rows and deletes the originals; it
+locks only that chunk and skips orders someone else has locked. The job is
+resumable: an archived order no longer matches the candidate query, so an
+interrupted run just picks up where it stopped.
+
+Order detail lookups fall back to the archive through find_archived_order(), and
+a customer's order list includes their archived orders via archived_orders_for().
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from config.partitioning import ensure_month_partitions
+from .models import (
+    Order, OrderReturn, VendorOrder, ArchivedOrder, ArchivedOrderItem, ArchivedOrderTracking
+)
+
+logger = logging.getLogger(__name__)
+
+CLOSED_STATUSES = ('DELIVERED', 'CANCELLED', 'FAILED', 'REFUNDED')
+OPEN_RETURN_STATUSES = ('requested', 'approved', 'received')
+
+# Related rows kept in ArchivedOrder.data (they are deleted with the order)
+RELATED_MANY = ('vendor_orders', 'payments', 'notes', 'status_history', 'shipments', 'returns', 'packages')
+RELATED_ONE = ('gift_details', 'address_verification')
+# Rows deleted with one of those related rows: (stored as, order relation, child relation)
+RELATED_NESTED = (('package_items', 'packages', 'items'),)
+
+
+def archivable_orders(before):
+    """Closed orders created before `before` with no open return and no unpaid vendor payout"""
+    return Order.objects.filter(status__in=CLOSED_STATUSES, created_at__lt=before).exclude(
+        return_status__in=('requested', 'approved')
+    ).exclude(
+        Exists(OrderReturn.objects.filter(order=OuterRef('pk'), status__in=OPEN_RETURN_STATUSES))
+    ).exclude(
+        Exists(VendorOrder.objects.filter(order=OuterRef('pk'), status='DELIVERED', paid_to_vendor=False))
+    )
+
+
+def _row(obj):
+    """Column values of a model instance, ready for a JSON field"""
+    return {
+        field.attname: field.get_prep_value(field.value_from_object(obj))
+        for field in obj._meta.concrete_fields
+    }
+
+
+def _related_rows(order):
+    related = {name: [_row(obj) for obj in getattr(order, name).all()] for name in RELATED_MANY}
+    for name in RELATED_ONE:
+        obj = getattr(order, name, None)
+        related[name] = _row(obj) if obj is not None else None
+    for name, parent, child in RELATED_NESTED:
+        related[name] = [_row(obj) for row in getattr(order, parent).all() for obj in getattr(row, child).all()]
+    return related
+
+
+def archive_orders(older_than_days=None, chunk_size=None, max_chunks=None, pause=0):
+    """Archive closed orders in chunks. Returns the number of orders archived."""
+    if older_than_days is None:
+        older_than_days = getattr(settings, 'ORDER_ARCHIVE_AFTER_DAYS', 365)
+    chunk_size = chunk_size or getattr(settings, 'ORDER_ARCHIVE_CHUNK_SIZE', 200)
+    before = timezone.now() - timedelta(days=older_than_days)
+
+    last_id = 0
+    archived = chunks = 0
+    while max_chunks is None or chunks < max_chunks:
+        ids = list(
+            archivable_orders(before).filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+        )
+        if not ids:
+            break
+        last_id = ids[-1]
+        archived += _archive_chunk(ids, before)
+        chunks += 1
+        if pause:
+            time.sleep(pause)
+
+    logger.info(f"Archived {archived} orders created before {before:%Y-%m-%d} in {chunks} chunks")
+    return archived
+
+
+@transaction.atomic
+def _archive_chunk(ids, before):
+    from promotions.models import CouponUsage
+    from .serializers import OrderSerializer
+
+    # Re-check eligibility under the lock: the order may have changed since it was listed
+    orders = list(
+        archivable_orders(before).filter(id__in=ids)
+        .select_for_update(skip_locked=True, of=('self',))
+        .select_related('user', 'gift_details', 'address_verification')
+        .prefetch_related(
+            'items', 'tracking_history', *RELATED_MANY,
+            *(f'{parent}__{child}' for _, parent, child in RELATED_NESTED),
+        )
+    )
+    if not orders:
+        return 0
+
+    archived_orders, archived_items, archived_tracking = [], [], []
+    for order in orders:
+        archived_orders.append(ArchivedOrder(
+            order_id=order.id,
+            user_id=order.user_id,
+            status=order.status,
+            payment_status=order.payment_status,
+            total_amount=order.total_amount,
+            created_at=order.created_at,
+            data={'order': OrderSerializer(order).data, 'related': _related_rows(order)},
+        ))
+        archived_items.extend(
+            ArchivedOrderItem(
+                item_id=item.id,
+                order_id=order.id,
+                vendor_id=item.vendor_id,
+                product_id=item.product_id,
+                created_at=order.created_at,
+                data=_row(item),
+            )
+            for item in order.items.all()
+        )
+        archived_tracking.extend(
+            ArchivedOrderTracking(tracking_id=event.id, order_id=order.id, created_at=order.created_at, data=_row(event))
+            for event in order.tracking_history.all()
+        )
+
+    created = [order.created_at for order in orders]
+    for model in (ArchivedOrder, ArchivedOrderItem, ArchivedOrderTracking):
+        ensure_month_partitions(model, created)
+
+    ArchivedOrder.objects.bulk_create(archived_orders)
+    ArchivedOrderItem.objects.bulk_create(archived_items)
+    ArchivedOrderTracking.objects.bulk_create(archived_tracking)
+
+    order_ids = [order.id for order in orders]
+    # Keep coupon usage history (per-user limits count these rows)
+    CouponUsage.objects.filter(order_id__in=order_ids).update(order=None)
+    Order.objects.filter(id__in=order_ids).delete()
+    return len(orders)
+
+
+def find_archived_order(order_id, user=None):
+    """The archived order with this id (restricted to `user`'s orders if given), or None"""
+    archived = ArchivedOrder.objects.filter(order_id=order_id)
+    if user is not None:
+        archived = archived.filter(user_id=user.id)
+    return archived.first()
+
+
+def archived_orders_for(user):
+    """`user`'s archived orders as the API rendered them, newest first and marked archived"""
+    return [
+        {**data['order'], 'archived': True}
+        for data in ArchivedOrder.objects.filter(user_id=user.id).order_by('-created_at').values_list('data', flat=True)
+    ]
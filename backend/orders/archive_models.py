@@ -0,0 +1,59 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class ArchivedOrder(models.Model):
+    """
+    Closed order moved out of the live tables by orders.archive.
+    `data` holds the order as the API rendered it plus its other related rows.
+    Range-partitioned by month of created_at on PostgreSQL.
+    """
+    pk = models.CompositePrimaryKey('order_id', 'created_at')
+    order_id = models.BigIntegerField()
+    user_id = models.BigIntegerField(null=True, blank=True)
+    status = models.CharField(max_length=20)
+    payment_status = models.CharField(max_length=20)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    data = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user_id', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"Archived order #{self.order_id}"
+
+
+class ArchivedOrderItem(models.Model):
+    """Order line of an archived order (partitioned like its order)"""
+    pk = models.CompositePrimaryKey('item_id', 'created_at')
+    item_id = models.BigIntegerField()
+    order_id = models.BigIntegerField()
+    vendor_id = models.BigIntegerField(null=True, blank=True)
+    product_id = models.BigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField()  # created_at of the order
+    data = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['order_id']),
+            models.Index(fields=['vendor_id', '-created_at']),
+        ]
+
+
+class ArchivedOrderTracking(models.Model):
+    """Tracking event of an archived order (partitioned like its order)"""
+    pk = models.CompositePrimaryKey('tracking_id', 'created_at')
+    tracking_id = models.BigIntegerField()
+    order_id = models.BigIntegerField()
+    created_at = models.DateTimeField()  # created_at of the order
+    data = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['order_id']),
+        ]
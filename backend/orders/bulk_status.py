@@ -0,0 +1,176 @@
+"""
+Bulk order status transitions for admins.
+
+Saving orders one by one runs the pre_save re-fetches and sends notifications
+synchronously per order. A bulk transition instead:
+- locks and validates every requested order against ORDER_STATUS_TRANSITIONS in
+  one query
+- moves all valid orders with a single UPDATE (and one for their vendor
+  sub-orders), and writes their tracking history with bulk_create
+- enqueues one notification task for the whole batch after commit
+
+Orders that are missing or not allowed to make the transition are reported
+back individually and left untouched.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Order, VendorOrder
+from .shiprocket_models import OrderTrackingStatus
+
+logger = logging.getLogger(__name__)
+
+# Status -> statuses an admin may move it to
+ORDER_STATUS_TRANSITIONS = {
+    'PENDING': ('PROCESSING', 'ON_HOLD', 'CANCELLED', 'FAILED'),
+    'PROCESSING': ('SHIPPED', 'ON_HOLD', 'CANCELLED'),
+    'ON_HOLD': ('PENDING', 'PROCESSING', 'CANCELLED'),
+    'SHIPPED': ('DELIVERED',),
+    'DELIVERED': ('REFUNDED',),
+    'CANCELLED': ('REFUNDED',),
+    'FAILED': (),
+    'REFUNDED': (),
+}
+
+MAX_BULK_ORDERS = 1000
+
+
+def allowed_sources(target_status):
+    return [source for source, targets in ORDER_STATUS_TRANSITIONS.items() if target_status in targets]
+
+
+def bulk_transition(order_ids, target_status, actor=None, note=''):
+    """
+    Move `order_ids` to `target_status`.
+    Returns {'updated': [order ids], 'failed': [{'order_id', 'error'}]}.
+    """
+    if target_status not in ORDER_STATUS_TRANSITIONS:
+        raise ValueError(f"Unknown order status: {target_status}")
+    order_ids = list(dict.fromkeys(order_ids))
+    sources = allowed_sources(target_status)
+    failed = []
+
+    with transaction.atomic():
+        current = dict(
+            Order.objects.select_for_update().filter(id__in=order_ids).values_list('id', 'status')
+        )
+        updated = []
+        for order_id in order_ids:
+            status = current.get(order_id)
+            if status is None:
+                failed.append({'order_id': order_id, 'error': 'Order not found'})
+            elif status == target_status:
+                failed.append({'order_id': order_id, 'error': f'Order is already {target_status}'})
+            elif status not in sources:
+                failed.append({'order_id': order_id, 'error': f'Cannot change status from {status} to {target_status}'})
+            else:
+                updated.append(order_id)
+
+        if updated:
+            _apply(updated, target_status, actor, note)
+            transaction.on_commit(lambda: _enqueue_notifications(updated, target_status))
+
+    logger.info(
+        f"Bulk status {target_status} by {getattr(actor, 'email', None)}: "
+        f"{len(updated)} updated, {len(failed)} failed"
+    )
+    return {'updated': updated, 'failed': failed}
+
+
+def _apply(order_ids, target_status, actor, note):
+    now = timezone.now()
+    updates = {'status': target_status, 'updated_at': now}
+    vendor_updates = {'status': target_status, 'updated_at': now}
+    if target_status == 'SHIPPED':
+        updates['shipped_at'] = vendor_updates['shipped_at'] = Coalesce('shipped_at', now)
+    elif target_status == 'DELIVERED':
+        updates['delivered_at'] = vendor_updates['delivered_at'] = Coalesce('delivered_at', now)
+
+    # The orders are locked and validated above, so this matches exactly `order_ids`
+    Order.objects.filter(id__in=order_ids).update(**updates)
+    VendorOrder.objects.filter(order_id__in=order_ids).filter(~Q(status=target_status)).update(**vendor_updates)
+
+    label = dict(Order.STATUS_CHOICES)[target_status]
+    by = f" by {actor.email}" if actor is not None and getattr(actor, 'email', '') else ''
+    OrderTrackingStatus.objects.bulk_create([
+        OrderTrackingStatus(
+            order_id=order_id,
+            status=label,
+            status_code=target_status,
+            description=note or f"Order marked {label.lower()}{by}",
+            timestamp=now,
+        )
+        for order_id in order_ids
+    ], batch_size=500)
+
+    # .update() skips post_save, so reverse cancelled / refunded orders in the GST rollup here
+    from payments import tax_rollup
+    if target_status in tax_rollup.REVERSED_ORDER_STATUSES:
+        for order in Order.objects.filter(id__in=order_ids, tax_posted=True).prefetch_related('items'):
+            tax_rollup.reverse_order(order)
+
+
+def _enqueue_notifications(order_ids, target_status):
+    from .tasks import send_bulk_status_notifications_task
+
+    try:
+        send_bulk_status_notifications_task.delay(order_ids, target_status)
+    except Exception as e:
+        # Celery not running — send synchronously
+        logger.warning(f"Could not enqueue bulk status notifications, sending inline: {e}")
+        send_status_notifications(order_ids, target_status)
+
+
+# Customer email template and SMS text per target status
+STATUS_NOTIFICATIONS = {
+    'SHIPPED': ('order_shipped', "Your order #{order_id} has been shipped!"),
+    'DELIVERED': ('order_delivered', "Your order #{order_id} has been delivered. Thank you for shopping with us!"),
+    'CANCELLED': ('order_cancellation', "Your order #{order_id} has been cancelled."),
+    'REFUNDED': ('refund_processed', "The refund for your order #{order_id} has been processed."),
+}
+
+
+def send_status_notifications(order_ids, target_status):
+    """Customer (and, on cancellation, vendor) notifications for a bulk transition"""
+    from notifications.tasks import send_notification_email, send_sms_task, send_whatsapp_task
+
+    if target_status not in STATUS_NOTIFICATIONS:
+        return 0
+    template, sms = STATUS_NOTIFICATIONS[target_status]
+    sent = 0
+
+    orders = Order.objects.filter(id__in=order_ids).select_related('user')
+    for order in orders.iterator(chunk_size=500):
+        try:
+            email = order.user.email if order.user else order.guest_email
+            if email:
+                send_notification_email(template, email, {
+                    'order_id': order.id,
+                    'customer_name': (order.user.first_name if order.user else '') or 'Customer',
+                    'amount': float(order.total_amount),
+                    'tracking_number': 'N/A',
+                    'courier_name': '',
+                })
+                sent += 1
+            phone = (order.shipping_address_data or {}).get('phone')
+            if phone:
+                message = sms.format(order_id=order.id)
+                send_sms_task.delay(phone, message)
+                send_whatsapp_task.delay(phone, message)
+        except Exception as e:
+            logger.error(f"Failed to send {target_status} notification for order #{order.id}: {e}")
+
+    if target_status == 'CANCELLED':
+        vendor_orders = VendorOrder.objects.filter(order_id__in=order_ids).select_related('vendor__user')
+        for vendor_order in vendor_orders.iterator(chunk_size=500):
+            vendor = vendor_order.vendor
+            if vendor.user.email:
+                send_notification_email('vendor_order_cancelled', vendor.user.email, {
+                    'vendor_name': vendor.store_name,
+                    'order_id': vendor_order.order_id,
+                })
+    return sent
@@ -6,12 +6,14 @@ from django.db import transaction
 from decimal import Decimal
 import logging
 
-from .models import Order, OrderItem, Cart
+from .models import Order, OrderItem, VendorOrder
+from . import guest_cart
 from users.models import Address
 from payments.models import Payment
 from payments.razorpay_gateway import RazorpayGateway
 from payments.tax_calculator import TaxCalculator
 from payments.shipping_calculator import ShippingCalculator
+from payments import quote_cache
 
 logger = logging.getLogger(__name__)
 
@@ -30,7 +32,8 @@ class CheckoutView(APIView):
             "shipping_address_id": 1,
             "billing_address_id": 1,
             "payment_method": "razorpay",
-            "coupon_code": "SAVE10"
+            "coupon_code": "SAVE10",
+            "quote_token": "<token from calculate-totals>"  # optional
         }
         
         Expected payload for guests:
@@ -56,6 +59,12 @@ class CheckoutView(APIView):
         
         logger.info(f"Checkout - user: {user}, selected_item_ids: {selected_item_ids}")
         
+        if payment_method not in ('razorpay', 'cod'):
+            return Response(
+                {'error': 'Invalid payment method'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
         # Handle address based on user type
         if user:
             # Logged-in user: get address from database
@@ -94,14 +103,8 @@ class CheckoutView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Get cart for logged-in user
-            try:
-                cart = Cart.objects.get(user=user)
-            except Cart.DoesNotExist:
-                return Response(
-                    {'error': 'Cart not found'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+            # Cart for logged-in user, with a cart built before login merged in
+            cart = guest_cart.user_cart(request)
             
             guest_email = None
             session_id = None
@@ -144,26 +147,27 @@ class CheckoutView(APIView):
             }
             billing_address_data = shipping_address_data.copy()
             
-            # Get cart for guest user via session
-            session_key = request.session.session_key
-            if not session_key:
+            # Copy the guest cart into the DB for the order flow
+            guest_cart_id = guest_cart.get_guest_cart_id(request)
+            cart = guest_cart.materialize_guest_cart(guest_cart_id) if guest_cart_id else None
+            if cart is None:
                 return Response(
-                    {'error': 'Session not found. Please add items to cart first.'},
+                    {'error': 'Cart not found. Please add items to cart first.'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            try:
-                cart = Cart.objects.get(session_id=session_key, user=None)
-            except Cart.DoesNotExist:
-                return Response(
-                    {'error': 'Cart not found'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+            # Guest cart item ids are product ids
+            if selected_item_ids:
+                selected_item_ids = list(
+                    cart.items.filter(product_id__in=selected_item_ids).values_list('id', flat=True)
+                ) or [0]  # None matched: keep the filter so nothing unselected is ordered
             
-            session_id = session_key
+            session_id = guest_cart_id
         
         # Get cart items
-        all_cart_items = cart.items.all()
+        all_cart_items = cart.items.select_related(
+            'product', 'product__vendor', 'product__tax_slab'
+        ).prefetch_related('product__images', 'product__attributes')
         
         # Filter by selected items if provided (selective checkout)
         if selected_item_ids:
@@ -185,46 +189,103 @@ class CheckoutView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Calculate subtotal
+        # Calculate subtotal from effective prices (deals / sale window) resolved in one batch
+        from .services import PriceCalculatorService
+        prices = PriceCalculatorService.resolve_prices(item.product for item in cart_items)
+        
+        # Available stock from the inventory ledger (Product.stock lags until compaction)
+        from products.inventory import get_available_stock
+        available = get_available_stock({item.product_id for item in cart_items})
+        
         subtotal = Decimal('0')
         for item in cart_items:
             # Validate stock
-            if item.product.stock < item.quantity:
+            if available[item.product_id] < item.quantity:
                 return Response(
                     {'error': f'Insufficient stock for {item.product.name}'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            subtotal += item.product.price * item.quantity
+            subtotal += Decimal(str(prices[item.product_id]['price'])) * item.quantity
+        
+        # Bundle and coupon discounts from the promotion engine (deals are already in the prices)
+        from promotions.engine import (
+            PromotionEngine, lines_from_cart_items, order_coupon_data, redeem_coupon, record_coupon_usage
+        )
+        promotion = PromotionEngine().evaluate(
+            lines_from_cart_items(cart_items, prices),
+            coupon_code=coupon_code,
+            user_id=user.id if user else None
+        )
+        coupon_result = promotion['coupon']
+        if coupon_result and not coupon_result['valid']:
+            return Response(
+                {'error': coupon_result['error']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        taxable_prices = {
+            line['product_id']: {'price': line['final_total'] / line['quantity']}
+            for line in promotion['lines'] if line['quantity']
+        }
+        # Bundle and coupon discount per cart line, kept on the order line for vendor payouts
+        line_discounts = {
+            line['key']: sum((d['amount'] for d in line['discounts'] if d['type'] != 'deal'), Decimal('0'))
+            for line in promotion['lines']
+        }
         
-        # Validate Pincode Serviceability for all items
-        from .utils import is_pincode_servicable
+        # Validate Pincode Serviceability for all items (in-memory, one lookup per vendor)
+        from .serviceability import check_pincode
         shipping_pincode = shipping_address_data['pincode']
+        serviceability = check_pincode(shipping_pincode, [item.product.vendor_id for item in cart_items])
         
         for item in cart_items:
-            is_available, message = is_pincode_servicable(shipping_pincode, item.product.vendor)
+            is_available, message = serviceability[item.product.vendor_id]
             if not is_available:
                 return Response(
                     {'error': f"Item '{item.product.name}' cannot be delivered to {shipping_pincode}. {message}"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
         
-        # Calculate shipping
-        shipping_calc = ShippingCalculator()
         state_code = shipping_address_data.get('state_code', '')
-        shipping_data = shipping_calc.calculate_shipping(
-            cart_items,
-            state_code,
-            subtotal
-        )
-        shipping_cost = Decimal(str(shipping_data['total_shipping']))
         
-        # Calculate tax using product-level tax slabs
-        tax_calc = TaxCalculator()
-        tax_data = tax_calc.calculate_gst_with_slabs(cart_items, state_code)
+        # Reuse the shipping and tax from the customer's quote if the cart and pricing rules are unchanged
+        quote = None
+        quote_token = request.data.get('quote_token')
+        if quote_token:
+            quote = quote_cache.resolve_quote_token(
+                quote_token,
+                quote_cache.build_quote_digest(
+                    cart,
+                    state_code,
+                    pincode=shipping_pincode,
+                    payment_mode=payment_method,
+                    coupon_code=coupon_code,
+                    selected_item_ids=selected_item_ids,
+                    gift_option_id=request.data.get('gift_option_id'),
+                ),
+            )
+        
+        if quote is not None:
+            logger.info(f"Checkout - reusing cached quote for cart {cart.id}")
+            shipping_data = quote['shipping']
+            tax_data = quote['tax']
+        else:
+            # Calculate shipping
+            shipping_calc = ShippingCalculator()
+            shipping_data = shipping_calc.calculate_shipping(
+                cart_items,
+                state_code,
+                subtotal
+            )
+            
+            # Calculate tax using product-level tax slabs
+            tax_calc = TaxCalculator()
+            tax_data = tax_calc.calculate_gst_with_slabs(cart_items, state_code, prices=taxable_prices)
+        
+        shipping_cost = Decimal(str(shipping_data['total_shipping']))
         tax_amount = Decimal(str(tax_data['total_tax']))
         
-        # Apply coupon (TODO: implement coupon logic)
-        discount_amount = Decimal('0')
+        # Bundle + coupon discount
+        discount_amount = promotion['bundle_discount'] + promotion['coupon_discount']
         
         # Validate and get Gift Option if provided
         gift_option_id = request.data.get('gift_option_id')
@@ -244,6 +305,16 @@ class CheckoutView(APIView):
         # Calculate total
         total_amount = subtotal + shipping_cost + tax_amount - discount_amount + gift_amount
         
+        # A COD order is placed for good, so its coupon is redeemed now; a Razorpay order's
+        # coupon only counts once the payment is verified (payments.signals)
+        coupon_applied = bool(coupon_result and coupon_result['valid'])
+        coupon_redeemed = coupon_applied and payment_method == 'cod'
+        if coupon_redeemed and not redeem_coupon(coupon_result['rule']):
+            return Response(
+                {'error': 'This coupon has reached its usage limit'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
         # Create order
         order = Order.objects.create(
             user=user,  # None for guests
@@ -268,9 +339,16 @@ class CheckoutView(APIView):
             tax_breakdown=tax_data,
             
             # Customer Note
-            customer_note=request.data.get('customer_note', '')
+            customer_note=request.data.get('customer_note', ''),
+            
+            coupon_data=order_coupon_data(coupon_result) if coupon_applied else {},
+            coupon_redeemed=coupon_redeemed,
         )
         
+        # Record coupon usage
+        if coupon_redeemed:
+            record_coupon_usage(coupon_result['rule'], order, user, coupon_result['discount_amount'])
+        
         # Create Order Gift Record if selected
         if gift_option:
             from .models import OrderGift
@@ -291,21 +369,32 @@ class CheckoutView(APIView):
                 product=item.product,
                 vendor=item.product.vendor,
                 quantity=item.quantity,
-                price=item.product.price,
+                price=prices[item.product_id]['price'],
+                discount_amount=line_discounts.get(item.id, 0),
                 # Tax details
                 tax_rate=item_tax.get('tax_rate', 0),
                 tax_amount=item_tax.get('tax_amount', 0),
                 cgst_amount=item_tax.get('cgst_amount', 0),
                 sgst_amount=item_tax.get('sgst_amount', 0),
                 igst_amount=item_tax.get('igst_amount', 0),
+                **OrderItem.snapshot_product(item.product),
             )
             
             # NOTE: Stock reduction moved to payment verification
             # Stock should only be reduced when payment is confirmed
         
+        # Create per-vendor sub-orders, using the quoted per-vendor shipping when it adds up
+        breakdown = shipping_data.get('vendor_breakdown') or []
+        shipping_by_vendor = {b['vendor_id']: b['shipping_cost'] for b in breakdown}
+        if Decimal(str(sum(shipping_by_vendor.values()))) != shipping_cost:
+            shipping_by_vendor = None
+        VendorOrder.create_for_order(order, shipping_by_vendor)
+        
         # NOTE: For Razorpay, we do NOT clear cart here. 
         # We clear it only after successful payment in VerifyPaymentView.
         if payment_method == 'cod':
+            if session_id:
+                guest_cart.get_store().remove(session_id, [item.product_id for item in cart_items])
             cart_items.delete()
         
         # Create payment based on method
@@ -325,7 +414,8 @@ class CheckoutView(APIView):
             )
             
             if not result['success']:
-                # Rollback will happen automatically due to transaction.atomic
+                # Returning a response commits the atomic block, so roll the order back explicitly
+                transaction.set_rollback(True)
                 return Response(
                     {'error': 'Failed to create payment order'},
                     status=status.HTTP_400_BAD_REQUEST
@@ -353,18 +443,14 @@ class CheckoutView(APIView):
                 }
             }, status=status.HTTP_201_CREATED)
         
-        elif payment_method == 'cod':
+        else:
             # Cash on Delivery - no payment gateway needed
             order.payment_status = 'cod'
             order.save()
             
             # For COD, reduce stock immediately (accepted business risk)
-            for order_item in order.items.all():
-                product = order_item.product
-                product.stock -= order_item.quantity
-                if product.stock < 0:
-                    product.stock = 0
-                product.save()
+            from products.inventory import record_sale
+            record_sale(order, actor=user)
             
             # Send Order Confirmation Email (Invoice)
             try:
@@ -380,9 +466,3 @@ class CheckoutView(APIView):
                 'is_guest': user is None,
                 'message': 'Order placed successfully. Pay on delivery.'
             }, status=status.HTTP_201_CREATED)
-        
-        else:
-            return Response(
-                {'error': 'Invalid payment method'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
@@ -11,10 +11,14 @@ import json
 import re
 import logging
 from django.conf import settings
+from config.http_clients import get_client
 from vendors.models import VendorProfile
 
 logger = logging.getLogger(__name__)
 
+# Pooled session with per-endpoint timeouts (config.http_clients)
+http = get_client('delhivery')
+
 
 class DelhiveryService:
     """
@@ -111,11 +115,10 @@ class DelhiveryService:
         url = f"{self.BASE_URL}/api/backend/clientwarehouse/create/"
         
         try:
-            response = requests.post(
+            response = http.post(
                 url,
                 json=payload,
-                headers=self.get_headers(),
-                timeout=30
+                headers=self.get_headers()
             )
             
             data = response.json() if response.content else {}
@@ -189,7 +192,12 @@ class DelhiveryService:
         
         # Calculate order totals for this vendor's items
         subtotal = sum(item.price * item.quantity for item in items)
-        total_weight = 0.5  # Default weight in kg
+        # Declared parcel from packing the items into catalog boxes (chargeable weight in kg)
+        from .packing import open_lines, pack_lines, shipment_dimensions
+        lines = open_lines(items)
+        if not lines:
+            raise ValueError(f"Cannot create shipment: every item of order {order.id} for vendor {vendor_profile.id} is cancelled")
+        length, width, height, total_weight = shipment_dimensions(pack_lines(lines))
         
         # Determine payment mode and COD amount
         is_cod = order.payment_method == 'cod'
@@ -205,7 +213,7 @@ class DelhiveryService:
         
         # Build product description
         product_desc = ', '.join([
-            f"{item.product.name} x{item.quantity}" for item in items
+            f"{item.product_name} x{item.quantity}" for item in items
         ])[:200]  # Limit length
         
         # Delhivery Create Shipment payload
@@ -232,6 +240,9 @@ class DelhiveryService:
                 
                 "quantity": sum(item.quantity for item in items),
                 "weight": total_weight,
+                "shipment_length": length,
+                "shipment_width": width,
+                "shipment_height": height,
                 "waybill": "",  # Delhivery auto-generates
                 
                 "client": pickup_location,  # Pickup warehouse
@@ -265,11 +276,10 @@ class DelhiveryService:
                 "Accept": "application/json"
             }
             
-            response = requests.post(
+            response = http.post(
                 url,
                 data={"format": "json", "data": json.dumps(shipment_data)},
-                headers={"Authorization": f"Token {self.token}"},
-                timeout=30
+                headers={"Authorization": f"Token {self.token}"}
             )
             
             data = response.json() if response.content else {}
@@ -330,25 +340,22 @@ class DelhiveryService:
         Returns:
             List of shipment results (one per vendor)
         """
-        from .models import OrderItem  # Avoid circular import
-        
-        order_items = order.items.select_related('product', 'vendor').all()
+        from .models import VendorOrder  # Avoid circular import
         
-        # Group items by vendor
-        items_by_vendor = {}
-        for item in order_items:
-            vendor_id = item.vendor.id
-            if vendor_id not in items_by_vendor:
-                items_by_vendor[vendor_id] = []
-            items_by_vendor[vendor_id].append(item)
+        vendor_orders = VendorOrder.create_for_order(order).prefetch_related('items__product')
         
         results = []
         
-        for vendor_id, items in items_by_vendor.items():
-            vendor = items[0].vendor
+        for vendor_order in vendor_orders:
+            vendor_id = vendor_order.vendor_id
+            vendor = vendor_order.vendor
             
             try:
-                result = self.create_shipment(order, vendor, items)
+                result = self.create_shipment(order, vendor, list(vendor_order.items.all()))
+                if result.get('awb'):
+                    vendor_order.awb_code = result['awb']
+                    vendor_order.courier_name = 'Delhivery'
+                    vendor_order.save(update_fields=['awb_code', 'courier_name', 'updated_at'])
                 results.append({
                     'vendor_id': vendor_id,
                     'vendor_name': vendor.store_name,
@@ -390,11 +397,10 @@ class DelhiveryService:
         }
         
         try:
-            response = requests.get(
+            response = http.get(
                 url,
                 params=params,
-                headers=self.get_headers(),
-                timeout=30
+                headers=self.get_headers()
             )
             
             if response.status_code == 200:
@@ -442,11 +448,10 @@ class DelhiveryService:
         params = {"waybill": awb_number}
         
         try:
-            response = requests.get(
+            response = http.get(
                 url,
                 params=params,
-                headers=self.get_headers(),
-                timeout=30
+                headers=self.get_headers()
             )
             
             if response.status_code == 200:
@@ -476,11 +481,10 @@ class DelhiveryService:
         }
         
         try:
-            response = requests.post(
+            response = http.post(
                 url,
                 json=payload,
-                headers=self.get_headers(),
-                timeout=30
+                headers=self.get_headers()
             )
             
             data = response.json() if response.content else {}
@@ -505,7 +509,8 @@ class DelhiveryService:
         destination_pincode: str, 
         weight: float = 0.5,
         payment_mode: str = 'Prepaid',
-        cod_amount: float = 0
+        cod_amount: float = 0,
+        timeout: float = 15
     ) -> dict:
         """
         Calculate shipping rate from Delhivery API.
@@ -516,6 +521,7 @@ class DelhiveryService:
             weight: Package weight in kg (default 0.5)
             payment_mode: 'Prepaid' or 'COD'
             cod_amount: COD amount if payment_mode is 'COD'
+            timeout: Request timeout in seconds
             
         Returns:
             dict with shipping cost breakdown
@@ -533,11 +539,11 @@ class DelhiveryService:
         }
         
         try:
-            response = requests.get(
+            response = http.get(
                 url,
                 params=params,
                 headers=self.get_headers(),
-                timeout=15
+                timeout=timeout
             )
             
             if response.status_code == 200:
@@ -656,11 +662,11 @@ class DelhiveryService:
         params = {"filter_codes": pincode}
         
         try:
-            response = requests.get(
+            response = http.get(
                 url,
                 params=params,
                 headers=self.get_headers(),
-                timeout=15
+                timeout=timeout
             )
             
             if response.status_code == 200:
@@ -0,0 +1,308 @@
+"""
+Guest (anonymous) carts.
+
+Guest carts live outside the database: one hash per cart ({product_id: quantity})
+with a sliding TTL, identified by a signed `guest_cart` cookie, so browsing
+anonymously creates no Django session or Cart/CartItem rows. Abandoned carts
+simply expire.
+
+A guest cart is written to the database only when it matters:
+- at login, it is merged into the user's Cart by the first authenticated cart
+  request of any kind: every such endpoint resolves the cart with user_cart()
+- at guest checkout, it is copied into a Cart(session_id=<guest cart id>) so
+  the order flow works on the usual models
+
+Both use one bulk_create/bulk_update. A merge holds a short per-cart lock so
+concurrent first requests after login merge the guest cart once, and the guest
+cart is deleted only when the merge commits. Backends are selected with the
+GUEST_CART_BACKEND setting: RedisGuestCartStore in production, and
+LocalGuestCartStore (in-process memory) for tests and local development.
+"""
+import logging
+import secrets
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+GUEST_CART_COOKIE = 'guest_cart'
+GUEST_CART_SALT = 'orders.guest_cart'
+KEY_PREFIX = 'guest_cart:'
+# Seconds a merge keeps the guest cart locked if its transaction never commits
+MERGE_LOCK_TIMEOUT = 30
+
+
+def get_ttl():
+    return getattr(settings, 'GUEST_CART_TTL', 60 * 60 * 24 * 30)
+
+
+class LocalGuestCartStore:
+    """In-process store with the same semantics as the Redis store (tests, local dev)"""
+
+    def __init__(self):
+        self._carts = {}  # cart_id -> (expires_at, {product_id: quantity})
+        self._merge_locks = {}  # cart_id -> expires_at
+        self._lock = threading.Lock()
+
+    def _live_items(self, cart_id):
+        entry = self._carts.get(cart_id)
+        if entry is None or entry[0] < time.monotonic():
+            self._carts.pop(cart_id, None)
+            return None
+        return entry[1]
+
+    def _touch(self, cart_id, items):
+        self._carts[cart_id] = (time.monotonic() + get_ttl(), items)
+
+    def get_items(self, cart_id):
+        with self._lock:
+            items = self._live_items(cart_id)
+            if items is None:
+                return {}
+            self._touch(cart_id, items)
+            return dict(items)
+
+    def add(self, cart_id, product_id, quantity):
+        with self._lock:
+            items = self._live_items(cart_id) or {}
+            items[product_id] = items.get(product_id, 0) + quantity
+            self._touch(cart_id, items)
+            return items[product_id]
+
+    def remove(self, cart_id, product_ids):
+        """Returns the number of products removed"""
+        with self._lock:
+            items = self._live_items(cart_id)
+            if not items:
+                return 0
+            removed = sum(1 for product_id in product_ids if items.pop(product_id, None) is not None)
+            self._touch(cart_id, items)
+            return removed
+
+    def delete(self, cart_id):
+        with self._lock:
+            self._carts.pop(cart_id, None)
+
+    def lock(self, cart_id, timeout):
+        """Take the cart's merge lock; False if another merge holds it"""
+        with self._lock:
+            now = time.monotonic()
+            if self._merge_locks.get(cart_id, 0) > now:
+                return False
+            self._merge_locks[cart_id] = now + timeout
+            return True
+
+    def unlock(self, cart_id):
+        with self._lock:
+            self._merge_locks.pop(cart_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._carts.clear()
+            self._merge_locks.clear()
+
+
+class RedisGuestCartStore:
+    """One Redis hash per cart; every read or write slides the expiry"""
+
+    def __init__(self):
+        import redis
+
+        self.client = redis.Redis.from_url(settings.GUEST_CART_REDIS_URL)
+
+    @staticmethod
+    def _key(cart_id):
+        return f"{KEY_PREFIX}{cart_id}"
+
+    def get_items(self, cart_id):
+        key = self._key(cart_id)
+        pipe = self.client.pipeline()
+        pipe.hgetall(key)
+        pipe.expire(key, get_ttl())
+        raw, _ = pipe.execute()
+        return {int(product_id): int(quantity) for product_id, quantity in raw.items()}
+
+    def add(self, cart_id, product_id, quantity):
+        key = self._key(cart_id)
+        pipe = self.client.pipeline()
+        pipe.hincrby(key, product_id, quantity)
+        pipe.expire(key, get_ttl())
+        new_quantity, _ = pipe.execute()
+        return new_quantity
+
+    def remove(self, cart_id, product_ids):
+        """Returns the number of products removed"""
+        if not product_ids:
+            return 0
+        return self.client.hdel(self._key(cart_id), *product_ids)
+
+    def delete(self, cart_id):
+        self.client.delete(self._key(cart_id))
+
+    def lock(self, cart_id, timeout):
+        """Take the cart's merge lock; False if another merge holds it"""
+        return bool(self.client.set(f"{self._key(cart_id)}:merging", 1, nx=True, ex=timeout))
+
+    def unlock(self, cart_id):
+        self.client.delete(f"{self._key(cart_id)}:merging")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the configured guest cart store (one instance per process)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = import_string(settings.GUEST_CART_BACKEND)()
+    return _store
+
+
+def get_guest_cart_id(request):
+    """Guest cart id from the signed cookie, or None"""
+    return request.get_signed_cookie(GUEST_CART_COOKIE, default=None, salt=GUEST_CART_SALT)
+
+
+def new_guest_cart_id():
+    # Fits Cart.session_id / Order.session_id (max_length=40)
+    return secrets.token_hex(16)
+
+
+def set_guest_cart_cookie(response, cart_id):
+    response.set_signed_cookie(
+        GUEST_CART_COOKIE,
+        cart_id,
+        salt=GUEST_CART_SALT,
+        max_age=get_ttl(),
+        httponly=True,
+        secure=settings.SESSION_COOKIE_SECURE,
+        samesite=settings.SESSION_COOKIE_SAMESITE,
+    )
+
+
+def clear_guest_cart_cookie(response):
+    response.delete_cookie(GUEST_CART_COOKIE, samesite=settings.SESSION_COOKIE_SAMESITE)
+
+
+def build_guest_cart_items(cart_id):
+    """Unsaved CartItems for a guest cart; the item id is the product id"""
+    from products.models import Product
+    from .models import CartItem
+
+    quantities = get_store().get_items(cart_id) if cart_id else {}
+    if not quantities:
+        return []
+    products = Product.objects.filter(id__in=quantities.keys()).select_related('vendor', 'tax_slab')
+    return [
+        CartItem(id=product.id, product=product, quantity=quantities[product.id])
+        for product in products
+    ]
+
+
+def _write_items(cart, quantities, replace):
+    """
+    Write {product_id: quantity} into `cart` with one bulk insert and one bulk update.
+    replace=True makes the cart mirror `quantities`; otherwise quantities are added.
+    """
+    from products.models import Product
+    from .models import Cart, CartItem
+
+    product_ids = set(Product.objects.filter(id__in=quantities.keys()).values_list('id', flat=True))
+    existing = {item.product_id: item for item in cart.items.all()}
+
+    if replace:
+        cart.items.exclude(product_id__in=product_ids).delete()
+
+    to_create, to_update = [], []
+    for product_id in product_ids:
+        item = existing.get(product_id)
+        if item is None:
+            to_create.append(CartItem(cart=cart, product_id=product_id, quantity=quantities[product_id]))
+        else:
+            item.quantity = quantities[product_id] if replace else item.quantity + quantities[product_id]
+            to_update.append(item)
+
+    CartItem.objects.bulk_create(to_create)
+    CartItem.objects.bulk_update(to_update, ['quantity'])
+    # Bulk writes skip the CartItem signals, so bump the cart version here
+    Cart.objects.filter(pk=cart.pk).update(version=F('version') + 1)
+    cart.refresh_from_db(fields=['version'])
+
+
+def merge_guest_cart(cart_id, user):
+    """
+    Merge a guest cart into the user's DB Cart (quantities are added) and drop it.
+    Returns the number of products merged (0 while another request is merging it).
+
+    The guest cart is deleted and its lock released once the merge commits. If the
+    transaction rolls back, the guest cart is left as it was and a later request
+    merges it when the lock expires.
+    """
+    from .models import Cart
+
+    store = get_store()
+    if not store.lock(cart_id, MERGE_LOCK_TIMEOUT):
+        return 0
+    try:
+        with transaction.atomic():
+            quantities = store.get_items(cart_id)
+            if quantities:
+                cart, created = Cart.objects.get_or_create(user=user)
+                _write_items(cart, quantities, replace=False)
+    except Exception:
+        store.unlock(cart_id)
+        raise
+    if not quantities:
+        store.unlock(cart_id)
+        return 0
+
+    def drop_guest_cart():
+        store.delete(cart_id)
+        store.unlock(cart_id)
+
+    transaction.on_commit(drop_guest_cart)
+    logger.info(f"Merged guest cart {cart_id} ({len(quantities)} products) into cart {cart.id} for user {user.id}")
+    return len(quantities)
+
+
+def user_cart(request):
+    """The authenticated user's Cart (created if missing), with a guest cart built before login merged in"""
+    from .models import Cart
+
+    guest_cart_id = get_guest_cart_id(request)
+    if guest_cart_id:
+        merge_guest_cart(guest_cart_id, request.user)
+    cart, created = Cart.objects.get_or_create(user=request.user)
+    return cart
+
+
+def clear_merged_cookie(request, response):
+    """Drop the guest cart cookie from `response` once user_cart() has merged it"""
+    if get_guest_cart_id(request):
+        clear_guest_cart_cookie(response)
+    return response
+
+
+@transaction.atomic
+def materialize_guest_cart(cart_id):
+    """
+    Copy a guest cart into Cart(session_id=cart_id) for checkout and return it,
+    or None if the guest cart is empty. The guest cart itself is kept until the
+    purchased items are removed after payment.
+    """
+    from .models import Cart
+
+    quantities = get_store().get_items(cart_id)
+    if not quantities:
+        return None
+    cart, created = Cart.objects.get_or_create(session_id=cart_id, user=None)
+    _write_items(cart, quantities, replace=True)
+    return cart
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from datetime import timedelta
+from django.conf import settings
+from orders.archive import archive_orders, archivable_orders
+
+
+class Command(BaseCommand):
+    help = 'Move closed orders past the archive horizon (with lines and tracking) into the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Archive closed orders older than this many days (default ORDER_ARCHIVE_AFTER_DAYS)')
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help='Orders per transaction (default ORDER_ARCHIVE_CHUNK_SIZE)')
+        parser.add_argument('--max-chunks', type=int, default=None, help='Stop after this many chunks')
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to sleep between chunks')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the archivable orders')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            days = options['days'] if options['days'] is not None else settings.ORDER_ARCHIVE_AFTER_DAYS
+            count = archivable_orders(timezone.now() - timedelta(days=days)).count()
+            self.stdout.write(f"{count} orders can be archived")
+            return
+
+        count = archive_orders(
+            older_than_days=options['days'],
+            chunk_size=options['chunk_size'],
+            max_chunks=options['max_chunks'],
+            pause=options['pause'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Archived {count} orders"))
@@ -0,0 +1,86 @@
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.core.management.base import BaseCommand
+from config.http_clients import IntegrationClient
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like the carrier APIs
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; with Nagle they wait for a delayed ACK
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.server.requests += 1
+        time.sleep(self.server.delay)
+        body = b'{"status": 200, "data": {}}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Compare one-off requests calls with the shared pooled integration client against a local stub API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--delay-ms', type=float, default=0, help='Server think time per request')
+
+    def _run(self, server, url, count, get):
+        server.requests = server.connections = 0
+        timings = []
+        started = time.perf_counter()
+        for index in range(count):
+            call_started = time.perf_counter()
+            get(f'{url}/courier/serviceability/?pincode={400001 + index % 100}').raise_for_status()
+            timings.append((time.perf_counter() - call_started) * 1000)
+        elapsed = time.perf_counter() - started
+        timings.sort()
+        return {
+            'elapsed': elapsed,
+            'mean_ms': statistics.mean(timings),
+            'p95_ms': timings[int(len(timings) * 0.95) - 1],
+            'connections': server.connections,
+        }
+
+    def handle(self, *args, **options):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+        server.delay = options['delay_ms'] / 1000
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{server.server_port}'
+        count = options['requests']
+        try:
+            client = IntegrationClient('benchmark')
+            results = {
+                'requests.get': self._run(server, url, count, lambda u: requests.get(u, timeout=30)),
+                'pooled client': self._run(server, url, count, client.get),
+            }
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.stdout.write(f"{count} GET calls to a local stub API ({options['delay_ms']:g} ms think time)")
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:>14}: {result['elapsed']:.2f} s, mean {result['mean_ms']:.2f} ms, "
+                f"p95 {result['p95_ms']:.2f} ms, {result['connections']} connections"
+            )
+        before, after = results['requests.get'], results['pooled client']
+        self.stdout.write(self.style.SUCCESS(
+            f"Pooled client: {before['mean_ms'] / after['mean_ms']:.1f}x faster per call, "
+            f"{before['connections']} -> {after['connections']} connections "
+            f"(client reports {client.connections_opened()} opened)"
+        ))
@@ -0,0 +1,82 @@
+import random
+import statistics
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from orders.packing import Box, active_boxes, pack_lines
+
+# Used when the catalog is empty (or with --sample-boxes): common e-commerce carton sizes
+SAMPLE_BOXES = [
+    Box('S', 20, 15, 10, 2, 0.1),
+    Box('M', 30, 25, 15, 5, 0.2),
+    Box('L', 40, 30, 25, 10, 0.35),
+    Box('XL', 60, 40, 40, 20, 0.6),
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark volumetric packing on generated carts (no database writes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--carts', type=int, default=2000)
+        parser.add_argument('--max-lines', type=int, default=8, help='Distinct products per cart')
+        parser.add_argument('--max-quantity', type=int, default=5, help='Units per line')
+        parser.add_argument('--large-units', type=int, default=1000, help='Units in the single large-order run')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--sample-boxes', action='store_true', help='Use the built-in sample boxes')
+
+    def _product(self, rng, index):
+        if rng.random() < 0.1:
+            # Catalog gaps: no dimensions, packing falls back to the defaults
+            return SimpleNamespace(id=index, length=None, width=None, height=None, weight=None)
+        return SimpleNamespace(
+            id=index,
+            length=round(rng.uniform(5, 50), 1),
+            width=round(rng.uniform(5, 35), 1),
+            height=round(rng.uniform(1, 25), 1),
+            weight=round(rng.uniform(0.05, 4), 2),
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        boxes = SAMPLE_BOXES if options['sample_boxes'] else (active_boxes() or SAMPLE_BOXES)
+        self.stdout.write(f"Boxes: {', '.join(box.name for box in boxes)}")
+
+        carts = []
+        for cart_index in range(options['carts']):
+            lines = []
+            for line in range(rng.randint(1, options['max_lines'])):
+                product = self._product(rng, cart_index * 100 + line)
+                lines.append((product.id, product, rng.randint(1, options['max_quantity'])))
+            carts.append(lines)
+
+        timings, package_counts = [], []
+        dead_total = chargeable_total = 0.0
+        for lines in carts:
+            started = time.perf_counter()
+            packages = pack_lines(lines, boxes)
+            timings.append((time.perf_counter() - started) * 1000)
+            package_counts.append(len(packages))
+            dead_total += sum(package.dead_weight for package in packages)
+            chargeable_total += sum(package.chargeable_weight for package in packages)
+
+        # Determinism: packing the same cart again gives the same packages
+        sample = carts[0]
+        assert [p.as_dict() for p in pack_lines(sample, boxes)] == [p.as_dict() for p in pack_lines(sample, boxes)]
+
+        timings.sort()
+        self.stdout.write(
+            f"{len(carts)} carts: p50 {statistics.median(timings):.3f} ms, "
+            f"p95 {timings[int(len(timings) * 0.95) - 1]:.3f} ms, max {timings[-1]:.3f} ms; "
+            f"{statistics.mean(package_counts):.2f} packages/cart; "
+            f"dead weight {dead_total:.1f} kg, chargeable {chargeable_total:.1f} kg"
+        )
+
+        lines = [(index, self._product(rng, index), 1) for index in range(options['large_units'])]
+        started = time.perf_counter()
+        packages = pack_lines(lines, boxes)
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stdout.write(self.style.SUCCESS(
+            f"Large order: {options['large_units']} units into {len(packages)} packages in {elapsed:.1f} ms"
+        ))
@@ -0,0 +1,84 @@
+import csv
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import reset_queries, transaction
+from orders.pincode_import import ZONES, import_pincode_master, import_serviceable_pincodes
+
+STATES = [state for states in ZONES.values() for state in states]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the streaming pincode CSV import on a generated post-office file (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=150000)
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--target', choices=['master', 'whitelist'], default='master')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def _write_file(self, path, rows, rng):
+        # Post-office layout: several offices share a pincode
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['circlename', 'regionname', 'divisionname', 'officename', 'pincode',
+                             'officetype', 'delivery', 'district', 'statename', 'area'])
+            pincode = 110000
+            for index in range(rows):
+                if rng.random() < 0.6:
+                    pincode += rng.randint(1, 4)
+                state = STATES[(pincode // 1000) % len(STATES)]
+                writer.writerow([f'{state} Circle', 'Region', f'Division {pincode // 100}', f'Office {index}',
+                                 pincode if rng.random() > 0.001 else 'N/A', 'BO', 'Delivery',
+                                 f'District {pincode // 1000}', state, f'Office {index}'])
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        importer = import_pincode_master if options['target'] == 'master' else import_serviceable_pincodes
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        os.close(fd)
+        try:
+            self._write_file(path, options['rows'], rng)
+            self.stdout.write(f"{options['rows']} rows, {os.path.getsize(path) / 1e6:.1f} MB, "
+                              f"chunks of {options['chunk_size']} into {options['target']}")
+
+            peaks = []
+
+            def progress(report):
+                # DEBUG keeps every executed query; that would read as growth
+                reset_queries()
+                peaks.append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.reset_peak()
+
+            tracemalloc.start()
+            started = time.perf_counter()
+            try:
+                with transaction.atomic():
+                    with open(path, 'rb') as f:
+                        report = importer(f, chunk_size=options['chunk_size'], progress=progress)
+                    elapsed = time.perf_counter() - started
+                    raise _Rollback
+            except _Rollback:
+                pass
+            finally:
+                tracemalloc.stop()
+        finally:
+            os.remove(path)
+
+        # Flat memory: the peak of the last chunk is no higher than that of the first
+        self.stdout.write(
+            f"{report.total_rows} rows in {elapsed:.1f} s ({report.total_rows / elapsed:,.0f} rows/s, "
+            f"traced); {report.upserted} upserted, {report.duplicates} duplicates, {report.invalid} invalid"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Peak memory per chunk: first {peaks[0] / 1024:.0f} KB, last {peaks[-1] / 1024:.0f} KB, "
+            f"max {max(peaks) / 1024:.0f} KB over {len(peaks)} chunks"
+        ))
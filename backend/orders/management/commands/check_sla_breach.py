@@ -1,7 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import timedelta
-from orders.models import Order
+from orders.models import VendorOrder
 from notifications.resend_service import send_email_via_resend
 from notifications.email_templates import get_email_template
 import logging
@@ -19,48 +19,44 @@ class Command(BaseCommand):
         start_window = now - timedelta(hours=48)
         end_window = now - timedelta(hours=24)
         
-        overdue_orders = Order.objects.filter(
+        # Vendor sub-orders still waiting to ship - one indexed query on (status, created_at)
+        overdue_vendor_orders = VendorOrder.objects.filter(
             status__in=['PENDING', 'PROCESSING'],
             created_at__gte=start_window,
             created_at__lte=end_window
-        )
+        ).select_related('vendor__user', 'order')
         
         count = 0
-        for order in overdue_orders:
-            # Group items by vendor
-            vendor_ids = order.items.values_list('product__vendor', flat=True).distinct()
-            from vendors.models import VendorProfile
-            vendors = VendorProfile.objects.filter(id__in=vendor_ids)
+        for vendor_order in overdue_vendor_orders:
+            vendor, order = vendor_order.vendor, vendor_order.order
+            if not vendor.user.email:
+                continue
+                
+            # Ideally check if we already sent warning. 
+            # For this implementation, we rely on the 24-48h window.
+            # If cron runs daily, it catches it once.
             
-            for vendor in vendors:
-                if not vendor.user.email:
-                    continue
-                    
-                # Ideally check if we already sent warning. 
-                # For this implementation, we rely on the 24-48h window.
-                # If cron runs daily, it catches it once.
+            try:
+                self.stdout.write(f"Sending SLA warning to {vendor.store_name} for Order #{order.id}")
+                
+                context = {
+                    'vendor_name': vendor.store_name,
+                    'order_id': order.id,
+                }
                 
-                try:
-                    self.stdout.write(f"Sending SLA warning to {vendor.store_name} for Order #{order.id}")
-                    
-                    context = {
-                        'vendor_name': vendor.store_name,
-                        'order_id': order.id,
-                    }
-                    
-                    email_data = get_email_template('vendor_sla_warning', context)
-                    if email_data:
-                        try:
-                            send_email_via_resend(
-                                to_email=vendor.user.email,
-                                subject=email_data['subject'],
-                                html_content=email_data['content']
-                            )
-                            count += 1
-                        except Exception as e:
-                            logger.error(f"Failed to send set SLA email to {vendor.user.email}: {e}")
-                            
-                except Exception as e:
-                    logger.error(f"Error processing SLA for vendor {vendor.id}: {e}")
+                email_data = get_email_template('vendor_sla_warning', context)
+                if email_data:
+                    try:
+                        send_email_via_resend(
+                            to_email=vendor.user.email,
+                            subject=email_data['subject'],
+                            html_content=email_data['content']
+                        )
+                        count += 1
+                    except Exception as e:
+                        logger.error(f"Failed to send set SLA email to {vendor.user.email}: {e}")
+                        
+            except Exception as e:
+                logger.error(f"Error processing SLA for vendor {vendor.id}: {e}")
 
         self.stdout.write(self.style.SUCCESS(f"Sent {count} SLA warnings."))
@@ -7,7 +7,8 @@ Usage:
 """
 
 from django.core.management.base import BaseCommand
-from orders.shiprocket_models import ShiprocketPincode
+from orders.postcode_lookup import invalidate_postcodes
+from orders.shiprocket_models import PincodeSyncCheckpoint, PincodeSyncPage, ShiprocketPincode
 
 class Command(BaseCommand):
     help = 'Delete all pincodes from the database'
@@ -37,6 +38,10 @@ class Command(BaseCommand):
         
         self.stdout.write(self.style.WARNING(f'\nDeleting {count} pincodes...'))
         ShiprocketPincode.objects.all().delete()
+        # Otherwise the next sync skips its unchanged pages and never writes them back
+        PincodeSyncPage.objects.all().delete()
+        PincodeSyncCheckpoint.objects.all().delete()
+        invalidate_postcodes()
         
         self.stdout.write(self.style.SUCCESS('✓ All pincodes deleted successfully'))
         self.stdout.write(self.style.SUCCESS(f'Deleted: {count} records\n'))
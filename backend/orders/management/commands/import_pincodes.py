@@ -1,6 +1,7 @@
-import requests
 import time
 from django.core.management.base import BaseCommand, CommandError
+from config.http_clients import get_client
+from orders.pincode_sync import PincodeSync, PincodeSyncError
 from orders.shiprocket_models import ShiprocketPincode
 
 class Command(BaseCommand):
@@ -11,6 +12,8 @@ class Command(BaseCommand):
         parser.add_argument('--states', type=str, help='Comma-separated state names to import (e.g., "Maharashtra,Delhi")')
         parser.add_argument('--limit', type=int, default=1000, help='Maximum records to import')
         parser.add_argument('--api-key', type=str, help='data.gov.in API key (required if source=datagovin)')
+        parser.add_argument('--restart', action='store_true',
+                            help='data.gov.in: ignore the checkpoint and stored page hashes and start from offset 0')
 
     def handle(self, *args, **options):
         source = options['source']
@@ -22,7 +25,7 @@ class Command(BaseCommand):
             api_key = options.get('api_key')
             if not api_key:
                 raise CommandError('--api-key is required for data.gov.in source')
-            self.import_from_datagovin(api_key, limit, options.get('states'))
+            self.import_from_datagovin(api_key, limit, options.get('states'), restart=options['restart'])
         else:
             raise CommandError('Invalid source. Use "postal" or "datagovin"')
 
@@ -56,7 +59,7 @@ class Command(BaseCommand):
                     
                 try:
                     url = f"https://api.postalpincode.in/pincode/{pincode}"
-                    response = requests.get(url, timeout=10)
+                    response = get_client('postalpincode').get(url, timeout=10)
                     data = response.json()
                     
                     if data and len(data) > 0 and data[0]['Status'] == 'Success':
@@ -85,69 +88,32 @@ class Command(BaseCommand):
         
         self.stdout.write(self.style.SUCCESS(f"Imported {count} pincodes successfully!"))
 
-    def import_from_datagovin(self, api_key, limit, states_filter=None):
+    def import_from_datagovin(self, api_key, limit, states_filter=None, restart=False):
         """
         Import from data.gov.in All India Pincode Directory
         """
         self.stdout.write("Importing from data.gov.in...")
         
-        offset = 0
-        count = 0
-        batch_size = 100
+        states_list = [s.strip() for s in states_filter.split(',')] if states_filter else None
         
-        while count < limit:
-            try:
-                url = f"https://api.data.gov.in/resource/6176ee09-3d56-4a3b-8115-21841576b2f6"
-                params = {
-                    'api-key': api_key,
-                    'format': 'json',
-                    'offset': offset,
-                    'limit': min(batch_size, limit - count)
-                }
-                
-                response = requests.get(url, params=params, timeout=30)
-                data = response.json()
-                
-                records = data.get('records', [])
-                if not records:
-                    break
-                
-                for record in records:
-                    pincode = str(int(record.get('pincode', 0)))
-                    state = record.get('statename', 'Unknown')
-                    district = record.get('Districtname', 'Unknown')
-                    
-                    # Filter by states if specified
-                    if states_filter:
-                        states_list = [s.strip() for s in states_filter.split(',')]
-                        if state not in states_list:
-                            continue
-                    
-                    if len(pincode) == 6:  # Valid Indian pincode
-                        obj, created = ShiprocketPincode.objects.update_or_create(
-                            pincode=pincode,
-                            defaults={
-                                'city': district,
-                                'state': state,
-                                'zone': self.get_zone(state),
-                                'is_serviceable': True,
-                                'is_cod_available': True,
-                            }
-                        )
-                        
-                        if created:
-                            count += 1
-                            if count % 100 == 0:
-                                self.stdout.write(f"Imported {count}...")
-                
-                offset += batch_size
-                time.sleep(0.5)  # Rate limiting for API
-                
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f"Error at offset {offset}: {e}"))
-                break
+        def progress(report, checkpoint):
+            self.stdout.write(f"Imported {report.created}, updated {report.updated}...")
+        
+        sync = PincodeSync(
+            api_key=api_key,
+            max_records=limit,
+            record_filter=(lambda record: record.get('statename') in states_list) if states_list else None,
+            filter_key=f"states={','.join(sorted(states_list))}" if states_list else '',
+            progress=progress,
+        )
+        try:
+            report = sync.run(restart=restart)
+        except PincodeSyncError as e:
+            raise CommandError(f"{e} - run the command again to resume")
         
-        self.stdout.write(self.style.SUCCESS(f"Imported {count} pincodes from data.gov.in!"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report.created} pincodes from data.gov.in! ({report.updated} updated)"
+        ))
 
     def get_zone(self, state):
         """Map states to zones"""
@@ -9,9 +9,9 @@ Or via Railway dashboard shell:
   python manage.py populate_production_pincodes
 """
 
-import requests
 import time
 from django.core.management.base import BaseCommand
+from config.http_clients import get_client
 from orders.shiprocket_models import ShiprocketPincode
 
 
@@ -47,7 +47,7 @@ class Command(BaseCommand):
                     'limit': min(batch_size, limit - offset)
                 }
                 
-                response = requests.get(url, params=params, timeout=30)
+                response = get_client('datagovin').get(url, params=params, timeout=30)
                 data = response.json()
                 records = data.get('records', [])
                 
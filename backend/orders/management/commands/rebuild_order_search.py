@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from orders.models import Order
+from orders.search import index_orders
+
+
+class Command(BaseCommand):
+    help = 'Build the order search index (backfill after deploying it, or repair drift)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Orders indexed per batch')
+        parser.add_argument('--missing-only', action='store_true', help='Only index orders without a search entry')
+
+    def handle(self, *args, **options):
+        orders = Order.objects.order_by('id')
+        if options['missing_only']:
+            orders = orders.filter(search_entry__isnull=True)
+
+        total, last_id = 0, 0
+        while True:
+            ids = list(orders.filter(id__gt=last_id).values_list('id', flat=True)[:options['chunk_size']])
+            if not ids:
+                break
+            total += index_orders(ids)
+            last_id = ids[-1]
+            self.stdout.write(f"Indexed {total} orders (up to #{last_id})")
+
+        self.stdout.write(self.style.SUCCESS(f"Order search index built for {total} orders"))
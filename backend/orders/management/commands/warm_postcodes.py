@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from orders.postcode_lookup import POPULAR_SIZE, warm_postcodes
+
+
+class Command(BaseCommand):
+    help = 'Preload the most looked-up pincodes into the postcode cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=POPULAR_SIZE, help='Number of popular pincodes to warm')
+
+    def handle(self, *args, **options):
+        count = warm_postcodes(options['limit'])
+        self.stdout.write(self.style.SUCCESS(f"Warmed {count} postcodes"))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0020_serviceablepincode_area_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0, help_text='Bumped on every cart item change (quote cache key)'),
+        ),
+    ]
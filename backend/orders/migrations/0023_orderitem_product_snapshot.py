@@ -0,0 +1,77 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:42
+
+from django.db import migrations, models
+
+
+def backfill_product_snapshots(apps, schema_editor):
+    """Snapshot existing order lines from their current product (one UPDATE per product)"""
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    Product = apps.get_model('products', 'Product')
+
+    product_ids = OrderItem.objects.filter(product_name='').values_list('product_id', flat=True).distinct()
+    products = Product.objects.filter(id__in=product_ids).select_related('tax_slab').prefetch_related('images', 'attributes')
+    for product in products.iterator(chunk_size=500):
+        images = list(product.images.all())
+        image = next((img for img in images if img.is_primary), images[0] if images else None)
+        OrderItem.objects.filter(product_id=product.id, product_name='').update(
+            product_name=product.name,
+            product_sku=product.sku or '',
+            product_image=image.image.url if image and image.image else '',
+            hsn_code=product.hsn_code,
+            tax_slab_name=product.tax_slab.name if product.tax_slab else '',
+            product_attributes={attr.name: attr.value for attr in product.attributes.all()},
+            is_returnable=product.is_returnable,
+            is_exchangeable=product.is_exchangeable,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0022_order_list_indexes'),
+        ('products', '0020_product_hsn_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='hsn_code',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='is_exchangeable',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='is_returnable',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_attributes',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_image',
+            field=models.CharField(blank=True, help_text='Primary image URL', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_sku',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='tax_slab_name',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.RunPython(backfill_product_snapshots, migrations.RunPython.noop),
+    ]
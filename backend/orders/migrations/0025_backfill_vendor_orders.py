@@ -0,0 +1,65 @@
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum
+
+
+def backfill_vendor_orders(apps, schema_editor):
+    """Create vendor orders for existing orders from per (order, vendor) item aggregates"""
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    VendorOrder = apps.get_model('orders', 'VendorOrder')
+
+    line_total = ExpressionWrapper(F('price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2))
+    groups = OrderItem.objects.filter(vendor_order__isnull=True).values('order_id', 'vendor_id').annotate(
+        item_count=Sum('quantity'), subtotal=Sum(line_total), tax_amount=Sum('tax_amount')
+    ).order_by('order_id')
+
+    by_order = {}
+    for group in groups.iterator(chunk_size=2000):
+        by_order.setdefault(group['order_id'], []).append(group)
+
+    order_ids = list(by_order)
+    for start in range(0, len(order_ids), 500):
+        chunk = order_ids[start:start + 500]
+        vendor_orders = []
+        for order in Order.objects.filter(id__in=chunk):
+            order_groups = by_order[order.id]
+            order_subtotal = sum((g['subtotal'] or Decimal('0') for g in order_groups), Decimal('0'))
+            for group in order_groups:
+                subtotal = group['subtotal'] or Decimal('0')
+                tax = group['tax_amount'] or Decimal('0')
+                share = subtotal / order_subtotal if order_subtotal else Decimal('1') / len(order_groups)
+                shipping = (order.shipping_amount * share).quantize(Decimal('0.01'))
+                discount = (order.discount_amount * share).quantize(Decimal('0.01'))
+                vendor_orders.append(VendorOrder(
+                    order_id=order.id,
+                    vendor_id=group['vendor_id'],
+                    status=order.status,
+                    item_count=group['item_count'],
+                    subtotal=subtotal,
+                    tax_amount=tax,
+                    shipping_amount=shipping,
+                    discount_amount=discount,
+                    total_amount=subtotal + tax + shipping - discount,
+                    shipped_at=order.shipped_at,
+                    delivered_at=order.delivered_at,
+                ))
+        VendorOrder.objects.bulk_create(vendor_orders, ignore_conflicts=True)
+
+    OrderItem.objects.filter(vendor_order__isnull=True).update(
+        vendor_order=Subquery(
+            VendorOrder.objects.filter(order_id=OuterRef('order_id'), vendor_id=OuterRef('vendor_id')).values('id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0024_vendororder'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_vendor_orders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:55
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+from config.partitioning import convert_to_monthly_partitions
+
+
+def partition_archive(apps, schema_editor):
+    for model_name in ('ArchivedOrder', 'ArchivedOrderItem', 'ArchivedOrderTracking'):
+        convert_to_monthly_partitions(schema_editor, apps.get_model('orders', model_name), 'created_at')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0025_backfill_vendor_orders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('pk', models.CompositePrimaryKey('order_id', 'created_at', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('order_id', models.BigIntegerField()),
+                ('user_id', models.BigIntegerField(blank=True, null=True)),
+                ('status', models.CharField(max_length=20)),
+                ('payment_status', models.CharField(max_length=20)),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('data', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user_id', '-created_at'], name='orders_arch_user_id_6febd8_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('pk', models.CompositePrimaryKey('item_id', 'created_at', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('item_id', models.BigIntegerField()),
+                ('order_id', models.BigIntegerField()),
+                ('vendor_id', models.BigIntegerField(blank=True, null=True)),
+                ('product_id', models.BigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('data', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['order_id'], name='orders_arch_order_i_5f1719_idx'), models.Index(fields=['vendor_id', '-created_at'], name='orders_arch_vendor__eef7eb_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderTracking',
+            fields=[
+                ('pk', models.CompositePrimaryKey('tracking_id', 'created_at', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('tracking_id', models.BigIntegerField()),
+                ('order_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField()),
+                ('data', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['order_id'], name='orders_arch_order_i_b7fab1_idx')],
+            },
+        ),
+        migrations.RunPython(partition_archive, migrations.RunPython.noop),
+    ]
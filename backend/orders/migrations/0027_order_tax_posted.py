@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0026_order_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='tax_posted',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0027_order_tax_posted'),
+        ('vendors', '0011_add_delhivery_warehouse_name'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='vendororder',
+            name='orders_vend_vendor__616a1e_idx',
+        ),
+        migrations.AddIndex(
+            model_name='vendororder',
+            index=models.Index(fields=['vendor', 'status', '-created_at', '-id'], name='orders_vend_vendor__d39c74_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendororder',
+            index=models.Index(fields=['vendor', '-created_at', '-id'], name='orders_vend_vendor__4b1798_idx'),
+        ),
+    ]
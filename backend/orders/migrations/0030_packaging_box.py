@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0029_order_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PackagingBox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('length', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('width', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('height', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('max_weight', models.DecimalField(decimal_places=2, help_text='Maximum content + box weight', max_digits=10)),
+                ('tare_weight', models.DecimalField(decimal_places=3, default=0, help_text='Weight of the empty box', max_digits=10)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Packaging Box',
+                'verbose_name_plural': 'Packaging Boxes',
+                'ordering': ['length', 'width', 'height'],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0030_packaging_box'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PincodeSyncCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(max_length=255, unique=True)),
+                ('page_size', models.PositiveIntegerField()),
+                ('next_offset', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(blank=True, null=True)),
+                ('started_at', models.DateTimeField()),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PincodeSyncPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(max_length=255)),
+                ('offset', models.PositiveIntegerField()),
+                ('etag', models.CharField(blank=True, max_length=255)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('record_count', models.PositiveIntegerField(default=0)),
+                ('synced_at', models.DateTimeField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('resource', 'offset'), name='unique_pincode_sync_page')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0031_pincode_sync_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='coupon_data',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='coupon_redeemed',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -3,11 +3,14 @@ from django.conf import settings
 from products.models import Product
 from vendors.models import VendorProfile
 from .shiprocket_models import ShiprocketConfig, ShipmentTracking, OrderTrackingStatus
-from .package_models import OrderPackage, PackageItem
+from .package_models import OrderPackage, PackageItem, PackagingBox
+from .archive_models import ArchivedOrder, ArchivedOrderItem, ArchivedOrderTracking
+from .search_models import OrderSearchEntry
 
 class Cart(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='cart', null=True, blank=True)
     session_id = models.CharField(max_length=40, null=True, blank=True, db_index=True)
+    version = models.PositiveBigIntegerField(default=0, help_text="Bumped on every cart item change (quote cache key)")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -92,6 +95,14 @@ class Order(models.Model):
     review_request_sent = models.BooleanField(default=False)
     review_request_sent_at = models.DateTimeField(null=True, blank=True)
 
+    # Set while the order's lines are counted in the GST rollup (payments.tax_rollup)
+    tax_posted = models.BooleanField(default=False)
+
+    # Coupon applied at checkout ({source, id, code, discount_amount}); it counts against
+    # the coupon's limits once the order is paid or placed as COD (promotions.engine)
+    coupon_data = models.JSONField(default=dict, blank=True)
+    coupon_redeemed = models.BooleanField(default=False)
+
     # Return Status
     RETURN_STATUS_CHOICES = (
         ('requested', 'Return Requested'),
@@ -104,16 +115,134 @@ class Order(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', '-created_at']),
+            models.Index(fields=['payment_status', '-created_at']),
+            models.Index(fields=['-created_at']),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} - {self.user.username}"
 
+class VendorOrder(models.Model):
+    """
+    One vendor's part of an order (sub-order / shipment group), created at checkout.
+    Vendor dashboards, shipping, SLA checks and payouts work on these rows instead
+    of regrouping order items per request.
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='vendor_orders')
+    vendor = models.ForeignKey(VendorProfile, on_delete=models.CASCADE, related_name='vendor_orders')
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES, default='PENDING')
+    
+    # Totals for this vendor's items
+    item_count = models.PositiveIntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    tax_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    shipping_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    discount_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    
+    # Shipment
+    awb_code = models.CharField(max_length=100, blank=True)
+    courier_name = models.CharField(max_length=100, blank=True)
+    tracking_url = models.URLField(blank=True)
+    
+    # Payout tracking
+    paid_to_vendor = models.BooleanField(default=False)
+    payout_date = models.DateTimeField(null=True, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    shipped_at = models.DateTimeField(null=True, blank=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        unique_together = ['order', 'vendor']
+        indexes = [
+            # Vendor order queue: keyset on (created_at, id) per vendor, with and without a status tab
+            models.Index(fields=['vendor', 'status', '-created_at', '-id']),
+            models.Index(fields=['vendor', '-created_at', '-id']),
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['status', 'paid_to_vendor', 'delivered_at']),
+        ]
+
+    def __str__(self):
+        return f"Order #{self.order_id} - {self.vendor.store_name}"
+
+    @classmethod
+    def create_for_order(cls, order, shipping_by_vendor=None):
+        """
+        Create the vendor orders for every order item not yet assigned to one.
+        shipping_by_vendor ({vendor_id: amount}) comes from the shipping quote; without it
+        the order's shipping is split by subtotal. Each vendor carries the promotion discount
+        allocated to its own lines, so a vendor's coupon or bundle is not charged to the others;
+        an order whose lines carry no allocation has its discount split by subtotal.
+        Safe to call again (returns all vendor orders of the order).
+        """
+        from decimal import Decimal
+        
+        groups = {}
+        line_discounts = {}
+        for item in order.items.filter(vendor_order__isnull=True):
+            group = groups.setdefault(item.vendor_id, {'item_count': 0, 'subtotal': Decimal('0'), 'tax_amount': Decimal('0')})
+            group['item_count'] += item.quantity
+            group['subtotal'] += item.price * item.quantity
+            group['tax_amount'] += item.tax_amount
+            line_discounts[item.vendor_id] = line_discounts.get(item.vendor_id, Decimal('0')) + item.discount_amount
+        allocated = any(line_discounts.values())
+        
+        if groups:
+            order_subtotal = sum((g['subtotal'] for g in groups.values()), Decimal('0'))
+            vendor_orders = []
+            for vendor_id, group in groups.items():
+                share = group['subtotal'] / order_subtotal if order_subtotal else Decimal('1') / len(groups)
+                if shipping_by_vendor and vendor_id in shipping_by_vendor:
+                    shipping = Decimal(str(shipping_by_vendor[vendor_id]))
+                else:
+                    shipping = (Decimal(str(order.shipping_amount)) * share).quantize(Decimal('0.01'))
+                if allocated:
+                    discount = line_discounts[vendor_id]
+                else:
+                    discount = (Decimal(str(order.discount_amount)) * share).quantize(Decimal('0.01'))
+                vendor_orders.append(cls(
+                    order=order,
+                    vendor_id=vendor_id,
+                    status=order.status,
+                    shipping_amount=shipping,
+                    discount_amount=discount,
+                    total_amount=group['subtotal'] + group['tax_amount'] + shipping - discount,
+                    **group
+                ))
+            cls.objects.bulk_create(vendor_orders, ignore_conflicts=True)
+            
+            # Link the items, one UPDATE per vendor
+            for vendor_order in cls.objects.filter(order=order, vendor_id__in=groups.keys()):
+                OrderItem.objects.filter(order=order, vendor_id=vendor_order.vendor_id, vendor_order__isnull=True).update(
+                    vendor_order=vendor_order
+                )
+        
+        return cls.objects.filter(order=order).select_related('vendor').order_by('id')
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
+    vendor_order = models.ForeignKey(VendorOrder, on_delete=models.SET_NULL, null=True, blank=True, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     vendor = models.ForeignKey(VendorProfile, on_delete=models.CASCADE, related_name='order_items')
     quantity = models.PositiveIntegerField()
     price = models.DecimalField(max_digits=10, decimal_places=2) # Price at time of purchase
+    # Bundle and coupon discount the promotion engine allocated to this line (deals are already in `price`)
+    discount_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    
+    # Product snapshot at time of purchase (order history renders from these, not the catalog)
+    product_name = models.CharField(max_length=255, blank=True)
+    product_sku = models.CharField(max_length=100, blank=True)
+    product_image = models.CharField(max_length=500, blank=True, help_text="Primary image URL")
+    hsn_code = models.CharField(max_length=20, blank=True)
+    tax_slab_name = models.CharField(max_length=50, blank=True)
+    product_attributes = models.JSONField(default=dict, blank=True)
+    is_returnable = models.BooleanField(default=False)
+    is_exchangeable = models.BooleanField(default=False)
     
     # Tax details (product-level)
     tax_rate = models.DecimalField(max_digits=5, decimal_places=2, default=0, help_text="Tax rate applied (%)")
@@ -136,7 +265,33 @@ class OrderItem(models.Model):
     refund_processed = models.BooleanField(default=False)
 
     def __str__(self):
-        return f"{self.quantity} x {self.product.name} (Order #{self.order.id})"
+        return f"{self.quantity} x {self.product_name} (Order #{self.order_id})"
+    
+    def save(self, *args, **kwargs):
+        # Lines created without an explicit snapshot (admin, scripts) take it from the product once
+        if not self.pk and not self.product_name and self.product_id:
+            for field, value in self.snapshot_product(self.product).items():
+                setattr(self, field, value)
+        super().save(*args, **kwargs)
+    
+    @staticmethod
+    def snapshot_product(product):
+        """
+        Snapshot fields for a new order line. Prefetch product images and attributes
+        and select the tax slab to avoid per-item queries.
+        """
+        images = list(product.images.all())
+        image = next((img for img in images if img.is_primary), images[0] if images else None)
+        return {
+            'product_name': product.name,
+            'product_sku': product.sku or '',
+            'product_image': image.image.url if image and image.image else '',
+            'hsn_code': product.hsn_code,
+            'tax_slab_name': product.tax_slab.name if product.tax_slab else '',
+            'product_attributes': {attr.name: attr.value for attr in product.attributes.all()},
+            'is_returnable': product.is_returnable,
+            'is_exchangeable': product.is_exchangeable,
+        }
     
     def get_active_quantity(self):
         """Get quantity that hasn't been cancelled"""
@@ -146,9 +301,11 @@ class OrderItem(models.Model):
         """Check if quantity can be cancelled"""
         return quantity <= self.get_active_quantity()
     
-    def cancel_partial(self, quantity, reason):
+    def cancel_partial(self, quantity, reason, actor=None):
         """Cancel partial quantity and calculate refund"""
         from django.utils import timezone
+        from products.inventory import record_cancellation
+        from payments.tax_rollup import post_cancellation
         
         if not self.can_cancel(quantity):
             raise ValueError(f"Cannot cancel {quantity} items. Only {self.get_active_quantity()} available.")
@@ -164,9 +321,9 @@ class OrderItem(models.Model):
         
         self.save()
         
-        # Restore inventory
-        self.product.stock += quantity
-        self.product.save()
+        # Restore inventory and net the cancelled units out of the GST rollup
+        record_cancellation(self, quantity, actor=actor, note=reason)
+        post_cancellation(self, quantity)
         
         return refund
 
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .package_models import OrderPackage, PackageItem
+from .package_models import OrderPackage, PackageItem, PackagingBox
 
 
 class PackageItemInline(admin.TabularInline):
@@ -41,3 +41,11 @@ class PackageItemAdmin(admin.ModelAdmin):
     list_filter = ['created_at']
     search_fields = ['package__order__id', 'order_item__product__name']
     readonly_fields = ['created_at']
+
+
+@admin.register(PackagingBox)
+class PackagingBoxAdmin(admin.ModelAdmin):
+    list_display = ['name', 'length', 'width', 'height', 'max_weight', 'tare_weight', 'is_active']
+    list_filter = ['is_active']
+    list_editable = ['is_active']
+    search_fields = ['name']
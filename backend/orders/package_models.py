@@ -65,7 +65,7 @@ class PackageItem(models.Model):
         verbose_name_plural = 'Package Items'
     
     def __str__(self):
-        return f"{self.order_item.product.name} x{self.quantity} in Package {self.package.package_number}"
+        return f"{self.order_item.product_name} x{self.quantity} in Package {self.package.package_number}"
     
     def clean(self):
         """Validate that package item quantity doesn't exceed order item quantity"""
@@ -86,3 +86,25 @@ class PackageItem(models.Model):
     def save(self, *args, **kwargs):
         self.clean()
         super().save(*args, **kwargs)
+
+
+class PackagingBox(models.Model):
+    """Shipping box in the packing catalog (see orders.packing); inner dimensions in cm, weights in kg"""
+    name = models.CharField(max_length=100, unique=True)
+    length = models.DecimalField(max_digits=10, decimal_places=2)
+    width = models.DecimalField(max_digits=10, decimal_places=2)
+    height = models.DecimalField(max_digits=10, decimal_places=2)
+    max_weight = models.DecimalField(max_digits=10, decimal_places=2, help_text="Maximum content + box weight")
+    tare_weight = models.DecimalField(max_digits=10, decimal_places=3, default=0, help_text="Weight of the empty box")
+    is_active = models.BooleanField(default=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['length', 'width', 'height']
+        verbose_name = 'Packaging Box'
+        verbose_name_plural = 'Packaging Boxes'
+
+    def __str__(self):
+        return f"{self.name} ({self.length} x {self.width} x {self.height} cm)"
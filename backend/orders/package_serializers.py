@@ -6,7 +6,7 @@ from products.serializers import ProductSerializer
 
 class PackageItemSerializer(serializers.ModelSerializer):
     """Serializer for items in a package"""
-    product_name = serializers.CharField(source='order_item.product.name', read_only=True)
+    product_name = serializers.CharField(source='order_item.product_name', read_only=True)
     product_price = serializers.DecimalField(source='order_item.price', max_digits=10, decimal_places=2, read_only=True)
     
     class Meta:
@@ -51,7 +51,6 @@ class CancelItemSerializer(serializers.Serializer):
 
 class OrderItemCancellationSerializer(serializers.ModelSerializer):
     """Serializer for order item with cancellation info"""
-    product_name = serializers.CharField(source='product.name', read_only=True)
     active_quantity = serializers.SerializerMethodField()
     
     class Meta:
@@ -61,7 +60,7 @@ class OrderItemCancellationSerializer(serializers.ModelSerializer):
             'cancelled_quantity', 'active_quantity', 'cancellation_reason',
             'cancelled_at', 'refund_amount', 'refund_processed'
         ]
-        read_only_fields = ['id', 'cancelled_quantity', 'cancellation_reason', 
+        read_only_fields = ['id', 'product_name', 'cancelled_quantity', 'cancellation_reason', 
                            'cancelled_at', 'refund_amount', 'refund_processed']
     
     def get_active_quantity(self, obj):
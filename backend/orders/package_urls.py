@@ -2,6 +2,7 @@ from django.urls import path
 from .package_views import (
     list_packages,
     create_package,
+    auto_create_packages,
     cancel_order_item,
     get_cancellable_items
 )
@@ -10,6 +11,7 @@ urlpatterns = [
     # Package management
     path('<int:order_id>/packages/', list_packages, name='list-packages'),
     path('<int:order_id>/packages/create/', create_package, name='create-package'),
+    path('<int:order_id>/packages/auto/', auto_create_packages, name='auto-create-packages'),
     
     # Partial cancellations
     path('items/<int:item_id>/cancel/', cancel_order_item, name='cancel-item'),
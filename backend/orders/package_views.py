@@ -32,7 +32,7 @@ def list_packages(request, order_id):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    packages = OrderPackage.objects.filter(order=order).prefetch_related('items__order_item__product')
+    packages = OrderPackage.objects.filter(order=order).prefetch_related('items__order_item')
     serializer = OrderPackageSerializer(packages, many=True)
     return Response(serializer.data)
 
@@ -73,6 +73,49 @@ def create_package(request, order_id):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def auto_create_packages(request, order_id):
+    """Create the order's packages from volumetric packing of each vendor's open items (see orders.packing)"""
+    from decimal import Decimal
+    from .packing import active_boxes, open_lines, pack_lines
+
+    order = get_object_or_404(Order, id=order_id)
+    if OrderPackage.objects.filter(order=order).exists():
+        return Response(
+            {'error': 'Order already has packages'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    lines_by_vendor = {}
+    for item in order.items.select_related('product').order_by('id'):
+        lines_by_vendor.setdefault(item.vendor_id, []).extend(open_lines([item]))
+
+    boxes = active_boxes()
+    package_items = []
+    number = 0
+    for vendor_id in sorted(lines_by_vendor, key=lambda vendor_id: vendor_id or 0):
+        for planned in pack_lines(lines_by_vendor[vendor_id], boxes):
+            number += 1
+            length, width, height = planned.dimensions
+            package = OrderPackage.objects.create(
+                order=order,
+                package_number=number,
+                length=Decimal(str(round(length, 2))),
+                width=Decimal(str(round(width, 2))),
+                height=Decimal(str(round(height, 2))),
+                weight=Decimal(str(round(planned.dead_weight, 2))),
+            )
+            package_items.extend(
+                PackageItem(package=package, order_item_id=item_id, quantity=quantity)
+                for item_id, quantity in planned.contents.items()
+            )
+    PackageItem.objects.bulk_create(package_items)
+
+    packages = OrderPackage.objects.filter(order=order).prefetch_related('items__order_item')
+    return Response(OrderPackageSerializer(packages, many=True).data, status=status.HTTP_201_CREATED)
+
+
 # Partial Cancellation Endpoints
 
 @api_view(['POST'])
@@ -105,7 +148,7 @@ def cancel_order_item(request, item_id):
     
     try:
         # Cancel the item
-        refund_amount = order_item.cancel_partial(quantity, reason)
+        refund_amount = order_item.cancel_partial(quantity, reason, actor=request.user)
         
         # Update order total
         order = order_item.order
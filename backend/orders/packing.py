@@ -0,0 +1,281 @@
+"""
+Volumetric packing of order lines into shipping boxes.
+
+Carriers charge max(dead weight, volumetric weight), volumetric being
+L x W x H (cm) / 5000. Declaring a vendor's items as one parcel of summed dead
+weight under- or over-declares that, so shipments are packed instead:
+
+- every unit is placed, largest volume first (first-fit decreasing), into the
+  first open package with room for it; otherwise a new package is opened in the
+  largest catalog box (PackagingBox) the unit fits
+- room inside a box is tracked as free cuboids: placing a unit (in the first of
+  its six orientations that fits) splits the cuboid it goes into into the
+  space beside, in front of and above it (guillotine cuts)
+- finally each package is moved to the smallest box its units still fit in
+
+Units too large or heavy for every box ship in their own packaging; with no box
+catalog a vendor's units are stacked into one parcel.
+
+The result only depends on the input (ties are broken by line key), and work is
+bounded: at most MAX_OPEN_PACKAGES packages that are not yet full take new
+units, free spaces per box are capped, and past MAX_PLACED_UNITS units are packed by volume only.
+"""
+from decimal import Decimal
+from itertools import permutations
+
+VOLUMETRIC_DIVISOR = 5000
+
+# Same defaults as OrderPackage / the shipment builders for products without dimensions
+DEFAULT_DIMENSIONS = (10.0, 10.0, 10.0)
+DEFAULT_WEIGHT = 0.5
+
+MAX_OPEN_PACKAGES = 32
+MAX_FREE_SPACES = 48
+MAX_PLACED_UNITS = 300
+# Fill ratio assumed for units packed by volume only
+VOLUME_FILL_RATIO = 0.8
+
+
+class Box:
+    def __init__(self, name, length, width, height, max_weight, tare_weight=0):
+        self.name = name
+        self.dimensions = (float(length), float(width), float(height))
+        self.max_weight = float(max_weight)
+        self.tare_weight = float(tare_weight)
+        self.volume = self.dimensions[0] * self.dimensions[1] * self.dimensions[2]
+
+    @classmethod
+    def from_model(cls, box):
+        return cls(box.name, box.length, box.width, box.height, box.max_weight, box.tare_weight)
+
+    def __repr__(self):
+        return f"Box({self.name!r}, {self.dimensions})"
+
+
+class Unit:
+    """One unit of an order line"""
+    __slots__ = ('key', 'dimensions', 'weight', 'volume')
+
+    def __init__(self, key, dimensions, weight):
+        self.key = key
+        self.dimensions = dimensions
+        self.weight = weight
+        self.volume = dimensions[0] * dimensions[1] * dimensions[2]
+
+
+def _orientation(dimensions, space):
+    """First rotation of `dimensions` that fits in `space`, or None"""
+    for rotated in permutations(dimensions):
+        if rotated[0] <= space[0] and rotated[1] <= space[1] and rotated[2] <= space[2]:
+            return rotated
+    return None
+
+
+class Package:
+    def __init__(self, box=None):
+        self.box = box
+        self.units = []
+        self.spaces = [box.dimensions] if box else []
+        self.largest_space = box.volume if box else 0.0
+        self.used_volume = 0.0
+        self.content_weight = 0.0
+        # Units placed in 3D; any after them were packed by volume only
+        self.placed_count = 0
+        self._loose_dimensions = None
+
+    @property
+    def dimensions(self):
+        return self.box.dimensions if self.box else self._loose_dimensions
+
+    @property
+    def dead_weight(self):
+        return self.content_weight + (self.box.tare_weight if self.box else 0)
+
+    @property
+    def volumetric_weight(self):
+        length, width, height = self.dimensions
+        return length * width * height / VOLUMETRIC_DIVISOR
+
+    @property
+    def chargeable_weight(self):
+        return max(self.dead_weight, self.volumetric_weight)
+
+    @property
+    def contents(self):
+        """{line key: units} in packing order"""
+        counts = {}
+        for unit in self.units:
+            counts[unit.key] = counts.get(unit.key, 0) + 1
+        return counts
+
+    def add(self, unit, by_volume=False):
+        if self.dead_weight + unit.weight > self.box.max_weight:
+            return False
+        if by_volume:
+            if self.used_volume + unit.volume > self.box.volume * VOLUME_FILL_RATIO:
+                return False
+        elif unit.volume <= self.largest_space and self._place(unit):
+            self.placed_count += 1
+        else:
+            return False
+        self.units.append(unit)
+        self.used_volume += unit.volume
+        self.content_weight += unit.weight
+        return True
+
+    def is_full(self, volume, weight, by_volume=False):
+        """True if no unit of `volume` and `weight` can be added any more"""
+        if self.dead_weight + weight > self.box.max_weight:
+            return True
+        if by_volume:
+            return self.used_volume + volume > self.box.volume * VOLUME_FILL_RATIO
+        return self.largest_space < volume and self.used_volume + volume > self.box.volume * VOLUME_FILL_RATIO
+
+    def _place(self, unit):
+        for index, space in enumerate(self.spaces):
+            rotated = _orientation(unit.dimensions, space)
+            if rotated is None:
+                continue
+            length, width, height = rotated
+            beside = (space[0] - length, width, height)
+            front = (space[0], space[1] - width, height)
+            above = (space[0], space[1], space[2] - height)
+            self.spaces[index:index + 1] = [s for s in (beside, front, above) if s[0] > 0 and s[1] > 0 and s[2] > 0]
+            if len(self.spaces) > MAX_FREE_SPACES:
+                # Keep the roomiest spaces; tiny slivers rarely fit anything
+                self.spaces.sort(key=lambda s: -(s[0] * s[1] * s[2]))
+                del self.spaces[MAX_FREE_SPACES:]
+            self.largest_space = max((s[0] * s[1] * s[2] for s in self.spaces), default=0.0)
+            return True
+        return False
+
+    @classmethod
+    def loose(cls, units):
+        """Units shipped without a catalog box: stacked, bounded by their largest footprint"""
+        package = cls()
+        for unit in units:
+            package.units.append(unit)
+            package.used_volume += unit.volume
+            package.content_weight += unit.weight
+        footprints = [sorted(unit.dimensions, reverse=True) for unit in units]
+        package._loose_dimensions = (
+            max(f[0] for f in footprints), max(f[1] for f in footprints), sum(f[2] for f in footprints)
+        )
+        return package
+
+    def as_dict(self):
+        length, width, height = self.dimensions
+        return {
+            'box': self.box.name if self.box else None,
+            'length': round(length, 2),
+            'width': round(width, 2),
+            'height': round(height, 2),
+            'dead_weight': round(self.dead_weight, 3),
+            'volumetric_weight': round(self.volumetric_weight, 3),
+            'chargeable_weight': round(self.chargeable_weight, 3),
+            'items': self.contents,
+        }
+
+
+def _repack(units, box, first_by_volume):
+    package = Package(box)
+    for index, unit in enumerate(units):
+        if not package.add(unit, by_volume=index >= first_by_volume):
+            return None
+    return package
+
+
+def pack_units(units, boxes):
+    """Pack `units` into packages using `boxes` (Box list)"""
+    units = sorted(units, key=lambda unit: (-unit.volume, -unit.weight, str(unit.key)))
+    boxes = sorted(boxes, key=lambda box: (box.volume, box.max_weight, box.name))
+    if not units:
+        return []
+    if not boxes:
+        return [Package.loose(units)]
+
+    packages = []
+    # Boxed packages that can still take a unit; full ones drop out so the scan stays short
+    open_packages = []
+    smallest_volume = units[-1].volume
+    lightest = min(unit.weight for unit in units)
+    for index, unit in enumerate(units):
+        by_volume = index >= MAX_PLACED_UNITS
+        target = next((package for package in open_packages if package.add(unit, by_volume)), None)
+        if target is None:
+            for box in reversed(boxes):
+                package = Package(box)
+                if _orientation(unit.dimensions, box.dimensions) and package.add(unit, by_volume):
+                    packages.append(package)
+                    open_packages.append(package)
+                    target = package
+                    break
+            else:
+                packages.append(Package.loose([unit]))
+                continue
+        if target.is_full(smallest_volume, lightest, by_volume):
+            open_packages.remove(target)
+        elif len(open_packages) > MAX_OPEN_PACKAGES:
+            # Close the package with the least room left
+            open_packages.remove(min(open_packages, key=lambda package: package.box.volume - package.used_volume))
+
+    # Move each package to the smallest box that still holds its units
+    for position, package in enumerate(packages):
+        if package.box is None:
+            continue
+        for box in boxes:
+            if box.volume >= package.box.volume:
+                break
+            if box.volume < package.used_volume or box.max_weight < package.content_weight + box.tare_weight:
+                continue
+            smaller = _repack(package.units, box, package.placed_count)
+            if smaller:
+                packages[position] = smaller
+                break
+    return packages
+
+
+def units_for_lines(lines):
+    """Units for (key, product, quantity) lines, using product dimensions or the defaults"""
+    units = []
+    for key, product, quantity in lines:
+        dimensions = tuple(
+            float(getattr(product, field, None) or default)
+            for field, default in zip(('length', 'width', 'height'), DEFAULT_DIMENSIONS)
+        )
+        weight = float(getattr(product, 'weight', None) or DEFAULT_WEIGHT)
+        units.extend(Unit(key, dimensions, weight) for _ in range(quantity))
+    return units
+
+
+def active_boxes():
+    from .package_models import PackagingBox
+
+    return [Box.from_model(box) for box in PackagingBox.objects.filter(is_active=True)]
+
+
+def open_lines(items):
+    """(key, product, quantity) packing lines of order items, without cancelled units"""
+    lines = []
+    for item in items:
+        quantity = item.quantity - item.cancelled_quantity
+        if quantity > 0:
+            lines.append((item.id, item.product, quantity))
+    return lines
+
+
+def pack_lines(lines, boxes=None):
+    """Packages for (key, product, quantity) lines of one vendor; boxes default to the active catalog"""
+    return pack_units(units_for_lines(lines), active_boxes() if boxes is None else boxes)
+
+
+def chargeable_weight(packages):
+    """Total chargeable weight (kg) of `packages`"""
+    return Decimal(str(round(sum(package.chargeable_weight for package in packages), 3)))
+
+
+def shipment_dimensions(packages):
+    """(length, width, height, weight) to declare for a shipment of `packages` with one parcel entry"""
+    largest = max(packages, key=lambda package: package.dimensions[0] * package.dimensions[1] * package.dimensions[2])
+    length, width, height = largest.dimensions
+    return round(length, 2), round(width, 2), round(height, 2), float(chargeable_weight(packages))
@@ -0,0 +1,259 @@
+"""
+Streaming pincode CSV import.
+
+The serviceability uploads and import_from_csv read the whole file into memory,
+loaded every existing pincode into a Python set to skip duplicates and inserted
+what was left, so the ~150k-row India post-office dataset took minutes and its
+memory grew with both the file and the table. Imports now stream instead:
+
+- the file is decoded line by line (an upload is never read whole) and parsed
+  with csv.DictReader; headers are matched loosely (Pincode / ZipCode / pin,
+  District / City, StateName / State, DivisionName, Area / Locality)
+- rows are validated and collected into chunks of `chunk_size`; each chunk is
+  de-duplicated on its unique key (last row wins - the post-office dataset lists
+  a pincode once per office) and written with one
+  bulk_create(update_conflicts=True) upsert, so existing rows are updated in
+  place instead of being looked up first
+- memory stays flat: only the current chunk and the first MAX_REPORTED_ERRORS
+  row errors are kept, whatever the file or table size
+- `progress(report)` is called after every chunk; the ImportReport returned
+  counts rows, upserts, duplicates and invalid rows with their line numbers
+
+Upserts only touch location fields (city, state, division, zone): an admin's
+serviceable / COD / active toggles survive a re-import. Whitelist rows without
+an area cannot be upserted - NULLs never conflict in the (pincode, area) unique
+constraint - so those are matched per chunk with one query instead.
+"""
+import codecs
+import csv
+import logging
+from itertools import chain
+
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+
+PINCODE_COLUMNS = ('pincode', 'zipcode', 'pin', 'zip')
+CITY_COLUMNS = ('district', 'city')
+STATE_COLUMNS = ('statename', 'state')
+DIVISION_COLUMNS = ('divisionname', 'division')
+AREA_COLUMNS = ('area', 'locality')
+
+ZONES = {
+    'East': ['Andaman And Nicobar Islands', 'Bihar', 'Jharkhand', 'Odisha', 'West Bengal'],
+    'South': ['Andhra Pradesh', 'Karnataka', 'Kerala', 'Tamil Nadu', 'Telangana', 'Puducherry', 'Lakshadweep'],
+    'North': ['Delhi', 'Haryana', 'Himachal Pradesh', 'Jammu And Kashmir', 'Punjab', 'Rajasthan', 'Uttarakhand', 'Chandigarh'],
+    'West': ['Goa', 'Gujarat', 'Maharashtra', 'Dadra And Nagar Haveli', 'Daman And Diu'],
+    'Central': ['Chhattisgarh', 'Madhya Pradesh', 'Uttar Pradesh'],
+    'Northeast': ['Arunachal Pradesh', 'Assam', 'Manipur', 'Meghalaya', 'Mizoram', 'Nagaland', 'Sikkim', 'Tripura']
+}
+_ZONE_BY_STATE = {state: zone for zone, states in ZONES.items() for state in states}
+
+
+class PincodeImportError(Exception):
+    """The file cannot be imported at all (e.g. it has no pincode column)"""
+
+
+def state_zone(state):
+    """Zone of a state name (case-insensitive), '' if unknown"""
+    return _ZONE_BY_STATE.get(str(state or '').strip().title(), '')
+
+
+class ImportReport:
+    def __init__(self):
+        self.total_rows = 0
+        self.upserted = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors = []
+        self.chunks = 0
+
+    def error(self, line, message):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def as_dict(self):
+        return {
+            'total_rows': self.total_rows,
+            'upserted': self.upserted,
+            'duplicates': self.duplicates,
+            'invalid': self.invalid,
+            'errors': self.errors,
+        }
+
+
+def _normalize_header(header):
+    return ''.join(ch for ch in str(header or '').lower() if ch.isalnum())
+
+
+def _find_column(headers, candidates):
+    normalized = {header: _normalize_header(header) for header in headers}
+    for candidate in candidates:
+        for header, name in normalized.items():
+            if name == candidate:
+                return header
+    for candidate in candidates:
+        for header, name in normalized.items():
+            if candidate in name:
+                return header
+    return None
+
+
+def read_rows(source, encoding='utf-8-sig'):
+    """
+    (DictReader, columns) over `source`: a binary file or upload, or any iterable
+    of byte lines. Tab-separated files are detected from the header line.
+    """
+    lines = codecs.iterdecode(source, encoding)
+    header = next(lines, '')
+    delimiter = '\t' if '\t' in header else ','
+    reader = csv.DictReader(chain([header], lines), delimiter=delimiter)
+    headers = reader.fieldnames or []
+
+    columns = {
+        'pincode': _find_column(headers, PINCODE_COLUMNS),
+        'city': _find_column(headers, CITY_COLUMNS),
+        'state': _find_column(headers, STATE_COLUMNS),
+        'division': _find_column(headers, DIVISION_COLUMNS),
+        'area': _find_column(headers, AREA_COLUMNS),
+    }
+    if not columns['pincode']:
+        raise PincodeImportError('CSV must contain a Pincode or ZipCode column')
+    return reader, columns
+
+
+def _value(row, column):
+    return (row.get(column) or '').strip() if column else ''
+
+
+def _stream(source, parse_row, write_chunk, chunk_size, progress):
+    """
+    Read `source` in chunks; parse_row(pincode, row, columns) returns (unique key,
+    field values) and write_chunk(values) stores one de-duplicated chunk.
+    Models are only built for the rows that survive de-duplication.
+    """
+    reader, columns = read_rows(source)
+    report = ImportReport()
+    chunk = {}
+    for line, row in enumerate(reader, start=2):
+        report.total_rows += 1
+        pincode = _value(row, columns['pincode'])
+        if not (len(pincode) == 6 and pincode.isdigit()):
+            report.error(line, f'Invalid pincode {pincode!r}')
+            continue
+        key, values = parse_row(pincode, row, columns)
+        if key in chunk:
+            report.duplicates += 1
+        chunk[key] = values
+
+        if len(chunk) >= chunk_size:
+            _flush(chunk, write_chunk, report, progress)
+            chunk = {}
+    if chunk:
+        _flush(chunk, write_chunk, report, progress)
+    return report
+
+
+def _flush(chunk, write_chunk, report, progress):
+    with transaction.atomic():
+        write_chunk(list(chunk.values()))
+    report.upserted += len(chunk)
+    report.chunks += 1
+    if progress:
+        progress(report)
+
+
+def import_pincode_master(source, chunk_size=DEFAULT_CHUNK_SIZE, update_existing=True, progress=None):
+    """
+    Upsert ShiprocketPincode rows from a pincode CSV (e.g. the post-office dataset).
+    With update_existing=False, pincodes already in the table are left untouched.
+    """
+    from .postcode_lookup import invalidate_postcodes
+    from .shiprocket_models import ShiprocketPincode
+
+    def parse_row(pincode, row, columns):
+        state = _value(row, columns['state']) or 'Unknown'
+        return pincode, (pincode, _value(row, columns['city']) or 'Unknown', state, _value(row, columns['division']))
+
+    def write_chunk(rows):
+        records = [
+            ShiprocketPincode(
+                pincode=pincode,
+                city=city,
+                state=state,
+                division_name=division,
+                zone=state_zone(state),
+                is_serviceable=True,
+                is_cod_available=True,
+            )
+            for pincode, city, state, division in rows
+        ]
+        if update_existing:
+            ShiprocketPincode.objects.bulk_create(
+                records,
+                update_conflicts=True,
+                unique_fields=['pincode'],
+                update_fields=['city', 'state', 'division_name', 'zone', 'last_synced_at'],
+            )
+        else:
+            ShiprocketPincode.objects.bulk_create(records, ignore_conflicts=True)
+
+    try:
+        report = _stream(source, parse_row, write_chunk, chunk_size, progress)
+    finally:
+        # Committed chunks change cached postcode lookups, even if the file fails later
+        transaction.on_commit(invalidate_postcodes)
+    logger.info(f"Pincode master import: {report.total_rows} rows, {report.upserted} upserted, {report.invalid} invalid")
+    return report
+
+
+def import_serviceable_pincodes(source, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """Upsert ServiceablePincode whitelist rows (State, City, ZipCode, optional Area)"""
+    from . import serviceability
+    from .models import ServiceablePincode
+
+    def parse_row(pincode, row, columns):
+        area = _value(row, columns['area']) or None
+        city = _value(row, columns['city']) or 'Unknown'
+        return (pincode, area), (pincode, city, _value(row, columns['state']) or 'Unknown', area)
+
+    def write_chunk(rows):
+        records = [
+            ServiceablePincode(pincode=pincode, city=city, state=state, area=area, is_active=True)
+            for pincode, city, state, area in rows
+        ]
+        with_area = [record for record in records if record.area]
+        ServiceablePincode.objects.bulk_create(
+            with_area,
+            update_conflicts=True,
+            unique_fields=['pincode', 'area'],
+            update_fields=['city', 'state', 'updated_at'],
+        )
+
+        without_area = {record.pincode: record for record in records if not record.area}
+        if not without_area:
+            return
+        existing = list(ServiceablePincode.objects.filter(pincode__in=without_area, area__isnull=True))
+        now = timezone.now()
+        for current in existing:
+            record = without_area[current.pincode]
+            current.city, current.state, current.updated_at = record.city, record.state, now
+        ServiceablePincode.objects.bulk_update(existing, ['city', 'state', 'updated_at'])
+        found = {current.pincode for current in existing}
+        ServiceablePincode.objects.bulk_create(
+            [record for pincode, record in without_area.items() if pincode not in found]
+        )
+
+    try:
+        report = _stream(source, parse_row, write_chunk, chunk_size, progress)
+    finally:
+        # bulk writes skip signals - rebuild the in-memory whitelist. Chunks commit on their own,
+        # so a file failing half way has still changed the table
+        transaction.on_commit(lambda: serviceability.invalidate(serviceability.GLOBAL))
+    logger.info(f"Serviceable pincode import: {report.total_rows} rows, {report.upserted} upserted, {report.invalid} invalid")
+    return report
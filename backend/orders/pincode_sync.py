@@ -0,0 +1,338 @@
+"""
+Concurrent, resumable pincode sync from data.gov.in.
+
+sync_all_pincodes and import_pincodes paged through the All India Pincode
+Directory one request at a time with a fixed sleep in between and started over
+from offset 0 after any failure, so a full sync took hours. PincodeSync instead:
+
+- fetches up to `concurrency` pages at once on a thread pool; a shared
+  RateLimiter spaces all requests to DATA_GOV_IN_RATE_LIMIT per second
+- retries connection errors, 429 and 5xx responses up to `max_attempts` times
+  with exponential backoff and full jitter (Retry-After wins when present)
+- keeps a checkpoint per resource: PincodeSyncCheckpoint holds the pass's
+  low-water offset (every page below it is done) and PincodeSyncPage the ETag,
+  content hash and time of each synced page. A crashed or failed pass resumes
+  at the low-water offset and skips pages already synced in that pass. A
+  filtered sync (record_filter, named by filter_key) keeps its own checkpoint
+  and pages: a page it skipped as unchanged may hold records it never wrote
+- sends the stored ETag as If-None-Match and skips pages that come back 304 or
+  whose content hash is unchanged; other pages are compared with
+  ShiprocketPincode and only new or changed pincodes are upserted. The skip
+  trusts the table to still hold what the page wrote: after pincodes are
+  deleted or edited locally, run(restart=True) drops the stored pages so every
+  page is fetched again and compared with the table
+
+Fetching happens on the worker threads and every database write on the calling
+thread, in offset order of completion, so no connection is shared.
+"""
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from config.http_clients import get_client
+from .pincode_import import state_zone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_CONCURRENCY = 4
+MAX_ATTEMPTS = 5
+BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60
+RESOURCE_MAX_LENGTH = 255
+
+
+class PincodeSyncError(Exception):
+    """A page could not be fetched; the checkpoint keeps everything synced so far"""
+
+
+class RateLimiter:
+    """Spaces acquire() calls from all threads at least 1 / `rate` seconds apart"""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next_at = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            delay = max(0, self.next_at - now)
+            self.next_at = max(now, self.next_at) + self.interval
+        if delay:
+            time.sleep(delay)
+
+
+class SyncReport:
+    def __init__(self):
+        self.pages_fetched = 0
+        self.pages_unchanged = 0
+        self.pages_resumed = 0
+        self.records = 0
+        self.created = 0
+        self.updated = 0
+        self.retries = 0
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+def page_hash(records):
+    return hashlib.sha256(json.dumps(records, sort_keys=True).encode()).hexdigest()
+
+
+def normalize_record(record):
+    """(pincode, (city, state, division)) of a directory record, or None if it has no valid pincode"""
+    try:
+        pincode = f"{int(str(record.get('pincode', '')).strip()):06d}"
+    except ValueError:
+        return None
+    if len(pincode) != 6:
+        return None
+    return pincode, (
+        str(record.get('Districtname') or record.get('districtname') or 'Unknown').strip(),
+        str(record.get('statename') or 'Unknown').strip(),
+        str(record.get('divisionname') or '').strip(),
+    )
+
+
+def resource_key(url, filter_key=''):
+    """Checkpoint key of a sync of `url`, separate per record filter"""
+    if not filter_key:
+        return url
+    key = f'{url}?filter={filter_key}'
+    if len(key) > RESOURCE_MAX_LENGTH:
+        key = f'{url}?filter={hashlib.sha1(filter_key.encode()).hexdigest()}'
+    return key
+
+
+def write_changed(records, record_filter=None):
+    """Upsert the pincodes of `records` that are new or differ from the table; returns (created, updated)"""
+    from .postcode_lookup import invalidate_postcodes
+    from .shiprocket_models import ShiprocketPincode
+
+    rows = {}
+    for record in records:
+        if record_filter and not record_filter(record):
+            continue
+        normalized = normalize_record(record)
+        if normalized:
+            rows[normalized[0]] = normalized[1]
+    if not rows:
+        return 0, 0
+
+    current = {
+        pincode: (city, state, division)
+        for pincode, city, state, division in ShiprocketPincode.objects.filter(
+            pincode__in=rows
+        ).values_list('pincode', 'city', 'state', 'division_name')
+    }
+    changed = [pincode for pincode, values in rows.items() if current.get(pincode) != values]
+    if changed:
+        ShiprocketPincode.objects.bulk_create(
+            [
+                ShiprocketPincode(
+                    pincode=pincode,
+                    city=rows[pincode][0],
+                    state=rows[pincode][1],
+                    division_name=rows[pincode][2],
+                    zone=state_zone(rows[pincode][1]),
+                    is_serviceable=True,
+                    is_cod_available=True,
+                )
+                for pincode in changed
+            ],
+            update_conflicts=True,
+            unique_fields=['pincode'],
+            update_fields=['city', 'state', 'division_name', 'zone', 'last_synced_at'],
+        )
+        transaction.on_commit(invalidate_postcodes)
+    created = sum(1 for pincode in changed if pincode not in current)
+    return created, len(changed) - created
+
+
+class PincodeSync:
+    def __init__(self, api_key=None, url=None, page_size=DEFAULT_PAGE_SIZE, concurrency=DEFAULT_CONCURRENCY,
+                 rate=None, max_attempts=MAX_ATTEMPTS, backoff=BACKOFF_SECONDS, timeout=None,
+                 max_records=None, record_filter=None, filter_key='', progress=None):
+        if record_filter and not filter_key:
+            raise ValueError('A record_filter needs a filter_key naming it')
+        self.api_key = api_key or settings.DATA_GOV_IN_API_KEY
+        self.url = url or settings.DATA_GOV_IN_PINCODE_URL
+        self.resource = resource_key(self.url, filter_key if record_filter else '')
+        self.page_size = page_size
+        self.concurrency = max(1, concurrency)
+        self.limiter = RateLimiter(settings.DATA_GOV_IN_RATE_LIMIT if rate is None else rate)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.timeout = timeout
+        self.max_records = max_records
+        self.record_filter = record_filter
+        self.progress = progress
+        self.http = get_client('datagovin')
+        self.report = SyncReport()
+
+    # Worker threads
+
+    def _retry_delay(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(int(retry_after), MAX_BACKOFF_SECONDS)
+        return random.uniform(0, min(MAX_BACKOFF_SECONDS, self.backoff * 2 ** attempt))
+
+    def fetch_page(self, offset, etag=''):
+        """(status, etag, records, total) of the page at `offset`; raises PincodeSyncError once retries run out"""
+        params = {'api-key': self.api_key, 'format': 'json', 'offset': offset, 'limit': self.page_size}
+        headers = {'If-None-Match': etag} if etag else {}
+        for attempt in range(self.max_attempts):
+            self.limiter.acquire()
+            response = None
+            try:
+                response = self.http.get(self.url, params=params, headers=headers, timeout=self.timeout)
+                if response.status_code == 304:
+                    return 304, etag, None, None
+                if response.status_code != 429 and response.status_code < 500:
+                    response.raise_for_status()
+                    data = response.json()
+                    total = data.get('total')
+                    return 200, response.headers.get('ETag', ''), data.get('records') or [], (
+                        int(total) if total not in (None, '') else None
+                    )
+                error = f'HTTP {response.status_code}'
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = str(e)
+            except (requests.RequestException, ValueError) as e:
+                raise PincodeSyncError(f'Page at offset {offset} failed: {e}')
+
+            if attempt + 1 < self.max_attempts:
+                self.report.retries += 1
+                delay = self._retry_delay(attempt, response)
+                logger.warning(f"Pincode sync page {offset}: {error}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+        raise PincodeSyncError(f'Page at offset {offset} failed after {self.max_attempts} attempts: {error}')
+
+    # Calling thread
+
+    def _checkpoint(self, restart):
+        from .shiprocket_models import PincodeSyncCheckpoint, PincodeSyncPage
+
+        now = timezone.now()
+        checkpoint, created = PincodeSyncCheckpoint.objects.get_or_create(
+            resource=self.resource, defaults={'page_size': self.page_size, 'started_at': now}
+        )
+        if restart or checkpoint.page_size != self.page_size:
+            # A restart compares every page with the table again; pages of another
+            # size cover other records, so their hashes are useless anyway
+            PincodeSyncPage.objects.filter(resource=self.resource).delete()
+            restart = True
+        if restart or checkpoint.completed_at:
+            checkpoint.page_size = self.page_size
+            checkpoint.next_offset = 0
+            checkpoint.started_at = now
+            checkpoint.completed_at = None
+            checkpoint.save()
+        return checkpoint
+
+    def _end(self, checkpoint):
+        ends = [value for value in (checkpoint.total, self.max_records) if value is not None]
+        return min(ends) if ends else None
+
+    def _store_page(self, checkpoint, offset, status, etag, records, pages):
+        from .shiprocket_models import PincodeSyncPage
+
+        previous = pages.get(offset)
+        content_hash = page_hash(records) if status == 200 else previous.content_hash
+        if status == 304 or (previous and previous.content_hash == content_hash):
+            self.report.pages_unchanged += 1
+        else:
+            created, updated = write_changed(records, self.record_filter)
+            self.report.created += created
+            self.report.updated += updated
+        record_count = len(records) if status == 200 else previous.record_count
+        self.report.records += record_count
+
+        pages[offset], _ = PincodeSyncPage.objects.update_or_create(
+            resource=self.resource,
+            offset=offset,
+            defaults={
+                'etag': etag or '',
+                'content_hash': content_hash,
+                'record_count': record_count,
+                'synced_at': timezone.now(),
+            },
+        )
+        return record_count
+
+    def run(self, restart=False):
+        """
+        Sync every page and return the SyncReport. Resumes the unfinished pass
+        unless `restart`, which also forgets the stored ETags and page hashes.
+        """
+        from .shiprocket_models import PincodeSyncPage
+
+        checkpoint = self._checkpoint(restart)
+        pages = {page.offset: page for page in PincodeSyncPage.objects.filter(resource=self.resource)}
+        done = {offset for offset, page in pages.items() if page.synced_at >= checkpoint.started_at}
+        if checkpoint.next_offset:
+            logger.info(f"Resuming pincode sync of {self.resource} at offset {checkpoint.next_offset}")
+
+        next_offset = checkpoint.next_offset
+        # Offset past the last page, once a short page or the reported total shows it
+        end = self._end(checkpoint)
+        failure = None
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='pincode-sync') as executor:
+            while True:
+                while failure is None and len(in_flight) < self.concurrency and (end is None or next_offset < end):
+                    if next_offset in done:
+                        self.report.pages_resumed += 1
+                    else:
+                        etag = pages[next_offset].etag if next_offset in pages else ''
+                        in_flight[executor.submit(self.fetch_page, next_offset, etag)] = next_offset
+                    next_offset += self.page_size
+                if not in_flight:
+                    break
+
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in sorted(finished, key=in_flight.get):
+                    offset = in_flight.pop(future)
+                    try:
+                        status, etag, records, total = future.result()
+                    except PincodeSyncError as e:
+                        failure = failure or e
+                        continue
+
+                    with transaction.atomic():
+                        record_count = self._store_page(checkpoint, offset, status, etag, records, pages)
+                    self.report.pages_fetched += 1
+                    done.add(offset)
+                    if total is not None and total != checkpoint.total:
+                        checkpoint.total = total
+                        end = self._end(checkpoint)
+                    if record_count < self.page_size:
+                        end = min(end, offset + record_count) if end is not None else offset + record_count
+
+                # Advance the low-water mark over contiguous finished pages
+                low_water = checkpoint.next_offset
+                while low_water in done and (end is None or low_water < end):
+                    low_water += self.page_size
+                checkpoint.next_offset = min(low_water, end) if end is not None else low_water
+                checkpoint.save(update_fields=['next_offset', 'total'])
+                if self.progress:
+                    self.progress(self.report, checkpoint)
+
+        if failure is not None:
+            raise failure
+        checkpoint.completed_at = timezone.now()
+        checkpoint.save(update_fields=['completed_at'])
+        logger.info(f"Pincode sync of {self.resource} complete: {self.report.as_dict()}")
+        return self.report
@@ -0,0 +1,227 @@
+"""
+Cached postcode (pincode -> city / state) lookup.
+
+The public postcode details endpoint queried ShiprocketPincode, and Shiprocket's
+open postcode API when the master had no usable row, on every request - for the
+same few thousand popular pincodes, and again on every keystroke for pincodes
+users mistype. lookup_postcode() answers from two cache tiers instead:
+
+- a per-process LRU (LOCAL_SIZE entries, LOCAL_TIMEOUT seconds) so repeat
+  lookups are a dict hit, well under a millisecond
+- the shared cache (POSITIVE_TIMEOUT), filled from the master or the API on a
+  miss; pincodes neither knows are cached as unknown for NEGATIVE_TIMEOUT only,
+  so a pincode imported later shows up within minutes. Its entries are keyed by
+  the 'postcodes' cache version, which pincode master writes (imports, syncs,
+  clear_pincodes) bump through invalidate_postcodes(); per-process copies
+  follow within LOCAL_TIMEOUT
+- malformed input (anything but six digits not starting with 0) is rejected
+  before any tier is consulted
+
+Concurrent misses for one pincode in a process share a single load; a lookup
+that waits longer than COALESCE_WAIT for it answers from the master alone. Found
+pincodes are counted per process and merged every HITS_FLUSH_EVERY lookups
+into a shared popularity list; warm_postcodes() (beat task and command)
+preloads its top entries from the master in batched queries.
+"""
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+
+from django.core.cache import cache
+
+from config.cache_versions import bump_version, get_version
+
+logger = logging.getLogger(__name__)
+
+POSTCODE_VERSION = 'postcodes'
+POSTCODE_KEY = 'orders:postcode:{version}:{pincode}'
+POPULAR_KEY = 'orders:postcode:popular'
+POSITIVE_TIMEOUT = 60 * 60 * 24
+NEGATIVE_TIMEOUT = 60 * 5
+POPULAR_TIMEOUT = 60 * 60 * 24 * 7
+LOCAL_SIZE = 10000
+LOCAL_TIMEOUT = 60 * 5
+# Seconds a lookup waits for another thread's load of the same pincode
+COALESCE_WAIT = 10
+HITS_FLUSH_EVERY = 1000
+POPULAR_SIZE = 5000
+
+# Stored for pincodes that are known not to exist (None means "not cached")
+UNKNOWN = False
+
+
+class LRUCache:
+    """Thread-safe LRU of (value, expiry) with per-entry timeouts"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """The cached value, or None if missing or expired"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+_local = LRUCache(LOCAL_SIZE)
+_loading = {}
+_loading_lock = threading.Lock()
+_hits = Counter()
+_hits_lock = threading.Lock()
+_unflushed = 0
+
+
+def is_valid_pincode(pincode):
+    return len(pincode) == 6 and pincode.isdigit() and pincode[0] != '0'
+
+
+def postcode_key(pincode, version=None):
+    """Shared cache key of `pincode` under the current (or given) postcode version"""
+    return POSTCODE_KEY.format(version=version or get_version(POSTCODE_VERSION), pincode=pincode)
+
+
+def invalidate_postcodes():
+    """Drop every shared postcode entry, after the pincode master changed"""
+    bump_version(POSTCODE_VERSION)
+
+
+def _details(pincode, city, state):
+    return {'postcode': pincode, 'city': city, 'state': state, 'country': 'India'}
+
+
+def _from_master(pincodes):
+    from .shiprocket_models import ShiprocketPincode
+
+    return {
+        pincode: _details(pincode, city, state)
+        for pincode, city, state in ShiprocketPincode.objects.filter(
+            pincode__in=pincodes
+        ).exclude(city='Unknown').values_list('pincode', 'city', 'state')
+        if city and state
+    }
+
+
+def _from_api(pincode):
+    from .shiprocket_service import ShiprocketService
+
+    try:
+        return ShiprocketService().get_postcode_details(pincode) or None
+    except Exception as e:
+        logger.warning(f"Postcode API lookup of {pincode} failed: {e}")
+        return None
+
+
+def _load(pincode):
+    """Shared cache, else master, else API; the result (or UNKNOWN) is written to the shared cache"""
+    key = postcode_key(pincode)
+    details = cache.get(key)
+    if details is not None:
+        return details
+
+    details = _from_master([pincode]).get(pincode) or _from_api(pincode)
+    if details:
+        cache.set(key, details, POSITIVE_TIMEOUT)
+        return details
+    cache.set(key, UNKNOWN, NEGATIVE_TIMEOUT)
+    return UNKNOWN
+
+
+def _load_coalesced(pincode):
+    with _loading_lock:
+        future = _loading.get(pincode)
+        leader = future is None
+        if leader:
+            future = _loading[pincode] = Future()
+    if not leader:
+        try:
+            return future.result(timeout=COALESCE_WAIT)
+        except TimeoutError:
+            # The load is stuck on the API - answer from the master, None (uncached) if it has no row
+            return _from_master([pincode]).get(pincode)
+
+    try:
+        details = _load(pincode)
+        future.set_result(details)
+        return details
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _loading_lock:
+            _loading.pop(pincode, None)
+
+
+def _count_hit(pincode):
+    global _unflushed
+    with _hits_lock:
+        _hits[pincode] += 1
+        _unflushed += 1
+        if _unflushed < HITS_FLUSH_EVERY:
+            return
+        hits = dict(_hits)
+        _hits.clear()
+        _unflushed = 0
+    try:
+        popular = Counter(cache.get(POPULAR_KEY) or {})
+        popular.update(hits)
+        cache.set(POPULAR_KEY, dict(popular.most_common(POPULAR_SIZE)), POPULAR_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Could not record popular postcodes: {e}")
+
+
+def lookup_postcode(pincode):
+    """{'postcode', 'city', 'state', 'country', ...} for `pincode`, or None if it is unknown or malformed"""
+    pincode = str(pincode or '').strip()
+    if not is_valid_pincode(pincode):
+        return None
+
+    details = _local.get(pincode)
+    if details is None:
+        details = _load_coalesced(pincode)
+        if details is not None:
+            _local.set(pincode, details, LOCAL_TIMEOUT if details else min(LOCAL_TIMEOUT, NEGATIVE_TIMEOUT))
+    if details:
+        _count_hit(pincode)
+        return details
+    return None
+
+
+def warm_postcodes(limit=POPULAR_SIZE):
+    """Preload the most looked-up pincodes from the master into both tiers; returns how many"""
+    popular = Counter(cache.get(POPULAR_KEY) or {})
+    pincodes = [pincode for pincode, _ in popular.most_common(limit)]
+    if not pincodes:
+        return 0
+
+    found = {}
+    for start in range(0, len(pincodes), 1000):
+        found.update(_from_master(pincodes[start:start + 1000]))
+    version = get_version(POSTCODE_VERSION)
+    cache.set_many(
+        {postcode_key(pincode, version): details for pincode, details in found.items()}, POSITIVE_TIMEOUT
+    )
+    for pincode, details in found.items():
+        _local.set(pincode, details, LOCAL_TIMEOUT)
+    return len(found)
+
@@ -54,7 +54,7 @@ def request_return(request, order_id):
 
     # Notify Vendors
     try:
-        vendor_ids = order.items.values_list('product__vendor', flat=True).distinct()
+        vendor_ids = order.vendor_orders.values_list('vendor_id', flat=True)
         from vendors.models import VendorProfile
         vendors = VendorProfile.objects.filter(id__in=vendor_ids)
         
@@ -0,0 +1,131 @@
+"""
+Order search index for support lookups.
+
+Every order gets one OrderSearchEntry whose `document` holds its searchable
+tokens: order number, customer and address emails, phone digits, names, AWB
+codes, Shiprocket and Razorpay ids. Signals reindex an order after any write to
+the order, its shipments, sub-orders or payments (after commit).
+
+Lookups are substring matches on `document` for every query term:
+- PostgreSQL: LIKE '%term%' served by a pg_trgm GIN index
+- SQLite: MATCH on an FTS5 trigram table kept in sync by triggers
+(both created by migration 0029_order_search_index)
+Both stay index-backed however many orders exist. Terms shorter than three
+characters cannot use a trigram index and fall back to a scan. The match is a
+subquery of the caller's (already filtered) order queryset, so there is no cap
+on how many orders a broad term can find.
+"""
+import logging
+import re
+
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+
+from .models import Order, OrderSearchEntry
+
+logger = logging.getLogger(__name__)
+
+MIN_TRIGRAM_LENGTH = 3
+FTS_TABLE = 'orders_ordersearchentry_fts'
+
+_PHONE = re.compile(r'^\+?[\d\s\-()]{6,}$')
+_NON_DIGITS = re.compile(r'\D')
+
+
+def _phone_digits(value):
+    digits = _NON_DIGITS.sub('', str(value or ''))
+    if not digits:
+        return []
+    # Stored with and without the country code so either form matches
+    return [digits, digits[-10:]] if len(digits) > 10 else [digits]
+
+
+def _address_tokens(address):
+    address = address or {}
+    tokens = [address.get('full_name'), address.get('name'), address.get('email')]
+    tokens += _phone_digits(address.get('phone'))
+    return tokens
+
+
+def build_document(order, shipments=(), vendor_orders=(), payments=()):
+    tokens = [str(order.id), f'ORD-{order.id:06d}', order.guest_email,
+              order.awb_code, order.tracking_number, order.shiprocket_order_id]
+    if order.user_id:
+        user = order.user
+        tokens += [user.email, user.first_name, user.last_name]
+    tokens += _address_tokens(order.shipping_address_data)
+    tokens += _address_tokens(order.billing_address_data)
+    for shipment in shipments:
+        tokens += [shipment.awb_code, shipment.shiprocket_order_id, shipment.shiprocket_shipment_id]
+    for vendor_order in vendor_orders:
+        tokens.append(vendor_order.awb_code)
+    for payment in payments:
+        tokens += [payment.razorpay_order_id, payment.payment_id]
+    return ' '.join(dict.fromkeys(str(token).strip().lower() for token in tokens if token))
+
+
+def index_orders(order_ids):
+    """(Re)build the search entries of `order_ids` in bulk; returns the number written"""
+    from payments.models import Payment
+
+    order_ids = list(order_ids)
+    orders = Order.objects.filter(id__in=order_ids).select_related('user').prefetch_related(
+        'shipments', 'vendor_orders'
+    )
+    payments = {}
+    for payment in Payment.objects.filter(order_id__in=order_ids).only('order_id', 'razorpay_order_id', 'payment_id'):
+        payments.setdefault(payment.order_id, []).append(payment)
+
+    entries = [
+        OrderSearchEntry(
+            order_id=order.id,
+            document=build_document(order, order.shipments.all(), order.vendor_orders.all(), payments.get(order.id, ())),
+        )
+        for order in orders
+    ]
+    OrderSearchEntry.objects.bulk_create(
+        entries, update_conflicts=True, unique_fields=['order'], update_fields=['document', 'updated_at'],
+    )
+    return len(entries)
+
+
+def schedule_reindex(order_id):
+    """Reindex an order once the current transaction commits"""
+    if order_id:
+        transaction.on_commit(lambda: _reindex_safely(order_id))
+
+
+def _reindex_safely(order_id):
+    try:
+        index_orders([order_id])
+    except Exception as e:
+        # A stale search entry must never fail the write that triggered it
+        logger.error(f"Failed to reindex order #{order_id} for search: {e}")
+
+
+def query_terms(query):
+    """Lowercase search terms; a phone-like query becomes one digits-only term"""
+    query = (query or '').strip()
+    if _PHONE.match(query):
+        return [_NON_DIGITS.sub('', query)[-10:]]
+    terms = []
+    for term in query.lower().split():
+        term = term.lstrip('#')
+        if term:
+            terms.append(term)
+    return terms
+
+
+def search_orders(queryset, query):
+    """`queryset` (of Order) narrowed to orders whose search document contains every term of `query`"""
+    terms = query_terms(query)
+    if not terms:
+        return queryset.none()
+    if connection.vendor == 'sqlite' and all(len(term) >= MIN_TRIGRAM_LENGTH for term in terms):
+        match = ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+        return queryset.filter(id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]))
+
+    entries = OrderSearchEntry.objects.all()
+    for term in terms:
+        entries = entries.filter(document__contains=term)
+    return queryset.filter(id__in=entries.values('order_id'))
@@ -0,0 +1,16 @@
+from django.db import models
+
+
+class OrderSearchEntry(models.Model):
+    """
+    Searchable tokens of one order (see orders.search), kept in sync on every
+    order, shipment, sub-order and payment write. `document` is lowercase and
+    carries a pg_trgm GIN index on PostgreSQL and an FTS5 trigram shadow table
+    on SQLite (both created in the migration).
+    """
+    order = models.OneToOneField('Order', on_delete=models.CASCADE, primary_key=True, related_name='search_entry')
+    document = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Search entry for order #{self.order_id}"
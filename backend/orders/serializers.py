@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Cart, CartItem, Order, OrderItem, OrderNote
+from .models import Cart, CartItem, Order, OrderItem, OrderNote, VendorOrder
 from products.serializers import ProductSerializer
 
 class CartItemSerializer(serializers.ModelSerializer):
@@ -37,11 +37,29 @@ class CartSerializer(serializers.ModelSerializer):
         return self.get_totals(obj)['discount_amount']
 
 class OrderItemSerializer(serializers.ModelSerializer):
-    product = ProductSerializer(read_only=True)
+    product = serializers.SerializerMethodField()
 
     class Meta:
         model = OrderItem
-        fields = ('id', 'product', 'quantity', 'price')
+        fields = (
+            'id', 'product', 'quantity', 'price',
+            'product_name', 'product_sku', 'product_image', 'hsn_code', 'tax_slab_name', 'product_attributes',
+        )
+
+    def get_product(self, obj):
+        """The product as it was bought, built from the line's snapshot (no catalog lookup)"""
+        image = obj.product_image
+        request = self.context.get('request')
+        if image and image.startswith('/') and request:
+            image = request.build_absolute_uri(image)
+        return {
+            'id': obj.product_id,
+            'name': obj.product_name,
+            'sku': obj.product_sku,
+            'images': [{'image': image}] if image else [],
+            'is_returnable': obj.is_returnable,
+            'is_exchangeable': obj.is_exchangeable,
+        }
 
 class UserBasicSerializer(serializers.Serializer):
     """Basic user info for order display"""
@@ -59,6 +77,42 @@ class OrderNoteSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('author', 'created_at')
 
+class AdminOrderSummarySerializer(serializers.ModelSerializer):
+    """Slim order row for the admin order list; details come from the order detail endpoint"""
+    user = UserBasicSerializer(read_only=True)
+    item_count = serializers.IntegerField(read_only=True)
+    shipment_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Order
+        fields = (
+            'id', 'user', 'guest_email', 'shipping_address_data',
+            'status', 'payment_status', 'payment_method',
+            'subtotal', 'tax_amount', 'shipping_amount', 'discount_amount', 'total_amount',
+            'item_count', 'shipment_count', 'created_at',
+        )
+
+class VendorOrderQueueItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = OrderItem
+        fields = ('id', 'product_id', 'product_name', 'product_sku', 'quantity', 'cancelled_quantity', 'price')
+
+class VendorOrderQueueSerializer(serializers.ModelSerializer):
+    """Row of a vendor's order queue: the sub-order with the order fields a vendor needs to fulfil it"""
+    items = VendorOrderQueueItemSerializer(many=True, read_only=True)
+    payment_method = serializers.ReadOnlyField(source='order.payment_method')
+    payment_status = serializers.ReadOnlyField(source='order.payment_status')
+    shipping_address = serializers.ReadOnlyField(source='order.shipping_address_data')
+
+    class Meta:
+        model = VendorOrder
+        fields = (
+            'id', 'order_id', 'status', 'payment_method', 'payment_status', 'shipping_address',
+            'item_count', 'subtotal', 'tax_amount', 'shipping_amount', 'discount_amount', 'total_amount',
+            'awb_code', 'courier_name', 'tracking_url', 'items',
+            'created_at', 'shipped_at', 'delivered_at',
+        )
+
 class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     user = UserBasicSerializer(read_only=True)
@@ -105,17 +159,14 @@ class OrderSerializer(serializers.ModelSerializer):
         if not request:
             return None
             
-        shipments = obj.shipments.all()
+        # Filtered in Python so prefetched shipments are reused
+        shipments = list(obj.shipments.all())
         
         # Filter for vendors
         if not request.user.is_staff and request.user != obj.user:
-            # Check if user is seller
-            if hasattr(request.user, 'vendor_profile'): # Or however we identify vendors
-                 shipments = shipments.filter(vendor=request.user)
-            elif request.user.pk: # If authenticated but logic is diff
-                 shipments = shipments.filter(vendor=request.user)
+            shipments = [s for s in shipments if s.vendor_id == request.user.pk]
 
-        shipment = shipments.order_by('-created_at').first()
+        shipment = max(shipments, key=lambda s: s.created_at, default=None)
         
         if shipment:
             return {
@@ -0,0 +1,271 @@
+"""
+In-memory pincode serviceability.
+
+Checking a pincode used to cost two queries per cart item plus parsing the
+vendor's comma-separated pincode list. Every scope is instead one PincodeSet:
+
+- 'global'       active ServiceablePincode rows (an empty whitelist serves everywhere)
+- 'cod'          active CODPincode rows
+- 'vendor:<id>'  the vendor's pincodes and ranges (vendors.pincodes; none serves everywhere)
+
+Pincodes are six-digit numbers, so a large set is a bitmap over 0-999999
+(125 KB) and a small one a sorted int array; membership is a bit test or a
+bisect.
+
+Each scope has its own shared cache version (config.cache_versions) and its
+snapshot is stored in the shared cache under that version and kept per process,
+so checking a whole cart is one cache round trip for the versions followed by
+memory lookups, with no SQL.
+
+Writes rebuild incrementally: once the write commits, the writer applies the
+change to the current snapshot and stores it under the next version. If another
+write bumped the version in between, nothing is stored and the next reader
+rebuilds the scope from the database; bulk updates that bypass signals call
+invalidate() for the same lazy rebuild.
+
+The admin state -> city -> area hierarchy of the whitelist is derived data of
+the same rows, so it is cached under the global scope's version too: built from
+one grouped query, kept per process, and that version doubles as its ETag.
+"""
+import logging
+from array import array
+from bisect import bisect_left, insort
+from itertools import groupby
+
+from django.core.cache import cache
+from django.db import transaction
+
+from config.cache_versions import LocalCopy, bump_version, get_version, get_versions
+
+logger = logging.getLogger(__name__)
+
+GLOBAL = 'global'
+COD = 'cod'
+VERSION_PREFIX = 'serviceability:'
+SNAPSHOT_KEY = 'orders:serviceability:{scope}:{version}'
+SNAPSHOT_TIMEOUT = 60 * 60 * 24
+HIERARCHY_KEY = 'orders:serviceability:hierarchy:{version}'
+
+PINCODE_SPACE = 1000000
+# Sets with at least this many pincodes are stored as a bitmap
+BITMAP_MIN_SIZE = 4096
+
+# Per-process snapshots: {scope: (snapshot key, PincodeSet)}
+_local_sets = {}
+_hierarchy_copy = LocalCopy(SNAPSHOT_TIMEOUT)
+
+
+def vendor_scope(vendor_id):
+    return f'vendor:{vendor_id}'
+
+
+def parse_pincode(value):
+    """Pincode as an int, or None if it is not six digits"""
+    value = str(value or '').strip()
+    return int(value) if len(value) == 6 and value.isdigit() else None
+
+
+class PincodeSet:
+    __slots__ = ('bitmap', 'values', 'count')
+
+    def __init__(self, pincodes=()):
+        values = sorted({value for value in map(parse_pincode, pincodes) if value is not None})
+        self.count = len(values)
+        self.bitmap = None
+        self.values = array('I', values)
+        if self.count >= BITMAP_MIN_SIZE:
+            self._to_bitmap()
+
+    def _to_bitmap(self):
+        self.bitmap = bytearray(PINCODE_SPACE // 8)
+        for value in self.values:
+            self.bitmap[value >> 3] |= 1 << (value & 7)
+        self.values = None
+
+    def _has(self, value):
+        if self.bitmap is not None:
+            return bool(self.bitmap[value >> 3] & (1 << (value & 7)))
+        index = bisect_left(self.values, value)
+        return index < len(self.values) and self.values[index] == value
+
+    def __contains__(self, pincode):
+        value = parse_pincode(pincode)
+        return value is not None and self._has(value)
+
+    def __len__(self):
+        return self.count
+
+    def add(self, pincode):
+        value = parse_pincode(pincode)
+        if value is None or self._has(value):
+            return
+        self.count += 1
+        if self.bitmap is not None:
+            self.bitmap[value >> 3] |= 1 << (value & 7)
+            return
+        insort(self.values, value)
+        if self.count >= BITMAP_MIN_SIZE:
+            self._to_bitmap()
+
+    def discard(self, pincode):
+        value = parse_pincode(pincode)
+        if value is None or not self._has(value):
+            return
+        self.count -= 1
+        if self.bitmap is not None:
+            self.bitmap[value >> 3] &= ~(1 << (value & 7)) & 0xFF
+        else:
+            del self.values[bisect_left(self.values, value)]
+
+
+def _load(scope):
+    from .models import CODPincode, ServiceablePincode
+
+    if scope == GLOBAL:
+        return PincodeSet(ServiceablePincode.objects.filter(is_active=True).values_list('pincode', flat=True).iterator())
+    if scope == COD:
+        return PincodeSet(CODPincode.objects.filter(is_active=True).values_list('pincode', flat=True).iterator())
+
+    from vendors.pincodes import vendor_pincodes
+    return PincodeSet(vendor_pincodes(int(scope.split(':', 1)[1])))
+
+
+def get_pincode_sets(scopes):
+    """{scope: PincodeSet} for `scopes`, loading only the scopes that changed since last use"""
+    scopes = list(dict.fromkeys(scopes))
+    versions = get_versions(f'{VERSION_PREFIX}{scope}' for scope in scopes)
+    sets = {}
+    stale = {}
+    for scope in scopes:
+        key = SNAPSHOT_KEY.format(scope=scope, version=versions[f'{VERSION_PREFIX}{scope}'])
+        local = _local_sets.get(scope)
+        if local and local[0] == key:
+            sets[scope] = local[1]
+        else:
+            stale[key] = scope
+
+    if stale:
+        cached = cache.get_many(list(stale))
+        for key, scope in stale.items():
+            pincodes = cached.get(key)
+            if pincodes is None:
+                pincodes = _load(scope)
+                cache.set(key, pincodes, SNAPSHOT_TIMEOUT)
+            _local_sets[scope] = (key, pincodes)
+            sets[scope] = pincodes
+    return sets
+
+
+def invalidate(scope):
+    """Drop the snapshot of `scope`; the next reader rebuilds it from the database"""
+    bump_version(f'{VERSION_PREFIX}{scope}')
+
+
+def _apply(scope, pincode, present):
+    name = f'{VERSION_PREFIX}{scope}'
+    version = get_version(name)
+    pincodes = cache.get(SNAPSHOT_KEY.format(scope=scope, version=version))
+    new_version = bump_version(name)
+    if pincodes is None or new_version != version + 1:
+        # Not cached, or raced with another write - rebuilt lazily by the next reader
+        return
+    if present:
+        pincodes.add(pincode)
+    else:
+        pincodes.discard(pincode)
+    cache.set(SNAPSHOT_KEY.format(scope=scope, version=new_version), pincodes, SNAPSHOT_TIMEOUT)
+
+
+def apply_change(scope, pincode, present):
+    """Set `pincode`'s membership of `scope` once the current transaction commits"""
+    def apply():
+        try:
+            _apply(scope, pincode, present() if callable(present) else present)
+        except Exception as e:
+            logger.error(f"Serviceability update of {scope} for {pincode} failed, rebuilding: {e}")
+            invalidate(scope)
+
+    transaction.on_commit(apply)
+
+
+def check_pincode(pincode, vendor_ids=()):
+    """
+    Serviceability of `pincode` globally and for each of `vendor_ids`, from memory.
+    Returns {None: (available, message)} for the global whitelist plus {vendor_id: (available, message)}.
+    """
+    vendor_ids = [vendor_id for vendor_id in dict.fromkeys(vendor_ids) if vendor_id]
+    sets = get_pincode_sets([GLOBAL, *(vendor_scope(vendor_id) for vendor_id in vendor_ids)])
+
+    # An empty whitelist means every pincode is served
+    whitelist = sets[GLOBAL]
+    if whitelist and pincode not in whitelist:
+        result = (False, "Sorry, we do not deliver to this location yet.")
+    else:
+        result = (True, "Delivery available!")
+    results = {None: result}
+    for vendor_id in vendor_ids:
+        allowed = sets[vendor_scope(vendor_id)]
+        if not result[0]:
+            results[vendor_id] = result
+        elif allowed and pincode not in allowed:
+            results[vendor_id] = (False, "Seller does not deliver to this pincode.")
+        else:
+            results[vendor_id] = result
+    return results
+
+
+def is_globally_serviceable(pincode):
+    """True if `pincode` is on the active whitelist (strict: an empty whitelist serves nowhere)"""
+    return pincode in get_pincode_sets([GLOBAL])[GLOBAL]
+
+
+def is_cod_pincode(pincode):
+    return pincode in get_pincode_sets([COD])[COD]
+
+
+def _node(label, name, children):
+    return {
+        label: name,
+        'total': sum(child['total'] for child in children),
+        'active': sum(child['active'] for child in children),
+    }
+
+
+def build_hierarchy():
+    """
+    The whitelist as {'states': [...], 'tree': [...], 'branches': {state: ...}} from one query:
+    'states' holds per-state counts, 'tree' states with their cities (the admin tree view) and
+    'branches' each state down to its areas, for expanding one state at a time.
+    """
+    from django.db.models import Count, Q
+    from .models import ServiceablePincode
+
+    rows = ServiceablePincode.objects.values('state', 'city', 'area').annotate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True))
+    ).order_by('state', 'city', 'area').values_list('state', 'city', 'area', 'total', 'active')
+
+    states, tree, branches = [], [], {}
+    for state, state_rows in groupby(rows.iterator(), key=lambda row: row[0]):
+        cities = []
+        for city, city_rows in groupby(state_rows, key=lambda row: row[1]):
+            areas = [{'area': area, 'total': total, 'active': active} for _, _, area, total, active in city_rows]
+            cities.append(dict(_node('city', city, areas), areas=areas))
+        summary = _node('state', state, cities)
+        states.append(dict(summary, city_count=len(cities)))
+        tree.append(dict(summary, cities=[
+            {'city': city['city'], 'total': city['total'], 'active': city['active']} for city in cities
+        ]))
+        branches[state] = dict(summary, cities=cities)
+    return {'states': states, 'tree': tree, 'branches': branches}
+
+
+def hierarchy_version():
+    """Changes with every whitelist write"""
+    return get_version(f'{VERSION_PREFIX}{GLOBAL}')
+
+
+def get_hierarchy():
+    """(version, hierarchy) of the whitelist, see build_hierarchy()"""
+    version = hierarchy_version()
+    return version, _hierarchy_copy.get(HIERARCHY_KEY.format(version=version), build_hierarchy)
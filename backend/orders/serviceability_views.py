@@ -1,13 +1,20 @@
+import logging
+
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.pagination import PageNumberPagination
 from django.shortcuts import get_object_or_404
+from config.http_clients import get_client
 from .shiprocket_models import ShiprocketPincode
+from .pincode_import import PincodeImportError, import_pincode_master, import_serviceable_pincodes, state_zone
+from .postcode_lookup import lookup_postcode
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import serializers
 
+logger = logging.getLogger(__name__)
+
 
 class ServiceabilityPagination(PageNumberPagination):
     page_size = 50
@@ -38,11 +45,9 @@ class AdminServiceabilityViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def upload_csv(self, request):
         """
-        Upload and import CSV file with BULK support (Fast Import)
+        Stream a pincode CSV (e.g. the post-office dataset) into the pincode master.
+        Existing pincodes get their location updated; serviceable/COD flags are kept.
         """
-        import csv
-        import io
-        
         csv_file = request.FILES.get('file')
         
         if not csv_file:
@@ -52,84 +57,21 @@ class AdminServiceabilityViewSet(viewsets.ModelViewSet):
             return Response({'error': 'File must be CSV format'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            # Read and decode CSV
-            file_data = csv_file.read().decode('utf-8')
-            reader = csv.DictReader(io.StringIO(file_data))
-            
-            # Normalize headers (lowercase, strip)
-            # This is tricky with DictReader as keys are fixed. 
-            # We will just be flexible in our get calls.
-            
-            pincodes_to_create = []
-            existing_pincodes = set(ShiprocketPincode.objects.values_list('pincode', flat=True))
-            
-            total_rows = 0
-            new_records = 0
-            skipped = 0
-            
-            # Batch size for bulk_create
-            BATCH_SIZE = 5000
-            
-            print("Starting CSV processing...")
-            
-            for row in reader:
-                total_rows += 1
-                
-                # Flexible column mapping
-                # Try various common header names
-                pincode = (row.get('pincode') or row.get('Pincode') or row.get('PINCODE') or '').strip()
-                
-                if not pincode or len(pincode) != 6 or not pincode.isdigit():
-                    skipped += 1
-                    continue
-                
-                if pincode in existing_pincodes:
-                    skipped += 1
-                    continue
-                
-                # New Pincode Found!
-                district = (row.get('district') or row.get('District') or row.get('City') or row.get('city') or 'Unknown').strip()
-                state = (row.get('statename') or row.get('StateName') or row.get('State') or row.get('state') or 'Unknown').strip()
-                division = (row.get('divisionname') or row.get('DivisionName') or row.get('Division') or row.get('division') or '').strip()
-                
-                # Determine Zone if possible
-                zone = self._get_zone(state)
-                
-                pincodes_to_create.append(
-                    ShiprocketPincode(
-                        pincode=pincode,
-                        city=district,
-                        state=state,
-                        division_name=division,
-                        zone=zone,
-                        is_serviceable=True,
-                        is_cod_available=True
-                    )
-                )
-                
-                existing_pincodes.add(pincode) # Prevent duplicates within the same file
-                new_records += 1
-                
-                # Process in chunks to save memory
-                if len(pincodes_to_create) >= BATCH_SIZE:
-                    ShiprocketPincode.objects.bulk_create(pincodes_to_create, ignore_conflicts=True)
-                    pincodes_to_create = []
-                    print(f"Processed {total_rows} rows...")
-            
-            # Create remaining
-            if pincodes_to_create:
-                ShiprocketPincode.objects.bulk_create(pincodes_to_create, ignore_conflicts=True)
-            
-            return Response({
-                'message': f'Processed {total_rows} rows. Imported {new_records} new pincodes. Skipped {skipped} duplicates/invalid.',
-                'imported': new_records,
-                'skipped': skipped,
-                'total_in_db': ShiprocketPincode.objects.count()
-            })
-            
+            report = import_pincode_master(csv_file)
+        except PincodeImportError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            print(f"Import Error: {e}")
+            logger.error(f"Pincode master CSV import failed: {e}")
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        return Response({
+            'message': f'Processed {report.total_rows} rows. Imported or updated {report.upserted} pincodes. '
+                       f'Skipped {report.invalid} invalid rows.',
+            'imported': report.upserted,
+            'skipped': report.invalid,
+            **report.as_dict(),
+            'total_in_db': ShiprocketPincode.objects.count()
+        })
     
     @action(detail=False, methods=['post'])
     def paste_csv(self, request):
@@ -229,8 +171,6 @@ class AdminServiceabilityViewSet(viewsets.ModelViewSet):
     
     def _bulk_fetch_from_datagovin(self, limit=1000, existing_pincodes=None):
         """Bulk fetch pincodes from data.gov.in, skipping existing ones"""
-        import requests
-        
         if existing_pincodes is None:
             existing_pincodes = set()
         
@@ -251,7 +191,7 @@ class AdminServiceabilityViewSet(viewsets.ModelViewSet):
                     'limit': batch_size
                 }
                 
-                response = requests.get(url, params=params, timeout=30)
+                response = get_client('datagovin').get(url, params=params, timeout=30)
                 records = response.json().get('records', [])
                 
                 if not records:
@@ -294,8 +234,6 @@ class AdminServiceabilityViewSet(viewsets.ModelViewSet):
     
     def _fetch_from_datagovin(self, query):
         """Helper to fetch specific pincodes from data.gov.in (for refresh)"""
-        import requests
-        
         api_key = '579b464db66ec23bdd000001f17ca38f88df4c4a6449db80d254a78f'
         url = 'https://api.data.gov.in/resource/6176ee09-3d56-4a3b-8115-21841576b2f6'
         
@@ -314,7 +252,7 @@ class AdminServiceabilityViewSet(viewsets.ModelViewSet):
                 'limit': 100
             }
             
-            response = requests.get(url, params=params, timeout=10)
+            response = get_client('datagovin').get(url, params=params, timeout=10)
             records = response.json().get('records', [])
             
             for record in records:
@@ -335,22 +273,7 @@ class AdminServiceabilityViewSet(viewsets.ModelViewSet):
     
     def _get_zone(self, state):
         """Map states to zones (case-insensitive)"""
-        # Normalize state name to Title Case for matching
-        state_normalized = state.strip().title()
-        
-        zones = {
-            'East': ['Andaman And Nicobar Islands', 'Bihar', 'Jharkhand', 'Odisha', 'West Bengal'],
-            'South': ['Andhra Pradesh', 'Karnataka', 'Kerala', 'Tamil Nadu', 'Telangana', 'Puducherry', 'Lakshadweep'],
-            'North': ['Delhi', 'Haryana', 'Himachal Pradesh', 'Jammu And Kashmir', 'Punjab', 'Rajasthan', 'Uttarakhand', 'Chandigarh'],
-            'West': ['Goa', 'Gujarat', 'Maharashtra', 'Dadra And Nagar Haveli', 'Daman And Diu'],
-            'Central': ['Chhattisgarh', 'Madhya Pradesh', 'Uttar Pradesh'],
-            'Northeast': ['Arunachal Pradesh', 'Assam', 'Manipur', 'Meghalaya', 'Mizoram', 'Nagaland', 'Sikkim', 'Tripura']
-        }
-        
-        for zone, states in zones.items():
-            if state_normalized in states:
-                return zone
-        return ''
+        return state_zone(state)
     
     @action(detail=False, methods=['post'])
     def refresh(self, request):
@@ -402,6 +325,7 @@ class PublicServiceabilityCheckView(APIView):
     
     def get(self, request, pincode):
         from .models import ServiceablePincode
+        from .serviceability import is_globally_serviceable
 
         # Check ServiceablePincode (Whitelist)
         queryset = ServiceablePincode.objects.filter(pincode=pincode, is_active=True)
@@ -414,9 +338,9 @@ class PublicServiceabilityCheckView(APIView):
             # Or use icontains if fuzzy? iexact is safer for "Reference Data".
             queryset = queryset.filter(area__iexact=area)
         
-        if queryset.exists():
-            # Get details from the first match
-            obj = queryset.first()
+        # The in-memory whitelist answers misses (and half-typed pincodes) without a query
+        obj = queryset.first() if is_globally_serviceable(pincode) else None
+        if obj:
             return Response({
                 'serviceable': True,
                 'pincode': obj.pincode,
@@ -448,33 +372,22 @@ class PublicPostcodeDetailsView(APIView):
             return Response({'error': 'Invalid Pincode'}, status=status.HTTP_400_BAD_REQUEST)
             
         try:
-            from .shiprocket_service import ShiprocketService
-            service = ShiprocketService()
-            # 1. Check Local DB first (Faster)
-            local = ShiprocketPincode.objects.filter(pincode=pincode).first()
-            if local and local.city and local.state and local.city != 'Unknown':
-                 return Response({
-                    'postcode': local.pincode,
-                    'city': local.city,
-                    'state': local.state,
-                    'country': "India"
-                 })
-                 
-            # 2. Check Shiprocket API
-            details = service.get_postcode_details(pincode)
-            
-            if details:
-                return Response(details)
-            else:
-                return Response({'error': 'Pincode details not found'}, status=status.HTTP_404_NOT_FOUND)
+            # Local LRU, shared cache, pincode master, then the Shiprocket API (see orders.postcode_lookup)
+            details = lookup_postcode(pincode)
         except Exception as e:
-             print(f"Postcode Details Error: {e}")
-             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            logger.error(f"Postcode Details Error: {e}")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            
+        if details:
+            return Response(details)
+        return Response({'error': 'Pincode details not found'}, status=status.HTTP_404_NOT_FOUND)
 
 
 # ========== ServiceablePincode Admin (Whitelist Management) ==========
 
 from .models import ServiceablePincode
+from .serviceability import GLOBAL as GLOBAL_SERVICEABILITY, invalidate as invalidate_serviceability
+from .serviceability import get_hierarchy, hierarchy_version
 
 class ServiceablePincodeSerializer(serializers.ModelSerializer):
     """Serializer for our own Serviceable Pincode whitelist"""
@@ -500,12 +413,9 @@ class ServiceablePincodeAdminViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def upload_csv(self, request):
         """
-        Optimized CSV import using bulk_create for large files (100k+ rows).
+        Streaming CSV import for large files (100k+ rows), upserted in chunks.
         Expected columns: State, City, ZipCode/Pincode, Area (optional)
         """
-        import csv
-        import io
-        
         csv_file = request.FILES.get('file')
         
         if not csv_file:
@@ -515,92 +425,20 @@ class ServiceablePincodeAdminViewSet(viewsets.ModelViewSet):
             return Response({'error': 'File must be CSV format'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            # Read and decode CSV
-            file_data = csv_file.read().decode('utf-8-sig')
-            reader = csv.DictReader(io.StringIO(file_data))
-            
-            headers = reader.fieldnames
-            
-            # Flexible column mapping
-            map_pincode = next((h for h in headers if 'zip' in h.lower() or 'pin' in h.lower()), None)
-            map_city = next((h for h in headers if 'city' in h.lower() or 'district' in h.lower()), None)
-            map_state = next((h for h in headers if 'state' in h.lower()), None)
-            map_area = next((h for h in headers if 'area' in h.lower() or 'locality' in h.lower()), None)
-            
-            if not map_pincode:
-                return Response({'error': 'CSV must contain a ZipCode or Pincode column'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Get existing pincode+area combinations for deduplication
-            existing = set(
-                ServiceablePincode.objects.values_list('pincode', 'area')
-            )
-            
-            records_to_create = []
-            total_rows = 0
-            skipped = 0
-            BATCH_SIZE = 5000
-            total_created = 0
-            
-            for row in reader:
-                total_rows += 1
-                
-                pincode = row.get(map_pincode, '').strip()
-                city = row.get(map_city, '').strip() if map_city else 'Unknown'
-                state = row.get(map_state, '').strip() if map_state else 'Unknown'
-                area = row.get(map_area, '').strip() if map_area else None
-                
-                if not pincode:
-                    skipped += 1
-                    continue
-                
-                # Check for duplicates
-                key = (pincode, area)
-                if key in existing:
-                    skipped += 1
-                    continue
-                
-                existing.add(key)  # Track within this import
-                
-                records_to_create.append(
-                    ServiceablePincode(
-                        pincode=pincode,
-                        city=city or 'Unknown',
-                        state=state or 'Unknown',
-                        area=area,
-                        is_active=True
-                    )
-                )
-                
-                # Bulk insert in batches
-                if len(records_to_create) >= BATCH_SIZE:
-                    ServiceablePincode.objects.bulk_create(
-                        records_to_create, 
-                        ignore_conflicts=True
-                    )
-                    total_created += len(records_to_create)
-                    records_to_create = []
-            
-            # Insert remaining records
-            if records_to_create:
-                ServiceablePincode.objects.bulk_create(
-                    records_to_create, 
-                    ignore_conflicts=True
-                )
-                total_created += len(records_to_create)
-            
-            return Response({
-                'message': f'Imported {total_created:,} locations. Skipped {skipped:,} duplicates/invalid.',
-                'created': total_created,
-                'skipped': skipped,
-                'total_rows': total_rows,
-                'total_in_db': ServiceablePincode.objects.count()
-            })
-            
+            report = import_serviceable_pincodes(csv_file)
+        except PincodeImportError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            import traceback
-            print(f"CSV Import Error: {e}")
-            traceback.print_exc()
+            logger.error(f"Serviceable pincode CSV import failed: {e}")
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        return Response({
+            'message': f'Imported or updated {report.upserted:,} locations. Skipped {report.invalid:,} invalid rows.',
+            'created': report.upserted,
+            'skipped': report.invalid,
+            **report.as_dict(),
+            'total_in_db': ServiceablePincode.objects.count()
+        })
     
     @action(detail=False, methods=['post'])
     def bulk_toggle(self, request):
@@ -615,6 +453,7 @@ class ServiceablePincodeAdminViewSet(viewsets.ModelViewSet):
             return Response({'error': 'ids and is_active are required'}, status=status.HTTP_400_BAD_REQUEST)
         
         count = ServiceablePincode.objects.filter(id__in=ids).update(is_active=is_active)
+        invalidate_serviceability(GLOBAL_SERVICEABILITY)
         
         action_text = "enabled" if is_active else "disabled"
         return Response({'message': f'{action_text.capitalize()} {count} locations'})
@@ -664,33 +503,28 @@ class ServiceablePincodeAdminViewSet(viewsets.ModelViewSet):
     def hierarchy(self, request):
         """
         Get hierarchical view: States -> Cities with counts and active status.
+        ?depth=states returns only per-state counts; ?state=<name> returns that state's
+        cities down to their areas. Served from cache with an ETag.
         """
-        from django.db.models import Count, Q
-        
-        # Get states with aggregated data
-        states = ServiceablePincode.objects.values('state').annotate(
-            total=Count('id'),
-            active=Count('id', filter=Q(is_active=True))
-        ).order_by('state')
-        
-        result = []
-        for state_data in states:
-            state_name = state_data['state']
-            
-            # Get cities for this state
-            cities = ServiceablePincode.objects.filter(state=state_name).values('city').annotate(
-                total=Count('id'),
-                active=Count('id', filter=Q(is_active=True))
-            ).order_by('city')
-            
-            result.append({
-                'state': state_name,
-                'total': state_data['total'],
-                'active': state_data['active'],
-                'cities': list(cities)
-            })
-        
-        return Response(result)
+        etag = f'"hierarchy-{hierarchy_version()}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            version, hierarchy = get_hierarchy()
+            etag = f'"hierarchy-{version}"'
+            state = request.query_params.get('state')
+            if state:
+                branch = hierarchy['branches'].get(state)
+                if branch is None:
+                    return Response({'error': f'No serviceable locations in {state}'}, status=status.HTTP_404_NOT_FOUND)
+                response = Response(branch)
+            elif request.query_params.get('depth') == 'states':
+                response = Response(hierarchy['states'])
+            else:
+                response = Response(hierarchy['tree'])
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
     
     @action(detail=False, methods=['post'])
     def toggle_state(self, request):
@@ -705,6 +539,7 @@ class ServiceablePincodeAdminViewSet(viewsets.ModelViewSet):
             return Response({'error': 'state and is_active are required'}, status=status.HTTP_400_BAD_REQUEST)
         
         count = ServiceablePincode.objects.filter(state=state).update(is_active=is_active)
+        invalidate_serviceability(GLOBAL_SERVICEABILITY)
         
         action_text = "enabled" if is_active else "disabled"
         return Response({'message': f'{action_text.capitalize()} {count:,} pincodes in {state}'})
@@ -723,6 +558,7 @@ class ServiceablePincodeAdminViewSet(viewsets.ModelViewSet):
             return Response({'error': 'state, city, and is_active are required'}, status=status.HTTP_400_BAD_REQUEST)
         
         count = ServiceablePincode.objects.filter(state=state, city=city).update(is_active=is_active)
+        invalidate_serviceability(GLOBAL_SERVICEABILITY)
         
         action_text = "enabled" if is_active else "disabled"
         return Response({'message': f'{action_text.capitalize()} {count:,} pincodes in {city}, {state}'})
@@ -1,63 +1,134 @@
+from django.core.cache import cache
 from django.utils import timezone
 from homepage.models import DealOfTheDay
 from products.models import Product
 
+
 class PriceCalculatorService:
+    # Where the effective price came from
+    SOURCE_DEAL = 'deal'
+    SOURCE_SALE = 'sale'
+    SOURCE_REGULAR = 'regular'
+
+    DEALS_SNAPSHOT_KEY = 'pricing:active_deals:{date}:{version}'
+    DEALS_SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+    @staticmethod
+    def get_active_deals():
+        """
+        Snapshot of today's active deals: {product_id: {'id', 'discount_percentage', 'end_date'}}.
+        Built with one query per day and pricing-rules version (deal writes bump the version),
+        keeping only the highest priority deal per product.
+        """
+        from payments.quote_cache import get_rules_version
+
+        today = timezone.now().date()
+        key = PriceCalculatorService.DEALS_SNAPSHOT_KEY.format(date=today.isoformat(), version=get_rules_version())
+        snapshot = cache.get(key)
+        if snapshot is None:
+            snapshot = {}
+            deals = DealOfTheDay.objects.filter(
+                is_active=True,
+                start_date__lte=today,
+                end_date__gte=today
+            ).order_by('-priority', '-created_at').values('id', 'product_id', 'discount_percentage', 'end_date')
+            for deal in deals:
+                snapshot.setdefault(deal['product_id'], {
+                    'id': deal['id'],
+                    'discount_percentage': deal['discount_percentage'],
+                    'end_date': deal['end_date'],
+                })
+            cache.set(key, snapshot, timeout=PriceCalculatorService.DEALS_SNAPSHOT_TIMEOUT)
+        return snapshot
+
+    @staticmethod
+    def get_base_price(product, now=None):
+        """Regular or sale price, honouring the sale window. Returns (price, source)."""
+        if product.sale_price is not None and product.sale_price < product.regular_price:
+            now = now or timezone.now()
+            starts, ends = product.sale_price_start, product.sale_price_end
+            if (starts is None or starts <= now) and (ends is None or now <= ends):
+                return product.sale_price, PriceCalculatorService.SOURCE_SALE
+            return product.regular_price, PriceCalculatorService.SOURCE_REGULAR
+        return product.price, PriceCalculatorService.SOURCE_REGULAR
+
+    @staticmethod
+    def resolve_prices(products):
+        """
+        Calculates effective prices for many products at once.
+        Returns {product_id: price breakdown} using the cached deals snapshot,
+        so pricing a whole cart costs no per-product queries.
+        """
+        deals = PriceCalculatorService.get_active_deals()
+        now = timezone.now()
+        prices = {}
+
+        for product in products:
+            if product.id in prices:
+                continue
+            original_price, source = PriceCalculatorService.get_base_price(product, now)
+            deal = deals.get(product.id)
+
+            if deal:
+                discount_amount = (original_price * deal['discount_percentage']) / 100
+                prices[product.id] = {
+                    'price': original_price - discount_amount,
+                    'original_price': original_price,
+                    'discount_amount': discount_amount,
+                    'is_deal': True,
+                    'deal_id': deal['id'],
+                    'source': PriceCalculatorService.SOURCE_DEAL,
+                }
+            else:
+                prices[product.id] = {
+                    'price': original_price,
+                    'original_price': original_price,
+                    'discount_amount': 0,
+                    'is_deal': False,
+                    'deal_id': None,
+                    'source': source,
+                }
+        return prices
+
     @staticmethod
     def calculate_price(product):
         """
         Calculates the effective price for a product, checking for active deals.
         Returns detailed price breakdown.
         """
-        today = timezone.now().date()
-        deal = product.daily_deals.filter(
-            is_active=True, 
-            start_date__lte=today, 
-            end_date__gte=today
-        ).first()
-
-        original_price = product.price
-        
-        if deal:
-            discount_amount = (original_price * deal.discount_percentage) / 100
-            final_price = original_price - discount_amount
-            return {
-                'price': final_price,
-                'original_price': original_price,
-                'discount_amount': discount_amount,
-                'is_deal': True,
-                'deal_id': deal.id
-            }
-        
-        return {
-            'price': original_price,
-            'original_price': original_price,
-            'discount_amount': 0,
-            'is_deal': False,
-            'deal_id': None
-        }
+        return PriceCalculatorService.resolve_prices([product])[product.id]
 
     @staticmethod
     def calculate_cart_total(cart):
         """
         Calculates total for a cart instance.
         """
+        return PriceCalculatorService.calculate_items_total(cart.items.select_related('product'))
+
+    @staticmethod
+    def calculate_items_total(items):
+        """
+        Calculates totals for cart items (saved CartItems or unsaved guest cart items).
+        """
         total = 0
         discount_total = 0
         subtotal = 0
-        
-        for item in cart.items.all():
-            price_info = PriceCalculatorService.calculate_price(item.product)
+
+        items = list(items)
+        prices = PriceCalculatorService.resolve_prices(item.product for item in items)
+
+        for item in items:
+            price_info = prices[item.product_id]
             quantity = item.quantity
-            
+
             line_total = price_info['price'] * quantity
             line_discount = price_info['discount_amount'] * quantity
             line_subtotal = price_info['original_price'] * quantity
-            
+
             total += line_total
             discount_total += line_discount
             subtotal += line_subtotal
-            
+
         return {
             'total_amount': total,
             'discount_amount': discount_total,
@@ -121,3 +121,35 @@ class ShiprocketPincode(models.Model):
 
     def __str__(self):
         return f"{self.pincode} - {self.city}, {self.state}"
+
+
+class PincodeSyncCheckpoint(models.Model):
+    """Progress of the current data.gov.in pincode sync pass (see orders.pincode_sync)"""
+    resource = models.CharField(max_length=255, unique=True)
+    page_size = models.PositiveIntegerField()
+    # Every page below this offset has been synced in the current pass
+    next_offset = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    started_at = models.DateTimeField()
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.resource} @ {self.next_offset}"
+
+
+class PincodeSyncPage(models.Model):
+    """ETag and content hash of one synced page, so unchanged pages are not written again"""
+    resource = models.CharField(max_length=255)
+    offset = models.PositiveIntegerField()
+    etag = models.CharField(max_length=255, blank=True)
+    content_hash = models.CharField(max_length=64)
+    record_count = models.PositiveIntegerField(default=0)
+    synced_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['resource', 'offset'], name='unique_pincode_sync_page'),
+        ]
+
+    def __str__(self):
+        return f"{self.resource} @ {self.offset}"
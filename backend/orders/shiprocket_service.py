@@ -1,12 +1,15 @@
-import requests
 import json
 import re
 from django.utils import timezone
 from django.conf import settings
+from config.http_clients import get_client
 from .shiprocket_models import ShiprocketConfig, ShipmentTracking, OrderTrackingStatus
 from .models import Order, OrderItem
 from vendors.models import VendorProfile
 
+# Pooled session with per-endpoint timeouts (config.http_clients)
+http = get_client('shiprocket')
+
 class ShiprocketService:
     BASE_URL = "https://apiv2.shiprocket.in/v1/external"
     
@@ -53,7 +56,7 @@ class ShiprocketService:
         }
         
         try:
-            response = requests.post(url, json=payload)
+            response = http.post(url, json=payload)
             response.raise_for_status()
             data = response.json()
             
@@ -128,7 +131,7 @@ class ShiprocketService:
         url = f"{self.BASE_URL}/settings/company/addpickup"
         
         try:
-            response = requests.post(url, json=payload, headers=self.get_headers())
+            response = http.post(url, json=payload, headers=self.get_headers())
             
             # Shiprocket returns 200 even if address already exists (sometimes logic varies)
             # If 422, it might mean "Location already exists" or validation error.
@@ -166,30 +169,36 @@ class ShiprocketService:
             print(f"Shiprocket Pickup Sync Failed: {e}")
             raise
 
-    def create_orders(self, order: Order):
+    def create_orders(self, order: Order, vendor=None):
         """
-        Split Order by Vendor and create Shiprocket Orders.
+        Create one Shiprocket Order per vendor sub-order (VendorOrder).
+        `vendor` (a vendor user) limits creation to that vendor's sub-order.
         Returns list of created ShipmentTracking objects.
         """
-        order_items = order.items.select_related('product', 'vendor').all()
+        from .models import VendorOrder
+        
+        from .packing import active_boxes, open_lines, pack_lines, shipment_dimensions
         
-        # Group items by Vendor
-        files_by_vendor = {}
-        for item in order_items:
-            vendor_id = item.vendor.id
-            if vendor_id not in files_by_vendor:
-                files_by_vendor[vendor_id] = []
-            files_by_vendor[vendor_id].append(item)
+        vendor_orders = VendorOrder.create_for_order(order).prefetch_related('items__product')
+        if vendor is not None:
+            vendor_orders = vendor_orders.filter(vendor__user=vendor)
             
         created_shipments = []
+        boxes = active_boxes()
         
-        for vendor_id, items in files_by_vendor.items():
-            vendor = items[0].vendor
-            pickup_location = vendor.shiprocket_pickup_location_name
+        for vendor_order in vendor_orders:
+            vendor_id = vendor_order.vendor_id
+            vendor_profile = vendor_order.vendor
+            items = list(vendor_order.items.all())
+            lines = open_lines(items)
+            if not lines:
+                # Every unit of this sub-order was cancelled - nothing to ship
+                continue
+            pickup_location = vendor_profile.shiprocket_pickup_location_name
             
             # Always try to sync/re-sync pickup location to ensure it exists in Shiprocket
             try:
-                synced_location = self.sync_vendor_pickup_location(vendor)
+                synced_location = self.sync_vendor_pickup_location(vendor_profile)
             except Exception as e:
                 print(f"Warning: Failed to sync pickup location for vendor {vendor_id}: {e}")
             # Check if order already exists for this vendor
@@ -202,8 +211,12 @@ class ShiprocketService:
                 print(f"Shiprocket order {shiprocket_order_id} already exists, skipping creation.")
                 continue
                 
-            # Calculate totals for this vendor's items
-            subtotal = sum(item.price * item.quantity for item in items)
+            # Totals for this vendor's items
+            subtotal = vendor_order.subtotal
+            # Declared parcel from packing the items into catalog boxes (chargeable weight in kg)
+            length, breadth, height, weight = shipment_dimensions(
+                pack_lines(lines, boxes)
+            )
             
             # Logic for shipping charges and taxes would ideally be split too
             # For now, we'll allocate shipping logic roughly or keep 0 if free shipping
@@ -226,25 +239,25 @@ class ShiprocketService:
                 "shipping_is_billing": True,
                 "order_items": [
                     {
-                        "name": item.product.name,
-                        "sku": item.product.sku or str(item.product.id),
+                        "name": item.product_name,
+                        "sku": item.product_sku or str(item.product_id),
                         "units": item.quantity,
                         "selling_price": float(item.price),
                         "discount": 0,
                         "tax": 0,
-                        "hsn": "" # Changed from 0 to "" to match original code's empty string
+                        "hsn": item.hsn_code
                     } for item in items
                 ],
                 "payment_method": "COD" if order.payment_method == 'cod' else "Prepaid",
                 "sub_total":float(subtotal),
-                "length": 10,  # Default dimensions
-                "breadth": 10,
-                "height": 10,
-                "weight": 0.5
+                "length": length,
+                "breadth": breadth,
+                "height": height,
+                "weight": weight
             }
             
             try:
-                response = requests.post(
+                response = http.post(
                     f"{self.BASE_URL}/orders/create/adhoc", # Changed from self.base_url to self.BASE_URL
                     headers=self.get_headers(), # Changed from explicit headers to get_headers()
                     json=payload
@@ -256,7 +269,7 @@ class ShiprocketService:
                     # Save tracking info
                     shipment = ShipmentTracking.objects.create(
                         order=order,
-                        vendor_id=vendor_id,  # Associate with vendor
+                        vendor_id=vendor_profile.user_id,  # Associate with vendor user
                         shiprocket_order_id=data.get('order_id'),
                         shiprocket_shipment_id=data.get('shipment_id'),
                         courier_name="Pending Assignment", # Added to match original code's default
@@ -264,7 +277,7 @@ class ShiprocketService:
                         current_status='CREATED'
                     )
                     created_shipments.append(shipment)
-                    print(f"Created Shiprocket Order {data.get('order_id')} for Vendor {items[0].vendor.store_name}") # Added print statement
+                    print(f"Created Shiprocket Order {data.get('order_id')} for Vendor {vendor_profile.store_name}") # Added print statement
                 else:
                     error_msg = f"Shiprocket Error: {response.status_code} - {data}"
             except Exception as e:
@@ -289,7 +302,7 @@ class ShiprocketService:
             payload["courier_id"] = courier_id
         
         try:
-            response = requests.post(url, json=payload, headers=self.get_headers())
+            response = http.post(url, json=payload, headers=self.get_headers())
             response.raise_for_status()
             data = response.json()
             
@@ -301,6 +314,11 @@ class ShiprocketService:
                 shipment.courier_id = awb_data.get('data', {}).get('courier_company_id') or courier_id
                 shipment.save()
                 
+                from .models import VendorOrder
+                VendorOrder.objects.filter(order_id=shipment.order_id, vendor__user_id=shipment.vendor_id).update(
+                    awb_code=shipment.awb_code, courier_name=shipment.courier_name
+                )
+                
                 print(f"AWB Generated: {shipment.awb_code} for {shipment.courier_name}")
                 return shipment
             else:
@@ -322,7 +340,7 @@ class ShiprocketService:
         }
         
         try:
-            response = requests.post(url, json=payload, headers=self.get_headers())
+            response = http.post(url, json=payload, headers=self.get_headers())
             response.raise_for_status()
             data = response.json()
             
@@ -353,7 +371,7 @@ class ShiprocketService:
         }
         
         try:
-            response = requests.post(url, json=payload, headers=self.get_headers())
+            response = http.post(url, json=payload, headers=self.get_headers())
             response.raise_for_status()
             data = response.json()
             
@@ -383,7 +401,7 @@ class ShiprocketService:
         url = f"{self.BASE_URL}/courier/track/shipment/{shipment_id}"
         
         try:
-            response = requests.get(url, headers=self.get_headers())
+            response = http.get(url, headers=self.get_headers())
             response.raise_for_status()
             data = response.json()
             
@@ -437,7 +455,7 @@ class ShiprocketService:
         }
         
         try:
-            response = requests.post(url, json=payload, headers=self.get_headers())
+            response = http.post(url, json=payload, headers=self.get_headers())
             response.raise_for_status()
             data = response.json()
             
@@ -471,7 +489,7 @@ class ShiprocketService:
         }
         
         try:
-            response = requests.get(url, params=params, headers=self.get_headers())
+            response = http.get(url, params=params, headers=self.get_headers())
             # Don't raise for status immediately, SR returns 404/422 for non-serviceable sometimes
             
             data = response.json()
@@ -499,7 +517,7 @@ class ShiprocketService:
             # The URL provided by user: https://apiv2.shiprocket.in/v1/external/open/postcode/details
             # It seems it might be a public open endpoint.
             
-            response = requests.get(url, params=params)
+            response = http.get(url, params=params)
             # If it requires auth, we can use self.get_headers(). 
             # User said "open", let's try without auth first as verified by curl.
             
@@ -1,8 +1,11 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete
+from django.db.models import F
 import datetime
 from django.dispatch import receiver
-from .models import Order
-from .shiprocket_models import OrderTrackingStatus
+from .models import Order, Cart, CartItem, CODPincode, ServiceablePincode, VendorOrder
+from .shiprocket_models import OrderTrackingStatus, ShipmentTracking
+from .search import schedule_reindex
+from . import serviceability
 from notifications.tasks import send_sms_task, send_whatsapp_task, send_notification_email
 from notifications.email_templates import get_email_template
 from notifications.resend_service import send_email_via_resend
@@ -10,6 +13,23 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+
+@receiver(post_save, sender=CartItem)
+@receiver(post_delete, sender=CartItem)
+def bump_cart_version(sender, instance, **kwargs):
+    """Bump the cart version on any item write so cached quotes for the old contents are never reused"""
+    Cart.objects.filter(pk=instance.cart_id).update(version=F('version') + 1)
+
+@receiver(post_save, sender=Order)
+def reindex_order_for_search(sender, instance, **kwargs):
+    schedule_reindex(instance.pk)
+
+@receiver(post_save, sender=ShipmentTracking)
+@receiver(post_save, sender=VendorOrder)
+def reindex_parent_order_for_search(sender, instance, **kwargs):
+    """AWB and Shiprocket ids are searchable, so shipment / sub-order writes reindex their order"""
+    schedule_reindex(instance.order_id)
+
 @receiver(post_save, sender=Order)
 def notify_order_placed(sender, instance, created, **kwargs):
     """Notify user when order is placed"""
@@ -65,20 +85,15 @@ def notify_order_placed(sender, instance, created, **kwargs):
                     except Exception:
                         pass
 
-                # 3. Notify Vendors
-                from collections import defaultdict
-                vendor_items = defaultdict(list)
-
-                for item in instance.items.all():
-                    if item.product.vendor:
-                        vendor_items[item.product.vendor].append(item)
-
-                for vendor_profile, items in vendor_items.items():
+                # 3. Notify Vendors (one email per vendor sub-order)
+                vendor_orders = instance.vendor_orders.select_related('vendor__user').prefetch_related('items')
+                for vendor_order in vendor_orders:
+                    vendor_profile, items = vendor_order.vendor, vendor_order.items.all()
                     if not vendor_profile.user.email:
                         continue
 
                     items_html = "".join(
-                        f"<li>{item.product.name} (SKU: {item.product.sku or 'N/A'}) x {item.quantity}</li>"
+                        f"<li>{item.product_name} (SKU: {item.product_sku or 'N/A'}) x {item.quantity}</li>"
                         for item in items
                     )
 
@@ -128,6 +143,20 @@ def notify_order_placed(sender, instance, created, **kwargs):
 
         transaction.on_commit(start_notification_thread)
 
+@receiver(post_save, sender=Order)
+def sync_vendor_order_status(sender, instance, created, **kwargs):
+    """Mirror order-level status changes onto the vendor sub-orders"""
+    if created:
+        return
+    from django.utils import timezone
+    now = timezone.now()
+    updates = {'status': instance.status, 'updated_at': now}
+    if instance.status == 'SHIPPED':
+        updates['shipped_at'] = instance.shipped_at or now
+    elif instance.status == 'DELIVERED':
+        updates['delivered_at'] = instance.delivered_at or now
+    VendorOrder.objects.filter(order_id=instance.pk).exclude(status=instance.status).update(**updates)
+
 @receiver(post_save, sender=Order)
 def notify_order_cancelled(sender, instance, **kwargs):
     """No-op: customer cancellation email is handled in notify_order_status_change_pre (pre_save)"""
@@ -166,7 +195,7 @@ def notify_order_status_change_pre(sender, instance, **kwargs):
                         logger.error(f"Failed to send customer cancellation email for #{instance.id}: {e}")
 
                 # 2. Notify Vendors
-                vendor_ids = instance.items.values_list('product__vendor', flat=True).distinct()
+                vendor_ids = instance.vendor_orders.values_list('vendor_id', flat=True)
                 from vendors.models import VendorProfile
                 vendors = VendorProfile.objects.filter(id__in=vendor_ids)
 
@@ -231,7 +260,7 @@ def notify_order_status_update(sender, instance, created, **kwargs):
 
             # 3. Vendor RTO Notification
             if 'RTO' in status and 'DELIVERED' in status:
-                 vendor_ids = order.items.values_list('product__vendor', flat=True).distinct()
+                 vendor_ids = order.vendor_orders.values_list('vendor_id', flat=True)
                  from vendors.models import VendorProfile
                  vendors = VendorProfile.objects.filter(id__in=vendor_ids)
                  
@@ -301,3 +330,36 @@ def notify_refund_processed(sender, instance, **kwargs):
                     
         except Order.DoesNotExist:
             pass
+
+
+@receiver(pre_save, sender=ServiceablePincode)
+@receiver(pre_save, sender=CODPincode)
+def remember_serviceable_pincode(sender, instance, **kwargs):
+    instance._previous_pincode = (
+        sender.objects.filter(pk=instance.pk).values_list('pincode', flat=True).first() if instance.pk else None
+    )
+
+
+def _whitelisted(pincode):
+    # Several areas can share a pincode; it stays serviceable while any of them is active
+    return lambda: ServiceablePincode.objects.filter(pincode=pincode, is_active=True).exists()
+
+
+@receiver(post_save, sender=ServiceablePincode)
+@receiver(post_delete, sender=ServiceablePincode)
+def update_serviceable_pincodes(sender, instance, **kwargs):
+    """Apply the change to the in-memory global whitelist"""
+    previous = getattr(instance, '_previous_pincode', None)
+    if previous and previous != instance.pincode:
+        serviceability.apply_change(serviceability.GLOBAL, previous, _whitelisted(previous))
+    serviceability.apply_change(serviceability.GLOBAL, instance.pincode, _whitelisted(instance.pincode))
+
+
+@receiver(post_save, sender=CODPincode)
+@receiver(post_delete, sender=CODPincode)
+def update_cod_pincodes(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_pincode', None)
+    if previous and previous != instance.pincode:
+        serviceability.apply_change(serviceability.COD, previous, False)
+    deleted = kwargs.get('signal') is post_delete
+    serviceability.apply_change(serviceability.COD, instance.pincode, instance.is_active and not deleted)
@@ -18,3 +18,31 @@ def send_abandoned_cart_task():
     except Exception as e:
         logger.error(f"Failed to run abandoned cart task: {e}")
         return f"Failed: {e}"
+
+
+@shared_task
+def archive_orders_task():
+    """Nightly archival of closed orders and expired analytics events"""
+    from analytics.archive import archive_events
+    from .archive import archive_orders
+
+    orders = archive_orders()
+    events = archive_events()
+    return f"Archived {orders} orders, {events} analytics events"
+
+
+@shared_task
+def warm_postcodes_task():
+    """Refresh the most looked-up pincodes in the postcode cache"""
+    from .postcode_lookup import warm_postcodes
+
+    return f"Warmed {warm_postcodes()} postcodes"
+
+
+@shared_task
+def send_bulk_status_notifications_task(order_ids, target_status):
+    """Notifications for a bulk admin status transition, one task per batch"""
+    from .bulk_status import send_status_notifications
+
+    sent = send_status_notifications(order_ids, target_status)
+    return f"Sent {sent} {target_status} notifications for {len(order_ids)} orders"
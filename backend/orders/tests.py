@@ -1,3 +1,778 @@
+import hashlib
+import io
+import json
+import threading
+import time
+from datetime import timedelta
+from unittest.mock import patch
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from homepage.models import DealOfTheDay
+from orders.models import Order, OrderItem, OrderTrackingStatus, ServiceablePincode, VendorOrder
+from orders.package_models import OrderPackage, PackageItem
+from orders.pincode_import import import_pincode_master, import_serviceable_pincodes
+from orders import postcode_lookup
+from orders.pincode_sync import PincodeSync, PincodeSyncError
+from config.http_clients import IntegrationClient
+from orders.serviceability import PincodeSet, check_pincode
+from orders.services import PriceCalculatorService
+from orders.shiprocket_models import PincodeSyncCheckpoint, ShiprocketPincode
+from products.models import Product
+from users.models import User
+from vendors.models import VendorProfile
+
+
+class PriceCalculatorServiceTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        vendor = VendorProfile.objects.create(
+            user=User.objects.create_user(username='vendor', email='vendor@example.com', password='password'),
+            store_name='Vendor Store'
+        )
+        now = timezone.now()
+        self.regular = Product.objects.create(
+            name='Regular', vendor=vendor, regular_price=100, description='Desc', slug='regular'
+        )
+        self.on_sale = Product.objects.create(
+            name='On Sale', vendor=vendor, regular_price=100, sale_price=80, description='Desc', slug='on-sale',
+            sale_price_start=now - timedelta(days=1), sale_price_end=now + timedelta(days=1)
+        )
+        self.sale_ended = Product.objects.create(
+            name='Sale Ended', vendor=vendor, regular_price=100, sale_price=80, description='Desc', slug='sale-ended',
+            sale_price_end=now - timedelta(days=1)
+        )
+        self.deal = Product.objects.create(
+            name='Deal', vendor=vendor, regular_price=200, description='Desc', slug='deal'
+        )
+        today = now.date()
+        DealOfTheDay.objects.create(product=self.deal, discount_percentage=25, start_date=today, end_date=today)
+
+    def test_resolve_prices_sources(self):
+        prices = PriceCalculatorService.resolve_prices([self.regular, self.on_sale, self.sale_ended, self.deal])
+        self.assertEqual(prices[self.regular.id]['source'], 'regular')
+        self.assertEqual(prices[self.on_sale.id]['source'], 'sale')
+        self.assertEqual(prices[self.on_sale.id]['price'], 80)
+        self.assertEqual(prices[self.sale_ended.id]['source'], 'regular')
+        self.assertEqual(prices[self.sale_ended.id]['price'], 100)
+        self.assertEqual(prices[self.deal.id]['source'], 'deal')
+        self.assertEqual(prices[self.deal.id]['price'], 150)
+
+    def test_product_page_deal_price_matches_cart(self):
+        from products.serializers import ProductSerializer
+
+        # Stored price is the ended sale price; the cart charges the deal on the regular price
+        DealOfTheDay.objects.create(product=self.sale_ended, discount_percentage=10,
+                                    start_date=timezone.localdate(), end_date=timezone.localdate())
+        deal = ProductSerializer(self.sale_ended).data['active_deal']
+        price = PriceCalculatorService.resolve_prices([self.sale_ended])[self.sale_ended.id]
+        self.assertEqual((deal['discounted_price'], price['price']), (90, 90))
+
+    def test_snapshot_is_reused_across_calls(self):
+        products = [self.regular, self.on_sale, self.sale_ended, self.deal]
+        PriceCalculatorService.resolve_prices(products)
+        with self.assertNumQueries(0):
+            PriceCalculatorService.resolve_prices(products)
+
+
+class AdminOrderListTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', email='admin@example.com', password='password', is_staff=True)
+        vendor = VendorProfile.objects.create(
+            user=User.objects.create_user(username='vendor', email='vendor@example.com', password='password'),
+            store_name='Vendor Store'
+        )
+        other_vendor = VendorProfile.objects.create(
+            user=User.objects.create_user(username='other', email='other@example.com', password='password'),
+            store_name='Other Store'
+        )
+        product = Product.objects.create(name='Item', vendor=vendor, regular_price=100, description='Desc', slug='item')
+        other_product = Product.objects.create(name='Other', vendor=other_vendor, regular_price=100, description='Desc', slug='other')
+        self.vendor = vendor
+        for index in range(3):
+            order = Order.objects.create(
+                user=self.admin, total_amount=200, shipping_address='Addr',
+                status='PENDING' if index else 'DELIVERED', payment_status='paid'
+            )
+            OrderItem.objects.create(order=order, product=product, vendor=vendor, quantity=1, price=100)
+            OrderItem.objects.create(order=order, product=other_product, vendor=other_vendor, quantity=1, price=100)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_summary_rows_and_filters(self):
+        from orders.shiprocket_models import ShipmentTracking
+
+        order = Order.objects.filter(status='PENDING').latest('created_at')
+        ShipmentTracking.objects.create(order=order, shiprocket_order_id='SR-1')
+        ShipmentTracking.objects.create(order=order, shiprocket_order_id='SR-2')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/orders/admin/orders/', {'status': 'PENDING', 'vendor': self.vendor.id})
+        self.assertEqual(response.data['count'], 2)
+        row = response.data['results'][0]
+        self.assertEqual((row['id'], row['item_count'], row['shipment_count']), (order.id, 2, 2))
+        self.assertEqual(response.data['results'][1]['shipment_count'], 0)
+        self.assertNotIn('items', row)
+        # Counts are correlated subqueries: neither the page nor the pagination count groups the orders
+        self.assertFalse(any('GROUP BY "orders_order"' in query['sql'] for query in queries.captured_queries))
+
+        today = timezone.localdate().isoformat()
+        response = self.client.get('/api/orders/admin/orders/', {'date_from': today, 'date_to': today})
+        self.assertEqual(response.data['count'], 3)
+
+    def test_malformed_filters_are_rejected(self):
+        for params in ({'date_from': '2024-02-30'}, {'date_to': 'yesterday'}, {'vendor': 'abc'},
+                       {'awaiting_shipment': 'all'}):
+            response = self.client.get('/api/orders/admin/orders/', params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.data)
+
+    def test_awaiting_shipment_filters_candidates(self):
+        from orders.shiprocket_models import ShipmentTracking
+
+        shipped, prepaid = Order.objects.filter(status='PENDING').order_by('id')
+        ShipmentTracking.objects.create(order=shipped, shiprocket_order_id='SR-1')
+        cod = Order.objects.create(
+            user=self.admin, total_amount=200, shipping_address='Addr', status='PROCESSING',
+            payment_method='cod', payment_status='pending'
+        )
+        for awaiting, expected in (('prepaid', [prepaid.id]), ('cod', [cod.id])):
+            response = self.client.get('/api/orders/admin/orders/', {'awaiting_shipment': awaiting})
+            self.assertEqual([row['id'] for row in response.data['results']], expected, awaiting)
+
+    def test_query_count_does_not_grow_with_orders(self):
+        # count + page, regardless of how many orders and items exist
+        with self.assertNumQueries(2):
+            self.client.get('/api/orders/admin/orders/')
+
+    def test_bulk_status_transition(self):
+        pending = list(Order.objects.filter(status='PENDING').values_list('id', flat=True))
+        delivered = Order.objects.get(status='DELIVERED').id
+        response = self.client.post('/api/orders/admin/orders/bulk-status/', {
+            'order_ids': pending + [delivered, 999999], 'status': 'PROCESSING'
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.data['updated']), sorted(pending))
+        self.assertEqual({f['order_id'] for f in response.data['failed']}, {delivered, 999999})
+        self.assertEqual(Order.objects.filter(status='PROCESSING').count(), 2)
+        self.assertEqual(OrderTrackingStatus.objects.filter(order_id__in=pending, status_code='PROCESSING').count(), 2)
+        self.assertEqual(Order.objects.get(id=delivered).status, 'DELIVERED')
+
+    def test_search_by_phone_email_and_awb(self):
+        from orders.search import index_orders
+        from orders.shiprocket_models import ShipmentTracking
+
+        order = Order.objects.filter(status='PENDING').first()
+        order.shipping_address_data = {'full_name': 'Asha Verma', 'phone': '+91 98765-43210'}
+        order.guest_email = 'asha.verma@example.com'
+        order.save()
+        ShipmentTracking.objects.create(order=order, shiprocket_order_id='SR-1', awb_code='AWB7788990')
+        index_orders(Order.objects.values_list('id', flat=True))
+
+        for q in ('98765 43210', '6543', 'ASHA.VERMA@', '7788990', 'asha verma', f'ORD-{order.id:06d}'):
+            response = self.client.get('/api/orders/admin/orders/', {'q': q})
+            self.assertEqual([row['id'] for row in response.data['results']], [order.id], q)
+        response = self.client.get('/api/orders/admin/orders/', {'q': 'nobody@example.com'})
+        self.assertEqual(response.data['count'], 0)
+
+        # A broad term is matched within the filtered orders, with an exact count
+        for params, count in (({'q': 'admin@example'}, 3), ({'q': 'admin@example', 'status': 'DELIVERED'}, 1),
+                              ({'q': 'ad', 'status': 'PENDING'}, 2)):
+            self.assertEqual(self.client.get('/api/orders/admin/orders/', params).data['count'], count, params)
+
+
+class OrderItemSnapshotTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', email='buyer@example.com', password='password')
+        vendor = VendorProfile.objects.create(
+            user=User.objects.create_user(username='vendor', email='vendor@example.com', password='password'),
+            store_name='Vendor Store'
+        )
+        self.product = Product.objects.create(
+            name='Brass Diya', sku='DIYA-1', hsn_code='7418', vendor=vendor, regular_price=100,
+            description='Desc', slug='brass-diya'
+        )
+        order = Order.objects.create(user=self.user, total_amount=100, shipping_address='Addr')
+        OrderItem.objects.create(order=order, product=self.product, vendor=vendor, quantity=1, price=100)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_order_history_renders_from_snapshot(self):
+        Product.objects.filter(pk=self.product.pk).update(name='Renamed', sku='DIYA-2')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/orders/orders/')
+
+        item = response.data[0]['items'][0]
+        self.assertEqual(item['product']['name'], 'Brass Diya')
+        self.assertEqual(item['product_sku'], 'DIYA-1')
+        self.assertEqual(item['hsn_code'], '7418')
+        self.assertFalse([q for q in queries.captured_queries if 'products_' in q['sql']])
+
+
+class VendorOrderTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', email='buyer@example.com', password='password')
+        self.vendors = [
+            VendorProfile.objects.create(
+                user=User.objects.create_user(username=f'vendor{i}', email=f'vendor{i}@example.com', password='password'),
+                store_name=f'Vendor {i}'
+            )
+            for i in range(2)
+        ]
+        self.order = Order.objects.create(
+            user=self.user, subtotal=400, shipping_amount=40, discount_amount=20, total_amount=420,
+            shipping_address='Addr'
+        )
+        for i, (vendor, price) in enumerate(zip(self.vendors, (100, 300))):
+            product = Product.objects.create(name=f'P{i}', vendor=vendor, regular_price=price, description='Desc', slug=f'p{i}')
+            OrderItem.objects.create(order=self.order, product=product, vendor=vendor, quantity=1, price=price)
+
+    def test_create_for_order_splits_totals(self):
+        vendor_orders = {vo.vendor_id: vo for vo in VendorOrder.create_for_order(self.order)}
+        first, second = vendor_orders[self.vendors[0].id], vendor_orders[self.vendors[1].id]
+        self.assertEqual((first.subtotal, first.shipping_amount, first.discount_amount), (100, 10, 5))
+        self.assertEqual((second.subtotal, second.shipping_amount, second.discount_amount), (300, 30, 15))
+        self.assertFalse(self.order.items.filter(vendor_order__isnull=True).exists())
+        # Idempotent
+        self.assertEqual(VendorOrder.create_for_order(self.order).count(), 2)
+
+    def test_vendor_orders_carry_their_own_line_discounts(self):
+        # A coupon that only applies to the second vendor's product
+        self.order.items.filter(vendor=self.vendors[1]).update(discount_amount=20)
+        vendor_orders = {vo.vendor_id: vo for vo in VendorOrder.create_for_order(self.order)}
+        first, second = vendor_orders[self.vendors[0].id], vendor_orders[self.vendors[1].id]
+        self.assertEqual((first.discount_amount, first.total_amount), (0, 110))
+        self.assertEqual((second.discount_amount, second.total_amount), (20, 310))
+
+    def test_order_status_mirrored(self):
+        VendorOrder.create_for_order(self.order)
+        self.order.status = 'DELIVERED'
+        self.order.save()
+        for vendor_order in self.order.vendor_orders.all():
+            self.assertEqual(vendor_order.status, 'DELIVERED')
+            self.assertIsNotNone(vendor_order.delivered_at)
+
+    def test_vendor_order_queue(self):
+        vendor = self.vendors[0]
+        product = Product.objects.get(vendor=vendor)
+        for index in range(4):
+            order = Order.objects.create(
+                user=self.user, total_amount=100, shipping_address='Addr',
+                status='SHIPPED' if index % 2 else 'PENDING'
+            )
+            OrderItem.objects.create(order=order, product=product, vendor=vendor, quantity=1, price=100)
+            VendorOrder.create_for_order(order)
+        client = APIClient()
+        client.force_authenticate(vendor.user)
+
+        # page, prefetched items and the status tab counts
+        with self.assertNumQueries(3):
+            response = client.get('/api/vendors/orders/', {'page_size': 3})
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(response.data['counts']['all'], 4)
+        self.assertEqual(response.data['counts']['PENDING'], 2)
+
+        second = client.get(response.data['next'])
+        self.assertEqual(len(second.data['results']), 1)
+        seen = {row['id'] for row in response.data['results'] + second.data['results']}
+        self.assertEqual(len(seen), 4)
+
+        response = client.get('/api/vendors/orders/', {'status': 'SHIPPED'})
+        self.assertEqual([row['status'] for row in response.data['results']], ['SHIPPED', 'SHIPPED'])
+
+
+class OrderArchiveTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', email='buyer@example.com', password='password')
+        vendor = VendorProfile.objects.create(
+            user=User.objects.create_user(username='seller', email='seller@example.com', password='password'),
+            store_name='Seller Store'
+        )
+        product = Product.objects.create(
+            name='Kettle', vendor=vendor, regular_price=100, description='Desc', slug='kettle'
+        )
+        old = timezone.now() - timedelta(days=400)
+        self.closed = Order.objects.create(
+            user=self.user, total_amount=100, shipping_address='Addr', status='CANCELLED'
+        )
+        self.open = Order.objects.create(
+            user=self.user, total_amount=100, shipping_address='Addr', status='SHIPPED'
+        )
+        for order in (self.closed, self.open):
+            item = OrderItem.objects.create(order=order, product=product, vendor=vendor, quantity=1, price=100)
+            package = OrderPackage.objects.create(order=order, package_number=1)
+            PackageItem.objects.create(package=package, order_item=item, quantity=1)
+            OrderTrackingStatus.objects.create(order=order, status='Created', description='Created', timestamp=old)
+        Order.objects.filter(id__in=[self.closed.id, self.open.id]).update(created_at=old)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_archives_closed_orders_and_detail_falls_back(self):
+        from orders.archive import archive_orders
+        from orders.models import ArchivedOrder, ArchivedOrderItem, ArchivedOrderTracking
+
+        self.assertEqual(archive_orders(chunk_size=1), 1)
+        self.assertFalse(Order.objects.filter(id=self.closed.id).exists())
+        self.assertTrue(Order.objects.filter(id=self.open.id).exists())
+        self.assertEqual(ArchivedOrderItem.objects.filter(order_id=self.closed.id).count(), 1)
+        self.assertEqual(ArchivedOrderTracking.objects.filter(order_id=self.closed.id).count(), 1)
+        # Package contents are cascade-deleted with the package, so they are kept with the order
+        related = ArchivedOrder.objects.get(order_id=self.closed.id).data['related']
+        self.assertEqual(len(related['packages']), 1)
+        self.assertEqual([(row['order_item_id'], row['quantity']) for row in related['package_items']],
+                         [(ArchivedOrderItem.objects.get(order_id=self.closed.id).item_id, 1)])
+        self.assertEqual(archive_orders(), 0)  # nothing left to resume
+
+        response = self.client.get(f'/api/orders/orders/{self.closed.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['archived'])
+        self.assertEqual(response.data['status'], 'CANCELLED')
+        self.assertEqual(len(response.data['items']), 1)
+
+        # The customer's order list still shows it, after the newer live order
+        Order.objects.filter(id=self.open.id).update(created_at=timezone.now())
+        response = self.client.get('/api/orders/orders/')
+        self.assertEqual([(row['id'], row.get('archived', False)) for row in response.data],
+                         [(self.open.id, False), (self.closed.id, True)])
+
+        other = User.objects.create_user(username='other', email='other@example.com', password='password')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(f'/api/orders/orders/{self.closed.id}/').status_code, 404)
+        self.assertEqual(self.client.get('/api/orders/orders/').data, [])
+        self.assertEqual(ArchivedOrder.objects.count(), 1)
+
+
+class PackingTest(TestCase):
+    def setUp(self):
+        from orders.packing import Box
+        self.boxes = [Box('S', 20, 15, 10, 2, 0.1), Box('L', 40, 30, 25, 10, 0.3)]
+
+    def _product(self, length, width, height, weight):
+        from types import SimpleNamespace
+        return SimpleNamespace(length=length, width=width, height=height, weight=weight)
+
+    def test_first_fit_decreasing_with_volumetric_weight(self):
+        from orders.packing import pack_lines
+
+        book = self._product(18, 12, 3, 0.4)
+        lamp = self._product(35, 25, 20, 1.5)
+        packages = pack_lines([('book', book, 2), ('lamp', lamp, 1)], self.boxes)
+        # The books fit beside the lamp in one large box
+        self.assertEqual(len(packages), 1)
+        package = packages[0].as_dict()
+        self.assertEqual(package['box'], 'L')
+        self.assertEqual(package['items'], {'lamp': 1, 'book': 2})
+        self.assertEqual(package['volumetric_weight'], 6.0)  # 40 x 30 x 25 / 5000
+        self.assertEqual(package['chargeable_weight'], 6.0)
+
+        # Small items alone shrink into the small box; an oversized one ships as is
+        rug = self._product(150, 20, 20, 3)
+        packages = pack_lines([('book', book, 2), ('rug', rug, 1)], self.boxes)
+        self.assertEqual([p.as_dict()['box'] for p in packages], [None, 'S'])
+        self.assertEqual(packages[0].dimensions, (150.0, 20.0, 20.0))
+        self.assertEqual(pack_lines([('book', book, 2), ('rug', rug, 1)], self.boxes)[1].as_dict(), packages[1].as_dict())
+
+    def test_open_lines_skip_cancelled_units(self):
+        from types import SimpleNamespace
+        from orders.packing import open_lines
+
+        book = self._product(18, 12, 3, 0.4)
+        items = [SimpleNamespace(id=1, product=book, quantity=3, cancelled_quantity=1),
+                 SimpleNamespace(id=2, product=book, quantity=2, cancelled_quantity=2)]
+        self.assertEqual(open_lines(items), [(1, book, 2)])
+
+    def test_auto_create_packages(self):
+        from orders.package_models import PackagingBox
+
+        admin = User.objects.create_user(username='packer', email='packer@example.com', password='password', is_staff=True)
+        vendor = VendorProfile.objects.create(user=admin, store_name='Store')
+        PackagingBox.objects.create(name='S', length=20, width=15, height=10, max_weight=2)
+        product = Product.objects.create(name='Book', vendor=vendor, regular_price=100, description='Desc', slug='book',
+                                         length=18, width=12, height=3, weight=0.4)
+        order = Order.objects.create(user=admin, total_amount=300, shipping_address='Addr')
+        item = OrderItem.objects.create(order=order, product=product, vendor=vendor, quantity=3, price=100)
+
+        client = APIClient()
+        client.force_authenticate(admin)
+        response = client.post(f'/api/orders/{order.id}/packages/auto/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(order.packages.get().items.get().order_item_id, item.id)
+        self.assertEqual(order.packages.get().items.get().quantity, 3)
+
+
+class ServiceabilityTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        for pincode in ('400001', '400002'):
+            ServiceablePincode.objects.create(pincode=pincode, city='Mumbai', state='Maharashtra')
+        self.vendor = VendorProfile.objects.create(
+            user=User.objects.create_user(username='vendor', email='vendor@example.com', password='password'),
+            store_name='Vendor', serviceable_pincodes='400001, 110001'
+        )
+
+    def test_checks_are_memory_lookups_and_writes_apply_incrementally(self):
+        check_pincode('400001', [self.vendor.id])
+        with self.assertNumQueries(0):
+            self.assertTrue(check_pincode('400001', [self.vendor.id])[self.vendor.id][0])
+            self.assertEqual(check_pincode('400002', [self.vendor.id])[self.vendor.id][1],
+                             'Seller does not deliver to this pincode.')
+            self.assertFalse(check_pincode('560001')[None][0])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ServiceablePincode.objects.create(pincode='560001', city='Bengaluru', state='Karnataka')
+        with self.assertNumQueries(0):
+            self.assertTrue(check_pincode('560001')[None][0])
+
+        self.vendor.serviceable_pincodes = ''
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vendor.save()
+        self.assertTrue(check_pincode('400002', [self.vendor.id])[self.vendor.id][0])
+
+    def test_hierarchy_is_one_query_served_with_etag(self):
+        ServiceablePincode.objects.create(pincode='380001', city='Ahmedabad', state='Gujarat', area='Navrangpura',
+                                          is_active=False)
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(
+            username='admin', email='admin@example.com', password='password', is_staff=True
+        ))
+        url = '/api/orders/admin/serviceable-areas/hierarchy/'
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertEqual(len([q for q in queries if 'orders_serviceablepincode' in q['sql']]), 1)
+        self.assertEqual(response.data[0], {
+            'state': 'Gujarat', 'total': 1, 'active': 0,
+            'cities': [{'city': 'Ahmedabad', 'total': 1, 'active': 0}],
+        })
+        self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        branch = client.get(url, {'state': 'Gujarat'}).data
+        self.assertEqual(branch['cities'][0]['areas'], [{'area': 'Navrangpura', 'total': 1, 'active': 0}])
+        self.assertEqual(client.get(url, {'depth': 'states'}).data[1]['city_count'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ServiceablePincode.objects.create(pincode='400003', city='Mumbai', state='Maharashtra')
+        response = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[1]['total'], 3)
+
+    def test_large_sets_use_a_bitmap(self):
+        pincodes = PincodeSet(str(pincode) for pincode in range(100000, 110000))
+        self.assertIsNotNone(pincodes.bitmap)
+        pincodes.discard('100500')
+        pincodes.add('999999')
+        self.assertEqual(len(pincodes), 10000)
+        self.assertNotIn('100500', pincodes)
+        self.assertIn('999999', pincodes)
+        self.assertNotIn('abc', pincodes)
+
+
+class PincodeImportTest(TestCase):
+    def test_streams_chunks_and_upserts(self):
+        ShiprocketPincode.objects.create(
+            pincode='400001', city='Old', state='Maharashtra', is_serviceable=False, is_cod_available=False
+        )
+        lines = [
+            b'officename\tpincode\tdistrict\tstatename\n',
+            b'Kalbadevi\t400002\tMumbai\tMaharashtra\n',
+            b'Kalbadevi S.O\t400002\tMumbai\tMaharashtra\n',
+            b'Fort\t400001\tMumbai\tMaharashtra\n',
+            b'Nowhere\t4000\tMumbai\tMaharashtra\n',
+            b'Connaught Place\t110001\tNew Delhi\tDelhi\n',
+        ]
+        chunks = []
+        report = import_pincode_master(lines, chunk_size=2, progress=lambda report: chunks.append(report.upserted))
+
+        self.assertEqual((report.total_rows, report.upserted, report.duplicates, report.invalid), (5, 3, 1, 1))
+        self.assertEqual(report.errors, [{'line': 5, 'error': "Invalid pincode '4000'"}])
+        self.assertEqual(chunks, [2, 3])
+        existing = ShiprocketPincode.objects.get(pincode='400001')
+        self.assertEqual((existing.city, existing.zone, existing.is_serviceable), ('Mumbai', 'West', False))
+        self.assertEqual(ShiprocketPincode.objects.get(pincode='110001').zone, 'North')
+
+    def test_whitelist_rows_with_and_without_area(self):
+        ServiceablePincode.objects.create(pincode='380001', city='Old', state='Gujarat')
+        lines = [
+            b'State,City,ZipCode,Area\n',
+            b'Gujarat,Ahmedabad,380001,\n',
+            b'Gujarat,Ahmedabad,380001,Navrangpura\n',
+            b'Gujarat,Ahmedabad,380002,\n',
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            report = import_serviceable_pincodes(lines)
+        self.assertEqual(report.upserted, 3)
+        import_serviceable_pincodes(lines)
+
+        self.assertEqual(ServiceablePincode.objects.count(), 3)
+        self.assertEqual(ServiceablePincode.objects.get(pincode='380001', area__isnull=True).city, 'Ahmedabad')
+        self.assertTrue(check_pincode('380002')[None][0])
+
+    def test_failed_whitelist_upload_still_refreshes_the_set(self):
+        def upload():
+            yield b'State,City,ZipCode\n'
+            yield b'Gujarat,Ahmedabad,380005\n'
+            yield b'Gujarat,Ahmedabad,380006\n'
+            raise ConnectionResetError('upload interrupted')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ServiceablePincode.objects.create(pincode='380001', city='Ahmedabad', state='Gujarat')
+        self.assertFalse(check_pincode('380005')[None][0])
+        with self.captureOnCommitCallbacks(execute=True), self.assertRaises(ConnectionResetError):
+            import_serviceable_pincodes(upload(), chunk_size=1)
+        # The chunks written before the failure are committed and served
+        self.assertTrue(check_pincode('380005')[None][0])
+
+
+class _DirectoryHandler(BaseHTTPRequestHandler):
+    """data.gov.in pincode directory: offset/limit paging, ETags and injected 503s"""
+
+    def do_GET(self):
+        server = self.server
+        query = parse_qs(urlparse(self.path).query)
+        offset, limit = int(query['offset'][0]), int(query['limit'][0])
+        with server.lock:
+            server.offsets.append(offset)
+            failing = server.failures.get(offset, 0)
+            if failing:
+                server.failures[offset] = failing - 1
+        if failing:
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        body = json.dumps({'total': len(server.records), 'records': server.records[offset:offset + limit]}).encode()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class PincodeSyncTest(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _DirectoryHandler)
+        self.server.lock = threading.Lock()
+        self.server.offsets = []
+        self.server.failures = {}
+        self.server.records = [
+            {'officename': f'Office {index}', 'pincode': pincode, 'Districtname': district,
+             'statename': state, 'divisionname': 'Division'}
+            for index, (pincode, district, state) in enumerate([
+                (400001, 'Mumbai', 'Maharashtra'), (400001, 'Mumbai', 'Maharashtra'),
+                (400002, 'Mumbai', 'Maharashtra'), (110001, 'New Delhi', 'Delhi'),
+                (560001, 'Bengaluru', 'Karnataka'), (600001, 'Chennai', 'Tamil Nadu'),
+                (700001, 'Kolkata', 'West Bengal'),
+            ])
+        ]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def sync(self, **kwargs):
+        return PincodeSync(
+            api_key='test', url=f'http://127.0.0.1:{self.server.server_port}/resource/pincodes',
+            page_size=2, concurrency=3, rate=0, backoff=0, **kwargs
+        )
+
+    def test_syncs_concurrently_and_writes_only_changes(self):
+        self.server.failures = {2: 1}
+        report = self.sync().run()
+        self.assertEqual((report.created, report.updated, report.retries), (6, 0, 1))
+        self.assertEqual(ShiprocketPincode.objects.get(pincode='400001').zone, 'West')
+        checkpoint = PincodeSyncCheckpoint.objects.get()
+        self.assertEqual(checkpoint.next_offset, 7)
+        self.assertIsNotNone(checkpoint.completed_at)
+
+        # Unchanged pages come back 304 and are not written
+        report = self.sync().run()
+        self.assertEqual((report.pages_unchanged, report.created, report.updated), (4, 0, 0))
+
+        self.server.records[6]['Districtname'] = 'Howrah'
+        report = self.sync().run()
+        self.assertEqual((report.pages_unchanged, report.created, report.updated), (3, 0, 1))
+        self.assertEqual(ShiprocketPincode.objects.get(pincode='700001').city, 'Howrah')
+
+    def test_resumes_from_checkpoint_after_failure(self):
+        self.server.failures = {4: 99}
+        with self.assertRaises(PincodeSyncError):
+            self.sync(max_attempts=2).run()
+        self.assertEqual(PincodeSyncCheckpoint.objects.get().next_offset, 4)
+        self.assertFalse(ShiprocketPincode.objects.filter(pincode='560001').exists())
+
+        self.server.failures = {}
+        self.server.offsets = []
+        synced = ShiprocketPincode.objects.count()
+        report = self.sync().run()
+        self.assertEqual(self.server.offsets[0], 4)
+        self.assertNotIn(0, self.server.offsets)
+        self.assertNotIn(2, self.server.offsets)
+        self.assertEqual(report.created, 6 - synced)
+        self.assertEqual(ShiprocketPincode.objects.count(), 6)
+        self.assertEqual(PincodeSyncCheckpoint.objects.get().next_offset, 7)
+
+    def test_filtered_sync_keeps_its_own_checkpoint(self):
+        report = self.sync(
+            record_filter=lambda record: record['statename'] == 'Maharashtra', filter_key='states=Maharashtra'
+        ).run()
+        self.assertEqual(report.created, 2)
+
+        # The unfiltered pass must not take the filtered pass's pages as unchanged
+        report = self.sync().run()
+        self.assertEqual((report.pages_unchanged, report.created), (0, 4))
+        self.assertEqual(ShiprocketPincode.objects.count(), 6)
+        self.assertEqual(PincodeSyncCheckpoint.objects.count(), 2)
+
+    def test_restart_rewrites_pincodes_deleted_locally(self):
+        self.sync().run()
+        ShiprocketPincode.objects.filter(pincode__in=['400001', '700001']).delete()
+        report = self.sync().run(restart=True)
+        self.assertEqual((report.pages_unchanged, report.created), (0, 2))
+        self.assertEqual(ShiprocketPincode.objects.count(), 6)
+
+        call_command('clear_pincodes', confirm=True, stdout=io.StringIO())
+        report = self.sync().run()
+        self.assertEqual(report.created, 6)
+
+
+class PostcodeLookupTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        postcode_lookup._local.clear()
+        ShiprocketPincode.objects.create(pincode='400001', city='Mumbai', state='Maharashtra')
+
+    def test_repeat_and_unknown_lookups_are_cached(self):
+        with patch.object(postcode_lookup, '_from_api', return_value=None) as api:
+            self.assertEqual(postcode_lookup.lookup_postcode('400001')['city'], 'Mumbai')
+            self.assertIsNone(postcode_lookup.lookup_postcode('999999'))
+            with self.assertNumQueries(0):
+                self.assertEqual(postcode_lookup.lookup_postcode('400001')['state'], 'Maharashtra')
+                self.assertIsNone(postcode_lookup.lookup_postcode('999999'))
+                self.assertIsNone(postcode_lookup.lookup_postcode('40000'))
+            self.assertEqual(api.call_count, 1)
+
+            # The shared tier answers a process with a cold LRU
+            postcode_lookup._local.clear()
+            with self.assertNumQueries(0):
+                self.assertIsNone(postcode_lookup.lookup_postcode('999999'))
+
+    def test_warmup_loads_popular_pincodes(self):
+        cache.set(postcode_lookup.POPULAR_KEY, {'400001': 5, '110001': 1})
+        self.assertEqual(postcode_lookup.warm_postcodes(), 1)
+        cache.delete(postcode_lookup.postcode_key('400001'))
+        with self.assertNumQueries(0):
+            self.assertEqual(postcode_lookup.lookup_postcode('400001')['city'], 'Mumbai')
+
+    def test_master_writes_invalidate_cached_lookups(self):
+        from orders.pincode_sync import write_changed
+
+        self.assertEqual(postcode_lookup.lookup_postcode('400001')['city'], 'Mumbai')
+        with self.captureOnCommitCallbacks(execute=True):
+            import_pincode_master([b'officename,pincode,district,statename\n', b'Fort,400001,Bombay,Maharashtra\n'])
+        postcode_lookup._local.clear()  # another process, or after LOCAL_TIMEOUT
+        self.assertEqual(postcode_lookup.lookup_postcode('400001')['city'], 'Bombay')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            write_changed([{'pincode': '400001', 'Districtname': 'Mumbai City', 'statename': 'Maharashtra'}])
+        postcode_lookup._local.clear()
+        self.assertEqual(postcode_lookup.lookup_postcode('400001')['city'], 'Mumbai City')
+
+    def test_stuck_concurrent_load_falls_back_to_the_master(self):
+        from concurrent.futures import Future
+
+        # Another thread is loading both pincodes and never finishes
+        postcode_lookup._loading.update({'400001': Future(), '999999': Future()})
+        self.addCleanup(postcode_lookup._loading.clear)
+        with patch.object(postcode_lookup, 'COALESCE_WAIT', 0.01), \
+                patch.object(postcode_lookup, '_from_api') as api:
+            self.assertEqual(postcode_lookup.lookup_postcode('400001')['city'], 'Mumbai')
+            self.assertIsNone(postcode_lookup.lookup_postcode('999999'))
+        api.assert_not_called()
+        # The miss was not the load's answer, so it is not remembered
+        self.assertIsNone(postcode_lookup._local.get('999999'))
+
+
+class _CarrierHandler(BaseHTTPRequestHandler):
+    """Keep-alive carrier API answering 503 (429 when `server.retry_after` is set) to the first `server.failures` calls"""
+    protocol_version = 'HTTP/1.1'
+
+    def _respond(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        with self.server.lock:
+            self.server.calls.append(self.command)
+            failing = len(self.server.calls) <= self.server.failures
+        body = b'{}'
+        if failing and self.server.retry_after:
+            self.send_response(429)
+            self.send_header('Retry-After', self.server.retry_after)
+        else:
+            self.send_response(503 if failing else 200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+class IntegrationClientTest(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _CarrierHandler)
+        self.server.lock = threading.Lock()
+        self.server.calls = []
+        self.server.failures = 0
+        self.server.retry_after = None
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        self.client = IntegrationClient('test', backoff=0)
+
+    def test_reuses_connections_and_records_metrics(self):
+        for order_id in range(5):
+            self.assertEqual(self.client.get(f'{self.url}/courier/track/{order_id}').status_code, 200)
+        self.assertEqual(self.client.connections_opened(), 1)
+        metrics = self.client.metrics()['endpoints']['/courier/track/:id']
+        self.assertEqual((metrics['count'], metrics['errors']), (5, 0))
+
+    def test_retries_only_idempotent_calls(self):
+        self.server.failures = 1
+        self.assertEqual(self.client.get(f'{self.url}/rates').status_code, 200)
+        self.assertEqual(self.server.calls, ['GET', 'GET'])
+
+        self.server.calls, self.server.failures = [], 1
+        self.assertEqual(self.client.post(f'{self.url}/orders/create', json={}).status_code, 503)
+        self.assertEqual(self.server.calls, ['POST'])
+
+    def test_retry_after_is_capped(self):
+        # A throttling provider must not park the request worker for the hour it asks for
+        self.server.failures, self.server.retry_after = 1, '3600'
+        client = IntegrationClient('test', backoff=0, max_retry_wait=0.1)
+        started = time.monotonic()
+        self.assertEqual(client.get(f'{self.url}/rates').status_code, 200)
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(self.server.calls, ['GET', 'GET'])
 
-# Create your tests here.
+    def test_endpoint_timeouts(self):
+        client = IntegrationClient('test', timeout=(3, 30), endpoint_timeouts=(('/open/postcode/', (3, 5)),))
+        self.assertEqual(client.timeout_for('https://api.example.com/v1/open/postcode/details?postcode=1'), (3, 5))
+        self.assertEqual(client.timeout_for('https://api.example.com/v1/orders/create'), (3, 30))
@@ -0,0 +1,94 @@
+from django.contrib.sessions.models import Session
+from django.db import transaction
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from orders import guest_cart
+from orders.models import Cart, CartItem
+from products.models import Product
+from users.models import User
+from vendors.models import VendorProfile
+
+
+class GuestCartTest(TestCase):
+    def setUp(self):
+        guest_cart.get_store().clear()
+        vendor = VendorProfile.objects.create(
+            user=User.objects.create_user(username='vendor', email='vendor@example.com', password='password'),
+            store_name='Vendor Store'
+        )
+        self.first = Product.objects.create(
+            name='First', vendor=vendor, regular_price=100, description='Desc', slug='first'
+        )
+        self.second = Product.objects.create(
+            name='Second', vendor=vendor, regular_price=50, description='Desc', slug='second'
+        )
+        self.client = APIClient()
+
+    def add(self, product, quantity):
+        return self.client.post('/api/orders/cart/add/', {'product_id': product.id, 'quantity': quantity}, format='json')
+
+    def test_guest_cart_creates_no_rows(self):
+        self.add(self.first, 2)
+        self.add(self.first, 1)
+        self.add(self.second, 1)
+
+        response = self.client.get('/api/orders/cart/')
+        self.assertEqual(response.status_code, 200)
+        quantities = {item['product']['id']: item['quantity'] for item in response.data['items']}
+        self.assertEqual(quantities, {self.first.id: 3, self.second.id: 1})
+        self.assertEqual(response.data['total_amount'], 350)
+        self.assertFalse(Cart.objects.exists())
+        self.assertFalse(Session.objects.exists())
+
+        self.client.delete(f'/api/orders/cart/items/{self.second.id}/')
+        response = self.client.get('/api/orders/cart/')
+        self.assertEqual(len(response.data['items']), 1)
+
+    def test_guest_cart_merged_on_login(self):
+        user = User.objects.create_user(username='buyer', email='buyer@example.com', password='password')
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.create(cart=cart, product=self.first, quantity=1)
+        self.add(self.first, 2)
+        self.add(self.second, 1)
+
+        self.client.force_authenticate(user)
+        response = self.client.get('/api/orders/cart/')
+
+        quantities = {item['product']['id']: item['quantity'] for item in response.data['items']}
+        self.assertEqual(quantities, {self.first.id: 3, self.second.id: 1})
+        self.assertEqual(self.client.cookies[guest_cart.GUEST_CART_COOKIE].value, '')
+
+    def test_guest_cart_merged_by_any_cart_request(self):
+        user = User.objects.create_user(username='buyer', email='buyer@example.com', password='password')
+        self.add(self.first, 2)
+
+        # The first request after login adds an item: the guest lines are merged before it
+        self.client.force_authenticate(user)
+        self.add(self.second, 1)
+        cart = Cart.objects.get(user=user)
+        self.assertEqual(dict(cart.items.values_list('product_id', 'quantity')), {self.first.id: 2, self.second.id: 1})
+        self.assertEqual(self.client.cookies[guest_cart.GUEST_CART_COOKIE].value, '')
+
+        response = self.client.get('/api/orders/cart/')
+        self.assertEqual(len(response.data['items']), 2)
+
+    def test_concurrent_merges_add_the_guest_cart_once(self):
+        user = User.objects.create_user(username='buyer', email='buyer@example.com', password='password')
+        cart_id = guest_cart.new_guest_cart_id()
+        guest_cart.get_store().add(cart_id, self.first.id, 2)
+
+        # A rolled back merge leaves the guest cart for a later request
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            guest_cart.merge_guest_cart(cart_id, user)
+            raise RuntimeError
+        self.assertEqual(guest_cart.get_store().get_items(cart_id), {self.first.id: 2})
+        guest_cart.get_store().unlock(cart_id)  # the lock would expire
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(guest_cart.merge_guest_cart(cart_id, user), 1)
+            # A second request merging before the first commits is turned away
+            self.assertEqual(guest_cart.merge_guest_cart(cart_id, user), 0)
+        self.assertEqual(guest_cart.merge_guest_cart(cart_id, user), 0)
+        self.assertEqual(guest_cart.get_store().get_items(cart_id), {})
+        self.assertEqual(CartItem.objects.get(cart__user=user).quantity, 2)
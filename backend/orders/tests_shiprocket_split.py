@@ -61,7 +61,7 @@ class ShiprocketSplitOrderTest(TestCase):
         OrderItem.objects.create(order=self.order, product=self.product1, vendor=self.vendor1, quantity=1, price=400)
         OrderItem.objects.create(order=self.order, product=self.product2, vendor=self.vendor2, quantity=1, price=600)
 
-    @patch('orders.shiprocket_service.requests.post')
+    @patch('orders.shiprocket_service.http.post')
     @patch('orders.shiprocket_service.ShiprocketService.get_token')
     def test_split_order_creation(self, mock_get_token, mock_post):
         # Setup Mocks
@@ -94,7 +94,7 @@ class ShiprocketSplitOrderTest(TestCase):
 
         # Assertions
         # 1. Check called twice (once for each vendor)
-        # Note: requests.post might be called more than twice if it syncs pickup locations
+        # Note: http.post might be called more than twice if it syncs pickup locations
         # We need to filter calls to the 'orders/create/adhoc' endpoint
         
         create_calls = [
@@ -2,7 +2,7 @@ from django.urls import path, include
 from . import views
 from .views import (
     CartDetailView, AddToCartView, RemoveFromCartView, 
-    OrderListCreateView, OrderDetailView, AdminOrderListView,
+    OrderListCreateView, OrderDetailView, AdminOrderListView, AdminBulkOrderStatusView,
     OrderNoteViewSet, ShiprocketConfigViewSet
 )
 from .checkout_views import CheckoutView
@@ -31,6 +31,7 @@ urlpatterns = [
     path('orders/<int:pk>/', OrderDetailView.as_view(), name='order-detail'),
     path('orders/<int:order_id>/return/', request_return, name='request-return'),
     path('admin/orders/', AdminOrderListView.as_view(), name='admin-order-list'),
+    path('admin/orders/bulk-status/', AdminBulkOrderStatusView.as_view(), name='admin-order-bulk-status'),
     
     # Serviceability Check
     path('serviceability/check/<str:pincode>/', PublicServiceabilityCheckView.as_view(), name='serviceability-check'),
@@ -1,9 +1,18 @@
 from rest_framework import generics, permissions, status, serializers
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.pagination import PageNumberPagination
+from datetime import datetime, time, timedelta
+from django.db.models import Count, Exists, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.timezone import make_aware
+from django.http import Http404
 from django.shortcuts import get_object_or_404
-from .models import Cart, CartItem, Order, OrderItem
-from .serializers import CartSerializer, CartItemSerializer, OrderSerializer
+from . import guest_cart
+from .models import CartItem, Order, OrderItem, VendorOrder
+from .serializers import CartSerializer, CartItemSerializer, OrderSerializer, AdminOrderSummarySerializer
+from .shiprocket_models import ShipmentTracking
 from products.models import Product
 
 class CartDetailView(generics.RetrieveAPIView):
@@ -11,16 +20,24 @@ class CartDetailView(generics.RetrieveAPIView):
     permission_classes = [permissions.AllowAny] # Allow guests
 
     def get_object(self):
-        user = self.request.user
-        if user.is_authenticated:
-            cart, created = Cart.objects.get_or_create(user=user)
-        else:
-            # Create session if not exists
-            if not self.request.session.session_key:
-                self.request.session.create()
-            session_key = self.request.session.session_key
-            cart, created = Cart.objects.get_or_create(session_id=session_key, user=None)
-        return cart
+        return guest_cart.user_cart(self.request)
+
+    def retrieve(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return guest_cart.clear_merged_cookie(request, super().retrieve(request, *args, **kwargs))
+
+        # Guest: cart lives in the guest cart store, no session or DB rows
+        items = guest_cart.build_guest_cart_items(guest_cart.get_guest_cart_id(request))
+        from .services import PriceCalculatorService
+        totals = PriceCalculatorService.calculate_items_total(items)
+        return Response({
+            'id': None,
+            'items': CartItemSerializer(items, many=True, context=self.get_serializer_context()).data,
+            'created_at': None,
+            'total_amount': totals['total_amount'],
+            'subtotal': totals['subtotal'],
+            'discount_amount': totals['discount_amount'],
+        })
 
 class AddToCartView(APIView):
     permission_classes = [permissions.AllowAny] # Allow guests
@@ -29,17 +46,25 @@ class AddToCartView(APIView):
         product_id = request.data.get('product_id')
         quantity = int(request.data.get('quantity', 1))
         
-        user = request.user
-        if user.is_authenticated:
-             cart, created = Cart.objects.get_or_create(user=user)
-        else:
-             if not request.session.session_key:
-                 request.session.create()
-             session_key = request.session.session_key
-             cart, created = Cart.objects.get_or_create(session_id=session_key, user=None)
-
         product = get_object_or_404(Product, id=product_id)
 
+        user = request.user
+        if not user.is_authenticated:
+            # Guest: the cart item id is the product id
+            guest_cart_id = guest_cart.get_guest_cart_id(request) or guest_cart.new_guest_cart_id()
+            new_quantity = guest_cart.get_store().add(guest_cart_id, product.id, quantity)
+            response = Response({
+                'status': 'Item added to cart',
+                'id': product.id,
+                'cart_item_id': product.id,
+                'product_id': product.id,
+                'quantity': new_quantity
+            }, status=status.HTTP_200_OK)
+            guest_cart.set_guest_cart_cookie(response, guest_cart_id)
+            return response
+
+        cart = guest_cart.user_cart(request)
+
         cart_item, created = CartItem.objects.get_or_create(cart=cart, product=product)
         if not created:
             cart_item.quantity += quantity
@@ -48,13 +73,13 @@ class AddToCartView(APIView):
         cart_item.save()
 
         # Return cart item ID for Buy Now functionality
-        return Response({
+        return guest_cart.clear_merged_cookie(request, Response({
             'status': 'Item added to cart',
             'id': cart_item.id,
             'cart_item_id': cart_item.id,
             'product_id': product.id,
             'quantity': cart_item.quantity
-        }, status=status.HTTP_200_OK)
+        }, status=status.HTTP_200_OK))
 
 class RemoveFromCartView(APIView):
     permission_classes = [permissions.AllowAny] # Allow guests
@@ -62,32 +87,44 @@ class RemoveFromCartView(APIView):
     def delete(self, request, item_id):
         # Identify cart for permission check
         user = request.user
-        if user.is_authenticated:
-            cart = get_object_or_404(Cart, user=user)
-        else:
-            if not request.session.session_key:
-                 return Response({'error': 'No session'}, status=status.HTTP_400_BAD_REQUEST)
-            cart = get_object_or_404(Cart, session_id=request.session.session_key)
-
+        if not user.is_authenticated:
+            guest_cart_id = guest_cart.get_guest_cart_id(request)
+            if not guest_cart_id:
+                return Response({'error': 'No guest cart'}, status=status.HTTP_400_BAD_REQUEST)
+            if not guest_cart.get_store().remove(guest_cart_id, [item_id]):
+                raise Http404
+            return Response({'status': 'Item removed from cart'}, status=status.HTTP_200_OK)
+
+        cart = guest_cart.user_cart(request)
         cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
         cart_item.delete()
-        return Response({'status': 'Item removed from cart'}, status=status.HTTP_200_OK)
+        return guest_cart.clear_merged_cookie(
+            request, Response({'status': 'Item removed from cart'}, status=status.HTTP_200_OK)
+        )
 
 class OrderListCreateView(generics.ListCreateAPIView):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        # Order lines render from their snapshot, so no catalog tables are joined
+        return Order.objects.filter(user=self.request.user).select_related('user').prefetch_related(
+            'items', 'notes', 'shipments'
+        )
 
-    def create(self, request, *args, **kwargs):
-        try:
-            cart = Cart.objects.get(user=request.user)
-        except Cart.DoesNotExist:
-            return Response(
-                {'error': 'Cart not found'}, 
-                status=status.HTTP_400_BAD_REQUEST
+    def list(self, request, *args, **kwargs):
+        # Orders archived after ORDER_ARCHIVE_AFTER_DAYS stay in "My Orders", read-only
+        from .archive import archived_orders_for
+        response = super().list(request, *args, **kwargs)
+        archived = archived_orders_for(request.user)
+        if archived:
+            response.data = sorted(
+                [*response.data, *archived], key=lambda order: parse_datetime(order['created_at']), reverse=True
             )
+        return response
+
+    def create(self, request, *args, **kwargs):
+        cart = guest_cart.user_cart(request)
         
         if not cart.items.exists():
             return Response(
@@ -110,8 +147,12 @@ class OrderListCreateView(generics.ListCreateAPIView):
         total_discount = 0
 
         # Create order items using Calculated Price
-        for item in cart.items.all():
-            price_info = PriceCalculatorService.calculate_price(item.product)
+        cart_items = list(
+            cart.items.select_related('product', 'product__tax_slab').prefetch_related('product__images', 'product__attributes')
+        )
+        prices = PriceCalculatorService.resolve_prices(item.product for item in cart_items)
+        for item in cart_items:
+            price_info = prices[item.product_id]
             final_price = price_info['price']
             
             OrderItem.objects.create(
@@ -119,7 +160,8 @@ class OrderListCreateView(generics.ListCreateAPIView):
                 product=item.product,
                 vendor=item.product.vendor,
                 quantity=item.quantity,
-                price=final_price # Store the discounted price as the transaction price
+                price=final_price, # Store the discounted price as the transaction price
+                **OrderItem.snapshot_product(item.product)
             )
             
             line_total = final_price * item.quantity
@@ -135,6 +177,7 @@ class OrderListCreateView(generics.ListCreateAPIView):
         order.discount_amount = total_discount
         order.total_amount = total_amount
         order.save()
+        VendorOrder.create_for_order(order)
         
         # Clear cart
         cart.items.all().delete()
@@ -152,23 +195,143 @@ class OrderDetailView(generics.RetrieveUpdateAPIView):
             return Order.objects.all()
         return Order.objects.filter(user=self.request.user)
 
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            # Closed orders past the archive horizon are served from the archive (read-only)
+            from .archive import find_archived_order
+            is_admin = request.user.is_staff or request.user.is_superuser
+            archived = find_archived_order(kwargs['pk'], user=None if is_admin else request.user)
+            if archived is None:
+                raise
+            return Response({**archived.data['order'], 'archived': True})
+
+class AdminOrderPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
 class AdminOrderListView(generics.ListAPIView):
     """
-    Admin view to list all orders in the system
+    Admin view to list all orders in the system (paginated summary rows).
+    Filters: status, payment_status, date_from / date_to (YYYY-MM-DD), vendor (vendor profile id),
+    q (order number, email, phone, name, AWB or Razorpay id; see orders.search),
+    awaiting_shipment (prepaid | cod: open orders with no shipment yet, for the shipment manager)
+    Malformed dates or vendor ids are rejected with 400.
     """
-    serializer_class = OrderSerializer
+    serializer_class = AdminOrderSummarySerializer
     permission_classes = [permissions.IsAdminUser]
+    pagination_class = AdminOrderPagination
 
     def get_queryset(self):
-        # Return all orders for admin users
-        queryset = Order.objects.all().order_by('-created_at')
+        queryset = Order.objects.select_related('user').order_by('-created_at')
+        params = self.request.query_params
         
         # Filter by status if provided
-        status = self.request.query_params.get('status')
+        status = params.get('status')
         if status:
             queryset = queryset.filter(status=status)
-            
-        return queryset
+        
+        payment_status = params.get('payment_status')
+        if payment_status:
+            queryset = queryset.filter(payment_status=payment_status)
+        
+        # Date range on created_at boundaries so the (status, created_at) indexes apply
+        date_from = _query_date(params, 'date_from')
+        if date_from:
+            queryset = queryset.filter(created_at__gte=make_aware(datetime.combine(date_from, time.min)))
+        date_to = _query_date(params, 'date_to')
+        if date_to:
+            queryset = queryset.filter(created_at__lt=make_aware(datetime.combine(date_to + timedelta(days=1), time.min)))
+        
+        q = params.get('q', '').strip()
+        if q:
+            from .search import search_orders
+            queryset = search_orders(queryset, q)
+        
+        vendor = params.get('vendor')
+        if vendor:
+            if not vendor.isdigit():
+                raise serializers.ValidationError({'error': 'vendor must be a vendor id'})
+            queryset = queryset.filter(
+                Exists(OrderItem.objects.filter(order=OuterRef('pk'), vendor_id=vendor))
+            )
+        
+        awaiting = params.get('awaiting_shipment')
+        if awaiting:
+            if awaiting not in SHIPMENT_CANDIDATES:
+                raise serializers.ValidationError({'error': 'awaiting_shipment must be prepaid or cod'})
+            queryset = queryset.filter(
+                SHIPMENT_CANDIDATES[awaiting],
+                status__in=['PENDING', 'PROCESSING'],
+            ).exclude(Exists(ShipmentTracking.objects.filter(order=OuterRef('pk'))))
+        
+        # Correlated counts instead of joining both one-to-many tables and grouping every filtered row
+        return queryset.annotate(
+            item_count=_related_count(OrderItem.objects),
+            shipment_count=_related_count(ShipmentTracking.objects),
+        )
+
+
+# Orders the shipment manager lists per tab; COD orders may carry payment_status 'cod' or 'pending'
+SHIPMENT_CANDIDATES = {
+    'prepaid': Q(payment_status='paid') & ~Q(payment_method='cod'),
+    'cod': Q(payment_method='cod') | Q(payment_status='cod'),
+}
+
+
+def _query_date(params, name):
+    """Parse an optional YYYY-MM-DD query parameter, rejecting malformed or impossible dates"""
+    raw = params.get(name)
+    if not raw:
+        return None
+    try:
+        value = parse_date(raw)
+    except ValueError:
+        value = None
+    if value is None:
+        raise serializers.ValidationError({'error': f'{name} must be a valid YYYY-MM-DD date'})
+    return value
+
+
+def _related_count(manager):
+    """Per-order row count of `manager` (a model with an `order` FK) as a correlated subquery"""
+    counts = manager.filter(order=OuterRef('pk')).order_by().values('order').annotate(c=Count('*')).values('c')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+class AdminBulkOrderStatusView(APIView):
+    """
+    Move many orders to one status: POST {"order_ids": [...], "status": "SHIPPED", "note": ""}
+    Orders that cannot make the transition are listed in `failed`; the rest are updated.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        from .bulk_status import MAX_BULK_ORDERS, ORDER_STATUS_TRANSITIONS, bulk_transition
+
+        target_status = request.data.get('status')
+        order_ids = request.data.get('order_ids')
+        if target_status not in ORDER_STATUS_TRANSITIONS:
+            return Response({'error': 'Invalid status'}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(order_ids, list) or not order_ids:
+            return Response({'error': 'order_ids must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(order_ids) > MAX_BULK_ORDERS:
+            return Response({'error': f'At most {MAX_BULK_ORDERS} orders per request'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            order_ids = [int(order_id) for order_id in order_ids]
+        except (TypeError, ValueError):
+            return Response({'error': 'order_ids must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = bulk_transition(order_ids, target_status, actor=request.user, note=request.data.get('note', ''))
+        return Response({
+            'status': target_status,
+            'updated_count': len(result['updated']),
+            'failed_count': len(result['failed']),
+            **result,
+        })
 
 from rest_framework import viewsets
 from .models import OrderNote
@@ -259,6 +422,10 @@ def check_cod_availability(request):
         return Response({'available': False, 'message': 'Pincode required'}, status=400)
     
     try:
+        # Most pincodes are not COD-enabled; answer those from memory without a query
+        from .serviceability import is_cod_pincode
+        if not is_cod_pincode(pincode):
+            raise CODPincode.DoesNotExist
         cod_pincode = CODPincode.objects.get(pincode=pincode, is_active=True)
         is_available = cod_pincode.is_cod_available(order_value)
         
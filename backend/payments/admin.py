@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Payment, ShippingZone, TaxRate
+from .models import Payment, RateCardEntry, ShippingZone, TaxRate
 
 
 @admin.register(Payment)
@@ -50,3 +50,16 @@ class TaxRateAdmin(admin.ModelAdmin):
     def total_gst(self, obj):
         return f"{obj.cgst_rate + obj.sgst_rate}%"
     total_gst.short_description = 'Total GST'
+
+
+@admin.register(RateCardEntry)
+class RateCardEntryAdmin(admin.ModelAdmin):
+    list_display = ['carrier', 'zone', 'service_type', 'payment_mode', 'weight_slab_grams', 'freight',
+                    'cod_charge', 'cod_percent', 'source', 'drift_samples', 'mean_drift_percent', 'last_sampled_at']
+    list_filter = ['carrier', 'zone', 'service_type', 'payment_mode', 'source']
+    readonly_fields = ['drift_samples', 'drift_total', 'last_live_total', 'last_sampled_at', 'updated_at']
+
+    def mean_drift_percent(self, obj):
+        drift = obj.mean_drift
+        return f"{drift * 100:+.1f}%" if drift is not None else '-'
+    mean_drift_percent.short_description = 'Mean drift'
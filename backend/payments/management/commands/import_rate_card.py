@@ -0,0 +1,64 @@
+import csv
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from payments.models import RateCardEntry
+from payments.quote_cache import bump_rules_version
+from payments.rate_cards import bump_rate_card_version
+
+
+class Command(BaseCommand):
+    help = (
+        'Import a carrier rate card CSV with columns zone, weight_slab_grams, freight and optionally '
+        'service_type, payment_mode, cod_charge, cod_percent'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', type=str)
+        parser.add_argument('--carrier', default='delhivery', choices=[c for c, _ in RateCardEntry.CARRIER_CHOICES])
+        parser.add_argument('--replace', action='store_true', help="Delete the carrier's imported cells first")
+
+    def handle(self, *args, **options):
+        carrier = options['carrier']
+        zones = {zone for zone, _ in RateCardEntry.ZONE_CHOICES}
+        entries = []
+        try:
+            with open(options['csv_file'], newline='', encoding='utf-8-sig') as handle:
+                for line, row in enumerate(csv.DictReader(handle), start=2):
+                    zone = (row.get('zone') or '').strip().upper()
+                    if zone not in zones:
+                        raise CommandError(f"Line {line}: unknown zone {zone!r}")
+                    try:
+                        entries.append(RateCardEntry(
+                            carrier=carrier,
+                            zone=zone,
+                            service_type=(row.get('service_type') or 'surface').strip().lower(),
+                            payment_mode='COD' if (row.get('payment_mode') or '').strip().upper() == 'COD' else 'Prepaid',
+                            weight_slab_grams=int(row['weight_slab_grams']),
+                            freight=Decimal(row['freight']),
+                            cod_charge=Decimal(row.get('cod_charge') or 0),
+                            cod_percent=Decimal(row.get('cod_percent') or 0),
+                            source='import',
+                        ))
+                    except (KeyError, ValueError, InvalidOperation) as e:
+                        raise CommandError(f"Line {line}: {e}")
+        except OSError as e:
+            raise CommandError(str(e))
+
+        with transaction.atomic():
+            if options['replace']:
+                RateCardEntry.objects.filter(carrier=carrier, source='import').delete()
+            # Imported rates replace any learned cell for the same slab
+            RateCardEntry.objects.bulk_create(
+                entries,
+                update_conflicts=True,
+                unique_fields=['carrier', 'zone', 'service_type', 'payment_mode', 'weight_slab_grams'],
+                update_fields=['freight', 'cod_charge', 'cod_percent', 'source', 'updated_at'],
+                batch_size=1000,
+            )
+        # bulk_create skips post_save, so invalidate the compiled card and cached quotes here
+        bump_rate_card_version()
+        bump_rules_version()
+        self.stdout.write(self.style.SUCCESS(f"Imported {len(entries)} {carrier} rate card cells"))
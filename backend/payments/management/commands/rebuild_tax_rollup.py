@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from payments.tax_rollup import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily GST rollup from all orders (initial backfill or repair)'
+
+    def handle(self, *args, **options):
+        rows = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt GST rollup with {rows} rows"))
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_add_shipping_settings'),
+        ('vendors', '0011_add_delhivery_warehouse_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaxRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('state_code', models.CharField(blank=True, max_length=10)),
+                ('hsn_code', models.CharField(blank=True, max_length=20)),
+                ('tax_rate', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('quantity', models.IntegerField(default=0)),
+                ('taxable_value', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cgst_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('sgst_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('igst_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tax_rollups', to='vendors.vendorprofile')),
+            ],
+            options={
+                'ordering': ['date'],
+                'indexes': [models.Index(fields=['vendor', 'date'], name='payments_ta_vendor__111e3e_idx')],
+                'constraints': [models.UniqueConstraint(fields=('date', 'vendor', 'state_code', 'hsn_code', 'tax_rate'), name='unique_tax_rollup_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0004_taxrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateCardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('carrier', models.CharField(choices=[('delhivery', 'Delhivery'), ('shiprocket', 'Shiprocket')], max_length=20)),
+                ('zone', models.CharField(choices=[('A', 'A - Within city'), ('B', 'B - Within state'), ('C', 'C - Metro to metro'), ('D', 'D - Rest of India'), ('E', 'E - Special (North East, J&K, islands)')], max_length=1)),
+                ('service_type', models.CharField(choices=[('surface', 'Surface'), ('express', 'Express')], default='surface', max_length=10)),
+                ('payment_mode', models.CharField(choices=[('Prepaid', 'Prepaid'), ('COD', 'COD')], default='Prepaid', max_length=10)),
+                ('weight_slab_grams', models.PositiveIntegerField(help_text='Upper bound of the weight slab')),
+                ('freight', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('cod_charge', models.DecimalField(decimal_places=2, default=0, help_text='Minimum COD charge', max_digits=10)),
+                ('cod_percent', models.DecimalField(decimal_places=2, default=0, help_text='COD charge as % of the amount', max_digits=5)),
+                ('source', models.CharField(choices=[('import', 'Imported rate card'), ('learned', 'Learned from live quote')], default='import', max_length=10)),
+                ('drift_samples', models.PositiveIntegerField(default=0)),
+                ('drift_total', models.DecimalField(decimal_places=4, default=0, max_digits=12)),
+                ('last_live_total', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('last_sampled_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['carrier', 'zone', 'service_type', 'payment_mode', 'weight_slab_grams'],
+                'constraints': [models.UniqueConstraint(fields=('carrier', 'zone', 'service_type', 'payment_mode', 'weight_slab_grams'), name='unique_rate_card_cell')],
+            },
+        ),
+    ]
@@ -97,3 +97,102 @@ class ShippingSettings(models.Model):
         """Get or create the singleton settings instance."""
         obj, created = cls.objects.get_or_create(pk=1)
         return obj
+
+
+class TaxRollup(models.Model):
+    """
+    Daily GST liability per (date, vendor, place of supply, HSN, rate), maintained
+    incrementally by payments.tax_rollup. Cancellations and refunds are posted as
+    negative amounts on the day they happen.
+    """
+    date = models.DateField()
+    vendor = models.ForeignKey('vendors.VendorProfile', on_delete=models.CASCADE, related_name='tax_rollups')
+    state_code = models.CharField(max_length=10, blank=True)
+    hsn_code = models.CharField(max_length=20, blank=True)
+    tax_rate = models.DecimalField(max_digits=5, decimal_places=2)
+
+    quantity = models.IntegerField(default=0)
+    taxable_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cgst_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    sgst_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    igst_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'vendor', 'state_code', 'hsn_code', 'tax_rate'], name='unique_tax_rollup_key'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['vendor', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.state_code} HSN {self.hsn_code or '-'} @ {self.tax_rate}%"
+
+
+class RateCardEntry(models.Model):
+    """
+    One cell of a carrier rate matrix: the charge for parcels up to `weight_slab_grams`
+    in a carrier zone. Imported from carrier rate CSVs or learned from live quotes, and
+    compared against sampled live quotes to track drift (see payments.rate_cards).
+    """
+    CARRIER_CHOICES = (
+        ('delhivery', 'Delhivery'),
+        ('shiprocket', 'Shiprocket'),
+    )
+    ZONE_CHOICES = (
+        ('A', 'A - Within city'),
+        ('B', 'B - Within state'),
+        ('C', 'C - Metro to metro'),
+        ('D', 'D - Rest of India'),
+        ('E', 'E - Special (North East, J&K, islands)'),
+    )
+    SERVICE_CHOICES = (
+        ('surface', 'Surface'),
+        ('express', 'Express'),
+    )
+    PAYMENT_MODE_CHOICES = (
+        ('Prepaid', 'Prepaid'),
+        ('COD', 'COD'),
+    )
+    SOURCE_CHOICES = (
+        ('import', 'Imported rate card'),
+        ('learned', 'Learned from live quote'),
+    )
+
+    carrier = models.CharField(max_length=20, choices=CARRIER_CHOICES)
+    zone = models.CharField(max_length=1, choices=ZONE_CHOICES)
+    service_type = models.CharField(max_length=10, choices=SERVICE_CHOICES, default='surface')
+    payment_mode = models.CharField(max_length=10, choices=PAYMENT_MODE_CHOICES, default='Prepaid')
+    weight_slab_grams = models.PositiveIntegerField(help_text="Upper bound of the weight slab")
+    freight = models.DecimalField(max_digits=10, decimal_places=2)
+    cod_charge = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Minimum COD charge")
+    cod_percent = models.DecimalField(max_digits=5, decimal_places=2, default=0, help_text="COD charge as % of the amount")
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default='import')
+
+    # Drift against sampled live quotes: sum of (live - card) / live over the samples
+    drift_samples = models.PositiveIntegerField(default=0)
+    drift_total = models.DecimalField(max_digits=12, decimal_places=4, default=0)
+    last_live_total = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    last_sampled_at = models.DateTimeField(null=True, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['carrier', 'zone', 'service_type', 'payment_mode', 'weight_slab_grams']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['carrier', 'zone', 'service_type', 'payment_mode', 'weight_slab_grams'],
+                name='unique_rate_card_cell'
+            ),
+        ]
+
+    @property
+    def mean_drift(self):
+        return self.drift_total / self.drift_samples if self.drift_samples else None
+
+    def __str__(self):
+        return f"{self.carrier} {self.zone} {self.service_type} {self.payment_mode} <= {self.weight_slab_grams} g"
@@ -0,0 +1,111 @@
+"""
+Versioned cache for checkout quotes computed by CalculateTotalsView.
+
+A quote is keyed by everything that can change its result:
+- the cart version (bumped on every CartItem write, see orders.signals)
+- the pricing rules version (bumped on deal, tax, shipping zone and price writes, see payments.signals)
+- today's date (deals start and end on date boundaries without any write)
+- which sale-window boundaries of the cart's products have passed (a sale starts or
+  ends at its own datetime, also without any write)
+- the request inputs: state, pincode, payment mode, coupon, selected items and gift option
+
+Identical repeat requests are served from the cache. The quote token returned to
+the client lets CheckoutView reuse the quoted tax and shipping instead of
+recomputing them, as long as nothing in the key has changed since.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.utils import timezone
+
+from config.cache_versions import get_version, bump_version
+from .tax_calculator import normalize_state_code
+
+logger = logging.getLogger(__name__)
+
+PRICING_RULES_VERSION = 'pricing_rules'
+QUOTE_KEY_PREFIX = 'payments:quote:'
+QUOTE_TOKEN_SALT = 'payments.quote'
+
+
+def get_rules_version():
+    return get_version(PRICING_RULES_VERSION)
+
+
+def bump_rules_version():
+    """Invalidate every cached quote (deal, tax rate, shipping zone or price change)"""
+    return bump_version(PRICING_RULES_VERSION)
+
+
+def _normalize_payment_mode(payment_mode):
+    """Map both checkout ('cod'/'razorpay') and totals ('COD'/'Prepaid') values to one form"""
+    return 'COD' if str(payment_mode or '').strip().upper() == 'COD' else 'Prepaid'
+
+
+def _sale_window_phase(cart):
+    """For each cart product with a sale window: has it started, has it ended"""
+    from django.db.models import Q
+
+    now = timezone.now()
+    windows = cart.items.filter(
+        Q(product__sale_price_start__isnull=False) | Q(product__sale_price_end__isnull=False)
+    ).values_list('product_id', 'product__sale_price_start', 'product__sale_price_end')
+    return ','.join(sorted(
+        f"{product_id}:{int(starts is not None and starts <= now)}{int(ends is not None and ends < now)}"
+        for product_id, starts, ends in windows
+    ))
+
+
+def build_quote_digest(cart, state_code, pincode=None, payment_mode='Prepaid',
+                       coupon_code=None, selected_item_ids=None, gift_option_id=None):
+    """Return the cache digest for a quote of `cart` with the given inputs"""
+    parts = [
+        cart.pk,
+        cart.version,
+        get_rules_version(),
+        timezone.localdate().isoformat(),
+        _sale_window_phase(cart),
+        normalize_state_code(state_code),
+        str(pincode or '').strip(),
+        _normalize_payment_mode(payment_mode),
+        str(coupon_code or '').strip().upper(),
+        ','.join(sorted(str(i) for i in (selected_item_ids or []))),
+        str(gift_option_id or ''),
+    ]
+    return hashlib.sha256('|'.join(str(p) for p in parts).encode()).hexdigest()
+
+
+def get_quote(digest):
+    return cache.get(f"{QUOTE_KEY_PREFIX}{digest}")
+
+
+def store_quote(digest, quote):
+    timeout = getattr(settings, 'QUOTE_CACHE_TIMEOUT', 900)
+    cache.set(f"{QUOTE_KEY_PREFIX}{digest}", quote, timeout=timeout)
+
+
+def make_quote_token(digest):
+    return signing.dumps(digest, salt=QUOTE_TOKEN_SALT)
+
+
+def resolve_quote_token(token, digest):
+    """
+    Return the cached quote for `token` if it is still valid for `digest`.
+
+    `digest` must be rebuilt from the current cart state and checkout inputs;
+    a token issued for an older cart version or rules version will not match
+    and None is returned so the caller recomputes.
+    """
+    if not token:
+        return None
+    try:
+        token_digest = signing.loads(token, salt=QUOTE_TOKEN_SALT)
+    except signing.BadSignature:
+        logger.warning("Rejected tampered or malformed quote token")
+        return None
+    if token_digest != digest:
+        return None
+    return get_quote(digest)
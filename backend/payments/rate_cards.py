@@ -0,0 +1,292 @@
+"""
+Carrier rate cards.
+
+Delhivery and Shiprocket price a parcel by carrier zone (A within city, B within
+state, C metro to metro, D rest of India, E special destinations), weight slab,
+payment mode and service type. RateCardEntry stores those matrices - imported
+from carrier rate CSVs (import_rate_card) or learned from live quotes - so
+checkout can answer quotes locally:
+
+- the zone of a route comes from the city and state of its origin and
+  destination pincodes in the pincode master (ShiprocketPincode)
+- all cells are compiled into one RateCard, versioned by the 'rate_cards' cache
+  version (bumped on RateCardEntry writes) and kept per process; a quote is a
+  dict lookup plus a bisect over the weight slabs of its cell
+- imported slabs cover every weight up to their bound and weights past the last
+  slab are extrapolated by its increment; learned cells only answer their slab
+- a fresh prepaid live quote for a route the card does not cover is stored as
+  a learned cell under the zone the carrier reported (COD charges depend on the
+  amount collected, so COD quotes are not learned). A learned cell stays off the
+  card until later live quotes of its cell agree with it: each adds a drift
+  sample, and RATE_CARD_LEARN_MIN_SAMPLES samples within RATE_CARD_LEARN_MAX_DRIFT
+  confirm it
+- a fraction (RATE_CARD_SAMPLE_RATE) of card quotes is re-quoted live in the
+  background to record drift on the cell that answered
+
+Live carrier calls are then only needed for uncovered routes and for booking.
+"""
+import logging
+import math
+import random
+from bisect import bisect_left
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from config.cache_versions import LocalCopy, bump_version, get_version
+from .rate_quotes import WEIGHT_SLAB_GRAMS
+
+logger = logging.getLogger(__name__)
+
+RATE_CARD_VERSION = 'rate_cards'
+RATE_CARD_KEY = 'payments:rate_card:{version}'
+RATE_CARD_TIMEOUT = 60 * 60 * 24
+PINCODE_REGION_KEY = 'payments:pincode_region:'
+PINCODE_REGION_TIMEOUT = 60 * 60 * 24
+
+CARRIER_DELHIVERY = 'delhivery'
+DEFAULT_SERVICE_TYPE = 'surface'
+CARRIER_ZONES = frozenset('ABCDE')
+
+_card_copy = LocalCopy(RATE_CARD_TIMEOUT)
+
+METRO_CITIES = frozenset({
+    'MUMBAI', 'DELHI', 'NEW DELHI', 'KOLKATA', 'CHENNAI', 'BENGALURU', 'BANGALORE', 'HYDERABAD',
+    'AHMEDABAD', 'PUNE',
+})
+SPECIAL_STATES = frozenset({
+    'ARUNACHAL PRADESH', 'ASSAM', 'MANIPUR', 'MEGHALAYA', 'MIZORAM', 'NAGALAND', 'SIKKIM', 'TRIPURA',
+    'JAMMU AND KASHMIR', 'JAMMU & KASHMIR', 'LADAKH', 'ANDAMAN AND NICOBAR ISLANDS',
+    'ANDAMAN & NICOBAR ISLANDS', 'LAKSHADWEEP',
+})
+
+
+def get_rate_card_version():
+    return get_version(RATE_CARD_VERSION)
+
+
+def bump_rate_card_version():
+    return bump_version(RATE_CARD_VERSION)
+
+
+def pincode_regions(pincodes):
+    """{pincode: (city, state)} upper-cased from the pincode master; unknown pincodes are left out"""
+    pincodes = {str(pincode).strip() for pincode in pincodes if pincode}
+    keys = {f'{PINCODE_REGION_KEY}{pincode}': pincode for pincode in pincodes}
+    regions = {keys[key]: tuple(region) for key, region in cache.get_many(list(keys)).items()}
+
+    missing = pincodes - regions.keys()
+    if missing:
+        from orders.shiprocket_models import ShiprocketPincode
+
+        found = {
+            pincode: (city.strip().upper(), state.strip().upper())
+            for pincode, city, state in ShiprocketPincode.objects.filter(
+                pincode__in=missing
+            ).values_list('pincode', 'city', 'state')
+        }
+        # Unknown pincodes are cached as () so they are not looked up on every quote
+        cache.set_many(
+            {f'{PINCODE_REGION_KEY}{pincode}': found.get(pincode, ()) for pincode in missing},
+            PINCODE_REGION_TIMEOUT
+        )
+        regions.update(found)
+    return {pincode: region for pincode, region in regions.items() if region}
+
+
+def carrier_zone(origin, destination):
+    """Carrier zone between two (city, state) regions, or None if either is unknown"""
+    if not origin or not destination:
+        return None
+    if origin == destination:
+        return 'A'
+    if origin[1] == destination[1]:
+        return 'B'
+    if destination[1] in SPECIAL_STATES:
+        return 'E'
+    if origin[0] in METRO_CITIES and destination[0] in METRO_CITIES:
+        return 'C'
+    return 'D'
+
+
+def route_zones(origins, destination_pincode):
+    """{name: carrier zone or None} for {name: origin pincode} shipping to `destination_pincode`"""
+    regions = pincode_regions([*origins.values(), destination_pincode])
+    destination = regions.get(str(destination_pincode).strip())
+    return {name: carrier_zone(regions.get(str(origin).strip()), destination) for name, origin in origins.items()}
+
+
+def slab_grams(weight_grams):
+    return max(1, math.ceil(weight_grams / WEIGHT_SLAB_GRAMS)) * WEIGHT_SLAB_GRAMS
+
+
+class RateCard:
+    """
+    Compiled rate cells: {(carrier, zone, service type, payment mode): slabs}, the
+    slabs being parallel tuples sorted by weight bound.
+    """
+
+    def __init__(self, cells):
+        self.cells = cells
+
+    def quote(self, carrier, zone, weight_grams, payment_mode='Prepaid', cod_amount=0,
+              service_type=DEFAULT_SERVICE_TYPE):
+        """Quote shaped like DelhiveryService.calculate_shipping_rate's, or None if the card does not cover it"""
+        cell = self.cells.get((carrier, zone, service_type, payment_mode))
+        if cell is None:
+            return None
+        bounds, freights, learned, cod_charges, cod_percents, entry_ids = cell
+
+        index = bisect_left(bounds, weight_grams)
+        if index < len(bounds):
+            if learned[index] and bounds[index] != slab_grams(weight_grams):
+                return None
+            freight = freights[index]
+        else:
+            if len(bounds) < 2 or learned[-1] or learned[-2]:
+                return None
+            index = len(bounds) - 1
+            steps = math.ceil((weight_grams - bounds[-1]) / (bounds[-1] - bounds[-2]))
+            freight = freights[-1] + steps * (freights[-1] - freights[-2])
+
+        cod_charge = Decimal('0')
+        if payment_mode == 'COD':
+            cod_charge = max(cod_charges[index], Decimal(str(cod_amount)) * cod_percents[index] / 100)
+            cod_charge = cod_charge.quantize(Decimal('0.01'))
+        return {
+            'success': True,
+            'source': 'rate_card',
+            'total_shipping': float(freight + cod_charge),
+            'freight_charge': float(freight),
+            'cod_charge': float(cod_charge),
+            'zone': zone,
+            'entry_id': entry_ids[index],
+        }
+
+    def quote_request(self, carrier, zone, request, service_type=DEFAULT_SERVICE_TYPE):
+        """Quote for a payments.rate_quotes.RateRequest (None without a zone)"""
+        if zone is None:
+            return None
+        return self.quote(carrier, zone, int(request.weight * 1000), request.payment_mode,
+                          request.cod_amount, service_type)
+
+
+def learned_cell_confirmed(drift_samples, drift_total):
+    """Whether enough live quotes agree with a learned cell for the card to use it"""
+    if drift_samples < getattr(settings, 'RATE_CARD_LEARN_MIN_SAMPLES', 3):
+        return False
+    return abs(drift_total / drift_samples) <= Decimal(str(getattr(settings, 'RATE_CARD_LEARN_MAX_DRIFT', 0.05)))
+
+
+def compile_rate_card():
+    from .models import RateCardEntry
+
+    grouped = {}
+    rows = RateCardEntry.objects.order_by('weight_slab_grams').values_list(
+        'carrier', 'zone', 'service_type', 'payment_mode', 'weight_slab_grams', 'freight', 'source',
+        'cod_charge', 'cod_percent', 'id', 'drift_samples', 'drift_total'
+    )
+    for (carrier, zone, service_type, payment_mode, bound, freight, source, cod_charge, cod_percent, entry_id,
+         drift_samples, drift_total) in rows:
+        if source == 'learned' and not learned_cell_confirmed(drift_samples, drift_total):
+            continue
+        grouped.setdefault((carrier, zone, service_type, payment_mode), []).append(
+            (bound, freight, source == 'learned', cod_charge, cod_percent, entry_id)
+        )
+    return RateCard({key: tuple(zip(*slabs)) for key, slabs in grouped.items()})
+
+
+def get_rate_card():
+    """Return the compiled rate card for the current rate card version"""
+    return _card_copy.get(RATE_CARD_KEY.format(version=get_rate_card_version()), compile_rate_card)
+
+
+def reported_zone(result):
+    """The carrier's own zone of a live quote ('D' for Delhivery's 'D' or 'D2'), or None"""
+    zone = str(result.get('zone') or '').strip().upper()[:1]
+    return zone if zone in CARRIER_ZONES else None
+
+
+def learn_quotes(carrier, requests, quotes, service_type=DEFAULT_SERVICE_TYPE):
+    """
+    Learn fresh prepaid live `quotes` ({name: result or None}) for routes the card
+    does not cover, or count them as drift samples on the unconfirmed learned cell
+    """
+    from .models import RateCardEntry
+
+    for name, result in quotes.items():
+        request = requests[name]
+        # Cached results were counted when fetched; COD charges depend on the amount collected
+        if not result or result.get('cached') or request.payment_mode != 'Prepaid':
+            continue
+        zone = reported_zone(result)
+        if zone is None:
+            continue
+        freight = Decimal(str(result.get('freight_charge', result['total_shipping'])))
+        try:
+            entry, created = RateCardEntry.objects.get_or_create(
+                carrier=carrier,
+                zone=zone,
+                service_type=service_type,
+                payment_mode=request.payment_mode,
+                weight_slab_grams=int(request.weight * 1000),
+                defaults={'freight': freight, 'source': 'learned'}
+            )
+            if created or entry.source != 'learned' or learned_cell_confirmed(entry.drift_samples, entry.drift_total):
+                continue
+            record_drift(entry.id, entry.freight, freight)
+            entry.refresh_from_db(fields=['drift_samples', 'drift_total'])
+            if learned_cell_confirmed(entry.drift_samples, entry.drift_total):
+                logger.info(f"Learned rate card cell {entry} confirmed by {entry.drift_samples} live quotes")
+                bump_rate_card_version()
+        except Exception as e:
+            logger.error(f"Could not learn rate card cell {carrier} {zone} {request.cache_key}: {e}")
+
+
+def should_sample():
+    return random.random() < getattr(settings, 'RATE_CARD_SAMPLE_RATE', 0)
+
+
+def drift_sample(request, quote):
+    """JSON-serializable sample comparing a card `quote` with a live quote for `request`"""
+    return {
+        'entry_id': quote['entry_id'],
+        'card_total': quote['total_shipping'],
+        'origin_pincode': request.origin_pincode,
+        'destination_pincode': request.destination_pincode,
+        'weight': request.weight,
+        'payment_mode': request.payment_mode,
+        'cod_amount': request.cod_amount,
+    }
+
+
+def enqueue_drift_samples(samples):
+    if not samples:
+        return
+    from .tasks import sample_rate_card_drift_task
+
+    try:
+        sample_rate_card_drift_task.delay(samples)
+    except Exception as e:
+        # Sampling is best effort - never quote live on the checkout path for it
+        logger.warning(f"Could not enqueue rate card drift samples: {e}")
+
+
+def record_drift(entry_id, card_total, live_total):
+    """Add one live sample to the drift of rate card cell `entry_id`"""
+    from .models import RateCardEntry
+
+    live_total = Decimal(str(live_total))
+    if live_total <= 0:
+        return
+    drift = ((live_total - Decimal(str(card_total))) / live_total).quantize(Decimal('0.0001'))
+    # .update() leaves the rate card version alone - drift does not change quotes
+    RateCardEntry.objects.filter(pk=entry_id).update(
+        drift_samples=F('drift_samples') + 1,
+        drift_total=F('drift_total') + drift,
+        last_live_total=live_total,
+        last_sampled_at=timezone.now(),
+    )
@@ -0,0 +1,119 @@
+"""
+Live carrier rate quotes for checkout, fetched concurrently and cached.
+
+ShippingCalculator needs one carrier quote per vendor in the cart (each vendor
+ships from its own pincode). Fetching them one after another with a 15 s
+timeout each let a slow carrier block a request for vendors x 15 s, so:
+
+- quotes are keyed by (origin pincode, destination pincode, weight slab, mode
+  and, for COD, the COD amount bucket) and cached for RATE_QUOTE_CACHE_TIMEOUT;
+  the carrier bills by slab, so every weight inside a slab shares one quote
+- missing quotes are fetched in parallel on a shared thread pool and the caller
+  waits at most RATE_QUOTE_DEADLINE seconds for all of them together
+- a quote that misses the deadline is reported as None (the caller falls back to
+  the zone rate for that vendor); the fetch still finishes in the background and
+  fills the cache for the next request
+"""
+import logging
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+RATE_KEY_PREFIX = 'payments:rate:'
+WEIGHT_SLAB_GRAMS = 500
+COD_AMOUNT_BUCKET = 500
+MAX_WORKERS = 16
+# HTTP timeout of one fetch; longer than the deadline so late quotes still land in the cache
+FETCH_TIMEOUT = 10
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='rate-quote')
+        return _executor
+
+
+def weight_slab(weight):
+    """Weight in kg rounded up to the carrier's billing slab"""
+    grams = max(1, math.ceil(float(weight) * 1000))
+    return math.ceil(grams / WEIGHT_SLAB_GRAMS) * WEIGHT_SLAB_GRAMS / 1000
+
+
+class RateRequest:
+    """One vendor's quote request, normalized to its cache key"""
+
+    def __init__(self, origin_pincode, destination_pincode, weight, payment_mode='Prepaid', cod_amount=0):
+        self.origin_pincode = str(origin_pincode).strip()
+        self.destination_pincode = str(destination_pincode).strip()
+        self.weight = weight_slab(weight)
+        self.payment_mode = 'COD' if str(payment_mode).upper() == 'COD' else 'Prepaid'
+        # COD charges depend on the amount collected; quote at the top of its bucket
+        self.cod_amount = (
+            math.ceil(float(cod_amount) / COD_AMOUNT_BUCKET) * COD_AMOUNT_BUCKET if self.payment_mode == 'COD' else 0
+        )
+
+    @property
+    def cache_key(self):
+        return (f"{RATE_KEY_PREFIX}{self.origin_pincode}:{self.destination_pincode}:"
+                f"{int(self.weight * 1000)}:{self.payment_mode}:{self.cod_amount}")
+
+
+def _fetch(service, request, timeout):
+    result = service.calculate_shipping_rate(
+        origin_pincode=request.origin_pincode,
+        destination_pincode=request.destination_pincode,
+        weight=request.weight,
+        payment_mode=request.payment_mode,
+        cod_amount=request.cod_amount,
+        timeout=timeout,
+    )
+    if result.get('success'):
+        result.pop('raw_response', None)
+        cache.set(request.cache_key, result, getattr(settings, 'RATE_QUOTE_CACHE_TIMEOUT', 1800))
+    return result
+
+
+def quote_rates(service, requests, deadline=None):
+    """
+    Quotes for {name: RateRequest} within `deadline` seconds in total.
+    Returns {name: result dict or None}; None means no quote in time or a carrier error.
+    """
+    deadline = getattr(settings, 'RATE_QUOTE_DEADLINE', 4) if deadline is None else deadline
+    results = {}
+    cached = cache.get_many([request.cache_key for request in requests.values()])
+
+    pending = {}
+    futures = {}
+    for name, request in requests.items():
+        if request.cache_key in cached:
+            results[name] = dict(cached[request.cache_key], cached=True)
+        elif request.cache_key in futures:
+            # Vendors with an identical quote key share one fetch
+            pending[name] = futures[request.cache_key]
+        else:
+            futures[request.cache_key] = pending[name] = _get_executor().submit(_fetch, service, request, FETCH_TIMEOUT)
+
+    if pending:
+        wait(set(pending.values()), timeout=deadline)
+    for name, future in pending.items():
+        if not future.done():
+            logger.warning(f"Rate quote {requests[name].cache_key} missed the {deadline}s deadline")
+            results[name] = None
+            continue
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.error(f"Rate quote {requests[name].cache_key} failed: {e}")
+            result = None
+        results[name] = result if result and result.get('success') else None
+    return results
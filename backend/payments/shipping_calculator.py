@@ -1,5 +1,6 @@
 from decimal import Decimal
 from payments.models import ShippingZone
+from payments.zone_table import DEFAULT_DELIVERY_ESTIMATE, get_zone_table
 
 
 class ShippingCalculator:
@@ -7,6 +8,8 @@ class ShippingCalculator:
     
     # Default origin pincode (can be overridden per vendor)
     DEFAULT_ORIGIN_PINCODE = '400001'  # Mumbai
+    # Flat rate when no shipping zone is configured
+    DEFAULT_FLAT_RATE = Decimal('50.00')
     
     def calculate_shipping(self, cart_items, state_code, subtotal=None, destination_pincode=None, payment_mode='Prepaid'):
         """
@@ -23,13 +26,9 @@ class ShippingCalculator:
         Returns:
             dict: Shipping cost breakdown
         """
-        # Calculate total weight first
-        total_weight = Decimal('0')
-        for item in cart_items:
-            product = item.product
-            quantity = item.quantity
-            weight = getattr(product, 'weight', 0.5) or 0.5
-            total_weight += Decimal(str(weight)) * quantity
+        # Chargeable (dead vs volumetric) weight of each vendor's items packed into boxes
+        vendor_weights = self._vendor_chargeable_weights(cart_items)
+        total_weight = sum(vendor_weights.values(), Decimal('0'))
         
         # Try live Delhivery rates first
         if destination_pincode:
@@ -38,7 +37,9 @@ class ShippingCalculator:
                 destination_pincode=destination_pincode,
                 total_weight=float(total_weight),
                 subtotal=subtotal,
-                payment_mode=payment_mode
+                payment_mode=payment_mode,
+                vendor_weights=vendor_weights,
+                state_code=state_code
             )
             
             if live_result and live_result.get('success'):
@@ -47,18 +48,28 @@ class ShippingCalculator:
         # Fallback to static zone-based calculation
         return self._calculate_static_shipping(cart_items, state_code, subtotal, total_weight)
     
-    def _calculate_live_shipping(self, cart_items, destination_pincode, total_weight, subtotal=None, payment_mode='Prepaid'):
+    def _vendor_chargeable_weights(self, cart_items):
+        """{vendor_id: chargeable weight (kg)} with each vendor's items packed by orders.packing"""
+        from orders.packing import active_boxes, chargeable_weight, pack_lines
+        
+        lines_by_vendor = {}
+        for item in cart_items:
+            vendor_id = item.product.vendor_id or 0
+            lines_by_vendor.setdefault(vendor_id, []).append((item.product.id, item.product, item.quantity))
+        boxes = active_boxes()
+        return {
+            vendor_id: chargeable_weight(pack_lines(lines, boxes))
+            for vendor_id, lines in lines_by_vendor.items()
+        }
+    
+    def _calculate_live_shipping(self, cart_items, destination_pincode, total_weight, subtotal=None, payment_mode='Prepaid',
+                                 vendor_weights=None, state_code=None):
         """
-        Calculate shipping using Delhivery API.
-        Groups by vendor and calculates rate for each.
+        Calculate shipping using Delhivery rates.
+        Groups by vendor and answers from the carrier rate card (payments.rate_cards) where it
+        covers the route; the rest are quoted live concurrently (payments.rate_quotes). A vendor
+        without a quote in time is charged the zone rate for its parcel.
         """
-        try:
-            from orders.delhivery_service import DelhiveryService
-            service = DelhiveryService()
-        except (ValueError, ImportError) as e:
-            # DELHIVERY_TOKEN not configured - fall back to static
-            return None
-        
         # Group items by vendor to get origin pincodes
         items_by_vendor = {}
         for item in cart_items:
@@ -72,54 +83,90 @@ class ShippingCalculator:
                     'subtotal': Decimal('0')
                 }
             items_by_vendor[vendor_id]['items'].append(item)
-            weight = getattr(item.product, 'weight', 0.5) or 0.5
-            items_by_vendor[vendor_id]['weight'] += Decimal(str(weight)) * item.quantity
             items_by_vendor[vendor_id]['subtotal'] += Decimal(str(item.product.price)) * item.quantity
         
-        total_shipping = Decimal('0')
-        vendor_breakdown = []
+        if vendor_weights is None:
+            vendor_weights = self._vendor_chargeable_weights(cart_items)
+        for vendor_id, weight in vendor_weights.items():
+            items_by_vendor[vendor_id]['weight'] = weight
         
+        from .rate_cards import (
+            CARRIER_DELHIVERY, drift_sample, enqueue_drift_samples, get_rate_card, learn_quotes, route_zones,
+            should_sample
+        )
+        from .rate_quotes import RateRequest
+        
+        rate_requests = {}
         for vendor_id, data in items_by_vendor.items():
             vendor = data['vendor']
             origin_pincode = getattr(vendor, 'zip_code', '') if vendor else ''
-            if not origin_pincode:
-                origin_pincode = self.DEFAULT_ORIGIN_PINCODE
-            
-            # Calculate COD amount for this vendor's items
-            cod_amount = float(data['subtotal']) if payment_mode == 'COD' else 0
-            
-            # Call Delhivery API
-            result = service.calculate_shipping_rate(
-                origin_pincode=origin_pincode,
+            data['origin_pincode'] = origin_pincode or self.DEFAULT_ORIGIN_PINCODE
+            rate_requests[vendor_id] = RateRequest(
+                origin_pincode=data['origin_pincode'],
                 destination_pincode=destination_pincode,
-                weight=float(data['weight']),
+                weight=data['weight'],
                 payment_mode=payment_mode,
-                cod_amount=cod_amount
+                # COD amount for this vendor's items
+                cod_amount=data['subtotal'] if payment_mode == 'COD' else 0
             )
+        
+        # Rate card first; a sample of its answers is re-quoted live in the background for drift
+        zones = route_zones({vendor_id: r.origin_pincode for vendor_id, r in rate_requests.items()}, destination_pincode)
+        rate_card = get_rate_card()
+        quotes = {}
+        samples = []
+        for vendor_id, rate_request in rate_requests.items():
+            quote = rate_card.quote_request(CARRIER_DELHIVERY, zones[vendor_id], rate_request)
+            if quote:
+                quotes[vendor_id] = quote
+                if should_sample():
+                    samples.append(drift_sample(rate_request, quote))
+        enqueue_drift_samples(samples)
+        
+        # Quote the uncovered vendors live (cached, within one overall deadline) and learn their cells
+        live_requests = {vendor_id: r for vendor_id, r in rate_requests.items() if vendor_id not in quotes}
+        if live_requests:
+            live_quotes = self._quote_live(live_requests)
+            learn_quotes(CARRIER_DELHIVERY, live_requests, live_quotes)
+            quotes.update(live_quotes)
+        
+        if not any(quotes.values()):
+            # No live quote at all - use the static zone calculation for the whole cart
+            return None
+        
+        zone = None
+        total_shipping = Decimal('0')
+        vendor_breakdown = []
+        
+        for vendor_id, data in items_by_vendor.items():
+            vendor = data['vendor']
+            result = quotes[vendor_id]
             
-            if result.get('success'):
+            if result:
                 shipping_cost = Decimal(str(result.get('total_shipping', 0)))
-                total_shipping += shipping_cost
-                vendor_breakdown.append({
-                    'vendor_id': vendor_id,
-                    'vendor_name': vendor.store_name if vendor else 'Default',
-                    'origin_pincode': origin_pincode,
-                    'shipping_cost': float(shipping_cost),
-                    'zone': result.get('zone', 'Unknown')
-                })
+                rate_source = result.get('source') or ('cache' if result.get('cached') else 'delhivery_live')
+                zone_name = result.get('zone', 'Unknown')
             else:
-                # If any vendor fails, return None to trigger fallback
-                return None
+                # Carrier too slow or failing for this vendor: zone rate for its parcel
+                if zone is None:
+                    zone = self._find_zone(state_code)
+                shipping_cost = self._zone_rate(zone, data['weight'])
+                rate_source = 'zone_fallback'
+                zone_name = zone.name if zone else 'Default'
+            
+            total_shipping += shipping_cost
+            vendor_breakdown.append({
+                'vendor_id': vendor_id,
+                'vendor_name': vendor.store_name if vendor else 'Default',
+                'origin_pincode': data['origin_pincode'],
+                'shipping_cost': float(shipping_cost),
+                'zone': zone_name,
+                'source': rate_source
+            })
         
         # Check free shipping threshold from settings (not hardcoded)
         free_shipping = False
-        threshold = None
-        try:
-            from payments.models import ShippingSettings
-            settings_obj = ShippingSettings.get_settings()
-            threshold = settings_obj.free_shipping_threshold
-        except Exception:
-            pass  # If settings not available, no free shipping
+        threshold = get_zone_table().free_shipping_threshold
         
         if threshold and subtotal:
             if Decimal(str(subtotal)) >= threshold:
@@ -139,43 +186,47 @@ class ShippingCalculator:
             'vendor_breakdown': vendor_breakdown
         }
     
+    def _quote_live(self, rate_requests):
+        """Live Delhivery quotes {name: result or None}; all None without a DELHIVERY_TOKEN"""
+        try:
+            from orders.delhivery_service import DelhiveryService
+            service = DelhiveryService()
+        except (ValueError, ImportError):
+            return dict.fromkeys(rate_requests)
+        
+        from .rate_quotes import quote_rates
+        return quote_rates(service, rate_requests)
+    
+    def _find_zone(self, state_code):
+        """Compiled zone covering the state, else the 'Default' zone (None if neither)"""
+        return get_zone_table().zone_for(state_code)
+    
+    def _zone_rate(self, zone, weight):
+        """Zone rate for one parcel of `weight` kg (the flat default without a zone)"""
+        if zone is None:
+            return self.DEFAULT_FLAT_RATE
+        return zone.rate(weight)
+    
     def _calculate_static_shipping(self, cart_items, state_code, subtotal=None, total_weight=None):
         """Fallback static zone-based shipping calculation."""
         try:
             # Calculate weight if not provided
             if total_weight is None:
-                total_weight = Decimal('0')
-                for item in cart_items:
-                    product = item.product
-                    quantity = item.quantity
-                    weight = getattr(product, 'weight', 0.5) or 0.5
-                    total_weight += Decimal(str(weight)) * quantity
+                total_weight = sum(self._vendor_chargeable_weights(cart_items).values(), Decimal('0'))
             
             # Find shipping zone for the state
-            all_zones = ShippingZone.objects.filter(is_active=True)
-            zone = None
-            
-            for z in all_zones:
-                if z.states and state_code in z.states:
-                    zone = z
-                    break
+            zone = self._find_zone(state_code)
             
             if not zone:
-                zone = ShippingZone.objects.filter(
-                    name='Default',
-                    is_active=True
-                ).first()
-                
-                if not zone:
-                    return {
-                        'success': True,
-                        'source': 'static_fallback',
-                        'zone': 'Default',
-                        'base_rate': 50.00,
-                        'weight_charge': 0.00,
-                        'total_shipping': 50.00,
-                        'free_shipping': False
-                    }
+                return {
+                    'success': True,
+                    'source': 'static_fallback',
+                    'zone': 'Default',
+                    'base_rate': 50.00,
+                    'weight_charge': 0.00,
+                    'total_shipping': 50.00,
+                    'free_shipping': False
+                }
             
             # Check for free shipping threshold
             if zone.free_shipping_threshold and subtotal:
@@ -247,25 +298,8 @@ class ShippingCalculator:
         from datetime import datetime, timedelta
         
         try:
-            # Find shipping zone for the state (Python filtering for SQLite compatibility)
-            all_zones = ShippingZone.objects.filter(is_active=True)
-            zone = None
-            
-            for z in all_zones:
-                if z.states and state_code in z.states:
-                    zone = z
-                    break
-            
-            # Default delivery estimates
-            if zone and 'Metro' in zone.name:
-                min_days = 2
-                max_days = 4
-            elif zone and 'North' in zone.name or 'South' in zone.name:
-                min_days = 3
-                max_days = 6
-            else:
-                min_days = 5
-                max_days = 10
+            zone = self._find_zone(state_code)
+            min_days, max_days = (zone.min_days, zone.max_days) if zone else DEFAULT_DELIVERY_ESTIMATE
             
             today = datetime.now()
             min_date = today + timedelta(days=min_days)
@@ -0,0 +1,129 @@
+import logging
+
+from django.db.models.signals import post_save, post_delete, pre_save, m2m_changed
+from django.dispatch import receiver
+from homepage.models import DealOfTheDay
+from products.models import Product, TaxSlab, Coupon as LegacyCoupon
+from products.phase3_models import ProductBundle
+from promotions.engine import redeem_order_coupon
+from promotions.models import Coupon
+from orders.models import GiftOption, Order, OrderReturn, PackagingBox
+from orders.search import schedule_reindex
+from .models import Payment, RateCardEntry, ShippingZone, ShippingSettings, TaxRate
+from .quote_cache import bump_rules_version
+from .rate_cards import bump_rate_card_version
+from .zone_table import bump_zone_table_version
+from . import tax_rollup
+
+logger = logging.getLogger(__name__)
+
+# Fields on Product that feed into a checkout quote (price and sale window, tax, and shipping weight and packed size)
+PRODUCT_PRICING_FIELDS = (
+    'price', 'regular_price', 'sale_price', 'sale_price_start', 'sale_price_end',
+    'tax_slab_id', 'weight', 'length', 'width', 'height', 'vendor_id',
+)
+
+
+@receiver(post_save, sender=DealOfTheDay)
+@receiver(post_delete, sender=DealOfTheDay)
+@receiver(post_save, sender=TaxSlab)
+@receiver(post_delete, sender=TaxSlab)
+@receiver(post_save, sender=TaxRate)
+@receiver(post_delete, sender=TaxRate)
+@receiver(post_save, sender=GiftOption)
+@receiver(post_delete, sender=GiftOption)
+@receiver(post_save, sender=Coupon)
+@receiver(post_delete, sender=Coupon)
+@receiver(post_save, sender=LegacyCoupon)
+@receiver(post_delete, sender=LegacyCoupon)
+@receiver(post_save, sender=ProductBundle)
+@receiver(post_delete, sender=ProductBundle)
+@receiver(post_save, sender=PackagingBox)
+@receiver(post_delete, sender=PackagingBox)
+def invalidate_quotes_on_rule_change(sender, instance, **kwargs):
+    """Any deal, promotion, tax or shipping configuration write invalidates all cached quotes and rule sets"""
+    bump_rules_version()
+
+
+@receiver(post_save, sender=ShippingZone)
+@receiver(post_delete, sender=ShippingZone)
+@receiver(post_save, sender=ShippingSettings)
+def invalidate_zone_table(sender, instance, **kwargs):
+    """Zones price shipping, so quotes go stale with the zone table"""
+    bump_zone_table_version()
+    bump_rules_version()
+
+
+@receiver(post_save, sender=RateCardEntry)
+@receiver(post_delete, sender=RateCardEntry)
+def invalidate_rate_card(sender, instance, **kwargs):
+    """Recompile the rate card; imported or edited cells also change cached quotes"""
+    bump_rate_card_version()
+    # Learned cells hold the live rate the cached quotes were computed with
+    if instance.source != 'learned':
+        bump_rules_version()
+
+
+@receiver(m2m_changed, sender=Coupon.applicable_products.through)
+@receiver(m2m_changed, sender=Coupon.applicable_categories.through)
+@receiver(m2m_changed, sender=LegacyCoupon.specific_products.through)
+@receiver(m2m_changed, sender=LegacyCoupon.specific_categories.through)
+@receiver(m2m_changed, sender=ProductBundle.bundled_products.through)
+def invalidate_quotes_on_rule_membership_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_rules_version()
+
+
+@receiver(pre_save, sender=Product)
+def flag_product_pricing_change(sender, instance, **kwargs):
+    """Only price/tax/weight/dimension changes invalidate quotes - stock updates must not"""
+    if not instance.pk:
+        return
+    old = Product.objects.filter(pk=instance.pk).values(*PRODUCT_PRICING_FIELDS).first()
+    if old and any(old[field] != getattr(instance, field) for field in PRODUCT_PRICING_FIELDS):
+        instance._pricing_changed = True
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_quotes_on_price_change(sender, instance, **kwargs):
+    if kwargs.get('signal') is post_delete or getattr(instance, '_pricing_changed', False):
+        instance._pricing_changed = False
+        bump_rules_version()
+
+
+@receiver(post_save, sender=Order)
+def sync_order_tax_rollup(sender, instance, created, **kwargs):
+    """Post paid/COD orders to the GST rollup and reverse cancelled or refunded ones"""
+    # Lines are created after the order row, so a new order is posted on its next save
+    if not created:
+        tax_rollup.sync_order(instance)
+
+
+@receiver(post_save, sender=Order)
+def redeem_coupon_on_payment(sender, instance, **kwargs):
+    """A Razorpay order's coupon counts against its limits once the order is paid"""
+    if instance.payment_status == 'paid' and instance.coupon_data and not instance.coupon_redeemed:
+        if not redeem_order_coupon(instance):
+            logger.warning(
+                f"Coupon {instance.coupon_data['code']} was over its usage limit when order {instance.id} was paid"
+            )
+
+
+@receiver(pre_save, sender=OrderReturn)
+def remember_return_status(sender, instance, **kwargs):
+    instance._previous_status = (
+        OrderReturn.objects.filter(pk=instance.pk).values_list('status', flat=True).first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=OrderReturn)
+def post_refunded_return(sender, instance, **kwargs):
+    if instance.status == 'refunded' and instance._previous_status != 'refunded':
+        tax_rollup.post_return_refund(instance)
+
+
+@receiver(post_save, sender=Payment)
+def reindex_order_on_payment(sender, instance, **kwargs):
+    """Razorpay order / payment ids are searchable on the order"""
+    schedule_reindex(instance.order_id)
@@ -0,0 +1,31 @@
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def sample_rate_card_drift_task(samples):
+    """Quote sampled rate card answers live and record the drift (see payments.rate_cards)"""
+    from orders.delhivery_service import DelhiveryService
+    from .rate_cards import record_drift
+    from .rate_quotes import FETCH_TIMEOUT, RateRequest, quote_rates
+
+    try:
+        service = DelhiveryService()
+    except ValueError as e:
+        logger.warning(f"Rate card drift sampling skipped: {e}")
+        return 0
+
+    requests = {
+        index: RateRequest(sample['origin_pincode'], sample['destination_pincode'], sample['weight'],
+                           sample['payment_mode'], sample['cod_amount'])
+        for index, sample in enumerate(samples)
+    }
+    quotes = quote_rates(service, requests, deadline=FETCH_TIMEOUT)
+    recorded = 0
+    for index, sample in enumerate(samples):
+        if quotes[index]:
+            record_drift(sample['entry_id'], sample['card_total'], quotes[index]['total_shipping'])
+            recorded += 1
+    return recorded
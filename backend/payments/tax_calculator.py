@@ -174,13 +174,14 @@ class TaxCalculator:
             'tax_rate': float(total_rate)
         }
     
-    def calculate_gst_with_slabs(self, cart_items, customer_state):
+    def calculate_gst_with_slabs(self, cart_items, customer_state, prices=None):
         """
         Calculate GST for cart items using product-specific tax slabs
         
         Args:
             cart_items: QuerySet of CartItem objects
             customer_state: Customer's state code
+            prices: Optional {product_id: price info} from PriceCalculatorService.resolve_prices
         
         Returns:
             dict: Detailed tax breakdown per item and total
@@ -207,7 +208,9 @@ class TaxCalculator:
             quantity = Decimal(str(item.quantity))
             
             # Get price (handle deals if exists)
-            if hasattr(product, 'active_deal') and product.active_deal:
+            if prices and product.id in prices:
+                price = Decimal(str(prices[product.id]['price']))
+            elif hasattr(product, 'active_deal') and product.active_deal:
                 price = Decimal(str(product.active_deal.discounted_price))
             else:
                 price = Decimal(str(product.price))
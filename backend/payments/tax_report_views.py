@@ -0,0 +1,104 @@
+"""
+GST reports served from the daily TaxRollup (see payments.tax_rollup).
+
+Both reports take ?month=YYYY-MM (default: current month) or
+?date_from=YYYY-MM-DD&date_to=YYYY-MM-DD. Admins see all vendors or one with
+?vendor_id=; vendors only see their own figures.
+"""
+from datetime import date
+
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .models import TaxRollup
+from .tax_calculator import TaxCalculator
+
+AMOUNTS = {
+    'taxable_value': Sum('taxable_value'),
+    'igst_amount': Sum('igst_amount'),
+    'cgst_amount': Sum('cgst_amount'),
+    'sgst_amount': Sum('sgst_amount'),
+}
+
+
+def _period(params):
+    """(first day, last day) from ?month= or ?date_from/date_to; None if invalid"""
+    if params.get('date_from') or params.get('date_to'):
+        try:
+            # parse_date returns None for a malformed string but raises on an impossible date
+            start, end = parse_date(params.get('date_from') or ''), parse_date(params.get('date_to') or '')
+        except ValueError:
+            return None
+        return (start, end) if start and end and start <= end else None
+    month = params.get('month') or timezone.localdate().strftime('%Y-%m')
+    try:
+        year, month = (int(part) for part in month.split('-'))
+        start = date(year, month, 1)
+    except ValueError:
+        return None
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, date.fromordinal(end.toordinal() - 1)
+
+
+class GSTReportView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        period = _period(request.query_params)
+        if period is None:
+            return Response(
+                {'error': 'Use month=YYYY-MM or date_from and date_to as YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rollups = TaxRollup.objects.filter(date__range=period)
+        if request.user.is_staff or request.user.is_superuser:
+            vendor_id = request.query_params.get('vendor_id')
+            if vendor_id:
+                if not vendor_id.isdigit():
+                    return Response({'error': 'vendor_id must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+                rollups = rollups.filter(vendor_id=vendor_id)
+        elif hasattr(request.user, 'vendor_profile'):
+            rollups = rollups.filter(vendor=request.user.vendor_profile)
+        else:
+            return Response({'error': 'Only vendors and admins can view GST reports'},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        return Response({
+            'period': {'from': period[0], 'to': period[1]},
+            **self.build(rollups),
+        })
+
+    def build(self, rollups):
+        raise NotImplementedError
+
+
+class GSTR1ReportView(GSTReportView):
+    """Outward supplies: B2C summary by place of supply and rate, and the HSN summary"""
+
+    def build(self, rollups):
+        b2cs = rollups.values('state_code', 'tax_rate').annotate(**AMOUNTS).order_by('state_code', 'tax_rate')
+        hsn = rollups.values('hsn_code', 'tax_rate').annotate(
+            quantity=Sum('quantity'), **AMOUNTS
+        ).order_by('hsn_code', 'tax_rate')
+        return {'b2cs': list(b2cs), 'hsn_summary': list(hsn)}
+
+
+class GSTR3BReportView(GSTReportView):
+    """Summary return: 3.1(a) outward taxable supplies and 3.2 inter-state supplies to unregistered persons"""
+
+    def build(self, rollups):
+        totals = rollups.aggregate(**AMOUNTS)
+        outward = {field: value or 0 for field, value in totals.items()}
+        inter_state = rollups.exclude(state_code__in=['', TaxCalculator().business_state]).values(
+            'state_code'
+        ).annotate(taxable_value=Sum('taxable_value'), igst_amount=Sum('igst_amount')).order_by('state_code')
+        return {
+            'outward_taxable_supplies': outward,
+            'inter_state_unregistered': list(inter_state),
+        }
@@ -0,0 +1,289 @@
+"""
+Daily GST rollup.
+
+TaxRollup keeps one row per (date, vendor, place of supply, HSN, tax rate) with
+the taxable value and CGST/SGST/IGST, so GST reports read a few thousand rollup
+rows instead of every order line since launch.
+
+The rollup is maintained incrementally (see payments.signals):
+- an order is posted once it is paid (or placed as COD), dated the day it was
+  placed like in rebuild(), whenever the payment arrives; Order.tax_posted
+  guards against posting twice
+- partial cancellations and refunded returns post negative amounts for the units
+- a fully cancelled or refunded order reverses what is still posted
+Adjustments are dated the day they happen, like a credit note.
+
+rebuild() recomputes the whole table from live and archived orders
+(manage.py rebuild_tax_rollup).
+"""
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import TaxRollup
+from .tax_calculator import TaxCalculator, normalize_state_code
+
+logger = logging.getLogger(__name__)
+
+TAXABLE_PAYMENT_STATUSES = ('paid', 'cod')
+REVERSED_ORDER_STATUSES = ('CANCELLED', 'FAILED', 'REFUNDED')
+AMOUNT_FIELDS = ('quantity', 'taxable_value', 'cgst_amount', 'sgst_amount', 'igst_amount')
+CENT = Decimal('0.01')
+
+
+def place_of_supply(order):
+    address = order.shipping_address_data or {}
+    return normalize_state_code(address.get('state_code') or address.get('state') or '')
+
+
+def _line_amounts(item, quantity, inter_state):
+    """Taxable value and GST for `quantity` units of an order line"""
+    share = Decimal(quantity) / Decimal(item.quantity)
+    cgst, sgst, igst = (Decimal(str(value)) for value in (item.cgst_amount, item.sgst_amount, item.igst_amount))
+    amounts = {
+        'quantity': quantity,
+        'taxable_value': Decimal(str(item.price)) * quantity,
+        'cgst_amount': Decimal('0'),
+        'sgst_amount': Decimal('0'),
+        'igst_amount': Decimal('0'),
+    }
+    # Checkout stores an inter-state tax as a CGST/SGST split for display; GST returns need IGST
+    if inter_state:
+        amounts['igst_amount'] = (cgst + sgst + igst) * share
+    else:
+        amounts['cgst_amount'] = cgst * share
+        amounts['sgst_amount'] = sgst * share
+    return amounts
+
+
+def _accumulate(totals, day, order, lines, sign, business_state):
+    """Add (item, quantity) lines of `order` into {rollup key: amounts}"""
+    state = place_of_supply(order)
+    inter_state = bool(state) and state != business_state
+    for item, quantity in lines:
+        if quantity <= 0:
+            continue
+        key = (day, item.vendor_id, state, item.hsn_code or '', item.tax_rate)
+        row = totals[key]
+        for field, value in _line_amounts(item, quantity, inter_state).items():
+            row[field] = row.get(field, 0) + sign * value
+
+
+def _apply(totals):
+    for (day, vendor_id, state, hsn, rate), amounts in totals.items():
+        key = {'date': day, 'vendor_id': vendor_id, 'state_code': state, 'hsn_code': hsn, 'tax_rate': rate}
+        values = {field: amounts[field] if field == 'quantity' else amounts[field].quantize(CENT)
+                  for field in AMOUNT_FIELDS}
+        increments = {field: F(field) + value for field, value in values.items()}
+        if TaxRollup.objects.filter(**key).update(**increments):
+            continue
+        try:
+            with transaction.atomic():
+                TaxRollup.objects.create(**key, **values)
+        except IntegrityError:
+            # Another writer created the row first
+            TaxRollup.objects.filter(**key).update(**increments)
+
+
+def _post(order, lines, sign, day=None):
+    totals = defaultdict(dict)
+    _accumulate(totals, day or timezone.localdate(), order, lines, sign, TaxCalculator().business_state)
+    _apply(totals)
+
+
+def _refunded_return_quantities(order):
+    from orders.models import OrderReturn
+
+    return dict(
+        OrderReturn.objects.filter(order=order, status='refunded', order_item__isnull=False)
+        .values_list('order_item_id').annotate(total=Sum('quantity'))
+    )
+
+
+def _open_lines(order):
+    """(item, units still counted) for every line of a posted order"""
+    returned = _refunded_return_quantities(order)
+    return [
+        (item, item.quantity - item.cancelled_quantity - returned.get(item.id, 0))
+        for item in order.items.all()
+    ]
+
+
+@transaction.atomic
+def post_order(order):
+    """Count a paid / COD order in the rollup (once)"""
+    from orders.models import Order
+
+    if not Order.objects.filter(pk=order.pk, tax_posted=False).update(tax_posted=True):
+        return False
+    order.tax_posted = True
+    # Same dates as rebuild(): the sale on the order date, earlier cancellations on their own
+    totals = defaultdict(dict)
+    business_state = TaxCalculator().business_state
+    items = list(order.items.all())
+    _accumulate(totals, timezone.localdate(order.created_at), order,
+                [(item, item.quantity) for item in items], 1, business_state)
+    for item in items:
+        if item.cancelled_quantity:
+            day = timezone.localdate(item.cancelled_at or order.updated_at)
+            _accumulate(totals, day, order, [(item, item.cancelled_quantity)], -1, business_state)
+    _apply(totals)
+    return True
+
+
+@transaction.atomic
+def reverse_order(order):
+    """Take a cancelled or refunded order back out of the rollup"""
+    from orders.models import Order
+
+    if not Order.objects.filter(pk=order.pk, tax_posted=True).update(tax_posted=False):
+        return False
+    order.tax_posted = False
+    _post(order, _open_lines(order), -1)
+    return True
+
+
+def post_cancellation(order_item, quantity):
+    """Net out partially cancelled units of a posted order"""
+    from orders.models import Order
+
+    if Order.objects.filter(pk=order_item.order_id, tax_posted=True).exists():
+        _post(order_item.order, [(order_item, quantity)], -1)
+
+
+def post_return_refund(order_return):
+    """Net out the units of a refunded return (the whole order if no line is given)"""
+    from orders.models import Order
+
+    order = order_return.order
+    if order_return.order_item_id is None:
+        reverse_order(order)
+    elif Order.objects.filter(pk=order.pk, tax_posted=True).exists():
+        _post(order, [(order_return.order_item, order_return.quantity)], -1)
+
+
+def sync_order(order):
+    """Post or reverse `order` according to its current payment and order status"""
+    taxable = order.payment_status in TAXABLE_PAYMENT_STATUSES and order.status not in REVERSED_ORDER_STATUSES
+    if taxable and not order.tax_posted:
+        post_order(order)
+    elif not taxable and order.tax_posted:
+        reverse_order(order)
+
+
+def _rebuild_order(totals, order, items, order_returns, business_state):
+    """Accumulate one order the way rebuild() dates it; True if it ends up posted"""
+    _accumulate(totals, timezone.localdate(order.created_at), order,
+                [(item, item.quantity) for item in items], 1, business_state)
+    for item in items:
+        if item.cancelled_quantity:
+            day = timezone.localdate(item.cancelled_at or order.updated_at)
+            _accumulate(totals, day, order, [(item, item.cancelled_quantity)], -1, business_state)
+    for order_return in order_returns:
+        day = timezone.localdate(order_return.refunded_at or order_return.updated_at)
+        _accumulate(totals, day, order, [(order_return.order_item, order_return.quantity)], -1, business_state)
+
+    if order.payment_status in TAXABLE_PAYMENT_STATUSES and order.status not in REVERSED_ORDER_STATUSES:
+        return True
+    returned = defaultdict(int)
+    for order_return in order_returns:
+        returned[order_return.order_item_id] += order_return.quantity
+    _accumulate(totals, timezone.localdate(order.updated_at), order, [
+        (item, item.quantity - item.cancelled_quantity - returned[item.id]) for item in items
+    ], -1, business_state)
+    return False
+
+
+def _restore(model, row):
+    """Unsaved `model` instance from a row archived by orders.archive"""
+    return model(**{
+        field.attname: field.to_python(row[field.attname])
+        for field in model._meta.concrete_fields if field.attname in row
+    })
+
+
+def _archived_orders(chunk_size=1000):
+    """(order, items, refunded line returns) rebuilt from the order archive, for rebuild()"""
+    from orders.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem, OrderReturn
+
+    archived = ArchivedOrder.objects.filter(
+        payment_status__in=TAXABLE_PAYMENT_STATUSES + ('refunded',)
+    ).order_by('order_id')
+    last_id = 0
+    while True:
+        chunk = list(archived.filter(order_id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        last_id = chunk[-1].order_id
+        items = defaultdict(list)
+        for row in ArchivedOrderItem.objects.filter(order_id__in=[a.order_id for a in chunk]).values_list('data', flat=True):
+            item = _restore(OrderItem, row)
+            items[item.order_id].append(item)
+        for entry in chunk:
+            data = entry.data.get('order', {})
+            order = Order(
+                id=entry.order_id, status=entry.status, payment_status=entry.payment_status,
+                created_at=entry.created_at, shipping_address_data=data.get('shipping_address_data') or {},
+                updated_at=Order._meta.get_field('updated_at').to_python(data.get('updated_at')) or entry.created_at,
+            )
+            lines = {item.id: item for item in items[entry.order_id]}
+            order_returns = []
+            for row in entry.data.get('related', {}).get('returns', []):
+                order_return = _restore(OrderReturn, row)
+                if order_return.status == 'refunded' and order_return.order_item_id in lines:
+                    order_return.order_item = lines[order_return.order_item_id]
+                    order_returns.append(order_return)
+            yield order, list(lines.values()), order_returns
+
+
+@transaction.atomic
+def rebuild():
+    """
+    Recompute the rollup from all orders, live and archived: sales on the order
+    date, partial cancellations and refunded returns on their own dates, and full
+    reversals on the order's last update. Returns the number of rollup rows written.
+    """
+    from orders.models import Order, OrderReturn
+
+    business_state = TaxCalculator().business_state
+    totals = defaultdict(dict)
+    posted_ids = []
+
+    orders = Order.objects.filter(
+        payment_status__in=TAXABLE_PAYMENT_STATUSES + ('refunded',)
+    ).prefetch_related('items').order_by('id')
+    returns = defaultdict(list)
+    for order_return in OrderReturn.objects.filter(status='refunded', order_item__isnull=False).select_related('order_item'):
+        returns[order_return.order_id].append(order_return)
+
+    for order in orders.iterator(chunk_size=1000):
+        if _rebuild_order(totals, order, list(order.items.all()), returns.get(order.id, []), business_state):
+            posted_ids.append(order.id)
+    # Archived orders are gone from Order but their GST still belongs to past returns
+    archived = 0
+    for order, items, order_returns in _archived_orders():
+        _rebuild_order(totals, order, items, order_returns, business_state)
+        archived += 1
+
+    TaxRollup.objects.all().delete()
+    TaxRollup.objects.bulk_create([
+        TaxRollup(
+            date=day, vendor_id=vendor_id, state_code=state, hsn_code=hsn, tax_rate=rate,
+            **{field: amounts[field] if field == 'quantity' else amounts[field].quantize(CENT)
+               for field in AMOUNT_FIELDS}
+        )
+        for (day, vendor_id, state, hsn, rate), amounts in totals.items()
+    ], batch_size=1000)
+
+    Order.objects.update(tax_posted=False)
+    for start in range(0, len(posted_ids), 1000):
+        Order.objects.filter(id__in=posted_ids[start:start + 1000]).update(tax_posted=True)
+
+    logger.info(
+        f"Rebuilt GST rollup: {len(totals)} rows from {len(posted_ids)} posted orders and {archived} archived orders"
+    )
+    return len(totals)
@@ -0,0 +1,364 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest.mock import patch
+from urllib.parse import parse_qsl, urlparse
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from homepage.models import DealOfTheDay
+from orders.delhivery_service import DelhiveryService
+from orders.models import Cart, CartItem, Order, OrderItem
+from orders.shiprocket_models import ShiprocketPincode
+from products.models import Product
+from users.models import User
+from vendors.models import VendorProfile
+from payments.shipping_calculator import ShippingCalculator
+from payments.models import RateCardEntry, ShippingZone, TaxRollup
+from payments.quote_cache import bump_rules_version
+from payments.rate_quotes import RateRequest, weight_slab
+from payments.tasks import sample_rate_card_drift_task
+from payments import tax_rollup
+
+
+class QuoteCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='buyer', email='buyer@example.com', password='password')
+        vendor = VendorProfile.objects.create(
+            user=User.objects.create_user(username='vendor', email='vendor@example.com', password='password'),
+            store_name='Vendor Store',
+            zip_code='400001'
+        )
+        self.product = Product.objects.create(
+            name='Diya', vendor=vendor, regular_price=200, stock=10, description='Desc', slug='diya'
+        )
+        self.cart = Cart.objects.create(user=self.user)
+        self.item = CartItem.objects.create(cart=self.cart, product=self.product, quantity=2)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def quote(self):
+        return self.client.post('/api/payments/calculate-totals/', {'state_code': 'MH'}, format='json')
+
+    def test_repeat_quote_is_served_from_cache(self):
+        with patch.object(ShippingCalculator, 'calculate_shipping', wraps=ShippingCalculator().calculate_shipping) as shipping:
+            first = self.quote()
+            second = self.quote()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.data['total'], second.data['total'])
+        self.assertTrue(second.data['quote_token'])
+        self.assertEqual(shipping.call_count, 1)
+
+    def test_cart_item_write_bumps_version_and_invalidates(self):
+        first = self.quote()
+        version = Cart.objects.get(pk=self.cart.pk).version
+        self.item.quantity = 3
+        self.item.save()
+        self.assertEqual(Cart.objects.get(pk=self.cart.pk).version, version + 1)
+        second = self.quote()
+        self.assertEqual(second.data['subtotal'], 600.0)
+        self.assertNotEqual(first.data['quote_token'], second.data['quote_token'])
+
+    def test_deal_change_invalidates(self):
+        self.assertEqual(self.quote().data['subtotal'], 400.0)
+        today = timezone.now().date()
+        DealOfTheDay.objects.create(
+            product=self.product, discount_percentage=50,
+            start_date=today, end_date=today + timedelta(days=1)
+        )
+        self.assertEqual(self.quote().data['subtotal'], 200.0)
+
+    def test_stock_update_keeps_cache(self):
+        token = self.quote().data['quote_token']
+        self.product.stock = 5
+        self.product.save()
+        self.assertEqual(self.quote().data['quote_token'], token)
+
+    def test_dimension_and_box_changes_invalidate(self):
+        from orders.models import PackagingBox
+
+        token = self.quote().data['quote_token']
+        self.product.length = 40
+        self.product.save()
+        token, previous = self.quote().data['quote_token'], token
+        self.assertNotEqual(token, previous)
+
+        PackagingBox.objects.create(name='M', length=30, width=20, height=15, max_weight=5)
+        self.assertNotEqual(self.quote().data['quote_token'], token)
+
+    def test_sale_edits_and_sale_window_boundaries_invalidate(self):
+        self.assertEqual(self.quote().data['subtotal'], 400.0)
+        self.product.sale_price = 150
+        self.product.sale_price_end = timezone.now() + timedelta(hours=1)
+        self.product.save()
+        self.assertEqual(self.quote().data['subtotal'], 300.0)
+
+        # The sale ends with no write at all
+        Product.objects.filter(pk=self.product.pk).update(sale_price_end=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.quote().data['subtotal'], 400.0)
+
+
+class TaxRollupTest(TestCase):
+    def setUp(self):
+        self.vendor_user = User.objects.create_user(username='seller', email='seller@example.com', password='password')
+        self.vendor = VendorProfile.objects.create(user=self.vendor_user, store_name='Seller Store')
+        product = Product.objects.create(
+            name='Lamp', vendor=self.vendor, regular_price=100, stock=10, description='Desc', slug='lamp',
+            hsn_code='9405'
+        )
+        self.order = Order.objects.create(
+            user=self.vendor_user, total_amount=472, shipping_address='Addr',
+            shipping_address_data={'state_code': 'KA'}
+        )
+        # Inter-state line: checkout stores the tax as a CGST/SGST split
+        self.item = OrderItem.objects.create(
+            order=self.order, product=product, vendor=self.vendor, quantity=4, price=100,
+            tax_rate=18, tax_amount=72, cgst_amount=36, sgst_amount=36
+        )
+
+    def rollup(self):
+        return TaxRollup.objects.get(vendor=self.vendor, state_code='KA', hsn_code='9405')
+
+    def test_paid_order_posts_once_and_cancellations_net(self):
+        self.order.payment_status = 'paid'
+        self.order.save()
+        self.order.save()
+        row = self.rollup()
+        self.assertEqual((row.quantity, row.taxable_value, row.igst_amount, row.cgst_amount), (4, 400, 72, 0))
+
+        self.item.cancel_partial(1, 'Changed mind')
+        row = self.rollup()
+        self.assertEqual((row.quantity, row.taxable_value, row.igst_amount), (3, 300, 54))
+
+        self.order.status = 'CANCELLED'
+        self.order.save()
+        row = self.rollup()
+        self.assertEqual((row.quantity, row.taxable_value, row.igst_amount), (0, 0, 0))
+
+        self.assertEqual(tax_rollup.rebuild(), 1)
+        row = self.rollup()
+        self.assertEqual((row.quantity, row.taxable_value), (0, 0))
+
+    def test_late_payment_posts_on_the_order_date_like_rebuild(self):
+        placed = timezone.now() - timedelta(days=1)
+        Order.objects.filter(pk=self.order.pk).update(created_at=placed)
+        self.order.refresh_from_db()
+        self.item.cancel_partial(1, 'Changed mind')  # before payment: not posted yet
+
+        self.order.payment_status = 'paid'
+        self.order.save()
+        rows = lambda: sorted(TaxRollup.objects.values_list('date', 'quantity', 'taxable_value'))
+        live = rows()
+        self.assertEqual(live, [(timezone.localdate(placed), 4, 400), (timezone.localdate(), -1, -100)])
+
+        tax_rollup.rebuild()
+        self.assertEqual(rows(), live)
+
+    def test_gstr_reports(self):
+        self.order.payment_status = 'cod'
+        self.order.save()
+        client = APIClient()
+        client.force_authenticate(self.vendor_user)
+
+        gstr1 = client.get('/api/payments/reports/gstr1/')
+        self.assertEqual(gstr1.status_code, 200)
+        self.assertEqual(gstr1.data['hsn_summary'][0]['hsn_code'], '9405')
+        self.assertEqual(gstr1.data['hsn_summary'][0]['quantity'], 4)
+
+        gstr3b = client.get('/api/payments/reports/gstr3b/')
+        self.assertEqual(gstr3b.data['outward_taxable_supplies']['igst_amount'], 72)
+        self.assertEqual(gstr3b.data['inter_state_unregistered'][0]['state_code'], 'KA')
+        self.assertEqual(client.get('/api/payments/reports/gstr1/', {'month': '2026-13'}).status_code, 400)
+        self.assertEqual(client.get('/api/payments/reports/gstr1/',
+                                    {'date_from': '2024-02-30', 'date_to': '2024-03-31'}).status_code, 400)
+
+    def test_rebuild_keeps_archived_orders(self):
+        from orders.archive import archive_orders
+
+        placed = timezone.now() - timedelta(days=400)
+        self.order.payment_status = 'paid'
+        self.order.save()
+        self.item.cancel_partial(1, 'Changed mind')
+        self.order.status = 'DELIVERED'
+        self.order.save()
+        Order.objects.filter(pk=self.order.pk).update(created_at=placed)
+        tax_rollup.rebuild()
+        rows = lambda: sorted(TaxRollup.objects.values_list('date', 'quantity', 'taxable_value', 'igst_amount'))
+        before = rows()
+        self.assertEqual(before[0][:3], (timezone.localdate(placed), 4, 400))
+
+        self.assertEqual(archive_orders(), 1)
+        self.assertFalse(Order.objects.filter(pk=self.order.pk).exists())
+        tax_rollup.rebuild()
+        self.assertEqual(rows(), before)
+
+
+class StubCarrierHandler(BaseHTTPRequestHandler):
+    """Delhivery rate endpoint stand-in; origin pincodes in `latency` respond that many seconds late"""
+    latency = {}
+    calls = []
+
+    def do_GET(self):
+        params = dict(parse_qsl(urlparse(self.path).query))
+        self.calls.append(params['o_pin'])
+        time.sleep(self.latency.get(params['o_pin'], 0))
+        body = json.dumps([{'total_amount': 40 + int(params['cgm']) / 100, 'zone': 'B'}]).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(DELHIVERY_TOKEN='test-token', RATE_QUOTE_DEADLINE=0.5)
+class RateQuoteFanOutTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubCarrierHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        StubCarrierHandler.calls = []
+        StubCarrierHandler.latency = {'110001': 0.3, '560001': 0.3, '700001': 2}
+        ShippingZone.objects.create(name='West', states=['MH'], base_rate=60, per_kg_rate=20)
+        self.items = []
+        for index, pincode in enumerate(('110001', '560001', '700001')):
+            vendor = VendorProfile.objects.create(
+                user=User.objects.create_user(username=f'v{index}', email=f'v{index}@example.com', password='password'),
+                store_name=f'Vendor {index}', zip_code=pincode
+            )
+            product = Product.objects.create(name=f'P{index}', vendor=vendor, regular_price=100,
+                                             description='Desc', slug=f'p{index}', weight=1.2)
+            self.items.append(SimpleNamespace(product=product, quantity=1))
+
+    def quote(self):
+        with patch.object(DelhiveryService, 'BASE_URL', self.base_url):
+            return ShippingCalculator().calculate_shipping(self.items, 'MH', subtotal=300, destination_pincode='400001')
+
+    def test_concurrent_quotes_with_deadline_fallback_and_cache(self):
+        started = time.monotonic()
+        result = self.quote()
+        # Two 0.3 s quotes in parallel, the 2 s one cut off at the 0.5 s deadline
+        self.assertLess(time.monotonic() - started, 1.5)
+        sources = {row['origin_pincode']: row['source'] for row in result['vendor_breakdown']}
+        self.assertEqual(sources, {'110001': 'delhivery_live', '560001': 'delhivery_live', '700001': 'zone_fallback'})
+        fallback = next(row for row in result['vendor_breakdown'] if row['origin_pincode'] == '700001')
+        self.assertEqual(fallback['shipping_cost'], 60 + 1.2 * 20)
+
+        # Cached quotes are reused; the slow quote completed in the background and is cached too
+        time.sleep(2)
+        calls = len(StubCarrierHandler.calls)
+        result = self.quote()
+        self.assertEqual(len(StubCarrierHandler.calls), calls)
+        self.assertEqual({row['source'] for row in result['vendor_breakdown']}, {'cache'})
+        self.assertEqual(weight_slab(1.2), 1.5)
+
+
+class ZoneTableTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        ShippingZone.objects.create(name='Metro West', states=['MH', 'GJ'], base_rate=40, per_kg_rate=10)
+        ShippingZone.objects.create(name='Default', states=[], base_rate=90, per_kg_rate=30)
+
+    def test_rate_and_eta_lookups_are_query_free_until_a_zone_changes(self):
+        calculator = ShippingCalculator()
+        calculator.estimate_delivery_date('MH')
+        with self.assertNumQueries(0):
+            self.assertEqual(calculator._zone_rate(calculator._find_zone('mh'), 2), 60)
+            self.assertEqual(calculator._find_zone('KL').name, 'Default')
+            estimate = calculator.estimate_delivery_date('GJ')
+        self.assertEqual((estimate['min_days'], estimate['max_days']), (2, 4))
+
+        # Price and coupon edits move the pricing rules version, not the zone table's
+        bump_rules_version()
+        with self.assertNumQueries(0):
+            self.assertEqual(calculator._find_zone('GJ').name, 'Metro West')
+
+        ShippingZone.objects.filter(name='Metro West').update(is_active=False)
+        ShippingZone.objects.create(name='South', states=['KL'], base_rate=70, per_kg_rate=20)
+        self.assertEqual(calculator._find_zone('MH').name, 'Default')
+        self.assertEqual(calculator.estimate_delivery_date('KL')['max_days'], 6)
+
+
+@override_settings(DELHIVERY_TOKEN='test-token', RATE_CARD_SAMPLE_RATE=0)
+class RateCardTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        for pincode, city, state in (('400001', 'Mumbai', 'Maharashtra'), ('110001', 'New Delhi', 'Delhi'),
+                                     ('781001', 'Guwahati', 'Assam')):
+            ShiprocketPincode.objects.create(pincode=pincode, city=city, state=state)
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write('zone,weight_slab_grams,freight\nC,500,40\nC,1000,70\nC,1500,100\n')
+        self.addCleanup(os.remove, handle.name)
+        call_command('import_rate_card', handle.name, stdout=open(os.devnull, 'w'))
+
+    def items(self, pincode, weight):
+        vendor = VendorProfile.objects.create(
+            user=User.objects.create_user(username=f'v{pincode}{weight}', email=f'v{pincode}{weight}@example.com',
+                                          password='password'),
+            store_name=f'Vendor {pincode}', zip_code=pincode
+        )
+        product = Product.objects.create(name='P', vendor=vendor, regular_price=100, description='Desc',
+                                         slug=f'p{pincode}{weight}', weight=weight)
+        return [SimpleNamespace(product=product, quantity=1)]
+
+    def quote(self, items):
+        return ShippingCalculator().calculate_shipping(items, 'MH', subtotal=100, destination_pincode='400001')
+
+    @patch.object(DelhiveryService, 'calculate_shipping_rate')
+    def test_card_quotes_locally_learns_uncovered_routes_and_tracks_drift(self, live):
+        live.return_value = {'success': True, 'total_shipping': 90.0, 'freight_charge': 90.0, 'cod_charge': 0.0,
+                             'zone': 'D'}
+
+        # Delhi -> Mumbai is metro to metro; 2.4 kg is extrapolated past the last slab
+        result = self.quote(self.items('110001', 1.2) + self.items('110001', 2.4))
+        self.assertFalse(live.called)
+        self.assertEqual(sorted(row['shipping_cost'] for row in result['vendor_breakdown']), [100, 160])
+        self.assertEqual({row['source'] for row in result['vendor_breakdown']}, {'rate_card'})
+
+        # Guwahati -> Mumbai is not on the card: quoted live and learned under the carrier's zone D,
+        # but only served from the card once another live quote agrees
+        items = self.items('781001', 1.2)
+        with override_settings(RATE_CARD_LEARN_MIN_SAMPLES=1):
+            self.assertEqual(self.quote(items)['vendor_breakdown'][0]['source'], 'delhivery_live')
+            self.assertTrue(RateCardEntry.objects.filter(zone='D', weight_slab_grams=1500, source='learned').exists())
+            self.assertEqual(self.quote(items)['vendor_breakdown'][0]['source'], 'cache')
+            cache.delete(RateRequest('781001', '400001', 1.2).cache_key)
+            self.assertEqual(self.quote(items)['vendor_breakdown'][0]['source'], 'delhivery_live')
+            self.assertEqual(self.quote(items)['vendor_breakdown'][0]['source'], 'rate_card')
+        self.assertEqual(live.call_count, 2)
+
+        # COD quotes carry a charge for one COD amount and are never learned
+        ShippingCalculator().calculate_shipping(self.items('781001', 3.2), 'MH', subtotal=100,
+                                                destination_pincode='400001', payment_mode='COD')
+        self.assertFalse(RateCardEntry.objects.filter(payment_mode='COD').exists())
+
+        with override_settings(RATE_CARD_SAMPLE_RATE=1), \
+                patch.object(sample_rate_card_drift_task, 'delay') as delay:
+            self.quote(self.items('110001', 0.4))
+        sample_rate_card_drift_task(*delay.call_args.args)
+        entry = RateCardEntry.objects.get(zone='C', weight_slab_grams=500)
+        self.assertEqual(entry.drift_samples, 1)
+        self.assertAlmostEqual(float(entry.mean_drift), (90 - 40) / 90, places=3)
@@ -9,6 +9,7 @@ from .views import (
     PaymentWebhookView,
     ShippingSettingsView,
 )
+from .tax_report_views import GSTR1ReportView, GSTR3BReportView
 
 router = DefaultRouter()
 router.register(r'shipping-zones', ShippingZoneViewSet, basename='shipping-zone')
@@ -21,4 +22,6 @@ urlpatterns = [
     path('shipping-settings/', ShippingSettingsView.as_view(), name='shipping-settings'),
     path('tax-rates/', TaxRateListView.as_view(), name='tax-rates'),
     path('webhook/', PaymentWebhookView.as_view(), name='payment-webhook'),
+    path('reports/gstr1/', GSTR1ReportView.as_view(), name='gstr1-report'),
+    path('reports/gstr3b/', GSTR3BReportView.as_view(), name='gstr3b-report'),
 ]
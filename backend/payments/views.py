@@ -16,7 +16,10 @@ from .serializers import (
 from .razorpay_gateway import RazorpayGateway
 from .tax_calculator import TaxCalculator
 from .shipping_calculator import ShippingCalculator
+from . import quote_cache
+from orders import guest_cart
 from orders.models import Order, Cart
+from products.inventory import record_sale
 from django.conf import settings
 
 
@@ -114,13 +117,7 @@ class VerifyPaymentView(APIView):
             order.save()
             
             # Reduce stock NOW that payment is confirmed
-            # Reduce stock NOW that payment is confirmed
-            for order_item in order.items.all():
-                product = order_item.product
-                product.stock -= order_item.quantity
-                if product.stock < 0:
-                    product.stock = 0  # Prevent negative stock
-                product.save()
+            record_sale(order, actor=order.user)
 
             # Clear purchased items from Cart
             try:
@@ -135,6 +132,10 @@ class VerifyPaymentView(APIView):
                     # Remove only items that are in this order (in case of selective checkout)
                     product_ids = [item.product_id for item in order.items.all()]
                     cart.items.filter(product_id__in=product_ids).delete()
+                    if not order.user and order.session_id:
+                        # Guest orders also clear the guest cart store
+                        from orders.guest_cart import get_store
+                        get_store().remove(order.session_id, product_ids)
             except Cart.DoesNotExist:
                 pass
 
@@ -187,6 +188,18 @@ class VerifyPaymentView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
 
 
+def _coupon_summary(coupon_result):
+    """JSON-safe view of the promotion engine's coupon result"""
+    if not coupon_result:
+        return None
+    return {
+        'code': coupon_result['code'],
+        'valid': coupon_result['valid'],
+        'error': coupon_result['error'],
+        'discount_amount': float(coupon_result['discount_amount']),
+    }
+
+
 class CalculateTotalsView(APIView):
     """Calculate order totals including tax and shipping"""
     permission_classes = [IsAuthenticated]
@@ -213,8 +226,8 @@ class CalculateTotalsView(APIView):
             )
         
         try:
-            cart = Cart.objects.get(user=user)
-            all_cart_items = cart.items.all()
+            cart = guest_cart.user_cart(request)
+            all_cart_items = cart.items.select_related('product', 'product__vendor', 'product__tax_slab')
             
             # Filter by selected items if provided (selective checkout)
             if selected_item_ids:
@@ -233,13 +246,28 @@ class CalculateTotalsView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        # Serve identical repeat quotes from the versioned quote cache
+        quote_digest = quote_cache.build_quote_digest(
+            cart,
+            state_code,
+            pincode=destination_pincode,
+            payment_mode=payment_mode,
+            coupon_code=request.data.get('coupon_code'),
+            selected_item_ids=selected_item_ids,
+            gift_option_id=gift_option_id,
+        )
+        cached_quote = quote_cache.get_quote(quote_digest)
+        if cached_quote is not None:
+            return Response({**cached_quote, 'quote_token': quote_cache.make_quote_token(quote_digest)})
+        
         # Calculate subtotal
         subtotal = Decimal('0')
         discount_total = Decimal('0')
         from orders.services import PriceCalculatorService
 
+        prices = PriceCalculatorService.resolve_prices(item.product for item in cart_items)
         for item in cart_items:
-            price_info = PriceCalculatorService.calculate_price(item.product)
+            price_info = prices[item.product_id]
             # Ensure we work with Decimals
             final_price = Decimal(str(price_info['price']))
             quantity = Decimal(str(item.quantity))
@@ -247,6 +275,19 @@ class CalculateTotalsView(APIView):
             subtotal += final_price * quantity
             discount_total += Decimal(str(price_info['discount_amount'])) * quantity
         
+        # Bundle and coupon discounts on top of deal prices, evaluated for the whole cart in one pass
+        from promotions.engine import PromotionEngine, lines_from_cart_items
+        promotion = PromotionEngine().evaluate(
+            lines_from_cart_items(cart_items, prices),
+            coupon_code=request.data.get('coupon_code'),
+            user_id=user.id
+        )
+        promotion_discount = promotion['bundle_discount'] + promotion['coupon_discount']
+        taxable_prices = {
+            line['product_id']: {'price': line['final_total'] / line['quantity']}
+            for line in promotion['lines'] if line['quantity']
+        }
+        
         # Calculate shipping (use Delhivery live rates if pincode provided)
         shipping_calc = ShippingCalculator()
         shipping_data = shipping_calc.calculate_shipping(
@@ -265,7 +306,7 @@ class CalculateTotalsView(APIView):
 
         # Calculate tax using product-level tax slabs
         tax_calc = TaxCalculator()
-        tax_data = tax_calc.calculate_gst_with_slabs(cart_items, state_code)
+        tax_data = tax_calc.calculate_gst_with_slabs(cart_items, state_code, prices=taxable_prices)
         tax_amount = Decimal(str(tax_data['total_tax']))  # Convert float back to Decimal for calculation
         
         # Calculate delivery estimate
@@ -283,12 +324,27 @@ class CalculateTotalsView(APIView):
                 pass
  
         # Calculate total
-        total = subtotal + shipping_cost + tax_amount + gift_wrapping_amount
+        total = subtotal - promotion_discount + shipping_cost + tax_amount + gift_wrapping_amount
         
         try:
-            return Response({
+            quote = {
                 'subtotal': float(subtotal),
                 'discount_total': float(discount_total),
+                'promotion_discount': float(promotion_discount),
+                'bundle_discount': float(promotion['bundle_discount']),
+                'coupon': _coupon_summary(promotion['coupon']),
+                'line_discounts': [
+                    {
+                        'item_id': line['key'],
+                        'product_id': line['product_id'],
+                        'discounts': [
+                            {'type': d['type'], 'rule_id': d['rule_id'], 'amount': float(d['amount'])}
+                            for d in line['discounts']
+                        ],
+                        'final_total': float(line['final_total']),
+                    }
+                    for line in promotion['lines']
+                ],
                 'shipping': shipping_data,
                 'tax': tax_data,
                 'tax_amount': float(tax_amount),
@@ -296,7 +352,9 @@ class CalculateTotalsView(APIView):
                 'total': float(total),
                 'delivery_estimate': delivery_estimate,
                 'items_count': cart_items.count()
-            })
+            }
+            quote_cache.store_quote(quote_digest, quote)
+            return Response({**quote, 'quote_token': quote_cache.make_quote_token(quote_digest)})
         except Exception as e:
             import traceback
             print(f"Calculate totals error: {str(e)}")
@@ -0,0 +1,101 @@
+"""
+Compiled shipping zone table.
+
+ShippingCalculator used to load every active ShippingZone and scan their state
+lists in Python for each vendor on every quote, and estimate_delivery_date did
+the same scan again. All active zones are instead compiled into one ZoneTable:
+
+- state code -> zone (first active zone by id listing the state, else the
+  active 'Default' zone), a dict lookup
+- per zone: base / per-kg rate, free shipping threshold and delivery estimate
+- the global free shipping threshold from ShippingSettings
+
+The table has its own 'shipping_zones' cache version, bumped only on
+ShippingZone and ShippingSettings writes (see payments.signals) so price and
+coupon edits leave it alone. It is stored in the shared cache and kept per
+process, so rate and ETA lookups cost no queries until the next zone or
+settings change.
+"""
+from decimal import Decimal
+
+from config.cache_versions import LocalCopy, bump_version, get_version
+
+ZONE_TABLE_VERSION = 'shipping_zones'
+ZONE_TABLE_KEY = 'payments:zones:{version}'
+ZONE_TABLE_TIMEOUT = 60 * 60 * 24
+
+_table_copy = LocalCopy(ZONE_TABLE_TIMEOUT)
+
+# (min days, max days) by zone name, first match wins
+DELIVERY_ESTIMATES = (
+    ('Metro', (2, 4)),
+    ('North', (3, 6)),
+    ('South', (3, 6)),
+)
+DEFAULT_DELIVERY_ESTIMATE = (5, 10)
+
+
+def normalize_state(state_code):
+    return str(state_code or '').strip().upper()
+
+
+def delivery_estimate(zone_name):
+    for marker, estimate in DELIVERY_ESTIMATES:
+        if marker in zone_name:
+            return estimate
+    return DEFAULT_DELIVERY_ESTIMATE
+
+
+class ZoneRate:
+    """Rates and delivery estimate of one compiled shipping zone"""
+    __slots__ = ('id', 'name', 'base_rate', 'per_kg_rate', 'free_shipping_threshold', 'min_days', 'max_days')
+
+    def __init__(self, id, name, base_rate, per_kg_rate, free_shipping_threshold=None):
+        self.id = id
+        self.name = name
+        self.base_rate = Decimal(base_rate)
+        self.per_kg_rate = Decimal(per_kg_rate)
+        self.free_shipping_threshold = (
+            Decimal(free_shipping_threshold) if free_shipping_threshold is not None else None
+        )
+        self.min_days, self.max_days = delivery_estimate(name)
+
+    def rate(self, weight):
+        """Charge for one parcel of `weight` kg"""
+        return self.base_rate + Decimal(str(weight)) * self.per_kg_rate
+
+
+class ZoneTable:
+    def __init__(self, zones_by_state, default_zone=None, free_shipping_threshold=None):
+        self.zones_by_state = zones_by_state
+        self.default_zone = default_zone
+        self.free_shipping_threshold = free_shipping_threshold
+
+    def zone_for(self, state_code):
+        """Zone covering the state, else the 'Default' zone (None if neither)"""
+        return self.zones_by_state.get(normalize_state(state_code), self.default_zone)
+
+
+def compile_zone_table():
+    from .models import ShippingSettings, ShippingZone
+
+    zones_by_state = {}
+    default_zone = None
+    for zone in ShippingZone.objects.filter(is_active=True).order_by('id'):
+        compiled = ZoneRate(zone.id, zone.name, zone.base_rate, zone.per_kg_rate, zone.free_shipping_threshold)
+        for state_code in zone.states or ():
+            zones_by_state.setdefault(normalize_state(state_code), compiled)
+        if default_zone is None and zone.name == 'Default':
+            default_zone = compiled
+
+    threshold = ShippingSettings.objects.filter(pk=1).values_list('free_shipping_threshold', flat=True).first()
+    return ZoneTable(zones_by_state, default_zone, threshold)
+
+
+def bump_zone_table_version():
+    return bump_version(ZONE_TABLE_VERSION)
+
+
+def get_zone_table():
+    """Return the compiled zone table for the current zone version"""
+    return _table_copy.get(ZONE_TABLE_KEY.format(version=get_version(ZONE_TABLE_VERSION)), compile_zone_table)
@@ -0,0 +1,205 @@
+"""
+Inventory ledger.
+
+Every stock change is a signed InventoryMovement row (reason, order line, actor)
+written with a plain INSERT, so concurrent checkouts of a best-seller never
+wait on each other for the product row and nothing is lost to read-modify-write
+races.
+
+Available stock is the product's InventoryBalance (movements already compacted)
+plus the movements recorded after its last_movement_id. compact() runs
+periodically (see config.celery) and folds settled movements into the
+balances, refreshing the denormalized Product.stock / stock_status used by
+listings. Product.stock therefore lags the ledger by one compaction at most.
+
+Product.stock is only written by compaction and by vendor/admin edits; an edit
+is turned into an 'adjustment' movement (see products.signals). find_drift()
+reports products whose Product.stock no longer matches the ledger, e.g. after
+an out-of-band UPDATE.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .inventory_models import InventoryMovement, InventoryBalance
+
+logger = logging.getLogger(__name__)
+
+COMPACTION_BATCH_SIZE = 1000
+
+
+def _balance_watermark():
+    """last_movement_id of the movement's product balance (0 when there is none)"""
+    return Coalesce(
+        Subquery(InventoryBalance.objects.filter(product_id=OuterRef('product_id')).values('last_movement_id')[:1]),
+        Value(0),
+    )
+
+
+def record_movements(movements):
+    """Insert unsaved InventoryMovement rows in one statement"""
+    movements = [m for m in movements if m.quantity]
+    if movements:
+        InventoryMovement.objects.bulk_create(movements)
+    return movements
+
+
+def record_sale(order, actor=None):
+    """
+    Record one 'sale' movement per order line. Safe to call twice for the same
+    order (e.g. a repeated payment verification): lines already recorded are skipped.
+    """
+    items = list(order.items.all())
+    recorded = set(
+        InventoryMovement.objects.filter(order_item__in=items, reason='sale').values_list('order_item_id', flat=True)
+    )
+    return record_movements(
+        InventoryMovement(
+            product_id=item.product_id,
+            quantity=-item.quantity,
+            reason='sale',
+            order_item=item,
+            actor=actor,
+        )
+        for item in items if item.id not in recorded
+    )
+
+
+def record_cancellation(order_item, quantity, actor=None, note=''):
+    """Put cancelled units of an order line back into stock"""
+    return record_movements([InventoryMovement(
+        product_id=order_item.product_id,
+        quantity=quantity,
+        reason='cancellation',
+        order_item=order_item,
+        actor=actor,
+        note=note[:255],
+    )])
+
+
+def record_adjustment(product, quantity, actor=None, note='', reason='adjustment'):
+    return record_movements([InventoryMovement(
+        product_id=product.pk,
+        quantity=quantity,
+        reason=reason,
+        actor=actor,
+        note=note[:255],
+    )])
+
+
+def get_available_stock(product_ids):
+    """Return {product_id: available units} from the ledger (balance + recent deltas)"""
+    product_ids = list(product_ids)
+    available = dict.fromkeys(product_ids, 0)
+    available.update(
+        InventoryBalance.objects.filter(product_id__in=product_ids).values_list('product_id', 'quantity')
+    )
+    deltas = InventoryMovement.objects.filter(
+        product_id__in=product_ids, id__gt=_balance_watermark()
+    ).order_by().values('product_id').annotate(delta=Sum('quantity'))
+    for row in deltas:
+        available[row['product_id']] += row['delta']
+    return available
+
+
+def set_available_stock(product, quantity, actor=None, note=''):
+    """Record the adjustment that brings the product's ledger stock to `quantity`"""
+    current = get_available_stock([product.pk])[product.pk]
+    return record_adjustment(product, quantity - current, actor=actor, note=note)
+
+
+def _sync_product_stock(balances):
+    """Write compacted balances to Product.stock (save() keeps the stock status and alerts)"""
+    from .models import Product
+
+    products = Product.objects.filter(id__in=[b.product_id for b in balances], manage_stock=True)
+    quantities = {b.product_id: max(b.quantity, 0) for b in balances}
+    for product in products.select_related('vendor__user'):
+        if product.stock == quantities[product.id]:
+            continue
+        product.stock = quantities[product.id]
+        product._inventory_sync = True
+        product.save(update_fields=['stock', 'stock_status'])
+
+
+def compact(lag=None):
+    """
+    Fold settled movements into the balances. Returns the number of products compacted.
+
+    Only movements older than `lag` (INVENTORY_COMPACTION_LAG seconds) are
+    settled, so a movement whose transaction has not committed yet can't be
+    skipped by a watermark moving past its id.
+    """
+    if lag is None:
+        lag = getattr(settings, 'INVENTORY_COMPACTION_LAG', 300)
+    cutoff = timezone.now() - timedelta(seconds=lag)
+    upper = InventoryMovement.objects.filter(created_at__lt=cutoff).aggregate(upper=Max('id'))['upper']
+    if upper is None:
+        return 0
+
+    product_ids = list(
+        InventoryMovement.objects.filter(id__lte=upper, id__gt=_balance_watermark())
+        .order_by().values_list('product_id', flat=True).distinct()
+    )
+    for start in range(0, len(product_ids), COMPACTION_BATCH_SIZE):
+        _compact_batch(product_ids[start:start + COMPACTION_BATCH_SIZE], upper)
+
+    if product_ids:
+        logger.info(f"Compacted inventory movements up to {upper} for {len(product_ids)} products")
+    return len(product_ids)
+
+
+@transaction.atomic
+def _compact_batch(product_ids, upper):
+    # Lock the balances so two compaction runs can't apply the same movements twice
+    balances = {
+        b.product_id: b
+        for b in InventoryBalance.objects.select_for_update().filter(product_id__in=product_ids)
+    }
+    pending = InventoryMovement.objects.filter(
+        product_id__in=product_ids, id__lte=upper, id__gt=_balance_watermark()
+    ).order_by().values('product_id').annotate(delta=Sum('quantity'), last_id=Max('id'))
+
+    to_create, to_update = [], []
+    for row in pending:
+        balance = balances.get(row['product_id'])
+        if balance is None:
+            balance = InventoryBalance(product_id=row['product_id'])
+            to_create.append(balance)
+        else:
+            to_update.append(balance)
+        balance.quantity += row['delta']
+        balance.last_movement_id = row['last_id']
+        balance.compacted_at = timezone.now()
+
+    InventoryBalance.objects.bulk_create(to_create)
+    InventoryBalance.objects.bulk_update(to_update, ['quantity', 'last_movement_id', 'compacted_at'])
+    _sync_product_stock(to_create + to_update)
+
+
+def find_drift(product_ids=None):
+    """
+    Return [(product, ledger_stock)] for stock-managed products whose Product.stock
+    differs from the ledger. Run after compact() so unsettled movements don't show up as drift.
+    """
+    from .models import Product
+
+    products = Product.objects.filter(manage_stock=True).only('id', 'name', 'stock')
+    if product_ids:
+        products = products.filter(id__in=product_ids)
+
+    drift = []
+    products = list(products.order_by('id'))
+    for start in range(0, len(products), COMPACTION_BATCH_SIZE):
+        chunk = products[start:start + COMPACTION_BATCH_SIZE]
+        available = get_available_stock(p.id for p in chunk)
+        drift.extend(
+            (product, available[product.id]) for product in chunk
+            if product.stock != max(available[product.id], 0)
+        )
+    return drift
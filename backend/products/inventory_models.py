@@ -0,0 +1,48 @@
+from django.db import models
+
+
+class InventoryMovement(models.Model):
+    """
+    Signed stock movement (negative for sales, positive for restocks).
+    Rows are only ever inserted; see products.inventory for how they are compacted.
+    """
+    REASON_CHOICES = (
+        ('opening', 'Opening balance'),
+        ('sale', 'Sale'),
+        ('cancellation', 'Order cancellation'),
+        ('return', 'Return restock'),
+        ('adjustment', 'Manual adjustment'),
+    )
+
+    product = models.ForeignKey('Product', on_delete=models.CASCADE, related_name='inventory_movements')
+    quantity = models.IntegerField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    order_item = models.ForeignKey(
+        'orders.OrderItem', on_delete=models.SET_NULL, null=True, blank=True, related_name='inventory_movements'
+    )
+    actor = models.ForeignKey(
+        'users.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='inventory_movements'
+    )
+    note = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['product', 'id']),
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.quantity:+d} ({self.reason})"
+
+
+class InventoryBalance(models.Model):
+    """Compacted stock of a product: the sum of its movements up to last_movement_id"""
+    product = models.OneToOneField('Product', on_delete=models.CASCADE, related_name='inventory_balance')
+    quantity = models.IntegerField(default=0)
+    last_movement_id = models.BigIntegerField(default=0)
+    compacted_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.product_id}: {self.quantity} (through movement {self.last_movement_id})"
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from products import inventory
+
+
+class Command(BaseCommand):
+    help = 'Fold settled inventory movements into the per-product balances and refresh Product.stock'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lag', type=int, default=None,
+                            help='Only compact movements older than this many seconds (default INVENTORY_COMPACTION_LAG)')
+
+    def handle(self, *args, **options):
+        count = inventory.compact(lag=options['lag'])
+        self.stdout.write(self.style.SUCCESS(f"Compacted inventory for {count} products"))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from products import inventory
+
+
+class Command(BaseCommand):
+    help = 'Report products whose Product.stock has drifted from the inventory ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--product', type=int, action='append', dest='product_ids',
+                            help='Only check this product id (repeatable)')
+        parser.add_argument('--fix', action='store_true',
+                            help='Record adjustments so the ledger matches Product.stock')
+        parser.add_argument('--no-compact', action='store_true',
+                            help='Skip compacting settled movements first')
+
+    def handle(self, *args, **options):
+        if not options['no_compact']:
+            inventory.compact()
+
+        drift = inventory.find_drift(options['product_ids'])
+        for product, ledger_stock in drift:
+            self.stdout.write(
+                f"Product {product.id} ({product.name}): Product.stock={product.stock} ledger={ledger_stock}"
+            )
+            if options['fix']:
+                # Out-of-band writes to Product.stock are treated as a stock count
+                inventory.set_available_stock(product, product.stock, note='Reconciled with Product.stock')
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("No inventory drift found"))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f"Recorded adjustments for {len(drift)} products"))
+        else:
+            self.stdout.write(self.style.WARNING(f"{len(drift)} products drifted; rerun with --fix to adjust the ledger"))
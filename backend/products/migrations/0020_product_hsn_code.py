@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0019_product_is_exchangeable_product_is_returnable'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='hsn_code',
+            field=models.CharField(blank=True, help_text='HSN/SAC code for GST invoices and returns', max_length=20),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def seed_inventory_balances(apps, schema_editor):
+    """Open every product's ledger with its current Product.stock"""
+    Product = apps.get_model('products', 'Product')
+    InventoryBalance = apps.get_model('products', 'InventoryBalance')
+
+    batch = []
+    for product_id, stock in Product.objects.values_list('id', 'stock').iterator(chunk_size=2000):
+        batch.append(InventoryBalance(product_id=product_id, quantity=stock, last_movement_id=0))
+        if len(batch) >= 2000:
+            InventoryBalance.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    InventoryBalance.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0021_inventory_ledger'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_inventory_balances, migrations.RunPython.noop),
+    ]
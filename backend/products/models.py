@@ -5,6 +5,7 @@ from vendors.models import VendorProfile
 from django.conf import settings
 from django.utils.text import slugify
 from django.core.files.storage import default_storage, storages
+from .inventory_models import InventoryMovement, InventoryBalance
 
 class Category(models.Model):
     name = models.CharField(max_length=255)
@@ -192,6 +193,7 @@ class Product(models.Model):
         ('none', 'None'),
     ])
     tax_class = models.CharField(max_length=50, blank=True, help_text="Deprecated: Use tax_slab instead")
+    hsn_code = models.CharField(max_length=20, blank=True, help_text="HSN/SAC code for GST invoices and returns")
     
     # Product Type
     virtual = models.BooleanField(default=False, help_text='Virtual products are intangible and are not shipped')
@@ -273,6 +275,17 @@ class Product(models.Model):
         
         super().save(*args, **kwargs)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Stock as loaded: an edit is recorded relative to it (see products.signals)
+        instance._loaded_stock = instance.__dict__.get('stock')
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._loaded_stock = self.__dict__.get('stock')
+
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
     # Let ImageField use DEFAULT_FILE_STORAGE automatically (no explicit storage parameter)
@@ -160,9 +160,10 @@ def add_bundle_to_cart(request):
     bundle = get_object_or_404(ProductBundle, id=bundle_id, is_active=True)
     
     # Add primary product and all bundled products to cart
-    from orders.models import Cart, CartItem
+    from orders import guest_cart
+    from orders.models import CartItem
     
-    cart, created = Cart.objects.get_or_create(user=request.user)
+    cart = guest_cart.user_cart(request)
     
     # Add primary product
     cart_item, created = CartItem.objects.get_or_create(
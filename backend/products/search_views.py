@@ -61,6 +61,12 @@ class ProductSearchView(generics.ListAPIView):
         if vendor_id:
             queryset = queryset.filter(vendor_id=vendor_id)
         
+        # Deliverable to the customer's pincode
+        pincode = self.request.query_params.get('deliverable_to')
+        if pincode:
+            from vendors.pincodes import filter_deliverable
+            queryset = filter_deliverable(queryset, pincode)
+        
         # Sorting
         sort_by = self.request.query_params.get('sort', '-created_at')
         if sort_by == 'price_low':
@@ -71,21 +71,18 @@ class ProductSerializer(serializers.ModelSerializer):
         read_only_fields = ('vendor', 'created_at', 'updated_at')
 
     def get_active_deal(self, obj):
-        from django.utils import timezone
-        today = timezone.now().date()
-        # Use the reverse relation 'daily_deals' from DealOfTheDay model
-        deal = obj.daily_deals.filter(
-            is_active=True, 
-            start_date__lte=today, 
-            end_date__gte=today
-        ).first() # Priority is handled by default ordering in DealOfTheDay Meta
+        # Read from the cached active-deals snapshot (highest priority deal per product)
+        from orders.services import PriceCalculatorService
+        deal = PriceCalculatorService.get_active_deals().get(obj.id)
         
         if deal:
+            # Same resolver as the cart: the deal applies to the sale-window base price
+            price = PriceCalculatorService.calculate_price(obj)
             return {
-                'id': deal.id,
-                'discount_percentage': deal.discount_percentage,
-                'discounted_price': deal.discounted_price,
-                'end_date': deal.end_date
+                'id': deal['id'],
+                'discount_percentage': deal['discount_percentage'],
+                'discounted_price': price['price'],
+                'end_date': deal['end_date']
             }
         return None
 
@@ -1,6 +1,10 @@
+from django.db.models import F
 from django.db.models.signals import pre_save, post_save
 from django.dispatch import receiver
+from django.utils import timezone
 from .models import Product, StockNotification
+from . import inventory
+from notifications.tasks import send_notification_email
 from notifications.resend_service import send_email_via_resend
 from notifications.email_templates import get_email_template
 import logging
@@ -91,3 +95,45 @@ def check_low_stock_and_notify(sender, instance, **kwargs):
                         
         except Product.DoesNotExist:
             pass
+
+
+@receiver(pre_save, sender=Product)
+def track_stock_edit(sender, instance, **kwargs):
+    """
+    Turn a stock edit into a delta against the stock the instance was loaded
+    with. If compaction changed the stored stock since then, the stale value
+    is not written back: the column gets the delta through F() instead.
+    """
+    instance._stock_delta = 0
+    if not instance.pk or getattr(instance, '_inventory_sync', False):
+        return
+    stored = Product.objects.filter(pk=instance.pk).values_list('stock', flat=True).first()
+    loaded = getattr(instance, '_loaded_stock', None)
+    if stored is None or loaded is None:
+        loaded = stored
+    if loaded is None:
+        return
+    instance._stock_delta = instance.stock - loaded
+    if stored != loaded:
+        if instance.manage_stock:
+            instance.stock_status = 'outofstock' if stored + instance._stock_delta <= 0 else 'instock'
+        instance.stock = F('stock') + instance._stock_delta
+
+
+@receiver(post_save, sender=Product)
+def record_stock_edit(sender, instance, created, **kwargs):
+    """
+    Record a vendor/admin stock edit as an adjustment movement of the edited
+    delta (compaction writes skip this).
+    """
+    if getattr(instance, '_inventory_sync', False):
+        instance._inventory_sync = False
+    elif created:
+        inventory.record_adjustment(instance, instance.stock, reason='opening', note='Initial stock')
+    elif getattr(instance, '_stock_delta', 0):
+        delta = instance._stock_delta
+        inventory.record_adjustment(instance, delta, note=f'Stock edited by {delta:+d}')
+    if hasattr(instance.stock, 'resolve_expression'):
+        instance.refresh_from_db(fields=['stock'])
+    instance._loaded_stock = instance.stock
+    instance._stock_delta = 0
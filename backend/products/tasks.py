@@ -0,0 +1,14 @@
+from celery import shared_task
+import logging
+
+from . import inventory
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def compact_inventory_task():
+    """Periodic compaction of the inventory ledger (see products.inventory)"""
+    count = inventory.compact()
+    logger.info(f"Inventory compaction finished for {count} products")
+    return count
@@ -1,3 +1,84 @@
 from django.test import TestCase
 
-# Create your tests here.
+from orders.models import Order, OrderItem
+from users.models import User
+from vendors.models import VendorProfile
+
+from . import inventory
+from .inventory_models import InventoryMovement
+from .models import Product
+
+
+class InventoryLedgerTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='vendor', email='vendor@example.com', password='password')
+        self.vendor = VendorProfile.objects.create(user=self.user, store_name='Vendor Store')
+        self.product = Product.objects.create(
+            name='Lamp', vendor=self.vendor, regular_price=100, description='Desc', slug='lamp', stock=10
+        )
+        self.order = Order.objects.create(user=self.user, total_amount=300, shipping_address='Addr')
+        self.item = OrderItem.objects.create(
+            order=self.order, product=self.product, vendor=self.vendor, quantity=3, price=100
+        )
+
+    def available(self):
+        return inventory.get_available_stock([self.product.id])[self.product.id]
+
+    def test_sales_are_inserts_and_compaction_refreshes_stock(self):
+        with self.assertNumQueries(3):
+            inventory.record_sale(self.order)
+        inventory.record_sale(self.order)  # repeated verification is a no-op
+        self.assertEqual(self.available(), 7)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 10)
+
+        self.assertEqual(inventory.compact(lag=0), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 7)
+        self.assertEqual(self.product.inventory_balance.quantity, 7)
+        self.assertEqual(self.available(), 7)
+        self.assertEqual(inventory.compact(lag=0), 0)
+
+    def test_cancellation_and_edits_are_movements(self):
+        inventory.record_sale(self.order)
+        self.item.cancel_partial(1, 'Changed mind', actor=self.user)
+        self.assertEqual(self.available(), 8)
+
+        # The edit is a delta on the loaded stock (10); uncompacted movements still apply
+        self.product.refresh_from_db()
+        self.product.stock = 20
+        self.product.save()
+        self.assertEqual(self.available(), 18)
+        self.assertEqual(
+            list(InventoryMovement.objects.order_by('id').values_list('reason', 'quantity')),
+            [('opening', 10), ('sale', -3), ('cancellation', 1), ('adjustment', 10)]
+        )
+
+    def test_saving_a_stale_instance_keeps_sales(self):
+        stale = Product.objects.get(pk=self.product.pk)
+        inventory.record_sale(self.order)
+        inventory.compact(lag=0)
+
+        # Loaded before the sale was compacted: saving it must not bring the 3 units back
+        stale.name = 'Brass Lamp'
+        stale.save()
+        self.assertEqual(stale.stock, 7)
+        self.assertEqual(self.available(), 7)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock, 7)
+
+        stale = Product.objects.get(pk=self.product.pk)
+        OrderItem.objects.create(order=self.order, product=self.product, vendor=self.vendor, quantity=2, price=100)
+        inventory.record_sale(self.order)
+        inventory.compact(lag=0)
+        stale.stock += 5  # restock on a stale form
+        stale.save()
+        self.assertEqual(self.available(), 10)
+        product = Product.objects.get(pk=self.product.pk)
+        self.assertEqual((product.stock, product.stock_status), (10, 'instock'))
+
+    def test_find_drift(self):
+        inventory.compact(lag=0)
+        self.assertEqual(inventory.find_drift(), [])
+        Product.objects.filter(pk=self.product.pk).update(stock=4)
+        drift = inventory.find_drift()
+        self.assertEqual([(p.id, stock) for p, stock in drift], [(self.product.id, 10)])
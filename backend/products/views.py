@@ -61,6 +61,15 @@ class ProductListView(generics.ListAPIView):
     ordering_fields = ['price', 'created_at', 'stock_quantity']
     
     def get_queryset(self):
+        queryset = self.get_base_queryset()
+        # ?deliverable_to=<pincode>: only products whose vendor delivers there
+        pincode = self.request.query_params.get('deliverable_to')
+        if pincode:
+            from vendors.pincodes import filter_deliverable
+            queryset = filter_deliverable(queryset, pincode)
+        return queryset
+    
+    def get_base_queryset(self):
         # Admin users can see all products (including inactive)
         if self.request.user and (self.request.user.is_staff or self.request.user.is_superuser):
             return Product.objects.all().order_by('-created_at')
@@ -261,25 +270,18 @@ def check_product_pincode(request, slug):
     
     product = get_object_or_404(Product, slug=slug)
     
-    # 1. Check ServiceablePincode whitelist
-    from orders.models import ServiceablePincode
-    
-    is_serviceable = ServiceablePincode.objects.filter(
-        pincode=pincode, 
-        is_active=True
-    ).exists()
+    # 1. Check ServiceablePincode whitelist (in-memory set)
+    from orders.serviceability import check_pincode, is_globally_serviceable
     
-    if not is_serviceable:
+    if not is_globally_serviceable(pincode):
         return Response({
             'available': False, 
             'message': 'We currently do not deliver to this location.'
         })
     
     # 2. Also check vendor-specific pincodes if configured
-    vendor = product.vendor
-    if vendor and vendor.serviceable_pincodes:
-        allowed_pincodes = [p.strip() for p in vendor.serviceable_pincodes.split(',') if p.strip()]
-        if allowed_pincodes and pincode not in allowed_pincodes:
+    if product.vendor_id:
+        if not check_pincode(pincode, [product.vendor_id])[product.vendor_id][0]:
             return Response({
                 'available': False, 
                 'message': 'This seller does not deliver to this pincode.'
@@ -79,10 +79,11 @@ class WishlistMoveToCartView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request, product_id):
-        from orders.models import Cart, CartItem
+        from orders import guest_cart
+        from orders.models import CartItem
         
-        # Get or create cart
-        cart, _ = Cart.objects.get_or_create(user=request.user)
+        # Get or create cart (merging a cart built before login)
+        cart = guest_cart.user_cart(request)
         
         # Get product
         product = get_object_or_404(Product, id=product_id)
@@ -0,0 +1,444 @@
+"""
+Cart promotion engine.
+
+All active promotion rules (bundles and coupons from both coupon models) are
+compiled into one in-memory PromotionRuleSet, versioned by the shared pricing
+rules version (see payments.quote_cache) and the current date. Evaluating a cart
+is a single pass over its lines with zero queries per rule once the rule set is
+loaded; only the per-user coupon checks (new user, usage per user) hit the DB.
+
+Stacking policy - tiers apply in this order, each on what the previous one left:
+1. deal    DealOfTheDay / sale window, already in the line's effective unit price
+           (PriceCalculatorService.resolve_prices)
+2. bundle  ProductBundle discount once every product of the bundle is in the cart.
+           A line joins at most one bundle; larger discounts are applied first.
+3. coupon  At most one coupon per cart, applied to its eligible lines and capped by
+           the coupon's maximum discount.
+"""
+from dataclasses import dataclass, field
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.utils import timezone
+
+from config.cache_versions import LocalCopy
+
+TWO_PLACES = Decimal('0.01')
+RULESET_KEY = 'promotions:ruleset:{date}:{version}'
+RULESET_TIMEOUT = 60 * 60 * 24
+
+_ruleset_copy = LocalCopy(RULESET_TIMEOUT)
+
+
+def _money(value):
+    return Decimal(value).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+
+
+@dataclass(frozen=True)
+class BundleRule:
+    id: int
+    product_ids: frozenset
+    discount_type: str
+    discount_value: Decimal
+
+
+@dataclass(frozen=True)
+class CouponRef:
+    """The coupon an order was placed with (Order.coupon_data), enough to redeem it"""
+    source: str
+    id: int
+
+
+@dataclass(frozen=True)
+class CouponRule:
+    source: str  # 'promotions' (promotions.Coupon) or 'products' (legacy products.Coupon)
+    id: int
+    code: str
+    description: str
+    discount_type: str
+    discount_value: Decimal
+    min_order_value: Decimal
+    max_discount: Decimal = None
+    usage_limit: int = None
+    times_used: int = 0
+    usage_per_user: int = None
+    valid_from: object = None
+    valid_to: object = None
+    new_user_only: bool = False
+    product_ids: frozenset = frozenset()
+    category_ids: frozenset = frozenset()
+
+    def applies_to(self, line):
+        """Empty product and category restrictions mean the coupon applies to every line"""
+        if not self.product_ids and not self.category_ids:
+            return True
+        return line.product_id in self.product_ids or line.category_id in self.category_ids
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'code': self.code,
+            'description': self.description,
+            'discount_type': self.discount_type,
+            'discount_value': self.discount_value,
+            'min_order_value': self.min_order_value,
+            'max_discount': self.max_discount,
+            'valid_from': self.valid_from,
+            'valid_to': self.valid_to,
+            'usage_limit': self.usage_limit,
+            'new_user_only': self.new_user_only,
+            'applicable_products': sorted(self.product_ids),
+            'applicable_categories': sorted(self.category_ids),
+        }
+
+
+@dataclass
+class PromotionRuleSet:
+    version: str
+    bundles_by_product: dict = field(default_factory=dict)  # product_id -> [BundleRule]
+    coupons: dict = field(default_factory=dict)  # CODE -> CouponRule
+
+
+@dataclass
+class CartLine:
+    """One cart line as seen by the engine; unit_price is the effective (post-deal) price"""
+    key: object
+    product_id: int
+    category_id: int
+    quantity: int
+    unit_price: Decimal
+    original_unit_price: Decimal = None
+    deal_id: int = None
+
+
+def compile_rule_set(version):
+    """Load every active bundle and coupon with a fixed number of queries"""
+    from products.models import Coupon as LegacyCoupon
+    from products.phase3_models import ProductBundle
+    from .models import Coupon
+
+    today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    ruleset = PromotionRuleSet(version=version)
+
+    # Bundles: primary product + bundled products
+    bundle_members = {}
+    bundles = ProductBundle.objects.filter(is_active=True).values(
+        'id', 'primary_product_id', 'discount_type', 'discount_value'
+    )
+    for bundle in bundles:
+        bundle_members[bundle['id']] = ({bundle['primary_product_id']}, bundle)
+    through = ProductBundle.bundled_products.through.objects.filter(productbundle__is_active=True)
+    for bundle_id, product_id in through.values_list('productbundle_id', 'product_id'):
+        if bundle_id in bundle_members:
+            bundle_members[bundle_id][0].add(product_id)
+    for bundle_id, (product_ids, bundle) in bundle_members.items():
+        if len(product_ids) < 2 or not bundle['discount_value']:
+            continue
+        rule = BundleRule(
+            id=bundle_id,
+            product_ids=frozenset(product_ids),
+            discount_type=bundle['discount_type'],
+            discount_value=bundle['discount_value'],
+        )
+        for product_id in product_ids:
+            ruleset.bundles_by_product.setdefault(product_id, []).append(rule)
+
+    # Legacy products.Coupon first so promotions.Coupon wins on a shared code
+    legacy = LegacyCoupon.objects.filter(is_active=True, valid_until__gte=today_start)
+    legacy_products = _group_pairs(
+        LegacyCoupon.specific_products.through.objects.filter(coupon__in=legacy).values_list('coupon_id', 'product_id')
+    )
+    legacy_categories = _group_pairs(
+        LegacyCoupon.specific_categories.through.objects.filter(coupon__in=legacy).values_list('coupon_id', 'category_id')
+    )
+    for coupon in legacy:
+        applicability = coupon.applicability_type
+        ruleset.coupons[coupon.code.upper()] = CouponRule(
+            source='products',
+            id=coupon.id,
+            code=coupon.code.upper(),
+            description=coupon.description,
+            discount_type=coupon.discount_type,
+            discount_value=coupon.discount_value,
+            min_order_value=coupon.min_purchase_amount or Decimal('0'),
+            max_discount=coupon.max_discount_amount,
+            usage_limit=coupon.usage_limit,
+            times_used=coupon.usage_count,
+            valid_from=coupon.valid_from,
+            valid_to=coupon.valid_until,
+            new_user_only=applicability == 'new_user',
+            product_ids=legacy_products.get(coupon.id, frozenset()) if applicability == 'specific_products' else frozenset(),
+            category_ids=legacy_categories.get(coupon.id, frozenset()) if applicability == 'specific_categories' else frozenset(),
+        )
+
+    coupons = Coupon.objects.filter(is_active=True, valid_to__gte=today_start)
+    coupon_products = _group_pairs(
+        Coupon.applicable_products.through.objects.filter(coupon__in=coupons).values_list('coupon_id', 'product_id')
+    )
+    coupon_categories = _group_pairs(
+        Coupon.applicable_categories.through.objects.filter(coupon__in=coupons).values_list('coupon_id', 'category_id')
+    )
+    for coupon in coupons:
+        ruleset.coupons[coupon.code.upper()] = CouponRule(
+            source='promotions',
+            id=coupon.id,
+            code=coupon.code.upper(),
+            description=coupon.description,
+            discount_type=coupon.discount_type,
+            discount_value=coupon.discount_value,
+            min_order_value=coupon.min_order_value or Decimal('0'),
+            max_discount=coupon.max_discount,
+            usage_limit=coupon.usage_limit,
+            times_used=coupon.times_used,
+            usage_per_user=coupon.usage_per_user,
+            valid_from=coupon.valid_from,
+            valid_to=coupon.valid_to,
+            product_ids=coupon_products.get(coupon.id, frozenset()),
+            category_ids=coupon_categories.get(coupon.id, frozenset()),
+        )
+    return ruleset
+
+
+def _group_pairs(pairs):
+    grouped = {}
+    for owner_id, member_id in pairs:
+        grouped.setdefault(owner_id, set()).add(member_id)
+    return {owner_id: frozenset(members) for owner_id, members in grouped.items()}
+
+
+def get_rule_set():
+    """Return the compiled rule set for today's date and the current pricing rules version"""
+    from payments.quote_cache import get_rules_version
+
+    key = RULESET_KEY.format(date=timezone.now().date().isoformat(), version=get_rules_version())
+    return _ruleset_copy.get(key, lambda: compile_rule_set(key))
+
+
+def lines_from_cart_items(cart_items, prices=None):
+    """Build engine lines from CartItem objects, resolving effective prices in one batch if not given"""
+    cart_items = list(cart_items)
+    if prices is None:
+        from orders.services import PriceCalculatorService
+        prices = PriceCalculatorService.resolve_prices(item.product for item in cart_items)
+    lines = []
+    for item in cart_items:
+        price_info = prices[item.product_id]
+        lines.append(CartLine(
+            key=item.id,
+            product_id=item.product_id,
+            category_id=item.product.category_id,
+            quantity=item.quantity,
+            unit_price=Decimal(str(price_info['price'])),
+            original_unit_price=Decimal(str(price_info['original_price'])),
+            deal_id=price_info.get('deal_id'),
+        ))
+    return lines
+
+
+class PromotionEngine:
+    """Evaluates a whole cart against the compiled rule set in one pass"""
+
+    def __init__(self, ruleset=None):
+        self.ruleset = ruleset or get_rule_set()
+
+    def evaluate(self, lines, coupon_code=None, user_id=None):
+        """
+        Returns:
+            dict with per-line discount breakdown, totals and coupon result
+        """
+        breakdown = {}
+        remaining = {}
+        for line in lines:
+            original_unit = line.original_unit_price if line.original_unit_price is not None else line.unit_price
+            entry = {
+                'key': line.key,
+                'product_id': line.product_id,
+                'quantity': line.quantity,
+                'unit_price': original_unit,
+                'line_total': original_unit * line.quantity,
+                'discounts': [],
+            }
+            deal_amount = (original_unit - line.unit_price) * line.quantity
+            if deal_amount > 0:
+                entry['discounts'].append({'type': 'deal', 'rule_id': line.deal_id, 'amount': deal_amount})
+            breakdown[line.key] = entry
+            remaining[line.key] = line.unit_price * line.quantity
+
+        self._apply_bundles(lines, breakdown, remaining)
+        coupon_result = self._apply_coupon(lines, breakdown, remaining, coupon_code, user_id)
+
+        result_lines = []
+        totals = {'deal': Decimal('0'), 'bundle': Decimal('0'), 'coupon': Decimal('0')}
+        for line in lines:
+            entry = breakdown[line.key]
+            for discount in entry['discounts']:
+                discount['amount'] = _money(discount['amount'])
+                totals[discount['type']] += discount['amount']
+            entry['unit_price'] = _money(entry['unit_price'])
+            entry['line_total'] = _money(entry['line_total'])
+            entry['discount_total'] = sum((d['amount'] for d in entry['discounts']), Decimal('0'))
+            entry['final_total'] = entry['line_total'] - entry['discount_total']
+            result_lines.append(entry)
+
+        subtotal = sum((entry['line_total'] for entry in result_lines), Decimal('0'))
+        discount_total = totals['deal'] + totals['bundle'] + totals['coupon']
+        return {
+            'lines': result_lines,
+            'subtotal': subtotal,
+            'deal_discount': totals['deal'],
+            'bundle_discount': totals['bundle'],
+            'coupon_discount': totals['coupon'],
+            'discount_total': discount_total,
+            'total': subtotal - discount_total,
+            'coupon': coupon_result,
+        }
+
+    def _apply_bundles(self, lines, breakdown, remaining):
+        bundles_by_product = self.ruleset.bundles_by_product
+        line_by_product = {}
+        for line in lines:
+            line_by_product.setdefault(line.product_id, line)
+
+        candidates = {}
+        for line in lines:
+            for rule in bundles_by_product.get(line.product_id, ()):
+                if rule.id in candidates or not rule.product_ids.issubset(line_by_product):
+                    continue
+                members = [line_by_product[product_id] for product_id in rule.product_ids]
+                sets = min(member.quantity for member in members)
+                base = sum((member.unit_price * sets for member in members), Decimal('0'))
+                if rule.discount_type == 'percentage':
+                    amount = base * rule.discount_value / Decimal('100')
+                else:
+                    amount = rule.discount_value * sets
+                candidates[rule.id] = (min(amount, base), base, rule, members, sets)
+
+        claimed = set()
+        for amount, base, rule, members, sets in sorted(candidates.values(), key=lambda c: (-c[0], c[2].id)):
+            if amount <= 0 or claimed.intersection(rule.product_ids):
+                continue
+            claimed.update(rule.product_ids)
+            shares = [member.unit_price * sets for member in members]
+            self._distribute(amount, members, shares, 'bundle', rule.id, breakdown, remaining, base)
+
+    def _apply_coupon(self, lines, breakdown, remaining, coupon_code, user_id):
+        if not coupon_code:
+            return None
+        code = str(coupon_code).strip().upper()
+        rule = self.ruleset.coupons.get(code)
+        if rule is None:
+            return {'code': code, 'valid': False, 'error': 'Invalid coupon code', 'discount_amount': Decimal('0')}
+
+        error = self._coupon_error(rule, remaining, user_id)
+        if error:
+            return {'code': code, 'valid': False, 'error': error, 'discount_amount': Decimal('0'), 'rule': rule}
+
+        eligible = [line for line in lines if rule.applies_to(line) and remaining[line.key] > 0]
+        eligible_amount = sum((remaining[line.key] for line in eligible), Decimal('0'))
+        if eligible_amount <= 0:
+            return {
+                'code': code, 'valid': False, 'error': 'This coupon does not apply to items in your cart',
+                'discount_amount': Decimal('0'), 'rule': rule,
+            }
+
+        if rule.discount_type == 'percentage':
+            amount = eligible_amount * rule.discount_value / Decimal('100')
+            if rule.max_discount:
+                amount = min(amount, rule.max_discount)
+        else:
+            amount = rule.discount_value
+        amount = min(amount, eligible_amount)
+
+        shares = [remaining[line.key] for line in eligible]
+        self._distribute(amount, eligible, shares, 'coupon', rule.id, breakdown, remaining, eligible_amount)
+        return {'code': code, 'valid': True, 'error': None, 'discount_amount': _money(amount), 'rule': rule}
+
+    def _coupon_error(self, rule, remaining, user_id):
+        now = timezone.now()
+        if rule.valid_from and now < rule.valid_from:
+            return 'This coupon is not yet valid'
+        if rule.valid_to and now > rule.valid_to:
+            return 'This coupon has expired'
+        if rule.usage_limit is not None and rule.times_used >= rule.usage_limit:
+            return 'This coupon has reached its usage limit'
+
+        cart_total = sum(remaining.values(), Decimal('0'))
+        if rule.min_order_value and cart_total < rule.min_order_value:
+            return f'Minimum order value of ₹{rule.min_order_value} required'
+
+        # Per-user checks are the only lookups made during evaluation
+        if rule.new_user_only:
+            if not user_id:
+                return 'This coupon is for new users only. Please login.'
+            from orders.models import Order
+            if Order.objects.filter(user_id=user_id).exists():
+                return 'This coupon is valid for new users only'
+        if rule.source == 'promotions' and rule.usage_per_user and user_id:
+            from .models import CouponUsage
+            if CouponUsage.objects.filter(coupon_id=rule.id, user_id=user_id).count() >= rule.usage_per_user:
+                return 'You have already used this coupon'
+        return None
+
+    @staticmethod
+    def _distribute(amount, lines, shares, discount_type, rule_id, breakdown, remaining, base):
+        """Split `amount` across `lines` proportionally to `shares`; the last line takes the rounding remainder"""
+        allocated = Decimal('0')
+        for index, (line, share) in enumerate(zip(lines, shares)):
+            if index == len(lines) - 1:
+                portion = amount - allocated
+            else:
+                portion = _money(amount * share / base) if base else Decimal('0')
+            portion = min(portion, remaining[line.key])
+            allocated += portion
+            remaining[line.key] -= portion
+            breakdown[line.key]['discounts'].append({'type': discount_type, 'rule_id': rule_id, 'amount': portion})
+
+
+def redeem_coupon(rule):
+    """
+    Atomically count one redemption against the coupon's usage limit.
+    Returns False if the limit was reached since the rule set was compiled.
+    """
+    from django.db.models import F, Q
+    from products.models import Coupon as LegacyCoupon
+    from .models import Coupon
+
+    if rule.source == 'promotions':
+        model, counter = Coupon, 'times_used'
+    else:
+        model, counter = LegacyCoupon, 'usage_count'
+    updated = model.objects.filter(pk=rule.id).filter(
+        Q(usage_limit__isnull=True) | Q(**{f'{counter}__lt': F('usage_limit')})
+    ).update(**{counter: F(counter) + 1})
+    return updated == 1
+
+
+def record_coupon_usage(rule, order, user, discount_amount):
+    """Per-user usage history (promotions.Coupon only - the legacy model has none)"""
+    from .models import CouponUsage
+
+    if rule.source == 'promotions' and user:
+        CouponUsage.objects.create(coupon_id=rule.id, user=user, order=order, discount_amount=discount_amount)
+
+
+def order_coupon_data(coupon_result):
+    """What Order.coupon_data keeps of a valid coupon result"""
+    rule = coupon_result['rule']
+    return {'source': rule.source, 'id': rule.id, 'code': rule.code,
+            'discount_amount': str(coupon_result['discount_amount'])}
+
+
+def redeem_order_coupon(order):
+    """
+    Count the coupon of a paid order against its limits, once. Returns False if the
+    coupon ran out between checkout and payment (the discount already paid stands).
+    """
+    from orders.models import Order
+
+    coupon = order.coupon_data
+    if not coupon or not Order.objects.filter(pk=order.pk, coupon_redeemed=False).update(coupon_redeemed=True):
+        return True
+    order.coupon_redeemed = True
+    rule = CouponRef(coupon['source'], coupon['id'])
+    redeemed = redeem_coupon(rule)
+    record_coupon_usage(rule, order, order.user, Decimal(coupon['discount_amount']))
+    return redeemed
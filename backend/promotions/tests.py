@@ -1,3 +1,73 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+
+from products.models import Product
+from products.phase3_models import ProductBundle
+from orders.models import Order
+from promotions.engine import PromotionEngine, CartLine, get_rule_set, order_coupon_data, redeem_coupon
+from promotions.models import Coupon, CouponUsage
+from users.models import User
+from vendors.models import VendorProfile
+
+
+class PromotionEngineTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        vendor = VendorProfile.objects.create(
+            user=User.objects.create_user(username='vendor', email='vendor@example.com', password='password'),
+            store_name='Vendor Store'
+        )
+        self.first = Product.objects.create(
+            name='First', vendor=vendor, regular_price=100, description='Desc', slug='first'
+        )
+        self.second = Product.objects.create(
+            name='Second', vendor=vendor, regular_price=100, description='Desc', slug='second'
+        )
+        bundle = ProductBundle.objects.create(
+            primary_product=self.first, discount_type='percentage', discount_value=10
+        )
+        bundle.bundled_products.add(self.second)
+        now = timezone.now()
+        self.coupon = Coupon.objects.create(
+            code='SAVE10', description='10% off', discount_type='percentage', discount_value=10,
+            valid_from=now - timedelta(days=1), valid_to=now + timedelta(days=1), usage_limit=1
+        )
+
+    def lines(self):
+        return [
+            CartLine(key=product.id, product_id=product.id, category_id=None, quantity=1, unit_price=Decimal('100'))
+            for product in (self.first, self.second)
+        ]
+
+    def test_bundle_then_coupon(self):
+        result = PromotionEngine().evaluate(self.lines(), coupon_code='save10')
+        self.assertEqual(result['bundle_discount'], Decimal('20.00'))
+        # Coupon applies to what the bundle left (180)
+        self.assertEqual(result['coupon_discount'], Decimal('18.00'))
+        self.assertEqual(result['total'], Decimal('162.00'))
+        self.assertTrue(result['coupon']['valid'])
+
+    def test_redeem_respects_usage_limit(self):
+        rule = get_rule_set().coupons['SAVE10']
+        self.assertTrue(redeem_coupon(rule))
+        self.assertFalse(redeem_coupon(rule))
+
+    def test_razorpay_order_redeems_its_coupon_once_paid(self):
+        result = PromotionEngine().evaluate(self.lines(), coupon_code='SAVE10')
+        buyer = User.objects.create_user(username='buyer', email='buyer@example.com', password='password')
+        order = Order.objects.create(user=buyer, total_amount=162, shipping_address='Addr',
+                                     coupon_data=order_coupon_data(result['coupon']))
+        # An unpaid (or abandoned) order leaves the single use available
+        self.coupon.refresh_from_db()
+        self.assertEqual(self.coupon.times_used, 0)
 
-# Create your tests here.
+        order.payment_status = 'paid'
+        order.save()
+        order.save()
+        self.coupon.refresh_from_db()
+        self.assertEqual(self.coupon.times_used, 1)
+        self.assertEqual(CouponUsage.objects.get(order=order).discount_amount, Decimal('18.00'))
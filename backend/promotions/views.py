@@ -4,8 +4,10 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.utils import timezone
 from django.db.models import Q
+from decimal import Decimal
 from .models import Coupon, CouponUsage
 from .serializers import CouponSerializer, CouponValidationSerializer, CouponUsageSerializer
+from .engine import PromotionEngine, CartLine
 
 
 @api_view(['POST'])
@@ -22,92 +24,40 @@ def validate_coupon(request):
     user_id = serializer.validated_data.get('user_id') or (request.user.id if request.user.is_authenticated else None)
     items = serializer.validated_data.get('items', [])
     
-    try:
-        coupon = Coupon.objects.get(code=code)
-        
-        # 1. Basic Active Checks
-        now = timezone.now()
-        if not coupon.is_active:
-            return Response({'valid': False, 'error': 'This coupon is no longer active'}, status=400)
-        
-        if now < coupon.valid_from:
-            return Response({'valid': False, 'error': 'This coupon is not yet valid'}, status=400)
-        
-        if now > coupon.valid_to:
-            return Response({'valid': False, 'error': 'This coupon has expired'}, status=400)
-            
-        if coupon.usage_limit and coupon.usage_count >= coupon.usage_limit:
-            return Response({'valid': False, 'error': 'This coupon has reached its usage limit'}, status=400)
-            
-        # 2. Check Min Purchase (on Cart Total)
-        # Note: Model field is `min_purchase_amount`
-        if coupon.min_purchase_amount and cart_total < coupon.min_purchase_amount:
-            return Response({'valid': False, 'error': f'Minimum order value of ₹{coupon.min_purchase_amount} required'}, status=400)
-
-        # 3. Applicability Logic
-        eligible_amount = cart_total
-        
-        if coupon.applicability_type == 'new_user':
-            # Check if user has any previous orders
-            if not user_id:
-                 return Response({'valid': False, 'error': 'This coupon is for new users only. Please login.'}, status=400)
-            
-            from orders.models import Order
-            previous_orders = Order.objects.filter(user_id=user_id).exists()
-            if previous_orders:
-                return Response({'valid': False, 'error': 'This coupon is valid for new users only'}, status=400)
-        
-        elif coupon.applicability_type == 'specific_products':
-            if not items:
-                return Response({'valid': False, 'error': 'Cart items required for validation'}, status=400)
-                
-            allowed_product_ids = set(coupon.specific_products.values_list('id', flat=True))
-            eligible_amount = sum(
-                float(item.get('price', 0)) * int(item.get('quantity', 1)) 
-                for item in items 
-                if item.get('product_id') in allowed_product_ids
-            )
-            
-            if eligible_amount <= 0:
-                 return Response({'valid': False, 'error': 'This coupon does not apply to items in your cart'}, status=400)
-
-        elif coupon.applicability_type == 'specific_categories':
-            if not items:
-                return Response({'valid': False, 'error': 'Cart items required for validation'}, status=400)
-                
-            allowed_category_ids = set(coupon.specific_categories.values_list('id', flat=True))
-            # Also need to handle recursive categories if complex, but simple match for now
-            # Note: client must send category_id in items
-            eligible_amount = sum(
-                float(item.get('price', 0)) * int(item.get('quantity', 1)) 
-                for item in items 
-                if item.get('category_id') in allowed_category_ids
-            )
-            
-            if eligible_amount <= 0:
-                 return Response({'valid': False, 'error': 'This coupon does not apply to items in your cart'}, status=400)
-
-        # 4. Calculate Discount
-        discount_amount = 0
-        if coupon.discount_type == 'percentage':
-            discount_amount = (float(eligible_amount) * float(coupon.discount_value)) / 100.0
-            if coupon.max_discount_amount:
-                discount_amount = min(discount_amount, float(coupon.max_discount_amount))
-        else:
-            discount_amount = float(coupon.discount_value)
-            
-        # Ensure discount doesn't exceed eligible amount (can't give free money beyond item cost)
-        discount_amount = min(discount_amount, float(eligible_amount))
-
-        return Response({
-            'valid': True,
-            'discount_amount': round(discount_amount, 2),
-            'coupon': CouponSerializer(coupon).data,
-            'message': f'Coupon applied! You save ₹{round(discount_amount, 2)}'
-        })
-        
-    except Coupon.DoesNotExist:
+    engine = PromotionEngine()
+    rule = engine.ruleset.coupons.get(code)
+    if rule is None:
         return Response({'valid': False, 'error': 'Invalid coupon code'}, status=404)
+    
+    if (rule.product_ids or rule.category_ids) and not items:
+        return Response({'valid': False, 'error': 'Cart items required for validation'}, status=400)
+    
+    # Evaluate against the client's cart lines, or the whole cart total as one line
+    if items:
+        lines = [
+            CartLine(
+                key=index,
+                product_id=item.get('product_id'),
+                category_id=item.get('category_id'),
+                quantity=int(item.get('quantity', 1)),
+                unit_price=Decimal(str(item.get('price', 0))),
+            )
+            for index, item in enumerate(items)
+        ]
+    else:
+        lines = [CartLine(key='cart', product_id=None, category_id=None, quantity=1, unit_price=cart_total)]
+    
+    result = engine.evaluate(lines, coupon_code=code, user_id=user_id)['coupon']
+    if not result['valid']:
+        return Response({'valid': False, 'error': result['error']}, status=400)
+    
+    discount_amount = result['discount_amount']
+    return Response({
+        'valid': True,
+        'discount_amount': float(discount_amount),
+        'coupon': rule.as_dict(),
+        'message': f'Coupon applied! You save ₹{discount_amount}'
+    })
 
 
 @api_view(['GET'])
@@ -2,7 +2,7 @@ from django.contrib import admin
 from .models import (
     VendorProfile, Wallet, Withdrawal, Transaction,
     StoreReview, StoreFollower, VendorCoupon, VendorAnnouncement,
-    PayoutRequest
+    PayoutRequest, VendorPincode, VendorPincodeRange
 )
 
 @admin.register(VendorProfile)
@@ -61,3 +61,30 @@ class PayoutRequestAdmin(admin.ModelAdmin):
     list_display = ['vendor', 'requested_amount', 'status', 'requested_at']
     list_filter = ['status', 'requested_at']
     search_fields = ['vendor__store_name']
+
+
+class ReadOnlyPincodeAdmin(admin.ModelAdmin):
+    """Rows are managed from the store settings and CSV uploads (vendors.pincodes)"""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(VendorPincode)
+class VendorPincodeAdmin(ReadOnlyPincodeAdmin):
+    list_display = ['pincode', 'vendor', 'source', 'created_at']
+    list_filter = ['source']
+    search_fields = ['pincode', 'vendor__store_name']
+
+
+@admin.register(VendorPincodeRange)
+class VendorPincodeRangeAdmin(ReadOnlyPincodeAdmin):
+    list_display = ['start', 'end', 'vendor', 'source', 'created_at']
+    list_filter = ['source']
+    search_fields = ['vendor__store_name']
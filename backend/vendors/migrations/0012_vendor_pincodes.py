@@ -0,0 +1,84 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+PINCODE_MIN = 100000
+
+
+def parse_entries(tokens):
+    """(pincodes, ranges) for '400001' / '400001-400104' tokens (copy of vendors.pincodes.parse_entries at this migration)"""
+    pincodes, ranges = set(), set()
+    for token in tokens:
+        token = str(token).strip()
+        if not token:
+            continue
+        start, _, end = token.partition('-')
+        start, end = start.strip(), (end.strip() or start.strip())
+        if not (len(start) == 6 and start.isdigit() and len(end) == 6 and end.isdigit()):
+            continue
+        start, end = sorted((int(start), int(end)))
+        if start < PINCODE_MIN:
+            continue
+        if start == end:
+            pincodes.add(f'{start:06d}')
+        else:
+            ranges.add((start, end))
+    return pincodes, sorted(ranges)
+
+
+def backfill_vendor_pincodes(apps, schema_editor):
+    VendorProfile = apps.get_model('vendors', 'VendorProfile')
+    VendorPincode = apps.get_model('vendors', 'VendorPincode')
+    VendorPincodeRange = apps.get_model('vendors', 'VendorPincodeRange')
+
+    vendors = VendorProfile.objects.exclude(serviceable_pincodes='').values_list('id', 'serviceable_pincodes')
+    for vendor_id, value in vendors.iterator():
+        pincodes, ranges = parse_entries((value or '').split(','))
+        VendorPincode.objects.bulk_create(
+            [VendorPincode(vendor_id=vendor_id, pincode=pincode, source='settings') for pincode in sorted(pincodes)],
+            batch_size=2000, ignore_conflicts=True,
+        )
+        VendorPincodeRange.objects.bulk_create(
+            [VendorPincodeRange(vendor_id=vendor_id, start=start, end=end, source='settings') for start, end in ranges],
+            batch_size=2000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0011_add_delhivery_warehouse_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorPincode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pincode', models.CharField(max_length=6)),
+                ('source', models.CharField(choices=[('settings', 'Store settings'), ('upload', 'CSV upload')], default='settings', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pincode_entries', to='vendors.vendorprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['pincode', 'vendor'], name='vendors_ven_pincode_ccc018_idx')],
+                'constraints': [models.UniqueConstraint(fields=('vendor', 'pincode', 'source'), name='unique_vendor_pincode')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VendorPincodeRange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.PositiveIntegerField()),
+                ('end', models.PositiveIntegerField()),
+                ('source', models.CharField(choices=[('settings', 'Store settings'), ('upload', 'CSV upload')], default='settings', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pincode_ranges', to='vendors.vendorprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['start', 'end', 'vendor'], name='vendors_ven_start_e9ad47_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_vendor_pincodes, migrations.RunPython.noop),
+    ]
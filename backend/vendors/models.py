@@ -306,7 +306,50 @@ class VendorAnnouncement(models.Model):
     def __str__(self):
         return f"{self.vendor.store_name} - {self.title}"
 
-from django.db.models.signals import post_save
+class VendorPincode(models.Model):
+    """
+    A pincode a vendor delivers to: serviceable_pincodes normalized, plus CSV uploads
+    (see vendors.pincodes). A vendor without any pincode or range delivers everywhere.
+    """
+    SOURCE_CHOICES = (
+        ('settings', 'Store settings'),
+        ('upload', 'CSV upload'),
+    )
+
+    vendor = models.ForeignKey(VendorProfile, on_delete=models.CASCADE, related_name='pincode_entries')
+    pincode = models.CharField(max_length=6)
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default='settings')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['vendor', 'pincode', 'source'], name='unique_vendor_pincode'),
+        ]
+        indexes = [
+            models.Index(fields=['pincode', 'vendor']),
+        ]
+
+    def __str__(self):
+        return f"{self.vendor.store_name} - {self.pincode}"
+
+
+class VendorPincodeRange(models.Model):
+    """An inclusive range of pincodes a vendor delivers to (e.g. 400001-400104)"""
+    vendor = models.ForeignKey(VendorProfile, on_delete=models.CASCADE, related_name='pincode_ranges')
+    start = models.PositiveIntegerField()
+    end = models.PositiveIntegerField()
+    source = models.CharField(max_length=10, choices=VendorPincode.SOURCE_CHOICES, default='settings')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['start', 'end', 'vendor']),
+        ]
+
+    def __str__(self):
+        return f"{self.vendor.store_name} - {self.start:06d}-{self.end:06d}"
+
+from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
 from .models import VendorProfile
 
@@ -324,3 +367,19 @@ def sync_delhivery_warehouse(sender, instance, created, **kwargs):
             except Exception as e:
                 # Don't break the save if Delhivery fails
                 print(f"Auto-sync Delhivery failed: {e}")
+
+
+@receiver(pre_save, sender=VendorProfile)
+def remember_serviceable_pincodes(sender, instance, **kwargs):
+    instance._previous_serviceable_pincodes = (
+        VendorProfile.objects.filter(pk=instance.pk).values_list('serviceable_pincodes', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=VendorProfile)
+def sync_serviceable_pincodes(sender, instance, created, **kwargs):
+    """Keep the vendor's normalized pincode rows in line with serviceable_pincodes"""
+    if (instance.serviceable_pincodes or '') != (getattr(instance, '_previous_serviceable_pincodes', None) or ''):
+        from .pincodes import sync_from_settings
+        sync_from_settings(instance)
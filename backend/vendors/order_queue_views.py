@@ -0,0 +1,67 @@
+"""
+Vendor order queue.
+
+Served from VendorOrder (one row per vendor per order, vendor_id and status
+denormalized onto it) so a page is an index range scan on
+(vendor, [status,] -created_at, -id) however much order history the vendor
+has. Pagination is keyset (cursor) based rather than OFFSET, and the counts
+for the status tabs come from a single conditional aggregation.
+"""
+from django.db.models import Count, Prefetch, Q
+from rest_framework import generics, permissions
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.pagination import CursorPagination
+
+from orders.models import Order, OrderItem, VendorOrder
+from orders.serializers import VendorOrderQueueSerializer
+
+QUEUE_STATUSES = [code for code, label in Order.STATUS_CHOICES]
+
+
+def status_counts(vendor):
+    """{'all': n, '<STATUS>': n, ...} for the vendor's queue tabs in one query"""
+    return VendorOrder.objects.filter(vendor=vendor).aggregate(
+        all=Count('id'),
+        **{code: Count('id', filter=Q(status=code)) for code in QUEUE_STATUSES}
+    )
+
+
+class VendorOrderQueuePagination(CursorPagination):
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    # id breaks ties between sub-orders created in the same instant
+    ordering = ('-created_at', '-id')
+
+
+class VendorOrderQueueView(generics.ListAPIView):
+    """
+    GET /api/vendors/orders/?status=PENDING&cursor=...
+    Returns the page, next/previous cursors and `counts` for every status tab.
+    """
+    serializer_class = VendorOrderQueueSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = VendorOrderQueuePagination
+
+    def get_vendor(self):
+        vendor = getattr(self.request.user, 'vendor_profile', None)
+        if vendor is None:
+            raise PermissionDenied('Vendor profile not found')
+        return vendor
+
+    def get_queryset(self):
+        queryset = VendorOrder.objects.filter(vendor=self.get_vendor()).select_related('order').prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.only(
+                'id', 'vendor_order_id', 'product_id', 'product_name', 'product_sku',
+                'quantity', 'cancelled_quantity', 'price',
+            ))
+        )
+        status = self.request.query_params.get('status')
+        if status:
+            queryset = queryset.filter(status=status)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        response.data['counts'] = status_counts(self.get_vendor())
+        return response
@@ -4,7 +4,7 @@ Utility functions for calculating vendor payouts based on delivered orders
 from decimal import Decimal
 from django.db.models import Sum, Q, F
 from django.utils import timezone
-from orders.models import OrderItem, Order
+from orders.models import OrderItem, Order, VendorOrder
 from products.models import Category
 
 
@@ -37,9 +37,10 @@ def calculate_pending_payouts():
     # 2. Delivered at least 7 days ago
     # 3. Don't have active return requests
     unpaid_items = OrderItem.objects.filter(
-        order__status='DELIVERED',
-        paid_to_vendor=False,
-        order__delivered_at__lte=cutoff_date  # Delivered 7+ days ago
+        vendor_order__status='DELIVERED',
+        vendor_order__paid_to_vendor=False,
+        vendor_order__delivered_at__lte=cutoff_date,  # Delivered 7+ days ago
+        paid_to_vendor=False
     ).exclude(
         id__in=items_with_returns  # No active return requests
     ).select_related('vendor', 'product', 'product__category', 'order')
@@ -94,7 +95,7 @@ def calculate_pending_payouts():
         # Add item details
         vendor_payouts[vendor_id]['order_items'].append({
             'order_id': item.order.id,
-            'product_name': item.product.name,
+            'product_name': item.product_name,
             'quantity': item.quantity,
             'price': float(item.price),
             'total': float(item_total),
@@ -154,10 +155,11 @@ def trigger_payout(vendor_id, admin_user, transaction_id='', notes=''):
     
     # Get all unpaid delivered items for this vendor that meet payout criteria
     unpaid_items = OrderItem.objects.filter(
-        vendor_id=vendor_id,
-        order__status='DELIVERED',
-        paid_to_vendor=False,
-        order__delivered_at__lte=cutoff_date  # Delivered 7+ days ago
+        vendor_order__vendor_id=vendor_id,
+        vendor_order__status='DELIVERED',
+        vendor_order__paid_to_vendor=False,
+        vendor_order__delivered_at__lte=cutoff_date,  # Delivered 7+ days ago
+        paid_to_vendor=False
     ).exclude(
         id__in=items_with_returns  # No active return requests
     ).select_related('product', 'product__category')
@@ -191,6 +193,11 @@ def trigger_payout(vendor_id, admin_user, transaction_id='', notes=''):
         total_sales += item_total
         total_commission += commission
     
+    # Sub-orders with every item paid out are settled
+    VendorOrder.objects.filter(
+        id__in={item.vendor_order_id for item in unpaid_items}
+    ).exclude(items__paid_to_vendor=False).update(paid_to_vendor=True, payout_date=payout_date)
+    
     net_payout = total_sales - total_commission
     
     # Create payout request record
@@ -0,0 +1,75 @@
+import csv
+import io
+
+from rest_framework import permissions, status
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .models import VendorPincode, VendorPincodeRange
+from .pincodes import parse_entries, replace_entries
+
+MAX_INVALID_REPORTED = 50
+
+
+class VendorPincodeView(APIView):
+    """
+    GET    /api/vendors/pincodes/  counts of the vendor's serviceable pincodes and ranges by source
+    POST   /api/vendors/pincodes/  CSV upload (`file`) replacing the uploaded pincodes; every cell is a
+                                   pincode or a range like 400001-400104
+    DELETE /api/vendors/pincodes/  remove the uploaded pincodes (store settings ones stay)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_vendor(self):
+        vendor = getattr(self.request.user, 'vendor_profile', None)
+        if vendor is None:
+            raise PermissionDenied('Vendor profile not found')
+        return vendor
+
+    def summary(self, vendor):
+        counts = {}
+        for source, label in VendorPincode.SOURCE_CHOICES:
+            counts[source] = {
+                'pincodes': VendorPincode.objects.filter(vendor=vendor, source=source).count(),
+                'ranges': VendorPincodeRange.objects.filter(vendor=vendor, source=source).count(),
+            }
+        return counts
+
+    def get(self, request):
+        return Response(self.summary(self.get_vendor()))
+
+    def post(self, request):
+        vendor = self.get_vendor()
+        csv_file = request.FILES.get('file')
+        if not csv_file:
+            return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
+        if not csv_file.name.lower().endswith('.csv'):
+            return Response({'error': 'File must be CSV format'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            rows = csv.reader(io.StringIO(csv_file.read().decode('utf-8-sig')))
+            tokens = [cell for row in rows for cell in row]
+        except UnicodeDecodeError:
+            return Response({'error': 'File must be UTF-8 encoded'}, status=status.HTTP_400_BAD_REQUEST)
+
+        pincodes, ranges, invalid = parse_entries(tokens)
+        # A header cell such as "pincode" is not an error
+        invalid = [token for token in invalid if not token.isalpha()]
+        if not pincodes and not ranges:
+            return Response({'error': 'No valid pincodes found', 'invalid': invalid[:MAX_INVALID_REPORTED]},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        replace_entries(vendor, pincodes, ranges, 'upload')
+        return Response({
+            'imported_pincodes': len(pincodes),
+            'imported_ranges': len(ranges),
+            'invalid': invalid[:MAX_INVALID_REPORTED],
+            'invalid_count': len(invalid),
+            'counts': self.summary(vendor),
+        })
+
+    def delete(self, request):
+        vendor = self.get_vendor()
+        replace_entries(vendor, (), (), 'upload')
+        return Response(self.summary(vendor))
@@ -0,0 +1,120 @@
+"""
+Normalized vendor serviceable pincodes.
+
+VendorProfile.serviceable_pincodes is a comma-separated list that had to be
+parsed on every check and could not be queried. Its entries - single pincodes
+or ranges like 400001-400104 - are stored as VendorPincode and
+VendorPincodeRange rows instead, together with those from CSV uploads:
+
+- rows are replaced per source ('settings' on every change of the text field,
+  'upload' on every CSV upload), so one never overwrites the other
+- a vendor with no rows at all delivers everywhere, like an empty text field
+- "which vendors deliver to 400001" is an index lookup on (pincode, vendor) plus
+  the (start, end) range index, and deliverable_filter() turns it into an EXISTS
+  semi-join for product listings
+"""
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from .models import VendorPincode, VendorPincodeRange
+
+PINCODE_MIN = 100000
+PINCODE_MAX = 999999
+
+
+def parse_entries(tokens):
+    """
+    (pincodes, ranges, invalid) for pincode tokens: '400001' or '400001-400104'.
+    Pincodes are six-digit strings, ranges inclusive (start, end) ints.
+    """
+    pincodes, ranges, invalid = set(), set(), []
+    for token in tokens:
+        token = str(token).strip()
+        if not token:
+            continue
+        start, _, end = token.partition('-')
+        start, end = start.strip(), (end.strip() or start.strip())
+        if not (len(start) == 6 and start.isdigit() and len(end) == 6 and end.isdigit()):
+            invalid.append(token)
+            continue
+        start, end = sorted((int(start), int(end)))
+        if start < PINCODE_MIN:
+            invalid.append(token)
+        elif start == end:
+            pincodes.add(f'{start:06d}')
+        else:
+            ranges.add((start, end))
+    return pincodes, sorted(ranges), invalid
+
+
+def split_setting(value):
+    return (value or '').split(',')
+
+
+def replace_entries(vendor, pincodes, ranges, source):
+    """Replace the vendor's rows of `source` with `pincodes` and `ranges`"""
+    from orders import serviceability
+
+    with transaction.atomic():
+        VendorPincode.objects.filter(vendor=vendor, source=source).delete()
+        VendorPincodeRange.objects.filter(vendor=vendor, source=source).delete()
+        VendorPincode.objects.bulk_create(
+            [VendorPincode(vendor=vendor, pincode=pincode, source=source) for pincode in sorted(pincodes)],
+            batch_size=2000,
+        )
+        VendorPincodeRange.objects.bulk_create(
+            [VendorPincodeRange(vendor=vendor, start=start, end=end, source=source) for start, end in ranges],
+            batch_size=2000,
+        )
+        transaction.on_commit(lambda: serviceability.invalidate(serviceability.vendor_scope(vendor.pk)))
+
+
+def sync_from_settings(vendor):
+    pincodes, ranges, invalid = parse_entries(split_setting(vendor.serviceable_pincodes))
+    replace_entries(vendor, pincodes, ranges, 'settings')
+    return invalid
+
+
+def vendor_pincodes(vendor_id):
+    """Every pincode the vendor lists, ranges expanded (empty if it delivers everywhere)"""
+    yield from VendorPincode.objects.filter(vendor_id=vendor_id).values_list('pincode', flat=True).iterator()
+    for start, end in VendorPincodeRange.objects.filter(vendor_id=vendor_id).values_list('start', 'end'):
+        for value in range(max(start, PINCODE_MIN), min(end, PINCODE_MAX) + 1):
+            yield f'{value:06d}'
+
+
+def _matches(pincode, vendor):
+    value = int(pincode)
+    return (
+        Q(Exists(VendorPincode.objects.filter(pincode=pincode, vendor=vendor)))
+        | Q(Exists(VendorPincodeRange.objects.filter(start__lte=value, end__gte=value, vendor=vendor)))
+    )
+
+
+def _restricted(vendor):
+    return Q(Exists(VendorPincode.objects.filter(vendor=vendor))) | Q(Exists(VendorPincodeRange.objects.filter(vendor=vendor)))
+
+
+def deliverable_filter(pincode, vendor_field='vendor'):
+    """Q for rows whose vendor (`vendor_field`) delivers to `pincode`, as EXISTS semi-joins"""
+    pincode = str(pincode or '').strip()
+    if not (len(pincode) == 6 and pincode.isdigit()):
+        return Q(pk__in=[])
+    vendor = OuterRef(vendor_field)
+    return Q(**{f'{vendor_field}__isnull': True}) | _matches(pincode, vendor) | ~_restricted(vendor)
+
+
+def vendors_delivering_to(pincode):
+    """VendorProfile queryset of vendors that deliver to `pincode`"""
+    from .models import VendorProfile
+
+    return VendorProfile.objects.filter(deliverable_filter(pincode, vendor_field='pk'))
+
+
+def filter_deliverable(queryset, pincode, vendor_field='vendor'):
+    """`queryset` narrowed to rows deliverable to `pincode` (global whitelist and vendor pincodes)"""
+    from orders.serviceability import check_pincode
+
+    if not check_pincode(pincode)[None][0]:
+        return queryset.none()
+    return queryset.filter(deliverable_filter(pincode, vendor_field))
@@ -1,3 +1,47 @@
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from products.models import Product
+from users.models import User
+
+from .models import VendorPincode, VendorPincodeRange, VendorProfile
+from .pincodes import vendors_delivering_to
+
+
+class VendorPincodeTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.vendors = {}
+        for name, pincodes in (('ranged', '400001, 110001-110099, junk'), ('everywhere', ''), ('uploaded', '')):
+            self.vendors[name] = VendorProfile.objects.create(
+                user=User.objects.create_user(username=name, email=f'{name}@example.com', password='password'),
+                store_name=name, serviceable_pincodes=pincodes, verification_status='verified'
+            )
+            Product.objects.create(name=name, vendor=self.vendors[name], regular_price=100, description='Desc', slug=name)
+
+    def test_rows_follow_settings_and_uploads_and_filter_listings(self):
+        ranged = self.vendors['ranged']
+        self.assertEqual(list(VendorPincode.objects.filter(vendor=ranged).values_list('pincode', flat=True)), ['400001'])
+        self.assertEqual(list(VendorPincodeRange.objects.filter(vendor=ranged).values_list('start', 'end')),
+                         [(110001, 110099)])
+
+        client = APIClient()
+        client.force_authenticate(self.vendors['uploaded'].user)
+        upload = SimpleUploadedFile('pincodes.csv', b'pincode\n560001\n560002-560010\n')
+        response = client.post('/api/vendors/pincodes/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['counts']['upload'], {'pincodes': 1, 'ranges': 1})
+
+        delivering = lambda pincode: set(vendors_delivering_to(pincode).values_list('store_name', flat=True))
+        self.assertEqual(delivering('110050'), {'ranged', 'everywhere'})
+        self.assertEqual(delivering('560005'), {'everywhere', 'uploaded'})
+
+        response = APIClient().get('/api/products/', {'deliverable_to': '400001'})
+        self.assertEqual({product['name'] for product in response.data}, {'ranged', 'everywhere'})
+
+        # Editing the settings replaces only the settings rows
+        ranged.serviceable_pincodes = ''
+        ranged.save()
+        self.assertEqual(delivering('560005'), {'ranged', 'everywhere', 'uploaded'})
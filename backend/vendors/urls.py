@@ -1,5 +1,7 @@
 from django.urls import path
 from . import views
+from .order_queue_views import VendorOrderQueueView
+from .pincode_views import VendorPincodeView
 from .payout_views import (
     PayoutRequestListView, PayoutRequestDetailView,
     ApprovePayoutView, RejectPayoutView, VendorPayoutStatsView,
@@ -37,4 +39,10 @@ urlpatterns = [
     
     # Vendor Personal Wallet
     path('wallet/stats/', views.VendorWalletStatsView.as_view(), name='vendor-wallet-stats'),
+
+    # Vendor order queue
+    path('orders/', VendorOrderQueueView.as_view(), name='vendor-order-queue'),
+
+    # Serviceable pincodes (CSV upload)
+    path('pincodes/', VendorPincodeView.as_view(), name='vendor-pincodes'),
 ]
@@ -1,14 +1,14 @@
 from rest_framework import generics, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from django.db.models import Sum, Count, Avg
+from django.db.models import Sum, Count, Avg, Q
 from django.utils import timezone
 from datetime import timedelta
 from decimal import Decimal
 from .models import VendorProfile, Wallet, Withdrawal
 from .serializers import VendorProfileSerializer, WalletSerializer, WithdrawalSerializer
 from products.models import Product
-from orders.models import OrderItem
+from orders.models import VendorOrder
 from .wallet_views import VendorWalletStatsView
 
 class VendorProfileView(generics.RetrieveUpdateAPIView):
@@ -51,27 +51,24 @@ class VendorStatsView(APIView):
         today = timezone.now()
         last_30_days = today - timedelta(days=30)
 
-        # Revenue metrics
-        total_revenue = OrderItem.objects.filter(
-            vendor=vendor_profile,
-            order__status='DELIVERED'
-        ).aggregate(total=Sum('price'))['total'] or Decimal('0.00')
-
-        pending_revenue = OrderItem.objects.filter(
-            vendor=vendor_profile,
-            order__status__in=['PENDING', 'PROCESSING', 'SHIPPED']
-        ).aggregate(total=Sum('price'))['total'] or Decimal('0.00')
-
-        # Order metrics
-        total_orders = OrderItem.objects.filter(vendor=vendor_profile).values('order').distinct().count()
-        pending_orders = OrderItem.objects.filter(vendor=vendor_profile, order__status='PENDING').values('order').distinct().count()
+        # Revenue and order metrics from the vendor's sub-orders in one query
+        order_stats = VendorOrder.objects.filter(vendor=vendor_profile).aggregate(
+            total_revenue=Sum('subtotal', filter=Q(status='DELIVERED')),
+            pending_revenue=Sum('subtotal', filter=Q(status__in=['PENDING', 'PROCESSING', 'SHIPPED'])),
+            total_orders=Count('id'),
+            pending_orders=Count('id', filter=Q(status='PENDING')),
+        )
+        total_revenue = order_stats['total_revenue'] or Decimal('0.00')
+        pending_revenue = order_stats['pending_revenue'] or Decimal('0.00')
+        total_orders = order_stats['total_orders']
+        pending_orders = order_stats['pending_orders']
 
         # Product metrics
         total_products = Product.objects.filter(vendor=vendor_profile).count()
         active_products = Product.objects.filter(vendor=vendor_profile, is_active=True).count()
 
         # Customer metrics
-        total_customers = OrderItem.objects.filter(vendor=vendor_profile).values('order__user').distinct().count()
+        total_customers = VendorOrder.objects.filter(vendor=vendor_profile).values('order__user').distinct().count()
 
         # Wallet
         try:
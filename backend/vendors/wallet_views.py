@@ -5,7 +5,7 @@ from rest_framework import status
 from django.db.models import Sum, Q
 
 from .models import VendorProfile, Wallet, PayoutRequest
-from orders.models import OrderItem
+from orders.models import VendorOrder
 
 class VendorWalletStatsView(APIView):
     """
@@ -32,10 +32,10 @@ class VendorWalletStatsView(APIView):
             # Let's stick to what's in the wallet logic if possible, or OrderItem aggregation
             
             # Total Revenue (Gross Sales)
-            total_sales = OrderItem.objects.filter(
+            total_sales = VendorOrder.objects.filter(
                 vendor=vendor,
-                order__status='DELIVERED'
-            ).aggregate(total=Sum('price'))['total'] or 0
+                status='DELIVERED'
+            ).aggregate(total=Sum('subtotal'))['total'] or 0
             
             # 3. Pending Payouts
             # Use the existing calculation logic logic if possible, or simplified:
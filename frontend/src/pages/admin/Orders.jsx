@@ -4,14 +4,24 @@ import { Button } from '../../components/ui/button';
 import { Input } from '../../components/ui/input';
 import { Modal } from '../../components/ui/modal';
 import { ConfirmDialog } from '../../components/ui/confirm-dialog';
-import { Search, Eye, Package, XCircle, CheckCircle2 } from 'lucide-react';
+import { Search, Eye, Package, XCircle, CheckCircle2, ChevronLeft, ChevronRight } from 'lucide-react';
 import api from '../../services/api';
 import toast from 'react-hot-toast';
 
+const PAGE_SIZE = 50;
+const STATUSES = ['PENDING', 'PROCESSING', 'SHIPPED', 'DELIVERED', 'CANCELLED'];
+
 const AdminOrders = () => {
     const [orders, setOrders] = useState([]);
     const [loading, setLoading] = useState(true);
     const [searchTerm, setSearchTerm] = useState('');
+    // Search and filters run on the server (the list is paginated)
+    const [query, setQuery] = useState('');
+    const [statusFilter, setStatusFilter] = useState('');
+    const [dateFrom, setDateFrom] = useState('');
+    const [dateTo, setDateTo] = useState('');
+    const [page, setPage] = useState(1);
+    const [pageInfo, setPageInfo] = useState({ count: 0, next: null, previous: null });
     const [selectedOrder, setSelectedOrder] = useState(null);
     const [isViewModalOpen, setIsViewModalOpen] = useState(false);
     const [isCancelDialogOpen, setIsCancelDialogOpen] = useState(false);
@@ -19,14 +29,30 @@ const AdminOrders = () => {
     const [isStatusDialogOpen, setIsStatusDialogOpen] = useState(false);
     const [statusUpdate, setStatusUpdate] = useState({ orderId: null, newStatus: null });
 
+    // Debounce typing before querying the server
+    useEffect(() => {
+        const timer = setTimeout(() => {
+            setQuery(searchTerm.trim());
+            setPage(1);
+        }, 300);
+        return () => clearTimeout(timer);
+    }, [searchTerm]);
+
     useEffect(() => {
         fetchOrders();
-    }, []);
+    }, [query, statusFilter, dateFrom, dateTo, page]);
 
     const fetchOrders = async () => {
+        setLoading(true);
         try {
-            const response = await api.get('/orders/admin/orders/');
-            setOrders(response.data);
+            const params = { page, page_size: PAGE_SIZE };
+            if (query) params.q = query;
+            if (statusFilter) params.status = statusFilter;
+            if (dateFrom) params.date_from = dateFrom;
+            if (dateTo) params.date_to = dateTo;
+            const response = await api.get('/orders/admin/orders/', { params });
+            setOrders(response.data.results);
+            setPageInfo({ count: response.data.count, next: response.data.next, previous: response.data.previous });
         } catch (error) {
             console.error('Failed to fetch orders:', error);
             toast.error('Failed to load orders');
@@ -35,9 +61,15 @@ const AdminOrders = () => {
         }
     };
 
-    const handleViewOrder = (order) => {
-        setSelectedOrder(order);
-        setIsViewModalOpen(true);
+    const handleViewOrder = async (order) => {
+        // The list holds summary rows; load the full order on demand
+        try {
+            const response = await api.get(`/orders/orders/${order.id}/`);
+            setSelectedOrder(response.data);
+            setIsViewModalOpen(true);
+        } catch (error) {
+            toast.error('Failed to load order details');
+        }
     };
 
     const confirmStatusUpdate = (orderId, newStatus) => {
@@ -58,10 +90,8 @@ const AdminOrders = () => {
                 setSelectedOrder(response.data);
             }
 
-            // Update the order in the orders list
-            setOrders(orders.map(order =>
-                order.id === statusUpdate.orderId ? response.data : order
-            ));
+            // Reload the page: the order may no longer match the filters
+            fetchOrders();
 
             setIsStatusDialogOpen(false);
             setStatusUpdate({ orderId: null, newStatus: null });
@@ -87,17 +117,18 @@ const AdminOrders = () => {
         }
     };
 
-    const filteredOrders = orders.filter(order =>
-        order.id?.toString().includes(searchTerm) ||
-        order.user?.username?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        order.user?.email?.toLowerCase().includes(searchTerm.toLowerCase())
-    );
+    const updateFilter = (setter) => (e) => {
+        setter(e.target.value);
+        setPage(1);
+    };
 
-    // Split orders into active and delivered
-    const activeOrders = filteredOrders.filter(order =>
+    const pageCount = Math.max(1, Math.ceil(pageInfo.count / PAGE_SIZE));
+
+    // Split the current page into active and delivered
+    const activeOrders = orders.filter(order =>
         order.status !== 'DELIVERED' && order.status !== 'CANCELLED'
     );
-    const deliveredOrders = filteredOrders.filter(order =>
+    const deliveredOrders = orders.filter(order =>
         order.status === 'DELIVERED' || order.status === 'CANCELLED'
     );
 
@@ -145,7 +176,7 @@ const AdminOrders = () => {
                                         <td className="py-4 font-medium">#{order.id}</td>
                                         <td className="py-4">{order.user?.username || 'N/A'}</td>
                                         <td className="py-4 text-sm text-slate-600">{order.user?.email || 'N/A'}</td>
-                                        <td className="py-4">{order.items?.length || 0} items</td>
+                                        <td className="py-4">{order.item_count ?? order.items?.length ?? 0} items</td>
                                         <td className="py-4 font-semibold">₹{Number(order.total_amount || 0).toFixed(2)}</td>
                                         <td className="py-4">
                                             <span className={`px-2 py-1 rounded-full text-xs ${getStatusColor(order.status)}`}>
@@ -193,18 +224,51 @@ const AdminOrders = () => {
                         </div>
                     </div>
 
-                    {/* Search */}
+                    {/* Search and filters */}
                     <Card className="border-2 border-slate-200">
-                        <CardContent className="pt-6">
+                        <CardContent className="pt-6 space-y-4">
                             <div className="relative">
                                 <Search className="absolute left-3 top-1/2 transform -translate-y-1/2 h-4 w-4 text-slate-400" />
                                 <Input
-                                    placeholder="Search by order ID, customer name, or email..."
+                                    placeholder="Search by order ID, email, phone, name, AWB or payment ID..."
                                     value={searchTerm}
                                     onChange={(e) => setSearchTerm(e.target.value)}
                                     className="pl-10"
                                 />
                             </div>
+                            <div className="grid grid-cols-1 md:grid-cols-3 gap-4">
+                                <div>
+                                    <label className="block text-sm font-medium mb-2">Status</label>
+                                    <select
+                                        value={statusFilter}
+                                        onChange={updateFilter(setStatusFilter)}
+                                        className="w-full px-3 py-2 border rounded-lg"
+                                    >
+                                        <option value="">All statuses</option>
+                                        {STATUSES.map(status => (
+                                            <option key={status} value={status}>{status}</option>
+                                        ))}
+                                    </select>
+                                </div>
+                                <div>
+                                    <label className="block text-sm font-medium mb-2">From</label>
+                                    <input
+                                        type="date"
+                                        value={dateFrom}
+                                        onChange={updateFilter(setDateFrom)}
+                                        className="w-full px-3 py-2 border rounded-lg"
+                                    />
+                                </div>
+                                <div>
+                                    <label className="block text-sm font-medium mb-2">To</label>
+                                    <input
+                                        type="date"
+                                        value={dateTo}
+                                        onChange={updateFilter(setDateTo)}
+                                        className="w-full px-3 py-2 border rounded-lg"
+                                    />
+                                </div>
+                            </div>
                         </CardContent>
                     </Card>
 
@@ -225,6 +289,33 @@ const AdminOrders = () => {
                                 title="Delivered & Cancelled Orders"
                                 icon={CheckCircle2}
                             />
+
+                            {/* Pagination */}
+                            <div className="flex items-center justify-between">
+                                <p className="text-sm text-slate-600">
+                                    {pageInfo.count} orders · page {page} of {pageCount}
+                                </p>
+                                <div className="flex gap-2">
+                                    <Button
+                                        variant="outline"
+                                        size="sm"
+                                        onClick={() => setPage(page - 1)}
+                                        disabled={!pageInfo.previous}
+                                    >
+                                        <ChevronLeft className="h-4 w-4" />
+                                        Previous
+                                    </Button>
+                                    <Button
+                                        variant="outline"
+                                        size="sm"
+                                        onClick={() => setPage(page + 1)}
+                                        disabled={!pageInfo.next}
+                                    >
+                                        Next
+                                        <ChevronRight className="h-4 w-4" />
+                                    </Button>
+                                </div>
+                            </div>
                         </>
                     )}
 
@@ -409,7 +500,7 @@ const AdminOrders = () => {
                                 <div>
                                     <h3 className="font-semibold mb-3">Update Order Status</h3>
                                     <div className="flex gap-2 flex-wrap">
-                                        {['PENDING', 'PROCESSING', 'SHIPPED', 'DELIVERED', 'CANCELLED'].map(status => (
+                                        {STATUSES.map(status => (
                                             <Button
                                                 key={status}
                                                 size="sm"
@@ -3,11 +3,17 @@ import { Package, Truck, Tag, Calendar, Download, XCircle, RefreshCw, Banknote }
 import api from '../../services/api';
 import toast from 'react-hot-toast';
 
+const PAGE_SIZE = 50;
+
 const ShipmentManager = () => {
     const [activeTab, setActiveTab] = useState('pending');
     const [shipments, setShipments] = useState([]);
     const [pendingOrders, setPendingOrders] = useState([]);
     const [codOrders, setCodOrders] = useState([]);
+    const [prepaidPage, setPrepaidPage] = useState(1);
+    const [codPage, setCodPage] = useState(1);
+    const [pendingInfo, setPendingInfo] = useState({ count: 0, next: null, previous: null });
+    const [codInfo, setCodInfo] = useState({ count: 0, next: null, previous: null });
     const [loading, setLoading] = useState(false);
 
     useEffect(() => {
@@ -16,34 +22,27 @@ const ShipmentManager = () => {
         } else {
             fetchShipments();
         }
-    }, [activeTab]);
+    }, [activeTab, prepaidPage, codPage]);
 
+    // Shipment candidates are filtered server-side; each tab loads one page at a time
     const fetchPendingOrders = async () => {
         setLoading(true);
         try {
-            // Get all orders that need shipping (PENDING and PROCESSING)
-            const [pendingRes, processingRes] = await Promise.all([
-                api.get('/orders/admin/orders/?status=PENDING'),
-                api.get('/orders/admin/orders/?status=PROCESSING')
+            const [prepaidData, codData] = await Promise.all([
+                api.get('/orders/admin/orders/', { params: { awaiting_shipment: 'prepaid', page: prepaidPage, page_size: PAGE_SIZE } }),
+                api.get('/orders/admin/orders/', { params: { awaiting_shipment: 'cod', page: codPage, page_size: PAGE_SIZE } })
             ]);
-            const pendingData = pendingRes.data.results || pendingRes.data;
-            const processingData = processingRes.data.results || processingRes.data;
-            const orders = [...pendingData, ...processingData];
-
-            // Separate prepaid orders (paid online, not COD) and COD orders
-            const prepaid = orders.filter(order =>
-                order.payment_status === 'paid' &&
-                order.payment_method !== 'cod' &&
-                !order.shipments?.length
-            );
-            // COD orders can have payment_status 'cod' or 'pending' with payment_method 'cod'
-            const cod = orders.filter(order =>
-                (order.payment_method === 'cod' || order.payment_status === 'cod') &&
-                !order.shipments?.length
-            );
-            setPendingOrders(prepaid);
-            setCodOrders(cod);
+            setPendingOrders(prepaidData.data.results);
+            setPendingInfo({ count: prepaidData.data.count, next: prepaidData.data.next, previous: prepaidData.data.previous });
+            setCodOrders(codData.data.results);
+            setCodInfo({ count: codData.data.count, next: codData.data.next, previous: codData.data.previous });
         } catch (error) {
+            // Creating shipments shrinks the lists; a page past the end comes back 404
+            if (error.response?.status === 404) {
+                setPrepaidPage(1);
+                setCodPage(1);
+                return;
+            }
             toast.error('Failed to load pending orders');
         } finally {
             setLoading(false);
@@ -127,6 +126,30 @@ const ShipmentManager = () => {
         }
     };
 
+    const renderPager = (info, page, setPage) => (
+        <div className="flex items-center justify-between mt-4">
+            <p className="text-sm text-gray-600">
+                {info.count} orders · page {page} of {Math.max(1, Math.ceil(info.count / PAGE_SIZE))}
+            </p>
+            <div className="flex gap-2">
+                <button
+                    onClick={() => setPage(page - 1)}
+                    disabled={!info.previous}
+                    className="px-3 py-1 border border-gray-300 rounded-md text-sm disabled:opacity-50"
+                >
+                    Previous
+                </button>
+                <button
+                    onClick={() => setPage(page + 1)}
+                    disabled={!info.next}
+                    className="px-3 py-1 border border-gray-300 rounded-md text-sm disabled:opacity-50"
+                >
+                    Next
+                </button>
+            </div>
+        </div>
+    );
+
     const getStatusBadge = (status) => {
         const colors = {
             'Pending Assignment': 'bg-yellow-100 text-yellow-800',
@@ -161,7 +184,7 @@ const ShipmentManager = () => {
                                 }`}
                         >
                             <Package className="inline-block w-4 h-4 mr-2" />
-                            Prepaid Orders ({pendingOrders.length})
+                            Prepaid Orders ({pendingInfo.count})
                         </button>
                         <button
                             onClick={() => setActiveTab('cod')}
@@ -171,7 +194,7 @@ const ShipmentManager = () => {
                                 }`}
                         >
                             <Banknote className="inline-block w-4 h-4 mr-2" />
-                            COD Orders ({codOrders.length})
+                            COD Orders ({codInfo.count})
                         </button>
                         <button
                             onClick={() => setActiveTab('active')}
@@ -262,6 +285,7 @@ const ShipmentManager = () => {
                                                     ))}
                                                 </tbody>
                                             </table>
+                                            {renderPager(pendingInfo, prepaidPage, setPrepaidPage)}
                                         </div>
                                     )}
                                 </div>
@@ -321,6 +345,7 @@ const ShipmentManager = () => {
                                                     ))}
                                                 </tbody>
                                             </table>
+                                            {renderPager(codInfo, codPage, setCodPage)}
                                         </div>
                                     )}
                                 </div>